@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Set
+from typing import List, Optional, Set
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -11,6 +11,36 @@ class ServerSettings(BaseSettings):
     ssl_enabled: bool = Field(default=False, validation_alias="SSL_ENABLED")
     ssl_cert: str = Field(default="/etc/letsencrypt/live/roleta.seudominio.com/fullchain.pem", validation_alias="SSL_CERT")
     ssl_key: str = Field(default="/etc/letsencrypt/live/roleta.seudominio.com/privkey.pem", validation_alias="SSL_KEY")
+    # Serialização das mensagens: auto (msgspec > orjson > json), msgspec, orjson ou json
+    codec: str = Field(default="auto", validation_alias="WS_CODEC")
+    # Oferece o subprotocolo binário roleta.msgpack.v1 (JSON continua o padrão)
+    binary_wire: bool = Field(default=True, validation_alias="WS_BINARY")
+
+class CompressionSettings(BaseSettings):
+    # permessage-deflate: "policy" (por tipo/tamanho), "all" (todo frame) ou "off"
+    mode: str = Field(default="policy", validation_alias="WS_COMPRESSION")
+    # Janela LZ77 em bits (9-15) do servidor e do cliente; nível (1-9, -1 = padrão zlib) e memLevel (1-9)
+    window_bits: int = Field(default=12, validation_alias="WS_COMPRESSION_WINDOW_BITS")
+    client_window_bits: int = Field(default=12, validation_alias="WS_COMPRESSION_CLIENT_WINDOW_BITS")
+    level: int = Field(default=6, validation_alias="WS_COMPRESSION_LEVEL")
+    mem_level: int = Field(default=5, validation_alias="WS_COMPRESSION_MEM_LEVEL")
+    # Modo policy: abaixo disso (bytes) o frame vai cru, salvo os tipos listados (JSON, ex: ["trace"])
+    min_size: int = Field(default=512, validation_alias="WS_COMPRESSION_MIN_SIZE")
+    always_types: List[str] = Field(default=["state_sync"], validation_alias="WS_COMPRESSION_ALWAYS")
+    never_types: List[str] = Field(
+        default=["sugestao", "ack", "heartbeat", "role_assigned", "role_changed", "error"],
+        validation_alias="WS_COMPRESSION_NEVER"
+    )
+
+class RateLimitSettings(BaseSettings):
+    # Token bucket por conexão e classe de mensagem (msgs/s e rajada); excedente é descartado antes do decode
+    enabled: bool = Field(default=True, validation_alias="RATE_LIMIT_ENABLED")
+    spin_rate: float = Field(default=50.0, validation_alias="RATE_LIMIT_SPIN")
+    spin_burst: int = Field(default=100, validation_alias="RATE_LIMIT_SPIN_BURST")
+    control_rate: float = Field(default=20.0, validation_alias="RATE_LIMIT_CONTROL")
+    control_burst: int = Field(default=40, validation_alias="RATE_LIMIT_CONTROL_BURST")
+    query_rate: float = Field(default=5.0, validation_alias="RATE_LIMIT_QUERY")
+    query_burst: int = Field(default=20, validation_alias="RATE_LIMIT_QUERY_BURST")
 
 class AuthSettings(BaseSettings):
     enabled: bool = Field(default=False, validation_alias="AUTH_ENABLED")
@@ -18,9 +48,111 @@ class AuthSettings(BaseSettings):
     keycloak_realm: str = Field(default="roleta", validation_alias="KEYCLOAK_REALM")
     keycloak_client_id: str = Field(default="roleta-cloud", validation_alias="KEYCLOAK_CLIENT_ID")
 
+class PersistenceSettings(BaseSettings):
+    # Write-behind do state.json: flush a cada N segundos ou N spins (o que vier primeiro)
+    snapshot_interval: float = Field(default=1.0, validation_alias="SNAPSHOT_INTERVAL")
+    snapshot_every_spins: int = Field(default=10, validation_alias="SNAPSHOT_EVERY_SPINS")
+    # Journal binário de spins (replay da cauda no startup)
+    journal_enabled: bool = Field(default=True, validation_alias="JOURNAL_ENABLED")
+    journal_compact_every: int = Field(default=1000, validation_alias="JOURNAL_COMPACT_EVERY")
+    journal_fsync: bool = Field(default=False, validation_alias="JOURNAL_FSYNC")
+
+class DatabaseSettings(BaseSettings):
+    # Arquivo SQLite (vazio = data/decisions.db)
+    db_path: Optional[Path] = Field(default=None, validation_alias="DB_PATH")
+    # PRAGMAs das conexões persistentes
+    journal_mode: str = Field(default="WAL", validation_alias="DB_JOURNAL_MODE")
+    synchronous: str = Field(default="NORMAL", validation_alias="DB_SYNCHRONOUS")
+    cache_size_kb: int = Field(default=8192, validation_alias="DB_CACHE_SIZE_KB")
+    mmap_size: int = Field(default=64 * 1024 * 1024, validation_alias="DB_MMAP_SIZE")
+    temp_store: str = Field(default="MEMORY", validation_alias="DB_TEMP_STORE")
+    busy_timeout_ms: int = Field(default=5000, validation_alias="DB_BUSY_TIMEOUT_MS")
+    read_pool_size: int = Field(default=4, validation_alias="DB_READ_POOL_SIZE")
+    cached_statements: int = Field(default=256, validation_alias="DB_CACHED_STATEMENTS")
+    # wal_checkpoint(PASSIVE) periódico (segundos, 0 = só o autocheckpoint)
+    checkpoint_interval: float = Field(default=60.0, validation_alias="DB_CHECKPOINT_INTERVAL")
+    # Escritor em lote: decisões/janelas gravadas fora do event loop
+    async_writes: bool = Field(default=True, validation_alias="DB_ASYNC_WRITES")
+    queue_size: int = Field(default=1000, validation_alias="DB_QUEUE_SIZE")
+    batch_size: int = Field(default=100, validation_alias="DB_BATCH_SIZE")
+    # Fila cheia: "drop" (descarta) ou "block" (espera até block_timeout; nunca dentro do event loop)
+    queue_policy: str = Field(default="drop", validation_alias="DB_QUEUE_POLICY")
+    block_timeout: float = Field(default=0.5, validation_alias="DB_BLOCK_TIMEOUT")
+
+class StateSyncSettings(BaseSettings):
+    # Versões do state_sync mantidas como base para deltas
+    history_size: int = Field(default=32, validation_alias="STATE_SYNC_HISTORY")
+    # Modo delta: reenvia se o state_ack não chegar neste tempo (s)
+    resend_timeout: float = Field(default=3.0, validation_alias="STATE_DELTA_RESEND_TIMEOUT")
+
+class BroadcastSettings(BaseSettings):
+    # Fila de saída por conexão (mensagens)
+    queue_size: int = Field(default=64, validation_alias="BROADCAST_QUEUE_SIZE")
+    # Fila cheia: "drop_oldest_heartbeat", "coalesce" ou "disconnect"
+    slow_policy: str = Field(default="drop_oldest_heartbeat", validation_alias="BROADCAST_SLOW_POLICY")
+    # Envio que demora mais que isso desconecta o cliente (s)
+    send_timeout: float = Field(default=10.0, validation_alias="BROADCAST_SEND_TIMEOUT")
+
+class TableSettings(BaseSettings):
+    # Mesas carregadas ao mesmo tempo (acima disso descarrega as ociosas, LRU)
+    max_tables: int = Field(default=500, validation_alias="MAX_TABLES")
+    # Mesa sem conexões há mais que isso é descarregada (s, 0 = nunca)
+    idle_timeout: float = Field(default=900.0, validation_alias="TABLE_IDLE_TIMEOUT")
+    # Intervalo da varredura de mesas ociosas (s)
+    sweep_interval: float = Field(default=30.0, validation_alias="TABLE_SWEEP_INTERVAL")
+
+class ShardSettings(BaseSettings):
+    # Processos worker donos de mesas (0 = processo único, sem roteador)
+    workers: int = Field(default=0, validation_alias="SHARD_WORKERS")
+    # Sockets IPC, bancos e mesa padrão dos workers (vazio = data/shards)
+    data_dir: Optional[Path] = Field(default=None, validation_alias="SHARD_DIR")
+    # Espera pelo socket de cada worker no startup (s)
+    start_timeout: float = Field(default=30.0, validation_alias="SHARD_START_TIMEOUT")
+
+class MetricsSettings(BaseSettings):
+    # Endpoint HTTP /metrics (formato texto do Prometheus)
+    enabled: bool = Field(default=True, validation_alias="METRICS_ENABLED")
+    host: str = Field(default="127.0.0.1", validation_alias="METRICS_HOST")
+    # 0 = WS_PORT + 1 (modo sharded: worker N usa a porta + 1 + N)
+    port: int = Field(default=0, validation_alias="METRICS_PORT")
+
+class TraceSettings(BaseSettings):
+    # Fração dos traces com spans detalhados e guardados no buffer (0-1)
+    sample_rate: float = Field(default=1.0, validation_alias="TRACE_SAMPLE_RATE")
+    # Traces mais lentos que isso (ms) entram no buffer mesmo sem amostragem (0 = nunca)
+    slow_ms: float = Field(default=50.0, validation_alias="TRACE_SLOW_MS")
+    # Traces concluídos mantidos para o get_traces (buffer circular por processo)
+    buffer_size: int = Field(default=1000, validation_alias="TRACE_BUFFER_SIZE")
+
+class StrategySettings(BaseSettings):
+    # SDA17: forças analisadas, raio de agrupamento e vizinhos de cada lado (17 números)
+    sda_min_forces: int = Field(default=3, validation_alias="SDA_MIN_FORCES")
+    sda_cluster_proximity: int = Field(default=5, validation_alias="SDA_CLUSTER_PROXIMITY")
+    sda_num_neighbors: int = Field(default=8, validation_alias="SDA_NUM_NEIGHBORS")
+    # Cluster mode pré-calculado por tupla de forças (cache em data/cache); acima do limite calcula por spin
+    sda_decision_table: bool = Field(default=True, validation_alias="SDA_DECISION_TABLE")
+    sda_table_max_entries: int = Field(default=2_000_000, validation_alias="SDA_TABLE_MAX_ENTRIES")
+    # Triple Rate: janelas curta/média/longa (JSON, ex: [4,6,12]) e limite de cold streak
+    triple_rate_windows: List[int] = Field(default=[4, 6, 12], validation_alias="TRIPLE_RATE_WINDOWS")
+    triple_rate_cold_threshold: float = Field(default=0.25, validation_alias="TRIPLE_RATE_COLD_THRESHOLD")
+    # Estratégia que decide a sugestao (nome do registro: strategies.available_strategies())
+    primary: str = Field(default="sda17", validation_alias="STRATEGY_PRIMARY")
+    # Ensemble avaliado a cada spin depois da sugestao (JSON, ex: ["sda17","sda11","inercia"]; vazio = desligado)
+    ensemble: List[str] = Field(default=[], validation_alias="STRATEGY_ENSEMBLE")
+    # Prazo por spin (ms): estratégia atrasada ou com erro fica fora do voto
+    ensemble_deadline_ms: float = Field(default=50.0, validation_alias="ENSEMBLE_DEADLINE_MS")
+    # Regra de voto: majority, weighted ou unanimous
+    ensemble_vote: str = Field(default="majority", validation_alias="ENSEMBLE_VOTE")
+    # Threads que executam as estratégias (compartilhadas entre mesas)
+    ensemble_workers: int = Field(default=4, validation_alias="ENSEMBLE_WORKERS")
+
 class GameSettings(BaseSettings):
+    # Capacidade do ring buffer de cada timeline (env MAX_TIMELINE_SIZE).
+    # add/recent são O(1): pode subir para dezenas de milhares em pesquisa.
     max_timeline_size: int = 45
     sda_forces_analyzed: int = 4
+    # Capacidade dos históricos de acerto (performance_sda17_* / performance_bet_*)
+    performance_history_size: int = 12
 
     # Roulette Wheel Constants
     wheel_sequence: List[int] = [
@@ -35,10 +167,26 @@ class Settings(BaseSettings):
 
     base_dir: Path = BASE_DIR
     state_file: Path = BASE_DIR / "state.json"
+    journal_file: Path = BASE_DIR / "data" / "spins.journal"
+    # Estado/journal das demais mesas: tables_dir/<mesa_id>/ (a padrão usa os caminhos acima)
+    tables_dir: Path = BASE_DIR / "data" / "tables"
+    # Tabelas pré-calculadas (strategies.decision_table)
+    cache_dir: Path = BASE_DIR / "data" / "cache"
     log_file: Path = BASE_DIR / "roleta.log"
 
     server: ServerSettings = Field(default_factory=ServerSettings)
+    compression: CompressionSettings = Field(default_factory=CompressionSettings)
+    rate_limit: RateLimitSettings = Field(default_factory=RateLimitSettings)
     auth: AuthSettings = Field(default_factory=AuthSettings)
+    persistence: PersistenceSettings = Field(default_factory=PersistenceSettings)
+    database: DatabaseSettings = Field(default_factory=DatabaseSettings)
+    state_sync: StateSyncSettings = Field(default_factory=StateSyncSettings)
+    broadcast: BroadcastSettings = Field(default_factory=BroadcastSettings)
+    tables: TableSettings = Field(default_factory=TableSettings)
+    shard: ShardSettings = Field(default_factory=ShardSettings)
+    metrics: MetricsSettings = Field(default_factory=MetricsSettings)
+    trace: TraceSettings = Field(default_factory=TraceSettings)
+    strategy: StrategySettings = Field(default_factory=StrategySettings)
     game: GameSettings = Field(default_factory=GameSettings)
 
 settings = Settings()
@@ -0,0 +1,29 @@
+# Roleta Cloud - Backtest Vetorizado
+"""
+Replay de sequências históricas de spins com a mesma semântica do
+servidor (SDA17Strategy + TripleRateAdvisor + MartingaleState), em
+operações NumPy sobre o array inteiro em vez de um spin por vez.
+
+Uso:
+    python -m backtest --journal data/spins.journal
+    python -m backtest --db data/decisions.db --json
+    python -m backtest --random 5000000 --check
+    python -m backtest.sweep --journal data/spins.journal --proximity 3:7 --neighbors 6:9
+"""
+
+from .data import SpinSequence, from_pairs, load_database, load_file, load_journal, load_sources, random_spins
+from .engine import BacktestParams, BacktestReport, run, run_many
+
+__all__ = [
+    "BacktestParams",
+    "BacktestReport",
+    "SpinSequence",
+    "from_pairs",
+    "load_database",
+    "load_file",
+    "load_journal",
+    "load_sources",
+    "random_spins",
+    "run",
+    "run_many",
+]
@@ -0,0 +1,88 @@
+# Roleta Cloud - CLI do Backtest
+"""
+Uso:
+    python -m backtest --journal data/spins.journal
+    python -m backtest --db data/decisions.db [--session ID]
+    python -m backtest --file spins.csv --json
+    python -m backtest --random 5000000 --seed 7
+    python -m backtest --random 20000 --check   # compara com o caminho de produção
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import List
+
+from .data import SpinSequence, load_sources
+from .engine import BacktestParams, BacktestReport, run_many
+
+
+def _load(args: argparse.Namespace) -> List[SpinSequence]:
+    return load_sources(args.journal, args.db, args.session, args.file, args.random, args.seed)
+
+
+def _print_report(report: BacktestReport, elapsed: float) -> None:
+    rate = report.spins / elapsed if elapsed > 0 else 0.0
+    print(f"Spins:        {report.spins:,} ({elapsed * 1000:.1f} ms, {rate:,.0f} spins/s)")
+    print(f"SDA17:        {report.prediction_hits:,}/{report.predictions:,} ({report.prediction_rate:.1%})")
+    print(f"Apostas:      {report.bet_hits:,}/{report.bets:,} ({report.bet_rate:.1%}), puladas {report.skipped:,}")
+    print(f"Confiança:    alta {report.confidence['alta']:,} | media {report.confidence['media']:,} | baixa {report.confidence['baixa']:,}")
+    print(f"Martingale:   {report.windows:,} janelas, {report.stops:,} STOPs, gale máximo {report.max_level}")
+    print(f"Erros seguidos (máx): {report.max_miss_streak}")
+    print(f"Resultado:    {report.profit:+,.2f} | drawdown máximo {report.max_drawdown:,.2f}")
+
+
+def _check(sequences: List[SpinSequence], params: BacktestParams) -> bool:
+    """Compara o motor vetorizado com o replay spin a spin de produção."""
+    from .reference import replay
+    from .engine import run
+
+    ok = True
+    for sequence in sequences:
+        expected = replay(sequence, params).to_dict()
+        actual = run(sequence, params).to_dict()
+        diff = {k: (expected[k], actual[k]) for k in expected if expected[k] != actual[k]}
+        if diff:
+            ok = False
+            print(f"DIVERGÊNCIA em {sequence.source}: {diff}", file=sys.stderr)
+    print("Paridade com produção: " + ("OK" if ok else "FALHOU"))
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m backtest", description="Backtest vetorizado SDA17 + Triple Rate + Martingale")
+    parser.add_argument("--journal", help="Journal de spins (inclui segmentos arquivados)")
+    parser.add_argument("--db", help="Banco de decisões (tabela decisions)")
+    parser.add_argument("--session", help="Filtra uma sessão do banco")
+    parser.add_argument("--file", action="append", help="Arquivo JSON/CSV de spins (repetível)")
+    parser.add_argument("--random", type=int, default=0, help="Gera N spins aleatórios")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--check", action="store_true", help="Verifica paridade com o caminho de produção")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args()
+
+    sequences = _load(args)
+    if not sequences:
+        parser.error("informe ao menos uma fonte (--journal, --db, --file ou --random)")
+
+    params = BacktestParams.from_production()
+    start = time.perf_counter()
+    report = run_many(sequences, params)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        output = report.to_dict()
+        output["elapsed_ms"] = round(elapsed * 1000, 3)
+        output["spins_per_s"] = round(report.spins / elapsed) if elapsed > 0 else 0
+        print(json.dumps(output, indent=2))
+    else:
+        _print_report(report, elapsed)
+
+    if args.check and not _check(sequences, params):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
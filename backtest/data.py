@@ -0,0 +1,173 @@
+# Roleta Cloud - Fontes de Dados do Backtest
+# Spins históricos (journal, banco de decisões, arquivos) como arrays NumPy
+
+import csv
+import json
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from state.journal import RECORD_SPIN, SpinJournal
+
+_CLOCKWISE = ("horario", "cw", "clockwise")
+
+
+@dataclass
+class SpinSequence:
+    """
+    Sequência contínua de spins (uma sessão).
+
+    numbers: números sorteados (0-36), int64
+    clockwise: True se o spin foi no sentido horário
+    """
+    numbers: np.ndarray
+    clockwise: np.ndarray
+    source: str = ""
+
+    def __len__(self) -> int:
+        return int(self.numbers.size)
+
+    def __repr__(self):
+        return f"SpinSequence({self.source or '?'}, spins={len(self)})"
+
+
+def from_pairs(pairs: Iterable[Tuple[int, Optional[str]]], source: str = "") -> SpinSequence:
+    """
+    Cria a sequência a partir de pares (numero, direcao).
+
+    Números fora de 0-36 são descartados (o servidor os rejeita). Sem
+    direção, os spins alternam a partir de "horario", como na mesa real.
+    """
+    numbers: List[int] = []
+    clockwise: List[bool] = []
+    for numero, direcao in pairs:
+        if not isinstance(numero, int) or isinstance(numero, bool) or not 0 <= numero <= 36:
+            continue
+        if direcao is None:
+            cw = not clockwise[-1] if clockwise else True
+        else:
+            cw = direcao in _CLOCKWISE
+        numbers.append(numero)
+        clockwise.append(cw)
+    return SpinSequence(
+        numbers=np.asarray(numbers, dtype=np.int64),
+        clockwise=np.asarray(clockwise, dtype=bool),
+        source=source
+    )
+
+
+def random_spins(count: int, seed: Optional[int] = None) -> SpinSequence:
+    """Spins uniformes com direção alternada (dataset sintético para medir vazão)."""
+    rng = np.random.default_rng(seed)
+    numbers = rng.integers(0, 37, size=count, dtype=np.int64)
+    clockwise = (np.arange(count) % 2) == 0
+    return SpinSequence(numbers=numbers, clockwise=clockwise, source=f"random(seed={seed})")
+
+
+def load_journal(path: Union[str, Path]) -> List[SpinSequence]:
+    """
+    Spins do journal (segmentos arquivados + ativo).
+
+    Registros de correção (clear) e reset encerram a sequência atual:
+    cada trecho é reproduzido a partir de um estado limpo.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Journal não encontrado: {path}")
+    journal = SpinJournal(path)
+    sequences: List[SpinSequence] = []
+    current: List[Tuple[int, str]] = []
+    try:
+        for record in journal.iter_all():
+            if record.kind == RECORD_SPIN:
+                current.append((record.numero, record.direcao))
+            elif current:
+                sequences.append(from_pairs(current, f"{path}#{len(sequences)}"))
+                current = []
+    finally:
+        journal.close()
+    if current:
+        sequences.append(from_pairs(current, f"{path}#{len(sequences)}"))
+    return sequences
+
+
+def load_database(path: Union[str, Path], session_id: Optional[str] = None) -> List[SpinSequence]:
+    """Spins da tabela decisions (uma sequência por sessão, em ordem de id)."""
+    if not Path(path).exists():
+        raise FileNotFoundError(f"Banco não encontrado: {path}")
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        query = "SELECT session_id, spin_number, spin_direction FROM decisions"
+        params: Tuple[Any, ...] = ()
+        if session_id is not None:
+            query += " WHERE session_id = ?"
+            params = (session_id,)
+        rows = conn.execute(query + " ORDER BY id", params).fetchall()
+    finally:
+        conn.close()
+
+    sequences: List[SpinSequence] = []
+    current: List[Tuple[int, str]] = []
+    current_session: Any = object()
+    for session, numero, direcao in rows:
+        if session != current_session and current:
+            sequences.append(from_pairs(current, f"{path}#{current_session}"))
+            current = []
+        current_session = session
+        current.append((numero, direcao or None))
+    if current:
+        sequences.append(from_pairs(current, f"{path}#{current_session}"))
+    return sequences
+
+
+def load_file(path: Union[str, Path]) -> List[SpinSequence]:
+    """
+    Spins de arquivo JSON ou CSV/texto.
+
+    JSON: lista de números, de pares [numero, direcao] ou de objetos
+    {"numero", "direcao"}. CSV/texto: uma linha por spin, "numero[,direcao]".
+    """
+    path = Path(path)
+    pairs: List[Tuple[int, Optional[str]]] = []
+    if path.suffix.lower() == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        for item in items:
+            if isinstance(item, dict):
+                pairs.append((item.get("numero"), item.get("direcao")))
+            elif isinstance(item, (list, tuple)):
+                pairs.append((item[0], item[1] if len(item) > 1 else None))
+            else:
+                pairs.append((item, None))
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if not row or not row[0].strip().lstrip("-").isdigit():
+                    continue  # Cabeçalho / linha vazia
+                direcao = row[1].strip() if len(row) > 1 and row[1].strip() else None
+                pairs.append((int(row[0]), direcao))
+    return [from_pairs(pairs, str(path))]
+
+
+def load_sources(
+    journal: Optional[str] = None,
+    db: Optional[str] = None,
+    session_id: Optional[str] = None,
+    files: Iterable[str] = (),
+    random_count: int = 0,
+    seed: Optional[int] = None
+) -> List[SpinSequence]:
+    """Junta as fontes da linha de comando (journal, banco, arquivos, aleatório)."""
+    sequences: List[SpinSequence] = []
+    if journal:
+        sequences.extend(load_journal(journal))
+    if db:
+        sequences.extend(load_database(db, session_id))
+    for path in files or ():
+        sequences.extend(load_file(path))
+    if random_count:
+        sequences.append(random_spins(random_count, seed))
+    return sequences
@@ -0,0 +1,449 @@
+# Roleta Cloud - Motor do Backtest Vetorizado
+# SDA17 + Triple Rate + Martingale sobre arrays inteiros (sem loop por spin)
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app_config.settings import settings
+from core.roulette import compile_wheel
+from state.bet_advisor import TripleRateAdvisor
+from state.game import MartingaleState
+from strategies.decision_table import get_decision_table
+from strategies.sda17 import SDA17Strategy
+
+from .data import SpinSequence
+
+# Força predita é limitada a 1..37 (SDA17Strategy._predict_cluster)
+MIN_FORCE = 1
+MAX_FORCE = 37
+
+
+@dataclass(frozen=True)
+class BacktestParams:
+    """
+    Parâmetros do replay. Os padrões espelham as classes de produção
+    (ver from_production); alterar um campo simula outra configuração.
+    """
+    # SDA17
+    min_forces: int = 3
+    cluster_proximity: int = 5
+    num_neighbors: int = 8
+    timeline_size: int = 45
+    # Triple Rate (janelas curta / média / longa)
+    windows: Tuple[int, int, int] = (4, 6, 12)
+    history_size: int = 12
+    min_data: int = 2
+    cold_threshold: float = 0.25
+    # Martingale
+    bet_values: Tuple[int, ...] = (17, 34, 68)
+    window_size: int = 5
+    min_hits_to_pass: int = 3
+    # Pagamento de número pleno (35:1)
+    payout: int = 35
+
+    @classmethod
+    def from_production(cls, **overrides: Any) -> "BacktestParams":
+        """Parâmetros atuais do servidor (estratégia, advisor, martingale, settings)."""
+        strategy = SDA17Strategy()
+        advisor = TripleRateAdvisor()
+        values: Dict[str, Any] = {
+            "min_forces": strategy.min_forces,
+            "cluster_proximity": strategy.cluster_proximity,
+            "num_neighbors": strategy.num_neighbors,
+            "timeline_size": settings.game.max_timeline_size,
+            "windows": advisor.windows,
+            "history_size": settings.game.performance_history_size,
+            "min_data": advisor.MIN_DATA,
+            "cold_threshold": advisor.cold_threshold,
+            "bet_values": tuple(MartingaleState.BET_VALUES[level] for level in sorted(MartingaleState.BET_VALUES)),
+            "window_size": MartingaleState.WINDOW_SIZE,
+            "min_hits_to_pass": MartingaleState.MIN_HITS_TO_PASS,
+        }
+        values.update(overrides)
+        return cls(**values)
+
+    @property
+    def history_capacity(self) -> int:
+        """Resultados mantidos por direção (cobre a maior janela, como state.game.history_capacity)."""
+        return max(self.history_size, *self.windows)
+
+
+@dataclass
+class BacktestReport:
+    """Resultado agregado de um replay (somável entre sequências)."""
+    spins: int = 0
+    predictions: int = 0           # SDA17 recomendou (registrado no Triple Rate)
+    prediction_hits: int = 0
+    bets: int = 0                  # Triple Rate não vetou (aposta real)
+    bet_hits: int = 0
+    windows: int = 0               # Janelas de martingale completas
+    stops: int = 0
+    max_level: int = 0
+    max_miss_streak: int = 0       # Maior sequência de apostas erradas
+    profit: float = 0.0
+    max_drawdown: float = 0.0
+    confidence: Dict[str, int] = field(default_factory=lambda: {"alta": 0, "media": 0, "baixa": 0})
+    # Estado final por direção (para comparar com o GameState de produção)
+    final: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def skipped(self) -> int:
+        return self.predictions - self.bets
+
+    @property
+    def prediction_rate(self) -> float:
+        return self.prediction_hits / self.predictions if self.predictions else 0.0
+
+    @property
+    def bet_rate(self) -> float:
+        return self.bet_hits / self.bets if self.bets else 0.0
+
+    def merge(self, other: "BacktestReport") -> "BacktestReport":
+        """
+        Acumula outra sequência (independente). O drawdown é o maior
+        entre as sequências; `final` fica com o da última.
+        """
+        self.max_drawdown = max(self.max_drawdown, other.max_drawdown)
+        self.profit += other.profit
+        self.spins += other.spins
+        self.predictions += other.predictions
+        self.prediction_hits += other.prediction_hits
+        self.bets += other.bets
+        self.bet_hits += other.bet_hits
+        self.windows += other.windows
+        self.stops += other.stops
+        self.max_level = max(self.max_level, other.max_level)
+        self.max_miss_streak = max(self.max_miss_streak, other.max_miss_streak)
+        for key, value in other.confidence.items():
+            self.confidence[key] = self.confidence.get(key, 0) + value
+        self.final = other.final
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "spins": self.spins,
+            "predictions": self.predictions,
+            "prediction_hits": self.prediction_hits,
+            "prediction_rate": round(self.prediction_rate, 4),
+            "bets": self.bets,
+            "bet_hits": self.bet_hits,
+            "bet_rate": round(self.bet_rate, 4),
+            "skipped": self.skipped,
+            "windows": self.windows,
+            "stops": self.stops,
+            "max_level": self.max_level,
+            "max_miss_streak": self.max_miss_streak,
+            "profit": round(self.profit, 2),
+            "max_drawdown": round(self.max_drawdown, 2),
+            "confidence": dict(self.confidence),
+            "final": self.final
+        }
+
+
+class WheelTables:
+    """Tabelas da roda (CompiledWheel) como arrays NumPy + máscara de acerto por raio."""
+
+    def __init__(self, wheel_sequence: Optional[Sequence[int]] = None):
+        wheel = compile_wheel(wheel_sequence if wheel_sequence is not None else settings.game.wheel_sequence)
+        self.size = wheel.size
+        self.force_cw = np.asarray(wheel.force_cw, dtype=np.int64)
+        self.force_ccw = np.asarray(wheel.force_ccw, dtype=np.int64)
+        self.target_cw = np.asarray(wheel.target_cw, dtype=np.int64)
+        self.target_ccw = np.asarray(wheel.target_ccw, dtype=np.int64)
+        self._wheel = wheel
+        self._masks: Dict[int, np.ndarray] = {}
+
+    def hit_mask(self, radius: int) -> np.ndarray:
+        """mask[centro, numero] = numero está entre os vizinhos do centro."""
+        mask = self._masks.get(radius)
+        if mask is None:
+            mask = np.zeros((self.size, self.size), dtype=bool)
+            for center in range(self.size):
+                mask[center, self._wheel.neighbors(center, radius)] = True
+            self._masks[radius] = mask
+        return mask
+
+
+_tables: Dict[Tuple[int, ...], WheelTables] = {}
+
+
+def wheel_tables(wheel_sequence: Optional[Sequence[int]] = None) -> WheelTables:
+    """WheelTables compartilhadas por sequência da roda."""
+    key = tuple(wheel_sequence if wheel_sequence is not None else settings.game.wheel_sequence)
+    tables = _tables.get(key)
+    if tables is None:
+        tables = _tables[key] = WheelTables(key)
+    return tables
+
+
+# ========== ETAPAS ==========
+
+def compute_forces(numbers: np.ndarray, clockwise: np.ndarray, tables: WheelTables) -> np.ndarray:
+    """Força de cada spin a partir do anterior (o estado começa em last_number = 0)."""
+    previous = np.empty_like(numbers)
+    previous[:1] = 0
+    previous[1:] = numbers[:-1]
+    return np.where(clockwise, tables.force_cw[previous, numbers], tables.force_ccw[previous, numbers])
+
+
+def predict_clusters(forces: np.ndarray, proximity: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster mode do SDA17 em lote.
+
+    forces: (N, k), mais recente primeiro. Cada força entra no primeiro
+    cluster cujo PRIMEIRO elemento está a <= proximity; senão abre outro.
+    O maior cluster vence (empate: o aberto primeiro) e a força predita
+    é a média truncada, limitada a 1..37.
+
+    Returns:
+        (força_predita, tamanho_do_cluster)
+    """
+    n, k = forces.shape
+    rows = np.arange(n)
+    anchors = np.zeros((n, k), dtype=np.int64)
+    sizes = np.zeros((n, k), dtype=np.int64)
+    sums = np.zeros((n, k), dtype=np.int64)
+    opened = np.zeros(n, dtype=np.int64)
+
+    for j in range(k):
+        f = forces[:, j]
+        close = (np.abs(anchors[:, :j] - f[:, None]) <= proximity) & (sizes[:, :j] > 0)
+        joined = close.any(axis=1) if j else np.zeros(n, dtype=bool)
+        slot = np.where(joined, close.argmax(axis=1) if j else 0, opened)
+        anchors[rows[~joined], slot[~joined]] = f[~joined]
+        sizes[rows, slot] += 1
+        sums[rows, slot] += f
+        opened += ~joined
+
+    best = sizes.argmax(axis=1)  # Primeiro máximo = max(clusters, key=len)
+    size = sizes[rows, best]
+    predicted = np.clip(sums[rows, best] // size, MIN_FORCE, MAX_FORCE)
+    return predicted, size
+
+
+def predict_forces(forces: np.ndarray, proximity: int, base: int) -> np.ndarray:
+    """
+    Força predita por linha de `forces` (N, k): leitura da tabela de decisão
+    do SDA17 (mesmo resultado de predict_clusters) quando ela existe para
+    (k, proximity); senão predict_clusters.
+    """
+    k = forces.shape[1]
+    table = get_decision_table(k, proximity, base)
+    if table is None:
+        return predict_clusters(forces, proximity)[0]
+    strides = base ** np.arange(k - 1, -1, -1, dtype=np.int64)
+    predicted = np.frombuffer(table.predicted, dtype=np.uint8)
+    return predicted[forces @ strides].astype(np.int64)
+
+
+def triple_rate(
+    resolved: np.ndarray,
+    outcomes: np.ndarray,
+    queries: np.ndarray,
+    params: BacktestParams
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    TripleRateAdvisor em lote para UMA direção.
+
+    resolved: posição (spin) de cada predição já verificada, em ordem
+    outcomes: acerto de cada predição verificada
+    queries: spins em que o advisor é consultado
+
+    Returns:
+        (should_bet, confiança) com confiança 0=baixa, 1=media, 2=alta
+    """
+    hits = np.concatenate(([0], np.cumsum(outcomes, dtype=np.int64)))
+    # Histórico no momento da consulta: predições verificadas antes dela
+    available = np.searchsorted(resolved, queries, side="left")
+
+    rates = []
+    for window in params.windows:
+        n = np.minimum(window, np.minimum(available, params.history_capacity))
+        counted = hits[available] - hits[available - n]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates.append(np.where(n > 0, counted / np.maximum(n, 1), 0.0))
+    short, medium, long_ = rates
+
+    warming = available < params.min_data
+    cold = short < params.cold_threshold
+    trending = short >= medium
+    should_bet = warming | (~cold & trending)
+    rising = trending & (medium >= long_) & (short > 0)
+    confidence = np.where(warming | cold | ~trending, 0, np.where(rising, 2, 1))
+    return should_bet, confidence
+
+
+def martingale(outcomes: np.ndarray, params: BacktestParams) -> Dict[str, Any]:
+    """
+    MartingaleState em lote para UMA direção.
+
+    As apostas formam janelas fixas de window_size. Janela com
+    min_hits_to_pass acertos volta ao nível 1; senão sobe um nível e,
+    no último, conta STOP e reinicia. O nível de cada janela é
+    1 + (falhas consecutivas anteriores mod níveis).
+    """
+    levels_count = len(params.bet_values)
+    total = outcomes.size
+    complete = total // params.window_size
+    window_hits = outcomes[:complete * params.window_size].reshape(complete, params.window_size).sum(axis=1)
+    failed = window_hits < params.min_hits_to_pass
+
+    index = np.arange(complete)
+    last_pass = np.maximum.accumulate(np.where(failed, -1, index)) if complete else index
+    streak = np.where(failed, index - last_pass, 0)  # falhas consecutivas até a janela (inclusive)
+    before = np.concatenate(([0], streak))            # ... antes de cada janela (inclui a parcial)
+    window_levels = 1 + before % levels_count
+
+    bet_levels = np.repeat(window_levels, params.window_size)[:total]
+
+    stops = int(np.count_nonzero(failed & (streak % levels_count == 0)))
+    partial = outcomes[complete * params.window_size:]
+    return {
+        "bet_levels": bet_levels,
+        "windows": complete,
+        "stops": stops,
+        "final": {
+            "level": int(window_levels[-1]),
+            "window_hits": int(partial.sum()),
+            "window_count": int(partial.size),
+            "total_stops": stops
+        }
+    }
+
+
+def _max_run(values: np.ndarray) -> int:
+    """Maior sequência de True consecutivos."""
+    if not values.size:
+        return 0
+    padded = np.concatenate(([0], values.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return int((edges[1::2] - edges[::2]).max()) if edges.size else 0
+
+
+# ========== REPLAY ==========
+
+def run(
+    sequence: SpinSequence,
+    params: Optional[BacktestParams] = None,
+    tables: Optional[WheelTables] = None,
+    forces: Optional[np.ndarray] = None
+) -> BacktestReport:
+    """
+    Reproduz uma sequência a partir de um GameState limpo.
+
+    Mesma ordem do handle_new_result: verificar a predição pendente,
+    atualizar o martingale (se apostou), processar o spin, analisar a
+    timeline alvo com SDA17 e consultar o Triple Rate. A predição do
+    spin i é verificada no spin i+1; a do último spin fica pendente.
+
+    `forces` (compute_forces) não depende dos parâmetros: pode ser
+    calculado uma vez e reaproveitado entre execuções (sweep).
+    """
+    params = params or BacktestParams.from_production()
+    tables = tables or wheel_tables()
+    numbers = sequence.numbers
+    clockwise = sequence.clockwise
+    total = int(numbers.size)
+    report = BacktestReport(spins=total, final=_final_state(params, {}))
+    if total == 0:
+        return report
+
+    # 1. Forças e timelines (uma por direção, em ordem de chegada)
+    if forces is None:
+        forces = compute_forces(numbers, clockwise, tables)
+    forces_cw = forces[clockwise]
+    forces_ccw = forces[~clockwise]
+    count_cw = np.cumsum(clockwise, dtype=np.int64)
+    count_ccw = np.arange(1, total + 1) - count_cw
+
+    # 2. SDA17 na timeline alvo (oposta ao spin atual)
+    target_cw = ~clockwise
+    available = np.where(target_cw, count_cw, count_ccw)
+    k = params.min_forces
+    if k > params.timeline_size:
+        predicted_at = np.zeros(0, dtype=np.int64)
+    else:
+        predicted_at = np.flatnonzero(available >= k)
+    if not predicted_at.size:
+        return report
+
+    pool = np.concatenate((forces_cw, forces_ccw))
+    t_cw = target_cw[predicted_at]
+    last = available[predicted_at] - 1
+    offsets = np.where(t_cw, 0, forces_cw.size) + last
+    window = pool[offsets[:, None] - np.arange(k)[None, :]]
+    force = predict_forces(window, params.cluster_proximity, tables.size)
+
+    from_number = numbers[predicted_at]
+    center = np.where(t_cw, tables.target_cw[from_number, force], tables.target_ccw[from_number, force])
+
+    # 3. Verificação no spin seguinte
+    resolved_mask = predicted_at < total - 1
+    hit = np.zeros(predicted_at.size, dtype=bool)
+    nxt = numbers[predicted_at[resolved_mask] + 1]
+    hit[resolved_mask] = tables.hit_mask(params.num_neighbors)[center[resolved_mask], nxt]
+
+    report.predictions = int(resolved_mask.sum())
+    report.prediction_hits = int(hit[resolved_mask].sum())
+
+    # 4. Triple Rate por direção + 5. Martingale das apostas reais
+    should_bet = np.zeros(predicted_at.size, dtype=bool)
+    stake = np.zeros(predicted_at.size, dtype=np.float64)
+    final: Dict[str, Dict[str, int]] = {}
+    for name, mask in (("cw", t_cw), ("ccw", ~t_cw)):
+        spins_dir = predicted_at[mask]
+        resolved_dir = mask & resolved_mask
+        bet_dir, confidence = triple_rate(
+            predicted_at[resolved_dir], hit[resolved_dir], spins_dir, params
+        )
+        should_bet[mask] = bet_dir
+        counted = resolved_mask[mask]
+        for label, code in (("baixa", 0), ("media", 1), ("alta", 2)):
+            report.confidence[label] += int(np.count_nonzero((confidence == code) & counted))
+
+        placed = np.flatnonzero(mask & should_bet & resolved_mask)
+        mg = martingale(hit[placed], params)
+        stake[placed] = np.asarray(params.bet_values, dtype=np.float64)[mg["bet_levels"] - 1]
+        report.windows += mg["windows"]
+        report.stops += mg["stops"]
+        if mg["bet_levels"].size:
+            report.max_level = max(report.max_level, int(mg["bet_levels"].max()))
+        final[name] = mg["final"]
+
+    placed = should_bet & resolved_mask
+    bet_hits = hit[placed]
+    report.bets = int(placed.sum())
+    report.bet_hits = int(bet_hits.sum())
+    report.max_miss_streak = _max_run(~bet_hits)
+    report.final = _final_state(params, final)
+
+    # 6. Lucro: cada número recebe stake/N; acerto paga payout:1 no número certo
+    numbers_per_bet = 2 * params.num_neighbors + 1
+    stakes = stake[placed]
+    pnl = np.where(bet_hits, stakes * (params.payout + 1) / numbers_per_bet - stakes, -stakes)
+    equity = np.cumsum(pnl)
+    if equity.size:
+        peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+        report.profit = float(equity[-1])
+        report.max_drawdown = float((peak - equity).max())
+    return report
+
+
+def _final_state(params: BacktestParams, final: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    empty = {"level": 1, "window_hits": 0, "window_count": 0, "total_stops": 0}
+    return {name: final.get(name, dict(empty)) for name in ("cw", "ccw")}
+
+
+def run_many(
+    sequences: Iterable[SpinSequence],
+    params: Optional[BacktestParams] = None
+) -> BacktestReport:
+    """Reproduz cada sequência de um estado limpo e soma os relatórios."""
+    params = params or BacktestParams.from_production()
+    tables = wheel_tables()
+    total = BacktestReport()
+    for sequence in sequences:
+        total.merge(run(sequence, params, tables))
+    return total
@@ -0,0 +1,90 @@
+# Roleta Cloud - Replay de Referência (spin a spin)
+# Mesmos objetos do servidor: GameState + SDA17Strategy + TripleRateAdvisor
+
+from typing import Optional
+
+from app_config.settings import settings
+from state.bet_advisor import TripleRateAdvisor
+from state.game import GameState, new_hit_history
+from strategies.sda17 import SDA17Strategy
+
+from .data import SpinSequence
+from .engine import BacktestParams, BacktestReport
+
+
+def replay(sequence: SpinSequence, params: Optional[BacktestParams] = None) -> BacktestReport:
+    """
+    Reproduz a sequência pelo caminho de produção, um spin por vez
+    (handle_new_result sem I/O). Lento; serve de gabarito para o motor
+    vetorizado (python -m backtest --check).
+    """
+    params = params or BacktestParams.from_production()
+    advisor = TripleRateAdvisor(windows=params.windows, cold_threshold=params.cold_threshold)
+    advisor.MIN_DATA = params.min_data
+    # Históricos com as janelas do replay (capacidade cobre a maior delas)
+    state = GameState(
+        bet_advisor=advisor,
+        performance_sda17_cw=new_hit_history(windows=params.windows),
+        performance_sda17_ccw=new_hit_history(windows=params.windows),
+        performance_bet_cw=new_hit_history(windows=params.windows),
+        performance_bet_ccw=new_hit_history(windows=params.windows)
+    )
+    strategy = SDA17Strategy(
+        min_forces=params.min_forces,
+        cluster_proximity=params.cluster_proximity,
+        num_neighbors=params.num_neighbors
+    )
+    wheel_sequence = settings.game.wheel_sequence
+    report = BacktestReport(spins=len(sequence))
+
+    equity = peak = 0.0
+    miss_streak = 0
+    numbers_per_bet = 2 * strategy.num_neighbors + 1
+    for numero, cw in zip(sequence.numbers.tolist(), sequence.clockwise.tolist()):
+        direcao = "horario" if cw else "anti-horario"
+        pending = state.pending_prediction
+        hit = state.check_prediction(numero)
+        if pending and hit is not None:
+            report.predictions += 1
+            report.prediction_hits += hit
+            report.confidence[pending["tr_confidence"]] += 1
+            if pending.get("bet_placed", False):
+                martingale = state.martingale_cw if pending["direction"] == "horario" else state.martingale_ccw
+                stake = float(martingale.current_bet)
+                report.max_level = max(report.max_level, martingale.level)
+                info = state.update_martingale(pending["direction"], hit)
+                if info["transition"]:
+                    report.windows += 1
+
+                report.bets += 1
+                report.bet_hits += hit
+                miss_streak = 0 if hit else miss_streak + 1
+                report.max_miss_streak = max(report.max_miss_streak, miss_streak)
+                equity += stake * (params.payout + 1) / numbers_per_bet - stake if hit else -stake
+                peak = max(peak, equity)
+                report.max_drawdown = max(report.max_drawdown, peak - equity)
+
+        state.process_spin(numero, direcao)
+        result = strategy.analyze(state.target_timeline, state.last_number, wheel_sequence, calibration=0)
+        advice = state.get_bet_advice()
+        if result.should_bet:
+            state.store_prediction(
+                numbers=result.numbers,
+                direction=state.target_direction,
+                center=result.center,
+                bet_placed=advice.should_bet,
+                tr_confidence=advice.confidence
+            )
+
+    report.profit = equity
+    report.stops = state.martingale_cw.total_stops + state.martingale_ccw.total_stops
+    report.final = {
+        name: {
+            "level": mg.level,
+            "window_hits": mg.window_hits,
+            "window_count": mg.window_count,
+            "total_stops": mg.total_stops
+        }
+        for name, mg in (("cw", state.martingale_cw), ("ccw", state.martingale_ccw))
+    }
+    return report
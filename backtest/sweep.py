@@ -0,0 +1,321 @@
+# Roleta Cloud - Sweep de Parâmetros (SDA17 + Triple Rate)
+"""
+Avalia uma grade (ou amostra aleatória da grade) de parâmetros do
+SDA17 e do Triple Rate sobre o histórico e grava a tabela ranqueada.
+
+Os spins e as forças (que não dependem dos parâmetros) são calculados
+uma vez e colocados em SharedMemory; os workers do pool de processos
+apenas anexam os blocos e reproduzem as combinações com o motor
+vetorizado, sem copiar o dataset por tarefa.
+
+Uso:
+    python -m backtest.sweep --journal data/spins.journal --min-forces 3:6 --proximity 3:7 --neighbors 6:9
+    python -m backtest.sweep --db data/decisions.db --windows 4/6/12,3/6/12 --cold 0.2,0.25,0.3 --samples 100
+    python -m backtest.sweep --random 1000000 --rank bet_rate --output sweep.csv
+
+Listas: "3,4,5"; faixas inteiras inclusivas: "3:6". O melhor resultado
+vira configuração de produção via SDA_MIN_FORCES, SDA_CLUSTER_PROXIMITY,
+SDA_NUM_NEIGHBORS, TRIPLE_RATE_WINDOWS e TRIPLE_RATE_COLD_THRESHOLD.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .data import SpinSequence, load_sources
+from .engine import BacktestParams, BacktestReport, compute_forces, run, wheel_tables
+
+# Métricas de ranqueamento: (chave, maior é melhor)
+RANKINGS: Dict[str, Tuple[Callable[[Dict[str, Any]], float], bool]] = {
+    "profit": (lambda r: r["profit"], True),
+    "bet_rate": (lambda r: r["bet_rate"], True),
+    "prediction_rate": (lambda r: r["prediction_rate"], True),
+    "stops": (lambda r: r["stops"], False),
+    "drawdown": (lambda r: r["max_drawdown"], False),
+}
+
+# Colunas da tabela de resultados
+COLUMNS = (
+    "rank", "min_forces", "cluster_proximity", "num_neighbors", "windows", "cold_threshold",
+    "predictions", "prediction_rate", "bets", "bet_rate", "stops", "max_level",
+    "max_miss_streak", "profit", "max_drawdown"
+)
+
+
+class SharedSpins:
+    """
+    Spins concatenados em SharedMemory: números, direção e forças.
+
+    O processo pai cria (create) e libera (close(unlink=True)); os
+    workers anexam pelo descritor (attach) e montam views NumPy de cada
+    sequência sem copiar.
+    """
+
+    ARRAYS = (("numbers", np.int8), ("clockwise", np.bool_), ("forces", np.int8))
+
+    def __init__(self, blocks: Dict[str, SharedMemory], bounds: List[Tuple[int, int]], total: int):
+        self.blocks = blocks
+        self.bounds = bounds
+        self.total = total
+        self.arrays = {
+            name: np.ndarray((total,), dtype=dtype, buffer=blocks[name].buf)
+            for name, dtype in self.ARRAYS
+        }
+
+    @classmethod
+    def create(cls, sequences: Sequence[SpinSequence]) -> "SharedSpins":
+        tables = wheel_tables()
+        bounds: List[Tuple[int, int]] = []
+        start = 0
+        for sequence in sequences:
+            bounds.append((start, start + len(sequence)))
+            start += len(sequence)
+        total = start
+
+        blocks = {name: SharedMemory(create=True, size=max(1, total * np.dtype(dtype).itemsize)) for name, dtype in cls.ARRAYS}
+        shared = cls(blocks, bounds, total)
+        for sequence, (begin, end) in zip(sequences, bounds):
+            shared.arrays["numbers"][begin:end] = sequence.numbers
+            shared.arrays["clockwise"][begin:end] = sequence.clockwise
+            shared.arrays["forces"][begin:end] = compute_forces(sequence.numbers, sequence.clockwise, tables)
+        return shared
+
+    def descriptor(self) -> Dict[str, Any]:
+        """Dados picklable para os workers anexarem os blocos."""
+        return {
+            "names": {name: block.name for name, block in self.blocks.items()},
+            "bounds": self.bounds,
+            "total": self.total
+        }
+
+    @classmethod
+    def attach(cls, descriptor: Dict[str, Any]) -> "SharedSpins":
+        blocks = {name: SharedMemory(name=shm_name) for name, shm_name in descriptor["names"].items()}
+        return cls(blocks, descriptor["bounds"], descriptor["total"])
+
+    def sequences(self) -> List[Tuple[SpinSequence, np.ndarray]]:
+        """(sequência, forças) de cada trecho, como views da memória compartilhada."""
+        numbers, clockwise, forces = (self.arrays[name] for name, _ in self.ARRAYS)
+        return [
+            (SpinSequence(numbers[begin:end], clockwise[begin:end], f"shared#{i}"), forces[begin:end])
+            for i, (begin, end) in enumerate(self.bounds)
+        ]
+
+    def close(self, unlink: bool = False) -> None:
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if unlink:
+                block.unlink()
+
+
+# ========== WORKER ==========
+
+_shared: Optional[SharedSpins] = None
+_views: List[Tuple[SpinSequence, np.ndarray]] = []
+
+
+def _init_worker(descriptor: Dict[str, Any]) -> None:
+    global _shared, _views
+    _shared = SharedSpins.attach(descriptor)
+    _views = _shared.sequences()
+
+
+def evaluate(params: BacktestParams) -> Dict[str, Any]:
+    """Reproduz todas as sequências com uma combinação (no worker)."""
+    tables = wheel_tables()
+    report = BacktestReport()
+    for sequence, forces in _views:
+        report.merge(run(sequence, params, tables, forces))
+    row = report.to_dict()
+    row.pop("final", None)
+    row["params"] = params
+    return row
+
+
+# ========== GRADE ==========
+
+def parse_values(text: str, cast: Callable[[str], Any]) -> List[Any]:
+    """'3,4,5' -> [3, 4, 5]; '3:6' -> [3, 4, 5, 6] (faixa inteira inclusiva)."""
+    values: List[Any] = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if ":" in part and cast is int:
+            low, high = (int(x) for x in part.split(":", 1))
+            values.extend(range(low, high + 1))
+        else:
+            values.append(cast(part))
+    return values
+
+
+def parse_windows(text: str) -> List[Tuple[int, int, int]]:
+    """'4/6/12,3/6/12' -> [(4, 6, 12), (3, 6, 12)]."""
+    windows = []
+    for part in text.split(","):
+        values = tuple(int(x) for x in part.strip().split("/"))
+        if len(values) != 3:
+            raise argparse.ArgumentTypeError(f"Janelas precisam ser curta/média/longa: {part!r}")
+        if min(values) <= 0:
+            raise argparse.ArgumentTypeError(f"Janelas precisam ser positivas: {part!r}")
+        windows.append(values)
+    return windows
+
+
+def build_grid(
+    axes: Dict[str, List[Any]],
+    samples: int = 0,
+    seed: Optional[int] = None
+) -> List[BacktestParams]:
+    """Produto cartesiano dos eixos (ou `samples` combinações sorteadas sem repetição)."""
+    names = list(axes)
+    combos = list(itertools.product(*(axes[name] for name in names)))
+    if samples and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+    return [BacktestParams.from_production(**dict(zip(names, combo))) for combo in combos]
+
+
+def rank(rows: List[Dict[str, Any]], metric: str) -> List[Dict[str, Any]]:
+    """Ordena pela métrica (desempate: maior lucro) e numera."""
+    key, higher_is_better = RANKINGS[metric]
+    sign = -1 if higher_is_better else 1
+    ordered = sorted(rows, key=lambda r: (sign * key(r), -r["profit"]))
+    for i, row in enumerate(ordered, start=1):
+        row["rank"] = i
+    return ordered
+
+
+def _flatten(row: Dict[str, Any]) -> Dict[str, Any]:
+    params: BacktestParams = row["params"]
+    flat = dict(row)
+    flat.pop("params")
+    flat.update({
+        "min_forces": params.min_forces,
+        "cluster_proximity": params.cluster_proximity,
+        "num_neighbors": params.num_neighbors,
+        "windows": "/".join(str(w) for w in params.windows),
+        "cold_threshold": params.cold_threshold
+    })
+    return flat
+
+
+def write_results(rows: List[Dict[str, Any]], path: Path) -> None:
+    """Tabela ranqueada completa em CSV (ou JSON, pela extensão)."""
+    flat = [_flatten(row) for row in rows]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == ".json":
+        for item, row in zip(flat, rows):
+            item["params"] = asdict(row["params"])
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(flat, f, indent=2)
+        return
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(flat)
+
+
+def print_table(rows: List[Dict[str, Any]], top: int) -> None:
+    header = f"{'#':>4} {'forces':>6} {'prox':>4} {'viz':>3} {'janelas':>9} {'cold':>5} {'apostas':>9} {'acerto':>7} {'stops':>6} {'gale':>4} {'lucro':>12} {'drawdown':>11}"
+    print(header)
+    print("-" * len(header))
+    for row in rows[:top]:
+        flat = _flatten(row)
+        print(
+            f"{flat['rank']:>4} {flat['min_forces']:>6} {flat['cluster_proximity']:>4} {flat['num_neighbors']:>3} "
+            f"{flat['windows']:>9} {flat['cold_threshold']:>5} {flat['bets']:>9,} {flat['bet_rate']:>7.1%} "
+            f"{flat['stops']:>6,} {flat['max_level']:>4} {flat['profit']:>+12,.0f} {flat['max_drawdown']:>11,.0f}"
+        )
+
+
+def sweep(
+    sequences: Sequence[SpinSequence],
+    grid: Sequence[BacktestParams],
+    workers: int
+) -> List[Dict[str, Any]]:
+    """Avalia a grade no pool de processos (workers=0: no próprio processo)."""
+    shared = SharedSpins.create(sequences)
+    try:
+        if workers <= 0:
+            _init_worker(shared.descriptor())
+            return [evaluate(params) for params in grid]
+        ctx = multiprocessing.get_context("spawn")
+        chunksize = max(1, len(grid) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(shared.descriptor(),)
+        ) as pool:
+            return list(pool.map(evaluate, grid, chunksize=chunksize))
+    finally:
+        _views.clear()
+        shared.close(unlink=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m backtest.sweep", description="Sweep de parâmetros SDA17 + Triple Rate")
+    parser.add_argument("--journal", help="Journal de spins (inclui segmentos arquivados)")
+    parser.add_argument("--db", help="Banco de decisões (tabela decisions)")
+    parser.add_argument("--session", help="Filtra uma sessão do banco")
+    parser.add_argument("--file", action="append", help="Arquivo JSON/CSV de spins (repetível)")
+    parser.add_argument("--random", type=int, default=0, help="Gera N spins aleatórios")
+    parser.add_argument("--seed", type=int, default=None, help="Semente dos spins aleatórios e da amostragem")
+
+    parser.add_argument("--min-forces", default=None, help="SDA17 min_forces (ex: 3:6)")
+    parser.add_argument("--proximity", default=None, help="SDA17 cluster_proximity (ex: 3,5,7)")
+    parser.add_argument("--neighbors", default=None, help="SDA17 num_neighbors (ex: 6:9)")
+    parser.add_argument("--windows", default=None, help="Triple Rate curta/média/longa (ex: 4/6/12,3/6/12)")
+    parser.add_argument("--cold", default=None, help="Triple Rate cold threshold (ex: 0.2,0.25,0.3)")
+    parser.add_argument("--samples", type=int, default=0, help="Busca aleatória: N combinações da grade")
+
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos (0 = sem pool)")
+    parser.add_argument("--rank", choices=sorted(RANKINGS), default="profit")
+    parser.add_argument("--top", type=int, default=20, help="Linhas exibidas")
+    parser.add_argument("--output", help="Tabela completa (.csv ou .json)")
+    args = parser.parse_args()
+
+    sequences = load_sources(args.journal, args.db, args.session, args.file, args.random, args.seed)
+    if not sequences:
+        parser.error("informe ao menos uma fonte (--journal, --db, --file ou --random)")
+
+    base = BacktestParams.from_production()
+    axes: Dict[str, List[Any]] = {
+        "min_forces": parse_values(args.min_forces, int) if args.min_forces else [base.min_forces],
+        "cluster_proximity": parse_values(args.proximity, int) if args.proximity else [base.cluster_proximity],
+        "num_neighbors": parse_values(args.neighbors, int) if args.neighbors else [base.num_neighbors],
+        "windows": parse_windows(args.windows) if args.windows else [base.windows],
+        "cold_threshold": parse_values(args.cold, float) if args.cold else [base.cold_threshold],
+    }
+    grid = build_grid(axes, args.samples, args.seed)
+    spins = sum(len(s) for s in sequences)
+    print(f"{len(grid)} combinações x {spins:,} spins ({len(sequences)} sequências), {args.workers} workers")
+
+    start = time.perf_counter()
+    rows = rank(sweep(sequences, grid, args.workers), args.rank)
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed:.1f}s ({len(grid) * spins / elapsed:,.0f} spins/s no total)\n")
+
+    print_table(rows, args.top)
+    if args.output:
+        write_results(rows, Path(args.output))
+        print(f"\nTabela completa: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Roleta Cloud - Benchmarks
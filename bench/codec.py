@@ -0,0 +1,205 @@
+# Roleta Cloud - Benchmark do Codec
+"""
+Custo de serializar/validar as mensagens do protocolo em cada backend
+instalado (msgspec, orjson, json da stdlib) e no protocolo binário
+(`binary`: ids de campo + MessagePack), com speedup sobre o json e
+bytes por frame.
+
+Casos:
+    encode_sugestao        Sugestao -> frame (resposta ao MASTER)
+    encode_trace           TraceMessage -> frame (broadcast por spin)
+    encode_state_sync      StateSync de um estado jogado -> frame (heartbeat)
+    decode_novo_resultado  frame -> dict -> NovoResultado.from_dict
+
+Antes de medir, o frame de cada backend é decodificado e comparado com
+o do json: backend que muda o conteúdo da mensagem aborta o benchmark.
+O decode do `binary` parte do frame binário do mesmo novo_resultado.
+
+Uso:
+    python -m bench.codec
+    python -m bench.codec --backends json,orjson --iterations 50000
+    python -m bench.codec --no-binary
+    python -m bench.codec --min-speedup 1.5     # exit 1 se o melhor não atingir
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from bench.suite import ROOT, _isolate, _played_state
+
+# Caso: backend -> operação sem argumentos
+Factory = Callable[[Any], Callable[[], Any]]
+
+
+def _messages() -> Dict[str, Any]:
+    """Mensagens realistas (mesmos formatos enviados pelo MessageHandler/StateSyncCache)."""
+    from codec import NovoResultado, StateSync, Sugestao, SugestaoData, TraceMessage
+    from server.state_sync import build_state_sync
+
+    state = _played_state()
+    steps = [
+        {"name": name, "t": 1760000000000 + i, "data": {"numero": 17} if i == 0 else {}, "at_ms": 0.1 * i, "ms": 0.1}
+        for i, name in enumerate(("received", "processed", "saved", "analyzed", "triple_rate", "sent"))
+    ]
+    sugestao = Sugestao(data=SugestaoData(
+        acao="APOSTAR", numeros=[32, 15, 19, 4, 21, 2, 25, 17, 34, 6, 27, 13], centro=4, regiao="32-13",
+        ultimo_numero=17, confianca=83, martingale="2x", aposta=2.0, gale_level=2, gale_display="G1",
+        estrategia="SDA17", trace_id="bench-0001", t_server=1760000000000,
+        bet_advice={"should_bet": True, "rate": 0.42, "reason": "triple_rate"}, action_reason="score"
+    ))
+    trace = TraceMessage(
+        trace_id="bench-0001", steps=steps, total_ms=1.234,
+        spin={"numero": 17, "direcao": "horario", "force": 12},
+        result={"acao": "APOSTAR", "centro": 4, "score": 5, "numeros": sugestao.data.numeros, "trend": "up"},
+        strategy={"name": "SDA17", "description": "Setores de 17 números"},
+        performance=state.get_performance_stats(),
+        state={"timeline_cw": state.timeline_cw.size, "timeline_ccw": state.timeline_ccw.size, "last_number": 17}
+    )
+    state_sync = StateSync(data=build_state_sync(state, {})["data"], seq=42)
+    novo_resultado = {
+        "type": "novo_resultado", "numero": 17, "direcao": "horario",
+        "timestamp": 1760000000000, "t_client": 1760000000000, "trace_id": "bench-0001"
+    }
+    return {
+        "encode_sugestao": sugestao,
+        "encode_trace": trace,
+        "encode_state_sync": state_sync,
+        "decode_novo_resultado": novo_resultado,
+        "_validate": NovoResultado.from_dict,
+    }
+
+
+def _cases(messages: Dict[str, Any]) -> Dict[str, Factory]:
+    validate = messages["_validate"]
+    inbound = messages["decode_novo_resultado"]
+
+    def encoder(name: str) -> Factory:
+        message = messages[name]
+        return lambda backend: (lambda: backend.dumps(message))
+
+    def decoder(backend) -> Callable[[], Any]:
+        loads = backend.loads
+        frame = backend.dumps(inbound)
+        return lambda: validate(loads(frame))
+
+    return {
+        "encode_sugestao": encoder("encode_sugestao"),
+        "encode_trace": encoder("encode_trace"),
+        "encode_state_sync": encoder("encode_state_sync"),
+        "decode_novo_resultado": decoder,
+    }
+
+
+def check_equivalence(backends: Dict[str, Any], messages: Dict[str, Any]) -> List[str]:
+    """Diferenças de conteúdo em relação ao json (lista vazia = ok)."""
+    reference = backends["json"]
+    problems = []
+    for name, backend in backends.items():
+        for case, message in messages.items():
+            if case.startswith("_"):
+                continue
+            expected = reference.loads(reference.dumps(message))
+            if backend.loads(backend.dumps(message)) != expected:
+                problems.append(f"{name}.{case}: conteúdo diferente do json")
+    return problems
+
+
+def time_op(op: Callable[[], Any], iterations: int, repeat: int) -> float:
+    """Melhor média (ns/op) entre `repeat` rodadas de `iterations` chamadas."""
+    for _ in range(min(1000, iterations)):
+        op()
+    best = float("inf")
+    clock = time.perf_counter_ns
+    for _ in range(repeat):
+        start = clock()
+        for _ in range(iterations):
+            op()
+        best = min(best, (clock() - start) / iterations)
+    return round(best, 1)
+
+
+def run(backend_names: List[str], iterations: int, repeat: int, binary: bool = True) -> Dict[str, Any]:
+    from codec import BinaryCodec, create_backend
+
+    backends = {name: create_backend(name) for name in dict.fromkeys(["json"] + backend_names)}
+    if binary:
+        backends["binary"] = BinaryCodec()
+    messages = _messages()
+    problems = check_equivalence(backends, messages)
+    if problems:
+        raise RuntimeError("; ".join(problems))
+
+    cases = _cases(messages)
+    results: Dict[str, Any] = {}
+    for case, factory in cases.items():
+        row: Dict[str, Any] = {}
+        for name, backend in backends.items():
+            ns = time_op(factory(backend), iterations, repeat)
+            row[name] = {"ns_per_op": ns, "bytes": len(backend.dumps(messages[case]))}
+            print(f"  {case} [{name}]: {ns:,.0f} ns/op", file=sys.stderr)
+        base = row["json"]["ns_per_op"]
+        for entry in row.values():
+            entry["speedup"] = round(base / entry["ns_per_op"], 2) if entry["ns_per_op"] else 0.0
+        results[case] = row
+    return results
+
+
+def _print_results(results: Dict[str, Any], names: List[str]) -> None:
+    header = f"{'caso':<24}" + "".join(f" {n + ' ns/op':>15} {'x':>6} {'bytes':>6}" for n in names)
+    print(header)
+    print("-" * len(header))
+    for case, row in results.items():
+        line = f"{case:<24}"
+        for name in names:
+            entry = row[name]
+            line += f" {entry['ns_per_op']:>15,.0f} {entry['speedup']:>6.2f} {entry['bytes']:>6}"
+        print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.codec", description="Benchmark dos backends do codec")
+    parser.add_argument("--backends", help="Backends separados por vírgula (padrão: todos os instalados)")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5, help="Rodadas por caso (vale a melhor)")
+    parser.add_argument("--no-binary", action="store_true", help="Não mede o protocolo binário")
+    parser.add_argument("--output", help="Grava os resultados em JSON")
+    parser.add_argument("--min-speedup", type=float, default=None,
+                        help="Exit 1 se o backend mais rápido não atingir este speedup em todos os casos")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="roleta-codec-"))
+    _isolate(workdir)
+    sys.path.insert(0, str(ROOT))
+    from codec import BACKENDS, available_backends
+
+    installed = available_backends()
+    names = [n.strip() for n in args.backends.split(",")] if args.backends else installed
+    unknown = [n for n in names if n not in BACKENDS]
+    if unknown:
+        parser.error(f"backends desconhecidos: {', '.join(unknown)}")
+    missing = [n for n in names if n not in installed]
+    if missing:
+        parser.error(f"backends não instalados: {', '.join(missing)}")
+
+    results = run(names, args.iterations, args.repeat, binary=not args.no_binary)
+    names = list(dict.fromkeys(["json"] + names + ([] if args.no_binary else ["binary"])))
+    _print_results(results, names)
+    if args.output:
+        Path(args.output).write_text(json.dumps({"installed": installed, "results": results}, indent=2))
+
+    if args.min_speedup is not None:
+        best = names[0] if len(names) == 1 else next(n for n in installed if n in names)
+        slow = [case for case, row in results.items() if row[best]["speedup"] < args.min_speedup]
+        if slow:
+            print(f"{best}: speedup abaixo de {args.min_speedup}x em {', '.join(slow)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
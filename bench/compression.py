@@ -0,0 +1,227 @@
+# Roleta Cloud - Benchmark da Política de Compressão
+"""
+CPU por frame e bytes no fio de cada política de permessage-deflate
+(server.compression), sobre o tráfego que o servidor realmente envia.
+
+Cada "spin" gera a sequência de saída de uma conexão:
+
+    sugestao, trace, ack, state_delta, 3x heartbeat
+    + state_sync completo a cada 10 spins
+
+Os frames variam de spin para spin (trace_id, seq, timestamps, números)
+e passam todos pelo mesmo compressor com context takeover, como numa
+conexão real. Frames quase iguais aos anteriores encolhem muito, então
+os bytes comprimidos são um limite inferior.
+
+Políticas:
+    off        sem extensão (referência de bytes)
+    all-L1/6/9 todo frame comprimido, nível zlib 1/6/9
+    policy     WS_COMPRESSION=policy com a configuração atual
+
+Janela e memLevel vêm da configuração (WS_COMPRESSION_WINDOW_BITS etc.).
+
+Uso:
+    python -m bench.compression
+    python -m bench.compression --format binary --spins 2000
+    python -m bench.compression --output compression.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench.suite import ROOT, _isolate
+
+# Mensagens enviadas por spin (tipo, quantidade)
+SPIN_MIX = (("sugestao", 1), ("trace", 1), ("ack", 1), ("state_delta", 1), ("heartbeat", 3))
+STATE_SYNC_EVERY = 10
+
+
+def _templates() -> Dict[str, Dict[str, Any]]:
+    """Uma mensagem de cada tipo, como dict (base das variações por spin)."""
+    from bench.codec import _messages
+    from codec import Ack, codec
+    from server.state_sync import diff_state
+
+    messages = _messages()
+    as_dict = lambda message: codec.loads(codec.dumps(message))
+    state = as_dict(messages["encode_state_sync"])
+    # Delta típico: a janela do último spin e a performance mudam
+    after = json.loads(json.dumps(state["data"]))
+    after["last_number"] = 21
+    changed, _ = diff_state(state["data"], after)
+    changed.update({k: v for k, v in state["data"].items() if k in ("performance", "martingale")})
+    return {
+        "sugestao": as_dict(messages["encode_sugestao"]),
+        "trace": as_dict(messages["encode_trace"]),
+        "ack": as_dict(Ack(received=3, message="ok", t_server=1760000000000)),
+        "state_delta": {"type": "state_delta", "seq": 43, "base_seq": 42, "changed": changed},
+        "heartbeat": {"type": "heartbeat", "seq": 42, "generation": 1},
+        "state_sync": state,
+    }
+
+
+def _vary(message: Dict[str, Any], spin: int) -> Dict[str, Any]:
+    """Cópia com os campos que mudam a cada spin."""
+    out = dict(message)
+    if "seq" in out:
+        out["seq"] = out["seq"] + spin
+    if "base_seq" in out:
+        out["base_seq"] = out["base_seq"] + spin
+    if "t_server" in out:
+        out["t_server"] = out["t_server"] + spin * 1000
+    if "trace_id" in out:
+        out["trace_id"] = f"bench-{spin:05d}"
+    data = out.get("data")
+    if isinstance(data, dict):
+        data = dict(data)
+        if "trace_id" in data:
+            data["trace_id"] = f"bench-{spin:05d}"
+        if "t_server" in data:
+            data["t_server"] = data["t_server"] + spin * 1000
+        if isinstance(data.get("numeros"), list):
+            shift = spin % len(data["numeros"])
+            data["numeros"] = data["numeros"][shift:] + data["numeros"][:shift]
+            data["ultimo_numero"] = data["numeros"][0]
+        out["data"] = data
+    return out
+
+
+def build_stream(spins: int, binary: bool) -> List[Tuple[str, bytes]]:
+    """Sequência (tipo, payload) de uma conexão ao longo de `spins` spins."""
+    from codec import binary_codec, codec
+
+    templates = _templates()
+    dumps = binary_codec.dumps if binary else (lambda m: codec.dumps(m).encode())
+    stream: List[Tuple[str, bytes]] = []
+    for spin in range(spins):
+        if spin % STATE_SYNC_EVERY == 0:
+            stream.append(("state_sync", dumps(_vary(templates["state_sync"], spin))))
+        for name, count in SPIN_MIX:
+            for _ in range(count):
+                stream.append((name, dumps(_vary(templates[name], spin))))
+    return stream
+
+
+def _extension(mode: str, level: Optional[int]):
+    """Extensão do lado servidor como a negociada por PolicyDeflateFactory (None = off)."""
+    from app_config.settings import settings
+    from server.compression import MODE_OFF, PolicyPerMessageDeflate, build_policy, compress_settings
+
+    if mode == MODE_OFF:
+        return None
+    cfg = settings.compression
+    options = compress_settings()
+    if level is not None:
+        options["level"] = level
+    return PolicyPerMessageDeflate(
+        build_policy(mode), False, False, cfg.client_window_bits, cfg.window_bits, options
+    )
+
+
+def run_policy(mode: str, level: Optional[int], stream: List[Tuple[str, bytes]],
+               binary: bool, repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Por tipo: frames, comprimidos, bytes crus/no fio e melhor ns/frame entre as rodadas."""
+    from websockets.frames import Frame, Opcode
+
+    opcode = Opcode.BINARY if binary else Opcode.TEXT
+    frames = [(name, Frame(opcode, payload)) for name, payload in stream]
+    clock = time.perf_counter_ns
+    best: Dict[str, Dict[str, Any]] = {}
+    for _ in range(repeat):
+        extension = _extension(mode, level)
+        rows: Dict[str, Dict[str, Any]] = {}
+        for name, frame in frames:
+            start = clock()
+            encoded = extension.encode(frame) if extension is not None else frame
+            elapsed = clock() - start
+            row = rows.get(name)
+            if row is None:
+                row = rows[name] = {"frames": 0, "compressed": 0, "raw_bytes": 0, "wire_bytes": 0, "ns": 0}
+            row["frames"] += 1
+            row["compressed"] += 1 if encoded.rsv1 else 0
+            row["raw_bytes"] += len(frame.data)
+            row["wire_bytes"] += len(encoded.data)
+            row["ns"] += elapsed
+        for name, row in rows.items():
+            if name not in best or row["ns"] < best[name]["ns"]:
+                best[name] = row
+    for row in best.values():
+        row["ns_per_frame"] = round(row.pop("ns") / row["frames"], 1)
+        row["ratio"] = round(row["wire_bytes"] / row["raw_bytes"], 3) if row["raw_bytes"] else 1.0
+    return best
+
+
+def run(spins: int, repeat: int, formats: List[str]) -> Dict[str, Any]:
+    from server.compression import MODE_ALL, MODE_OFF, MODE_POLICY
+
+    policies = [
+        ("off", MODE_OFF, None),
+        ("all-L1", MODE_ALL, 1),
+        ("all-L6", MODE_ALL, 6),
+        ("all-L9", MODE_ALL, 9),
+        ("policy", MODE_POLICY, None),
+    ]
+    results: Dict[str, Any] = {}
+    for fmt in formats:
+        binary = fmt == "binary"
+        stream = build_stream(spins, binary)
+        per_format: Dict[str, Any] = {}
+        for label, mode, level in policies:
+            rows = run_policy(mode, level, stream, binary, repeat)
+            total_ns = sum(r["ns_per_frame"] * r["frames"] for r in rows.values())
+            wire = sum(r["wire_bytes"] for r in rows.values())
+            per_format[label] = {
+                "types": rows,
+                "us_per_spin": round(total_ns / spins / 1000, 2),
+                "wire_bytes_per_spin": round(wire / spins, 1),
+            }
+            print(f"  {fmt} [{label}]: {per_format[label]['us_per_spin']} µs/spin", file=sys.stderr)
+        results[fmt] = per_format
+    return results
+
+
+def _print_results(results: Dict[str, Any]) -> None:
+    for fmt, per_format in results.items():
+        types = list(next(iter(per_format.values()))["types"])
+        header = f"{fmt:<8} {'política':<8}" + "".join(f" {t[:11] + ' ns':>14} {'bytes':>7}" for t in types)
+        header += f" {'µs/spin':>9} {'B/spin':>9}"
+        print(header)
+        print("-" * len(header))
+        for label, entry in per_format.items():
+            line = f"{'':<8} {label:<8}"
+            for t in types:
+                row = entry["types"][t]
+                line += f" {row['ns_per_frame']:>14,.0f} {row['wire_bytes'] / row['frames']:>7,.0f}"
+            line += f" {entry['us_per_spin']:>9.2f} {entry['wire_bytes_per_spin']:>9,.0f}"
+            print(line)
+        print()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.compression",
+                                     description="Benchmark das políticas de permessage-deflate")
+    parser.add_argument("--spins", type=int, default=1000, help="Spins simulados por rodada")
+    parser.add_argument("--repeat", type=int, default=5, help="Rodadas por política (vale a melhor)")
+    parser.add_argument("--format", choices=("json", "binary", "both"), default="both")
+    parser.add_argument("--output", help="Grava os resultados em JSON")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="roleta-compression-"))
+    _isolate(workdir)
+    sys.path.insert(0, str(ROOT))
+
+    formats = ["json", "binary"] if args.format == "both" else [args.format]
+    results = run(args.spins, args.repeat, formats)
+    _print_results(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,432 @@
+# Roleta Cloud - Gerador de Carga Sintético
+"""
+Simula extensões (MASTER) e dashboards (SLAVE) contra um `main.py`
+local, em degraus crescentes de clientes, até a saturação.
+
+Cada mesa `load_NNNN` tem um MASTER (register -> novo_resultado em
+laço aberto, `--rate` spins/s) e `--fanout` SLAVEs (get_state na mesa,
+opcionalmente em modo delta). Mede por degrau:
+
+    suggestion_ms   t_client do novo_resultado -> sugestao no MASTER
+    trace_ms        t_client -> broadcast "trace" recebido em cada SLAVE
+    state_sync_ms   montagem do state_sync (data.timestamp) -> recebimento
+    heartbeat_gap_ms atraso do frame de heartbeat além do intervalo de 1s
+    dropped         conexões fechadas pelo servidor / falhas de conexão
+    lost            spins sem sugestao até o fim do degrau
+    bytes_received  bytes dos frames recebidos (fora do aquecimento)
+
+Com `--binary` os clientes negociam o subprotocolo roleta.msgpack.v1
+(frames binários, codec.binary) em vez de JSON.
+
+O degrau satura quando o p99 da sugestão passa de `--max-p99`, há
+conexões derrubadas ou a vazão fica abaixo de `--min-rate` do alvo.
+
+Uso:
+    python -m bench.loadgen --masters 1,4,16,64 --fanout 4 --rate 2
+    python -m bench.loadgen --workers 2 --masters 8,32 --delta --output load.json
+    python -m bench.loadgen --url ws://127.0.0.1:8765 --masters 4 --duration 30
+    python -m bench.loadgen --masters 16 --binary
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from bench.shards import _free_port, start_server, stop_server
+from codec.binary import binary_codec
+from codec.wire import SUBPROTOCOL_MSGPACK
+
+# Limites superiores (ms) dos buckets; o último bucket é +Inf
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+HEARTBEAT_INTERVAL_MS = 1000.0
+HEARTBEAT_TYPES = ("state_sync", "state_delta", "heartbeat")
+
+
+@dataclass
+class Histogram:
+    """Histograma de buckets fixos + amostras para percentis."""
+    samples: List[float] = field(default_factory=list)
+
+    def add(self, value: float) -> None:
+        self.samples.append(value)
+
+    def extend(self, other: "Histogram") -> None:
+        self.samples.extend(other.samples)
+
+    def to_dict(self) -> Dict[str, Any]:
+        values = sorted(self.samples)
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        for v in values:
+            for i, bound in enumerate(BUCKETS_MS):
+                if v <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+
+        def pct(p: float) -> Optional[float]:
+            if not values:
+                return None
+            return round(values[min(len(values) - 1, int(len(values) * p))], 3)
+
+        return {
+            "count": len(values),
+            "mean": round(sum(values) / len(values), 3) if values else None,
+            "p50": pct(0.50),
+            "p90": pct(0.90),
+            "p99": pct(0.99),
+            "max": round(values[-1], 3) if values else None,
+            "buckets": {
+                **{f"le_{b:g}": c for b, c in zip(BUCKETS_MS, counts)},
+                "le_inf": counts[-1]
+            }
+        }
+
+
+@dataclass
+class Stats:
+    """Contadores e histogramas de um processo cliente."""
+    suggestion: Histogram = field(default_factory=Histogram)
+    trace: Histogram = field(default_factory=Histogram)
+    state_sync: Histogram = field(default_factory=Histogram)
+    heartbeat_gap: Histogram = field(default_factory=Histogram)
+    spins_sent: int = 0
+    suggestions: int = 0
+    lost: int = 0
+    errors: int = 0
+    connected: int = 0
+    failed: int = 0
+    dropped: int = 0
+    masters: int = 0
+    slaves: int = 0
+    bytes_received: int = 0
+
+    def merge(self, other: "Stats") -> None:
+        for name in ("suggestion", "trace", "state_sync", "heartbeat_gap"):
+            getattr(self, name).extend(getattr(other, name))
+        for name in ("spins_sent", "suggestions", "lost", "errors", "connected",
+                     "failed", "dropped", "masters", "slaves", "bytes_received"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+# ========== CLIENTES ==========
+
+def _wall_ms() -> float:
+    return time.time() * 1000
+
+
+class _Client:
+    """Uma conexão simulada; `reader` consome frames até o fim do degrau."""
+
+    def __init__(self, url: str, mesa_id: str, stats: Stats, sent: Dict[str, float], measuring: List[bool],
+                 binary: bool = False):
+        self.url = url
+        self.binary = binary
+        self.mesa_id = mesa_id
+        self.stats = stats
+        self.sent = sent            # trace_id -> perf_counter do envio (compartilhado na mesa)
+        self.measuring = measuring  # [bool] fora do aquecimento
+        self.ws = None
+        self.role: Optional[str] = None
+        self.in_table = asyncio.Event()  # mesa_ativa (role_assigned da mesa nova chega antes)
+        self.closing = False
+        self.last_beat: Optional[float] = None
+
+    async def connect(self) -> bool:
+        import websockets
+
+        try:
+            self.ws = await websockets.connect(
+                self.url, max_size=None, open_timeout=30,
+                subprotocols=[SUBPROTOCOL_MSGPACK] if self.binary else None
+            )
+        except Exception:
+            self.stats.failed += 1
+            return False
+        self.stats.connected += 1
+        return True
+
+    async def close(self) -> None:
+        self.closing = True
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def reader(self, delta: bool) -> None:
+        import websockets
+
+        try:
+            async for raw in self.ws:
+                if self.measuring[0]:
+                    self.stats.bytes_received += len(raw)
+                self._handle(binary_codec.loads(raw) if isinstance(raw, bytes) else json.loads(raw), delta)
+        except websockets.ConnectionClosed:
+            pass
+        if not self.closing:
+            self.stats.dropped += 1
+
+    def _handle(self, message: Dict[str, Any], delta: bool) -> None:
+        msg_type = message.get("type")
+        now = _wall_ms()
+
+        if msg_type in ("role_assigned", "role_changed"):
+            self.role = message.get("role", self.role)
+        elif msg_type == "mesa_ativa":
+            self.in_table.set()
+        elif msg_type == "error":
+            self.stats.errors += 1
+
+        if msg_type in HEARTBEAT_TYPES:
+            if delta and message.get("seq") is not None and msg_type != "heartbeat":
+                asyncio.ensure_future(self._send({"type": "state_ack", "seq": message["seq"]}))
+            if not self.measuring[0]:
+                self.last_beat = None
+                return
+            if self.last_beat is not None:
+                self.stats.heartbeat_gap.add(max(0.0, now - self.last_beat - HEARTBEAT_INTERVAL_MS))
+            self.last_beat = now
+            data = message.get("data") if msg_type == "state_sync" else message.get("changed")
+            built = data.get("timestamp") if isinstance(data, dict) else None
+            if isinstance(built, (int, float)):
+                self.stats.state_sync.add(max(0.0, now - built))
+            return
+
+        if msg_type == "sugestao":
+            trace_id = (message.get("data") or {}).get("trace_id")
+            started = self.sent.get(trace_id)
+            if started is not None and started > 0 and self.role == "master":
+                self.sent[trace_id] = -started  # marcado como respondido (slaves ainda leem)
+                self.stats.suggestions += 1
+                if self.measuring[0]:
+                    self.stats.suggestion.add((time.perf_counter() - started) * 1000)
+        elif msg_type == "trace" and self.role == "slave":
+            started = self.sent.get(message.get("trace_id"))
+            if started is not None and self.measuring[0]:
+                self.stats.trace.add((time.perf_counter() - abs(started)) * 1000)
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        try:
+            await self.ws.send(binary_codec.dumps(message) if self.binary else json.dumps(message))
+        except Exception:
+            pass
+
+
+async def _run_table(url: str, mesa_id: str, fanout: int, rate: float, delta: bool, binary: bool,
+                     start_at: float, deadline: float, measuring: List[bool], stats: Stats) -> None:
+    """Uma mesa: MASTER em laço aberto + SLAVEs lendo broadcasts."""
+    sent: Dict[str, float] = {}
+    master = _Client(url, mesa_id, stats, sent, measuring, binary)
+    if not await master.connect():
+        return
+    readers = [asyncio.ensure_future(master.reader(delta))]
+    await master._send({"type": "register", "device_id": f"load-{mesa_id}", "mesa_id": mesa_id})
+    try:
+        await asyncio.wait_for(master.in_table.wait(), 30)
+    except asyncio.TimeoutError:
+        stats.failed += 1
+    stats.masters += 1
+
+    slaves = []
+    for _ in range(fanout):
+        slave = _Client(url, mesa_id, stats, sent, measuring, binary)
+        if not await slave.connect():
+            continue
+        readers.append(asyncio.ensure_future(slave.reader(delta)))
+        await slave._send({"type": "get_state", "mesa_id": mesa_id})
+        if delta:
+            await slave._send({"type": "state_subscribe", "mode": "delta", "mesa_id": mesa_id})
+        slaves.append(slave)
+    stats.slaves += len(slaves)
+
+    rng = random.Random(mesa_id)
+    timestamp = int(_wall_ms())
+    interval = 1.0 / rate if rate > 0 else None
+    next_at = max(time.monotonic(), start_at - (interval or 0))
+    while interval is not None and master.ws is not None:
+        next_at += interval
+        if next_at >= deadline:
+            break
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)  # laço aberto: atrasos do servidor não reduzem a taxa
+        timestamp += 1000  # Deduplicação usa o segundo do timestamp
+        t_client = int(_wall_ms())
+        trace_id = f"{mesa_id}-{timestamp}"
+        sent[trace_id] = time.perf_counter()
+        stats.spins_sent += 1
+        await master._send({
+            "type": "novo_resultado",
+            "mesa_id": mesa_id,
+            "numero": rng.randint(0, 36),
+            "direcao": rng.choice(("horario", "anti-horario")),
+            "timestamp": timestamp,
+            "t_client": t_client,
+            "trace_id": trace_id
+        })
+
+    await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+    await asyncio.sleep(1.0)  # tolerância para respostas em voo
+    stats.lost += sum(1 for started in sent.values() if started > 0)
+    for client in [master, *slaves]:
+        await client.close()
+    await asyncio.gather(*readers, return_exceptions=True)
+
+
+def _client_process(url: str, mesas: List[str], fanout: int, rate: float, delta: bool, binary: bool,
+                    warmup: float, duration: float, out) -> None:
+    async def run() -> Stats:
+        stats = Stats()
+        measuring = [False]
+        start_at = time.monotonic() + warmup
+        deadline = start_at + duration
+
+        async def flip():
+            await asyncio.sleep(max(0.0, start_at - time.monotonic()))
+            measuring[0] = True
+
+        flipper = asyncio.ensure_future(flip())
+        await asyncio.gather(*(
+            _run_table(url, m, fanout, rate, delta, binary, start_at, deadline, measuring, stats) for m in mesas
+        ))
+        flipper.cancel()
+        return stats
+
+    out.put(asyncio.run(run()))
+
+
+def run_step(url: str, masters: int, fanout: int, rate: float, delta: bool,
+             processes: int, warmup: float, duration: float, binary: bool = False) -> Dict[str, Any]:
+    """Um degrau de carga: `masters` mesas x (1 + fanout) conexões."""
+    mesas = [f"load_{i:04d}" for i in range(masters)]
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    groups = [mesas[i::processes] for i in range(processes) if mesas[i::processes]]
+    procs = [ctx.Process(target=_client_process, args=(url, g, fanout, rate, delta, binary, warmup, duration, out))
+             for g in groups]
+    for p in procs:
+        p.start()
+    stats = Stats()
+    for _ in procs:
+        stats.merge(out.get(timeout=warmup + duration + 180))
+    for p in procs:
+        p.join()
+
+    target = masters * rate
+    measured = stats.suggestion.samples
+    return {
+        "masters": masters,
+        "slaves": stats.slaves,
+        "connections": stats.connected,
+        "connect_failed": stats.failed,
+        "dropped": stats.dropped,
+        "errors": stats.errors,
+        "spins_sent": stats.spins_sent,
+        "suggestions": stats.suggestions,
+        "lost": stats.lost,
+        "target_spins_per_s": round(target, 2),
+        "spins_per_s": round(len(measured) / duration, 2),
+        "bytes_received": stats.bytes_received,
+        "suggestion_ms": stats.suggestion.to_dict(),
+        "trace_ms": stats.trace.to_dict(),
+        "state_sync_ms": stats.state_sync.to_dict(),
+        "heartbeat_gap_ms": stats.heartbeat_gap.to_dict(),
+    }
+
+
+def saturated(step: Dict[str, Any], max_p99: float, min_rate: float) -> List[str]:
+    """Motivos de saturação do degrau (lista vazia = saudável)."""
+    reasons = []
+    p99 = step["suggestion_ms"]["p99"]
+    if p99 is not None and p99 > max_p99:
+        reasons.append(f"p99 {p99}ms > {max_p99}ms")
+    if step["dropped"] or step["connect_failed"]:
+        reasons.append(f"{step['dropped']} derrubadas, {step['connect_failed']} falhas de conexão")
+    if step["target_spins_per_s"] and step["spins_per_s"] < step["target_spins_per_s"] * min_rate:
+        reasons.append(f"vazão {step['spins_per_s']}/s < {min_rate:.0%} do alvo")
+    if step["lost"]:
+        reasons.append(f"{step['lost']} spins sem sugestão")
+    return reasons
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Carga sintética de MASTERs e SLAVEs contra main.py")
+    parser.add_argument("--url", help="Servidor já em execução (padrão: sobe main.py isolado)")
+    parser.add_argument("--workers", type=int, default=0, help="SHARD_WORKERS do servidor iniciado pelo gerador")
+    parser.add_argument("--masters", default="1,4,16,64", help="Degraus: mesas (um MASTER cada)")
+    parser.add_argument("--fanout", type=int, default=4, help="SLAVEs por MASTER")
+    parser.add_argument("--rate", type=float, default=1.0, help="Spins/s por MASTER")
+    parser.add_argument("--delta", action="store_true", help="SLAVEs em modo state_delta")
+    parser.add_argument("--binary", action="store_true", help="Protocolo binário (subprotocolo roleta.msgpack.v1)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos medidos por degrau")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Aquecimento por degrau (não medido)")
+    parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Processos cliente")
+    parser.add_argument("--max-p99", type=float, default=250.0, help="p99 da sugestão (ms) que caracteriza saturação")
+    parser.add_argument("--min-rate", type=float, default=0.9, help="Fração mínima da vazão alvo")
+    parser.add_argument("--keep-going", action="store_true", help="Continua os degraus após saturar")
+    parser.add_argument("--output", help="Grava o resultado JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    steps = []
+    saturation = None
+    with tempfile.TemporaryDirectory(prefix="roleta-load-") as tmp:
+        server = None
+        url = args.url
+        if url is None:
+            port = _free_port()
+            server = start_server(args.workers, port, Path(tmp))
+            url = f"ws://127.0.0.1:{port}"
+        try:
+            for masters in (int(m) for m in args.masters.split(",")):
+                step = run_step(url, masters, args.fanout, args.rate, args.delta,
+                                args.processes, args.warmup, args.duration, args.binary)
+                step["saturated"] = saturated(step, args.max_p99, args.min_rate)
+                steps.append(step)
+                s = step["suggestion_ms"]
+                print(f"masters={masters:<4} conns={step['connections']:<5} "
+                      f"{step['spins_per_s']:>8.1f}/{step['target_spins_per_s']:.1f} spins/s  "
+                      f"sugestao p50={s['p50']}ms p99={s['p99']}ms  "
+                      f"trace p99={step['trace_ms']['p99']}ms  "
+                      f"dropped={step['dropped']}  rx={step['bytes_received'] / 1024:.0f}KiB"
+                      + (f"  SATURADO: {'; '.join(step['saturated'])}" if step["saturated"] else ""),
+                      file=sys.stderr)
+                if step["saturated"] and saturation is None:
+                    saturation = {"masters": masters, "connections": step["connections"], "reasons": step["saturated"]}
+                    if not args.keep_going:
+                        break
+        finally:
+            if server is not None:
+                stop_server(server)
+
+    healthy = [s for s in steps if not s["saturated"]]
+    report = {
+        "benchmark": "loadgen",
+        "url": args.url or "local",
+        "workers": args.workers if args.url is None else None,
+        "cpu_count": os.cpu_count(),
+        "fanout": args.fanout,
+        "rate_per_master": args.rate,
+        "delta": args.delta,
+        "binary": args.binary,
+        "duration_s": args.duration,
+        "buckets_ms": list(BUCKETS_MS),
+        "max_healthy": {"masters": healthy[-1]["masters"], "connections": healthy[-1]["connections"]} if healthy else None,
+        "saturation": saturation,
+        "steps": steps
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
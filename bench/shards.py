@@ -0,0 +1,207 @@
+# Roleta Cloud - Benchmark do modo sharded
+"""
+Vazão de spins (novo_resultado -> sugestao) do servidor completo com
+0 (processo único), 1, 2, 4... workers.
+
+Cada configuração sobe `main.py` em um diretório temporário (estado,
+journal e bancos isolados) e dispara `--tables` mesas, cada uma com um
+MASTER enviando spins em loop fechado (próximo spin só após a sugestão).
+Os clientes rodam em `--clients` processos para não serem o gargalo.
+
+Uso:
+    python -m bench.shards --workers 0,1,2,4 --tables 64 --duration 10
+    python -m bench.shards --workers 1,2 --output shards.json
+
+A escala só é linear até o número de núcleos livres (roteador e
+clientes também consomem CPU); `cpu_count` sai no resultado.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Servidor não abriu a porta {port} em {timeout}s")
+
+
+def start_server(workers: int, port: int, workdir: Path) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "SHARD_WORKERS": str(workers),
+        "WS_HOST": "127.0.0.1",
+        "WS_PORT": str(port),
+        "STATE_FILE": str(workdir / "state.json"),
+        "JOURNAL_FILE": str(workdir / "spins.journal"),
+        "TABLES_DIR": str(workdir / "tables"),
+        "DB_PATH": str(workdir / "decisions.db"),
+        "LOG_FILE": str(workdir / "roleta.log"),
+        "SHARD_DIR": str(workdir / "shards"),
+        # Os clientes mandam spins sem pausa (muito acima de RATE_LIMIT_SPIN)
+        "RATE_LIMIT_ENABLED": "0",
+    })
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "main.py")],
+        cwd=str(ROOT), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    _wait_port(port)
+    return process
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ========== CLIENTES ==========
+
+async def _drive_table(url: str, mesa_id: str, deadline: float, latencies: List[float]) -> int:
+    import websockets
+
+    spins = 0
+    rng = random.Random(mesa_id)
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "register", "device_id": f"bench-{mesa_id}", "mesa_id": mesa_id}))
+        timestamp = 1_000_000
+        while time.monotonic() < deadline:
+            timestamp += 1000  # Deduplicação usa o segundo do timestamp
+            start = time.perf_counter()
+            await ws.send(json.dumps({
+                "type": "novo_resultado",
+                "mesa_id": mesa_id,
+                "numero": rng.randint(0, 36),
+                "direcao": rng.choice(("horario", "anti-horario")),
+                "timestamp": timestamp
+            }))
+            while True:
+                message = json.loads(await ws.recv())
+                if message.get("type") == "sugestao":
+                    break
+                if message.get("type") == "error":
+                    raise RuntimeError(f"{mesa_id}: {message}")
+            latencies.append((time.perf_counter() - start) * 1000)
+            spins += 1
+    return spins
+
+
+def _client_process(url: str, mesas: List[str], duration: float, warmup: float, out) -> None:
+    async def run():
+        latencies: List[float] = []
+        start_at = time.monotonic() + warmup
+        deadline = start_at + duration
+        counts = await asyncio.gather(*(_drive_table(url, m, deadline, latencies) for m in mesas))
+        return sum(counts), latencies
+
+    try:
+        spins, latencies = asyncio.run(run())
+    except Exception as error:
+        # O pai recebe o erro em vez de esperar o timeout da fila
+        out.put((0, [], f"{type(error).__name__}: {error}"))
+        return
+    out.put((spins, latencies, None))
+
+
+def run_load(port: int, tables: int, clients: int, duration: float) -> Dict[str, Any]:
+    url = f"ws://127.0.0.1:{port}"
+    mesas = [f"bench_{i:04d}" for i in range(tables)]
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    groups = [mesas[i::clients] for i in range(clients) if mesas[i::clients]]
+    procs = [ctx.Process(target=_client_process, args=(url, g, duration, 1.0, out)) for g in groups]
+    started = time.monotonic()
+    for p in procs:
+        p.start()
+    results = [out.get(timeout=duration + 120) for _ in procs]
+    for p in procs:
+        p.join()
+    errors = [r[2] for r in results if r[2]]
+    if errors:
+        raise RuntimeError(f"Cliente falhou: {errors[0]}")
+    elapsed = time.monotonic() - started - 1.0
+
+    spins = sum(r[0] for r in results)
+    latencies = sorted(l for r in results for l in r[1])
+    return {
+        "spins": spins,
+        "elapsed_s": round(elapsed, 3),
+        "spins_per_s": round(spins / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(statistics.median(latencies), 3) if latencies else None,
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 3) if latencies else None,
+    }
+
+
+def main(argv=None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Vazão do servidor por número de workers")
+    parser.add_argument("--workers", default="0,1,2,4", help="Lista de SHARD_WORKERS (0 = processo único)")
+    parser.add_argument("--tables", type=int, default=64, help="Mesas simultâneas (um MASTER por mesa)")
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Processos cliente")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de medição por configuração")
+    parser.add_argument("--output", help="Grava o resultado JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    runs = []
+    for workers in (int(w) for w in args.workers.split(",")):
+        with tempfile.TemporaryDirectory(prefix="roleta-bench-") as tmp:
+            port = _free_port()
+            server = start_server(workers, port, Path(tmp))
+            try:
+                result = run_load(port, args.tables, args.clients, args.duration)
+            finally:
+                stop_server(server)
+        result["workers"] = workers
+        runs.append(result)
+        print(f"workers={workers:<3} {result['spins_per_s']:>9.1f} spins/s  "
+              f"p50={result['p50_ms']}ms  p99={result['p99_ms']}ms", file=sys.stderr)
+
+    base = next((r["spins_per_s"] for r in runs if r["workers"] <= 1 and r["spins_per_s"]), None)
+    for r in runs:
+        r["speedup"] = round(r["spins_per_s"] / base, 2) if base else None
+
+    report = {
+        "benchmark": "shards",
+        "cpu_count": os.cpu_count(),
+        "tables": args.tables,
+        "clients": args.clients,
+        "duration_s": args.duration,
+        "runs": runs
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
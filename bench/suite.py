@@ -0,0 +1,558 @@
+# Roleta Cloud - Benchmarks do Hot Path
+"""
+Micro e macro benchmarks do caminho de um spin, com saída JSON
+(p50/p99 por operação e ops/s) e comparação com um baseline.
+
+Casos:
+    handle_new_result     MessageHandler completo (WebSocket falso em memória)
+    sda17_analyze         SDA17Strategy.analyze com timeline cheia
+    ensemble_evaluate     EnsembleRunner com todas as estratégias registradas (pool de threads)
+    game_state_save       GameState.save (state.json atômico)
+    game_state_load       GameState.load
+    repo_save_decision    SQLiteDecisionRepository.save_decision (INSERT + commit)
+    writer_save_decision  DatabaseService.save_decision (escritor em lote, inclui flush)
+    get_window_history    DatabaseService.get_window_history (sem cache)
+    state_sync_build      build_state_sync + codec.dumps (estado mudou)
+    state_sync_render     StateSyncCache.render por conexão (estado inalterado)
+
+Uso:
+    python -m bench.suite                                # grava bench_output.txt
+    python -m bench.suite --only sda17_analyze,handle_new_result
+    python -m bench.suite --compare bench/baseline.json  # exit 1 se regrediu
+    python -m bench.suite --save-baseline bench/baseline.json
+
+Estado, journal e banco ficam em um diretório temporário. O logging
+fica em WARNING (o INFO por spin mediria o disco, não o código); use
+--log para medir com o logging de produção.
+
+O baseline depende da máquina (CPU, Python, disco): bench/baseline.json
+foi gravado na máquina descrita em "meta" e só serve de referência
+nela. Em outra máquina, grave um baseline local antes das mudanças
+(--save-baseline) e compare com ele; --compare avisa quando o "meta"
+do baseline não bate com a máquina atual.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT = ROOT / "bench_output.txt"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# Operação medida: síncrona ou coroutine, recebe o índice da iteração
+Op = Callable[[int], Union[None, Awaitable[None]]]
+
+
+@dataclass
+class BenchResult:
+    """Latências (µs) de uma operação + vazão."""
+    name: str
+    iterations: int
+    p50_us: float
+    p99_us: float
+    mean_us: float
+    max_us: float
+    ops_per_s: float
+
+
+@dataclass
+class Case:
+    """Caso de benchmark: operação + limpeza opcional (executada fora da medição)."""
+    op: Op
+    iterations: int
+    finish: Optional[Callable[[], Any]] = None  # Incluído no tempo total (ex: flush)
+    cleanup: Optional[Callable[[], Any]] = None
+
+
+class FakeWebSocket:
+    """WebSocket em memória: guarda só a contagem de mensagens enviadas."""
+    remote_address = ("127.0.0.1", 0)
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, message):
+        self.sent += 1
+
+    async def close(self, *args, **kwargs):
+        pass
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+async def measure(name: str, case: Case, warmup: int) -> BenchResult:
+    """Executa warmup + iterações medindo cada chamada com perf_counter_ns."""
+    op = case.op
+    is_async = asyncio.iscoroutinefunction(op)
+    for i in range(warmup):
+        result = op(i)
+        if is_async:
+            await result
+
+    samples: List[int] = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for i in range(warmup, warmup + case.iterations):
+        t0 = clock()
+        result = op(i)
+        if is_async:
+            await result
+        samples.append(clock() - t0)
+    if case.finish is not None:
+        finished = case.finish()
+        if asyncio.iscoroutine(finished):
+            await finished
+    total_s = (clock() - start) / 1e9
+    if case.cleanup is not None:
+        cleaned = case.cleanup()
+        if asyncio.iscoroutine(cleaned):
+            await cleaned
+
+    samples.sort()
+    us = [s / 1000 for s in samples]
+    return BenchResult(
+        name=name,
+        iterations=case.iterations,
+        p50_us=round(_percentile(us, 50), 3),
+        p99_us=round(_percentile(us, 99), 3),
+        mean_us=round(statistics.fmean(us), 3),
+        max_us=round(us[-1], 3),
+        ops_per_s=round(case.iterations / total_s, 1) if total_s > 0 else 0.0
+    )
+
+
+# ========== CASOS ==========
+
+def _spins(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {"numero": rng.randint(0, 36), "direcao": "horario" if i % 2 == 0 else "anti-horario", "timestamp": 1000 * i}
+        for i in range(count)
+    ]
+
+
+def _played_state(spins: int = 200):
+    """GameState após `spins` spins (timelines cheias, performance e martingale ativos)."""
+    from app_config.settings import settings
+    from state.game import GameState
+    from strategies.sda17 import SDA17Strategy
+
+    state = GameState()
+    strategy = SDA17Strategy()
+    for spin in _spins(spins, seed=7):
+        pending = state.pending_prediction
+        hit = state.check_prediction(spin["numero"])
+        if pending and hit is not None and pending.get("bet_placed"):
+            state.update_martingale(pending["direction"], hit)
+        state.process_spin(spin["numero"], spin["direcao"])
+        result = strategy.analyze(state.target_timeline, state.last_number, settings.game.wheel_sequence)
+        advice = state.get_bet_advice()
+        if result.should_bet:
+            state.store_prediction(result.numbers, state.target_direction, result.center, bet_placed=advice.should_bet)
+    return state
+
+
+async def case_handle_new_result(workdir: Path, iterations: int) -> Case:
+    from models.trace import TraceContext
+    from server.connection_manager import ConnectionManager
+    from server.message_handler import MessageHandler
+    from server.message_router import Request
+    from server.state_sync import StateSyncCache
+    from database.service import DatabaseService
+    from state.game import GameState
+    from state.journal import SpinJournal
+    from state.snapshot import SnapshotService
+    from strategies.sda17 import SDA17Strategy
+
+    game_state = GameState()
+    journal = SpinJournal(workdir / "handler.journal")
+    snapshotter = SnapshotService(game_state, path=workdir / "handler_state.json", journal=journal)
+    db = DatabaseService("bench")
+    connections = ConnectionManager()
+    handler = MessageHandler(
+        game_state, SDA17Strategy(), asyncio.Lock(), str(ROOT / "server" / "configs"),
+        snapshotter=snapshotter, journal=journal, state_sync=StateSyncCache(game_state, db),
+        connections=connections, db=db, mesa_id="bench"
+    )
+    websocket = FakeWebSocket()
+    conn_id = await connections.connect(websocket)
+    snapshotter.start()
+    spins = _spins(iterations + 1000)
+
+    async def op(i: int) -> None:
+        await handler.handle_new_result(
+            Request(websocket, spins[i], conn_id, "novo_resultado", TraceContext(trace_id=f"b{i}"))
+        )
+
+    async def cleanup() -> None:
+        await connections.disconnect(conn_id)
+        await snapshotter.stop()
+        journal.close()
+        db.writer.flush(5.0)
+
+    return Case(op=op, iterations=iterations, cleanup=cleanup)
+
+
+async def case_sda17_analyze(workdir: Path, iterations: int) -> Case:
+    from app_config.settings import settings
+    from strategies.sda17 import SDA17Strategy
+
+    state = _played_state()
+    strategy = SDA17Strategy()
+    timeline = state.target_timeline
+    wheel_sequence = settings.game.wheel_sequence
+
+    def op(i: int) -> None:
+        strategy.analyze(timeline, i % 37, wheel_sequence)
+
+    return Case(op=op, iterations=iterations)
+
+
+async def case_ensemble_evaluate(workdir: Path, iterations: int) -> Case:
+    from app_config.settings import settings
+    from strategies import EnsembleRunner, available_strategies, create_strategy
+    from strategies.ensemble import snapshot
+
+    state = _played_state()
+    runner = EnsembleRunner(
+        {name: create_strategy(name) for name in available_strategies()},
+        deadline_ms=settings.strategy.ensemble_deadline_ms
+    )
+    timeline = state.target_timeline
+    wheel_sequence = settings.game.wheel_sequence
+
+    async def op(i: int) -> None:
+        await runner.evaluate(snapshot(timeline), i % 37, wheel_sequence)
+
+    return Case(op=op, iterations=iterations)
+
+
+async def case_game_state_save(workdir: Path, iterations: int) -> Case:
+    state = _played_state()
+    path = workdir / "bench_state.json"
+
+    def op(i: int) -> None:
+        state.save(path)
+
+    return Case(op=op, iterations=iterations)
+
+
+async def case_game_state_load(workdir: Path, iterations: int) -> Case:
+    from state.game import GameState
+
+    path = workdir / "bench_state_load.json"
+    _played_state().save(path)
+
+    def op(i: int) -> None:
+        GameState.load(path)
+
+    return Case(op=op, iterations=iterations)
+
+
+def _decision(i: int):
+    from database.models import Decision
+
+    return Decision(
+        session_id="bench",
+        spin_number=i % 37,
+        spin_direction="horario" if i % 2 == 0 else "anti-horario",
+        spin_force=i % 37,
+        tr_should_bet=True,
+        tr_confidence="alta",
+        tr_reason="bench",
+        tr_c4_rate=0.5,
+        tr_m6_rate=0.5,
+        tr_l12_rate=0.5,
+        sda_should_bet=True,
+        sda_score=4,
+        sda_center=i % 37,
+        sda_numbers=list(range(17)),
+        sda_predicted_force=12,
+        final_action="APOSTAR",
+        action_reason="bench",
+        gale_level=1,
+        gale_window_hits=0,
+        gale_window_count=0,
+        gale_bet_value=17,
+        calibration_offset=0,
+        performance_snapshot=[True, False] * 6
+    )
+
+
+async def case_repo_save_decision(workdir: Path, iterations: int) -> Case:
+    from database.sqlite_repo import SQLiteDecisionRepository
+
+    repo = SQLiteDecisionRepository(str(workdir / "repo_bench.db"))
+    decisions = [_decision(i) for i in range(iterations + 1000)]
+
+    def op(i: int) -> None:
+        repo.save_decision(decisions[i])
+
+    return Case(op=op, iterations=iterations, cleanup=repo.close)
+
+
+async def case_writer_save_decision(workdir: Path, iterations: int) -> Case:
+    from database.service import DatabaseService
+
+    db = DatabaseService("bench_writer")
+    decisions = [_decision(i) for i in range(iterations + 1000)]
+
+    def op(i: int) -> None:
+        db.save_decision(decisions[i])
+
+    return Case(op=op, iterations=iterations, finish=lambda: db.writer.flush(30.0))
+
+
+async def case_get_window_history(workdir: Path, iterations: int) -> Case:
+    from database.service import DatabaseService
+
+    db = DatabaseService("bench_history")
+    state = _played_state(0)
+    # Janelas suficientes para o LIMIT de cada direção
+    for i in range(60):
+        direction = "horario" if i % 2 == 0 else "anti-horario"
+        info = state.update_martingale(direction, i % 3 == 0)
+        db.track_gale_window(
+            game_state=state, direction=direction, hit=i % 3 == 0,
+            martingale_info=info, pending={"center": 0, "numbers": []},
+            force=0, numero=i % 37
+        )
+    db.writer.flush(10.0)
+
+    def op(i: int) -> None:
+        db.window_version += 1  # Invalida o cache: mede a consulta
+        db.get_window_history()
+
+    return Case(op=op, iterations=iterations)
+
+
+async def case_state_sync_build(workdir: Path, iterations: int) -> Case:
+    from database.service import DatabaseService
+    from server.state_sync import StateSyncCache
+
+    state = _played_state()
+    cache = StateSyncCache(state, DatabaseService("bench_sync"))
+    lock = asyncio.Lock()
+    await cache.refresh(lock)  # Histórico de janelas em cache: mede só montagem + JSON
+
+    async def op(i: int) -> None:
+        state.touch()
+        await cache.refresh(lock)
+        cache.full_frame.text  # Frame serializa sob demanda
+
+    return Case(op=op, iterations=iterations)
+
+
+async def case_state_sync_render(workdir: Path, iterations: int) -> Case:
+    from database.service import DatabaseService
+    from server.connection_manager import ConnectionInfo
+    from server.state_sync import StateSyncCache
+
+    state = _played_state()
+    cache = StateSyncCache(state, DatabaseService("bench_render"))
+    lock = asyncio.Lock()
+    conns = [
+        ConnectionInfo(id=f"c{i}", device_id=f"d{i}", websocket=None, role="slave", connected_at=0.0)
+        for i in range(100)
+    ]
+
+    async def op(i: int) -> None:
+        if i % 10 == 0:
+            state.touch()
+        await cache.refresh(lock)
+        for conn in conns:
+            _, _, on_sent = cache.render(conn)
+            if on_sent is not None:
+                on_sent()  # Entregue (como faria a task escritora do fan-out)
+
+    return Case(op=op, iterations=iterations)
+
+
+# Nome -> (fábrica, iterações padrão)
+CASES: Dict[str, Any] = {
+    "handle_new_result": (case_handle_new_result, 3000),
+    "sda17_analyze": (case_sda17_analyze, 20000),
+    "ensemble_evaluate": (case_ensemble_evaluate, 2000),
+    "game_state_save": (case_game_state_save, 1000),
+    "game_state_load": (case_game_state_load, 2000),
+    "repo_save_decision": (case_repo_save_decision, 1000),
+    "writer_save_decision": (case_writer_save_decision, 5000),
+    "get_window_history": (case_get_window_history, 2000),
+    "state_sync_build": (case_state_sync_build, 3000),
+    "state_sync_render": (case_state_sync_render, 2000),
+}
+
+
+# ========== BASELINE ==========
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float,
+    p99_threshold: Optional[float] = None
+) -> List[str]:
+    """
+    Regressões em relação ao baseline (lista vazia = ok).
+
+    Regride quem ficou `threshold` (fração) mais lento no p50 ou com
+    ops/s `threshold` menor; p99 só conta se p99_threshold for dado.
+    """
+    regressions: List[str] = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        checks = [
+            ("p50_us", current["p50_us"], base["p50_us"], threshold, True),
+            ("ops_per_s", current["ops_per_s"], base["ops_per_s"], threshold, False),
+        ]
+        if p99_threshold is not None:
+            checks.append(("p99_us", current["p99_us"], base["p99_us"], p99_threshold, True))
+        for metric, value, reference, limit, lower_is_better in checks:
+            if reference <= 0:
+                continue
+            change = (value - reference) / reference
+            worse = change > limit if lower_is_better else change < -limit
+            if worse:
+                regressions.append(f"{name}.{metric}: {reference} -> {value} ({change:+.1%}, limite {limit:.0%})")
+    return regressions
+
+
+def _print_results(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    header = f"{'caso':<22} {'iter':>7} {'p50 µs':>10} {'p99 µs':>10} {'ops/s':>12}"
+    if baseline:
+        header += f" {'Δp50':>8} {'Δops/s':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = f"{name:<22} {r['iterations']:>7} {r['p50_us']:>10.2f} {r['p99_us']:>10.2f} {r['ops_per_s']:>12,.0f}"
+        base = (baseline or {}).get(name)
+        if base:
+            d50 = (r["p50_us"] - base["p50_us"]) / base["p50_us"] if base["p50_us"] else 0.0
+            dops = (r["ops_per_s"] - base["ops_per_s"]) / base["ops_per_s"] if base["ops_per_s"] else 0.0
+            line += f" {d50:>+8.1%} {dops:>+8.1%}"
+        print(line)
+
+
+def _isolate(workdir: Path) -> None:
+    """Aponta estado, journal, mesas e banco para o diretório temporário (antes dos imports)."""
+    os.environ.update({
+        "STATE_FILE": str(workdir / "state.json"),
+        "JOURNAL_FILE": str(workdir / "spins.journal"),
+        "TABLES_DIR": str(workdir / "tables"),
+        "DB_PATH": str(workdir / "decisions.db"),
+        "LOG_FILE": str(workdir / "roleta.log"),
+        # Os casos enfileiram em laço apertado no event loop, onde fila cheia
+        # descarta (DB_QUEUE_POLICY): a fila cabe todas as operações do caso
+        "DB_QUEUE_SIZE": "100000",
+    })
+
+
+async def run_suite(names: List[str], workdir: Path, scale: float, warmup: int) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in names:
+        factory, iterations = CASES[name]
+        case = await factory(workdir, max(1, int(iterations * scale)))
+        result = await measure(name, case, warmup)
+        results[name] = asdict(result)
+        results[name].pop("name")
+        print(f"  {name}: p50 {result.p50_us:.2f} µs, {result.ops_per_s:,.0f} ops/s", file=sys.stderr)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.suite", description="Benchmarks do hot path de um spin")
+    parser.add_argument("--only", help=f"Casos separados por vírgula ({', '.join(CASES)})")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplica as iterações de cada caso")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="JSON de resultados")
+    parser.add_argument("--compare", nargs="?", const=str(DEFAULT_BASELINE), help="Baseline para comparar (padrão: bench/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Regressão tolerada no p50/ops/s (fração)")
+    parser.add_argument("--p99-threshold", type=float, default=None, help="Regressão tolerada no p99 (desligado por padrão)")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE), help="Grava os resultados como baseline")
+    parser.add_argument("--log", action="store_true", help="Mantém o logging INFO de produção")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"casos desconhecidos: {', '.join(unknown)}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="roleta-bench-"))
+    _isolate(workdir)
+    sys.path.insert(0, str(ROOT))
+    logging.basicConfig(level=logging.INFO if args.log else logging.WARNING, stream=sys.stderr)
+    logging.getLogger().setLevel(logging.INFO if args.log else logging.WARNING)
+
+    try:
+        results = asyncio.run(run_suite(names, workdir, args.scale, args.warmup))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    output = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": args.scale
+        },
+        "results": results
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        different = [
+            f"{key}: {saved.get('meta', {}).get(key)!r} -> {output['meta'][key]!r}"
+            for key in ("python", "platform", "cpu_count", "scale")
+            if saved.get("meta", {}).get(key) != output["meta"][key]
+        ]
+        if different:
+            print(
+                f"AVISO: baseline gravado em outra máquina/configuração ({'; '.join(different)}); "
+                f"as diferenças podem não ser regressões",
+                file=sys.stderr
+            )
+    _print_results(results, baseline)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline gravado: {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.p99_threshold)
+        if regressions:
+            print("\nREGRESSÕES:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nSem regressões acima do limite.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
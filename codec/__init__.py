@@ -0,0 +1,61 @@
+# Roleta Cloud - Codec das Mensagens WebSocket
+"""
+Serialização de todas as mensagens do servidor por um backend plugável:
+msgspec > orjson > json da stdlib (o primeiro instalado, ou WS_CODEC).
+
+    from codec import codec
+    frame = codec.dumps(Sugestao(data=SugestaoData(...)))
+    data = codec.loads(message)        # DecodeError se não for JSON
+
+Mensagens tipadas (codec.messages) são dataclasses: msgspec e orjson as
+serializam nativamente; o backend json converte via `default`.
+
+Conexões que negociam o subprotocolo roleta.msgpack.v1 recebem frames
+binários (codec.binary, codec.wire):
+
+    await send_message(websocket, Ack(received=3))   # JSON ou binário
+    data = loads_for(websocket, message)
+
+Benchmark: python -m bench.codec
+"""
+
+from .backends import BACKENDS, DecodeError, available_backends, create_backend, struct_to_dict
+from .binary import BinaryCodec, binary_codec
+from .messages import (
+    Ack, EnsembleMessage, ErrorMessage, LegacySpin, NovoResultado, StateSync, Sugestao, SugestaoData, TraceMessage
+)
+from .wire import (
+    SUBPROTOCOL_JSON, SUBPROTOCOL_MSGPACK, Frame, encode, encode_for, is_binary, loads_for, peek_type,
+    send_message, serve_options
+)
+from .wire import text_codec as codec
+
+__all__ = [
+    "Ack",
+    "BACKENDS",
+    "BinaryCodec",
+    "DecodeError",
+    "EnsembleMessage",
+    "ErrorMessage",
+    "Frame",
+    "LegacySpin",
+    "NovoResultado",
+    "SUBPROTOCOL_JSON",
+    "SUBPROTOCOL_MSGPACK",
+    "StateSync",
+    "Sugestao",
+    "SugestaoData",
+    "TraceMessage",
+    "available_backends",
+    "binary_codec",
+    "codec",
+    "create_backend",
+    "encode",
+    "encode_for",
+    "is_binary",
+    "loads_for",
+    "peek_type",
+    "send_message",
+    "serve_options",
+    "struct_to_dict",
+]
@@ -0,0 +1,143 @@
+# Roleta Cloud - Backends de Serialização JSON
+# msgspec > orjson > json (stdlib), escolhido uma vez no startup
+
+import dataclasses
+import json
+import logging
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Ordem de preferência do modo "auto"
+PREFERENCE = ("msgspec", "orjson", "json")
+
+
+class DecodeError(ValueError):
+    """Frame de entrada não é JSON válido (qualquer backend)."""
+
+
+_FIELDS: Dict[type, Tuple[str, ...]] = {}
+
+
+def struct_to_dict(obj: Any) -> Dict[str, Any]:
+    """Dataclass -> dict raso (os aninhados são convertidos pelo encoder)."""
+    names = _FIELDS.get(type(obj))
+    if names is None:
+        names = _FIELDS[type(obj)] = tuple(f.name for f in dataclasses.fields(obj))
+    return {name: getattr(obj, name) for name in names}
+
+
+def _default(obj: Any) -> Any:
+    names = _FIELDS.get(type(obj))
+    if names is not None:
+        return {name: getattr(obj, name) for name in names}
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return struct_to_dict(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "dtype") and hasattr(obj, "tolist"):
+        # Escalares/arrays numpy (np.float64 não é float para orjson/msgspec)
+        return obj.tolist()
+    raise TypeError(f"Objeto {type(obj).__name__} não é serializável em JSON")
+
+
+class JsonBackend:
+    """json da stdlib: mesmo formato de saída que o servidor sempre usou."""
+    name = "json"
+
+    def __init__(self):
+        self._encode = json.JSONEncoder(default=_default).encode
+        self._decode = json.JSONDecoder().decode
+
+    def dumps(self, obj: Any) -> str:
+        return self._encode(obj)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        try:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                data = bytes(data).decode("utf-8")
+            return self._decode(data)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise DecodeError(str(e)) from None
+        except RecursionError:
+            raise DecodeError("JSON aninhado demais") from None
+
+
+class OrjsonBackend:
+    """orjson: saída compacta em UTF-8, dataclasses nativas."""
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> str:
+        return self._orjson.dumps(obj, default=_default, option=self._option).decode("utf-8")
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        try:
+            return self._orjson.loads(data)
+        except self._orjson.JSONDecodeError as e:
+            raise DecodeError(str(e)) from None
+
+
+class MsgspecBackend:
+    """msgspec: encoder/decoder reutilizáveis, dataclasses nativas."""
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._error = msgspec.DecodeError
+        self._encoder = msgspec.json.Encoder(enc_hook=_default)
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode("utf-8")
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except self._error as e:
+            raise DecodeError(str(e)) from None
+
+
+BACKENDS: Dict[str, Callable[[], Any]] = {
+    "msgspec": MsgspecBackend,
+    "orjson": OrjsonBackend,
+    "json": JsonBackend,
+}
+
+
+def available_backends() -> List[str]:
+    """Backends importáveis neste ambiente, em ordem de preferência."""
+    names = []
+    for name in PREFERENCE:
+        try:
+            BACKENDS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def create_backend(name: str = "auto"):
+    """
+    Instancia o backend pedido ("auto" = o mais rápido instalado).
+    Um backend explícito que não está instalado cai para o próximo,
+    com aviso no log (o servidor nunca deixa de subir por isso).
+    """
+    order = PREFERENCE if name == "auto" else (name,) + tuple(n for n in PREFERENCE if n != name)
+    if name != "auto" and name not in BACKENDS:
+        raise ValueError(f"Codec desconhecido: {name} (use auto, {', '.join(PREFERENCE)})")
+    for candidate in order:
+        try:
+            backend = BACKENDS[candidate]()
+        except ImportError:
+            if candidate == name:
+                logger.warning(f"Codec {name} não instalado, usando o próximo disponível")
+            continue
+        return backend
+    return JsonBackend()
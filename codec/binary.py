@@ -0,0 +1,396 @@
+# Roleta Cloud - Protocolo Binário (MessagePack com ids de campo)
+"""
+Formato binário opcional do WebSocket (subprotocolo roleta.msgpack.v1).
+
+MessagePack padrão, com uma compactação: nas mensagens quentes as
+chaves viram ids inteiros estáveis definidos em SCHEMAS.
+
+    {"type": "sugestao", "data": {"acao": ..., "numeros": [...]}}
+    -> {0: 1, 1: {1: ..., 2: [...]}}
+
+- a chave 0 do mapa de topo (sempre a primeira) é o id do tipo da mensagem
+- o id de um campo é a sua posição (1-based) na tupla `fields`; ids
+  nunca mudam: campos novos entram no FIM da tupla, removidos viram None
+- campos fora do schema seguem com a chave texto (clientes antigos os
+  ignoram); tipos sem schema são MessagePack puro com chaves texto
+
+Usa o pacote `msgpack` (extensão C) quando instalado; senão, o
+empacotador em Python puro deste módulo (mesmo formato de saída).
+"""
+
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .backends import DecodeError, _default, struct_to_dict
+
+TYPE_KEY = 0
+
+
+@dataclass
+class Schema:
+    """Campos de um struct, na ordem dos ids (1, 2, 3...)."""
+    fields: Tuple[Optional[str], ...]
+    # campo -> schema do dict (ou dos itens da lista) naquele campo
+    nested: Dict[str, "Schema"] = field(default_factory=dict)
+    type_id: int = 0
+
+    def __post_init__(self):
+        self.ids: Dict[str, int] = {name: i + 1 for i, name in enumerate(self.fields) if name}
+
+
+# ========== SCHEMAS (ids estáveis: só acrescentar no fim) ==========
+
+HIT_STATS = Schema(("results", "hits", "total", "rate"))
+DIRECTION_STATS = Schema(("cw", "ccw"), nested={"cw": HIT_STATS, "ccw": HIT_STATS})
+PERFORMANCE = Schema(
+    ("sda17", "bet", "cw", "ccw"),
+    nested={"sda17": DIRECTION_STATS, "bet": DIRECTION_STATS, "cw": HIT_STATS, "ccw": HIT_STATS}
+)
+MARTINGALE = Schema(("level", "window_hits", "window_count", "total_stops", "current_bet", "multiplier", "gale_display"))
+
+SUGESTAO_DATA = Schema((
+    "acao", "numeros", "centro", "regiao", "ultimo_numero", "confianca", "martingale", "aposta",
+    "gale_level", "gale_display", "estrategia", "trace_id", "t_server", "bet_advice", "action_reason"
+))
+STATE_DATA = Schema(
+    (
+        "gale_level", "gale_display", "martingale", "aposta", "last_number", "target_direction",
+        "performance", "martingale_cw", "martingale_ccw", "pending_prediction", "window_history",
+        "bet_placed", "generation", "timestamp"
+    ),
+    nested={"performance": PERFORMANCE, "martingale_cw": MARTINGALE, "martingale_ccw": MARTINGALE}
+)
+TRACE_STEP = Schema(("name", "t", "data", "at_ms", "ms"))
+
+SCHEMAS: Dict[str, Schema] = {
+    "sugestao": Schema(("data",), nested={"data": SUGESTAO_DATA}, type_id=1),
+    "state_sync": Schema(("data", "seq"), nested={"data": STATE_DATA}, type_id=2),
+    "state_delta": Schema(("seq", "base_seq", "changed", "removed"), type_id=3),
+    "heartbeat": Schema(("seq", "generation"), type_id=4),
+    "trace": Schema(
+        ("trace_id", "steps", "total_ms", "spin", "result", "strategy", "performance", "state"),
+        nested={"steps": TRACE_STEP, "performance": PERFORMANCE},
+        type_id=5
+    ),
+    "ack": Schema(("received", "message", "t_server"), type_id=6),
+    "novo_resultado": Schema(("numero", "direcao", "timestamp", "t_client", "trace_id", "mesa_id"), type_id=7),
+    "error": Schema(("trace_id", "code", "message", "t_server"), type_id=8),
+    "ensemble": Schema(("trace_id", "data"), type_id=9),
+}
+SCHEMAS_BY_ID: Dict[int, Tuple[str, Schema]] = {s.type_id: (name, s) for name, s in SCHEMAS.items()}
+
+
+def _as_dict(value: Any) -> Any:
+    if hasattr(value, "__dataclass_fields__") and not isinstance(value, type):
+        return struct_to_dict(value)
+    return value
+
+
+def compact(obj: Dict[str, Any], schema: Schema) -> Dict[Union[int, str], Any]:
+    """Troca as chaves conhecidas pelos ids (recursivo nos campos aninhados)."""
+    ids = schema.ids
+    nested = schema.nested
+    out: Dict[Union[int, str], Any] = {}
+    for key, value in obj.items():
+        field_id = ids.get(key)
+        if field_id is None:
+            out[key] = value
+            continue
+        sub = nested.get(key)
+        if sub is not None:
+            value = _as_dict(value)
+            if isinstance(value, dict):
+                value = compact(value, sub)
+            elif isinstance(value, list):
+                items = [_as_dict(v) for v in value]
+                value = [compact(v, sub) if isinstance(v, dict) else v for v in items]
+        out[field_id] = value
+    return out
+
+
+def expand(obj: Dict[Any, Any], schema: Schema) -> Dict[Any, Any]:
+    """Inverso de compact: ids -> nomes (ids desconhecidos ficam inteiros)."""
+    fields = schema.fields
+    nested = schema.nested
+    out: Dict[Any, Any] = {}
+    for key, value in obj.items():
+        if isinstance(key, int) and 0 < key <= len(fields) and fields[key - 1]:
+            key = fields[key - 1]
+            sub = nested.get(key)
+            if sub is not None:
+                if isinstance(value, dict):
+                    value = expand(value, sub)
+                elif isinstance(value, list):
+                    value = [expand(v, sub) if isinstance(v, dict) else v for v in value]
+        out[key] = value
+    return out
+
+
+def to_wire(message: Any) -> Any:
+    """Mensagem (dict ou struct) -> árvore com ids de campo, pronta para empacotar."""
+    message = _as_dict(message)
+    if not isinstance(message, dict):
+        return message
+    schema = SCHEMAS.get(message.get("type"))
+    if schema is None:
+        return message
+    # Id do tipo primeiro: quem só olha o início do frame (ex: compressão) o encontra
+    out: Dict[Union[int, str], Any] = {TYPE_KEY: schema.type_id}
+    out.update(compact({k: v for k, v in message.items() if k != "type"}, schema))
+    return out
+
+
+def from_wire(obj: Any) -> Any:
+    """Árvore desempacotada -> mensagem com os nomes dos campos."""
+    if not isinstance(obj, dict) or TYPE_KEY not in obj:
+        return obj
+    known = SCHEMAS_BY_ID.get(obj[TYPE_KEY])
+    if known is None:
+        raise DecodeError(f"Tipo binário desconhecido: {obj[TYPE_KEY]!r}")
+    name, schema = known
+    message = {"type": name}
+    message.update(expand({k: v for k, v in obj.items() if k != TYPE_KEY}, schema))
+    return message
+
+
+# ========== MESSAGEPACK EM PYTHON PURO ==========
+
+_pack_f64 = struct.Struct(">Bd").pack
+
+
+class Packer:
+    """Subconjunto do MessagePack usado pelo protocolo (sem ext/timestamp)."""
+
+    def pack(self, obj: Any) -> bytes:
+        out = bytearray()
+        self._pack(obj, out)
+        return bytes(out)
+
+    def _pack(self, obj: Any, out: bytearray) -> None:
+        if obj is None:
+            out.append(0xC0)
+        elif obj is True:
+            out.append(0xC3)
+        elif obj is False:
+            out.append(0xC2)
+        elif isinstance(obj, int):
+            self._pack_int(obj, out)
+        elif isinstance(obj, float):
+            out += _pack_f64(0xCB, obj)
+        elif isinstance(obj, str):
+            raw = obj.encode("utf-8")
+            n = len(raw)
+            if n < 32:
+                out.append(0xA0 | n)
+            elif n < 0x100:
+                out += bytes((0xD9, n))
+            elif n < 0x10000:
+                out += struct.pack(">BH", 0xDA, n)
+            else:
+                out += struct.pack(">BI", 0xDB, n)
+            out += raw
+        elif isinstance(obj, dict):
+            n = len(obj)
+            if n < 16:
+                out.append(0x80 | n)
+            elif n < 0x10000:
+                out += struct.pack(">BH", 0xDE, n)
+            else:
+                out += struct.pack(">BI", 0xDF, n)
+            for key, value in obj.items():
+                self._pack(key, out)
+                self._pack(value, out)
+        elif isinstance(obj, (list, tuple)):
+            n = len(obj)
+            if n < 16:
+                out.append(0x90 | n)
+            elif n < 0x10000:
+                out += struct.pack(">BH", 0xDC, n)
+            else:
+                out += struct.pack(">BI", 0xDD, n)
+            for value in obj:
+                self._pack(value, out)
+        elif isinstance(obj, (bytes, bytearray, memoryview)):
+            raw = bytes(obj)
+            n = len(raw)
+            if n < 0x100:
+                out += bytes((0xC4, n))
+            elif n < 0x10000:
+                out += struct.pack(">BH", 0xC5, n)
+            else:
+                out += struct.pack(">BI", 0xC6, n)
+            out += raw
+        else:
+            self._pack(_default(obj), out)
+
+    @staticmethod
+    def _pack_int(n: int, out: bytearray) -> None:
+        if 0 <= n < 0x80:
+            out.append(n)
+        elif -32 <= n < 0:
+            out.append(n & 0xFF)
+        elif n >= 0:
+            if n < 0x100:
+                out += bytes((0xCC, n))
+            elif n < 0x10000:
+                out += struct.pack(">BH", 0xCD, n)
+            elif n < 0x100000000:
+                out += struct.pack(">BI", 0xCE, n)
+            elif n < 0x10000000000000000:
+                out += struct.pack(">BQ", 0xCF, n)
+            else:
+                raise OverflowError(f"Inteiro grande demais para MessagePack: {n}")
+        elif n >= -0x80:
+            out += struct.pack(">Bb", 0xD0, n)
+        elif n >= -0x8000:
+            out += struct.pack(">Bh", 0xD1, n)
+        elif n >= -0x80000000:
+            out += struct.pack(">Bi", 0xD2, n)
+        elif n >= -0x8000000000000000:
+            out += struct.pack(">Bq", 0xD3, n)
+        else:
+            raise OverflowError(f"Inteiro grande demais para MessagePack: {n}")
+
+
+# Formato -> (struct, tamanho) dos tipos de tamanho fixo
+_FIXED = {
+    0xCA: struct.Struct(">f"), 0xCB: struct.Struct(">d"),
+    0xCC: struct.Struct(">B"), 0xCD: struct.Struct(">H"), 0xCE: struct.Struct(">I"), 0xCF: struct.Struct(">Q"),
+    0xD0: struct.Struct(">b"), 0xD1: struct.Struct(">h"), 0xD2: struct.Struct(">i"), 0xD3: struct.Struct(">q"),
+}
+_LENGTH = {1: struct.Struct(">B"), 2: struct.Struct(">H"), 4: struct.Struct(">I")}
+
+# Aninhamento máximo de arrays/maps (as mensagens do protocolo usam 4-5 níveis)
+MAX_DEPTH = 32
+
+
+class Unpacker:
+    """
+    Decodifica um objeto MessagePack completo (bytes extras são erro).
+
+    Qualquer frame malformado vira DecodeError: truncado, UTF-8 inválido,
+    chave de map não hashable (lista/map como chave) ou aninhamento acima
+    de MAX_DEPTH.
+    """
+
+    def unpack(self, data: bytes) -> Any:
+        self._data = data
+        self._pos = 0
+        self._depth = 0
+        try:
+            obj = self._unpack()
+        except (IndexError, struct.error, TypeError, ValueError, RecursionError) as e:
+            raise DecodeError(f"MessagePack inválido: {e}") from None
+        finally:
+            data_len, pos = len(data), self._pos
+            self._data = b""
+        if pos != data_len:
+            raise DecodeError(f"MessagePack inválido: {data_len - pos} bytes sobrando")
+        return obj
+
+    def _take(self, n: int) -> bytes:
+        start = self._pos
+        end = start + n
+        if end > len(self._data):
+            raise DecodeError("MessagePack inválido: frame truncado")
+        self._pos = end
+        return self._data[start:end]
+
+    def _length(self, size: int) -> int:
+        return _LENGTH[size].unpack(self._take(size))[0]
+
+    def _unpack(self) -> Any:
+        b = self._data[self._pos]
+        self._pos += 1
+        if b < 0x80:
+            return b
+        if b >= 0xE0:
+            return b - 0x100
+        if 0xA0 <= b <= 0xBF:
+            return self._take(b & 0x1F).decode("utf-8")
+        if 0x90 <= b <= 0x9F:
+            return self._array(b & 0x0F)
+        if 0x80 <= b <= 0x8F:
+            return self._map(b & 0x0F)
+        if b == 0xC0:
+            return None
+        if b == 0xC2:
+            return False
+        if b == 0xC3:
+            return True
+        fixed = _FIXED.get(b)
+        if fixed is not None:
+            return fixed.unpack(self._take(fixed.size))[0]
+        if b in (0xD9, 0xDA, 0xDB):
+            return self._take(self._length(1 << (b - 0xD9))).decode("utf-8")
+        if b in (0xC4, 0xC5, 0xC6):
+            return self._take(self._length(1 << (b - 0xC4)))
+        if b in (0xDC, 0xDD):
+            return self._array(self._length(2 if b == 0xDC else 4))
+        if b in (0xDE, 0xDF):
+            return self._map(self._length(2 if b == 0xDE else 4))
+        raise DecodeError(f"MessagePack: formato 0x{b:02x} não suportado")
+
+    def _enter(self) -> None:
+        self._depth += 1
+        if self._depth > MAX_DEPTH:
+            raise DecodeError(f"MessagePack inválido: aninhamento acima de {MAX_DEPTH}")
+
+    def _array(self, n: int) -> List[Any]:
+        self._enter()
+        out = [self._unpack() for _ in range(n)]
+        self._depth -= 1
+        return out
+
+    def _map(self, n: int) -> Dict[Any, Any]:
+        self._enter()
+        out = {}
+        for _ in range(n):
+            key = self._unpack()
+            out[key] = self._unpack()
+        self._depth -= 1
+        return out
+
+
+class BinaryCodec:
+    """Mensagem <-> frame binário (ids de campo + MessagePack)."""
+
+    def __init__(self, native: Optional[bool] = None):
+        try:
+            if native is False:
+                raise ImportError
+            import msgpack
+        except ImportError:
+            if native:
+                raise
+            msgpack = None
+        self.name = "msgpack" if msgpack is not None else "msgpack-py"
+        if msgpack is not None:
+            self._error = (msgpack.UnpackException, ValueError, TypeError)
+            self._pack = msgpack.Packer(default=_default, use_bin_type=True).pack
+            self._unpack = lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False)
+        else:
+            self._error = ()
+            self._pack = Packer().pack
+            self._unpack = Unpacker().unpack
+
+    def dumps(self, message: Any) -> bytes:
+        return self._pack(to_wire(message))
+
+    def loads(self, data: Union[bytes, bytearray, memoryview]) -> Any:
+        try:
+            obj = self._unpack(bytes(data))
+        except DecodeError:
+            raise
+        except self._error as e:
+            raise DecodeError(f"MessagePack inválido: {e}") from None
+        try:
+            return from_wire(obj)
+        except (TypeError, ValueError) as e:
+            # Ex: id de tipo não hashable ({0: [1]})
+            raise DecodeError(f"Mensagem binária inválida: {e}") from None
+
+
+binary_codec = BinaryCodec()
+
@@ -0,0 +1,181 @@
+# Roleta Cloud - Mensagens Tipadas do Protocolo WebSocket
+# Dataclasses serializadas nativamente por msgspec/orjson (json via default)
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+DIRECTIONS = ("horario", "anti-horario")
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _optional_int(data: Dict[str, Any], key: str) -> Optional[int]:
+    value = data.get(key)
+    if value is None or _is_int(value):
+        return value
+    raise ValueError(f"Campo '{key}' deve ser inteiro: {value!r}")
+
+
+# Texto inteiro aceito pelo modo lax do pydantic ("17", " 17 ", "1_000", "17.0")
+_LAX_INT_TEXT = re.compile(r"[+-]?[0-9]+(?:_[0-9]+)*(?:\.0+)?")
+
+
+def _lax_int(value: Any) -> Optional[int]:
+    """
+    Inteiro como o SpinInput (pydantic, modo lax) aceitava: bool, float
+    sem parte fracionária e texto numérico. None se não for inteiro.
+    """
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return int(value) if value.is_integer() and abs(value) < 2 ** 63 else None
+    if isinstance(value, str):
+        text = value.strip()
+        if _LAX_INT_TEXT.fullmatch(text):
+            return int(text.split(".")[0])
+    return None
+
+
+# ========== ENTRADA ==========
+
+@dataclass
+class NovoResultado:
+    """Spin enviado pelo MASTER (type "novo_resultado")."""
+    numero: int = 0
+    direcao: str = "horario"
+    timestamp: Optional[int] = None
+    t_client: Optional[int] = None
+    trace_id: Optional[str] = None
+    mesa_id: Optional[str] = None
+    type: str = "novo_resultado"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NovoResultado":
+        """Valida o dict decodificado. ValueError com a mesma mensagem de sempre."""
+        numero = data.get("numero")
+        if numero is None:
+            raise ValueError("Campo 'numero' obrigatório")
+        if not _is_int(numero) or not 0 <= numero <= 36:
+            raise ValueError(f"Número inválido: {numero} (deve ser 0-36)")
+        direcao = data.get("direcao", "horario")
+        if not isinstance(direcao, str):
+            raise ValueError(f"Direção inválida: {direcao!r}")
+        trace_id = data.get("trace_id")
+        return cls(
+            numero=numero,
+            direcao=direcao,
+            timestamp=_optional_int(data, "timestamp"),
+            t_client=_optional_int(data, "t_client"),
+            trace_id=str(trace_id) if trace_id is not None else None,
+            mesa_id=data.get("mesa_id")
+        )
+
+
+@dataclass
+class LegacySpin:
+    """
+    Spin no formato antigo (sem type): mesmas regras do SpinInput,
+    inclusive a coerção lax de numero e t_client ("17" -> 17).
+    """
+    numero: int = 0
+    direcao: str = "horario"
+    trace_id: str = ""
+    t_client: int = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LegacySpin":
+        numero = _lax_int(data.get("numero"))
+        if numero is None or not 0 <= numero <= 36:
+            raise ValueError(f"numero: deve ser inteiro entre 0 e 36 (recebido {data.get('numero')!r})")
+        direcao = data.get("direcao")
+        if direcao not in DIRECTIONS:
+            raise ValueError(f"direcao: deve ser 'horario' ou 'anti-horario' (recebido {direcao!r})")
+        trace_id = data.get("trace_id")
+        if not isinstance(trace_id, str) or not 4 <= len(trace_id) <= 36:
+            raise ValueError(f"trace_id: texto de 4 a 36 caracteres (recebido {trace_id!r})")
+        t_client = _lax_int(data.get("t_client"))
+        if t_client is None:
+            raise ValueError(f"t_client: deve ser inteiro (recebido {data.get('t_client')!r})")
+        return cls(numero=numero, direcao=direcao, trace_id=trace_id, t_client=t_client)
+
+
+# ========== SAÍDA ==========
+
+@dataclass
+class SugestaoData:
+    """Payload da sugestão para o overlay."""
+    acao: str = "PULAR"
+    numeros: Optional[List[int]] = None
+    centro: int = 0
+    regiao: str = ""
+    ultimo_numero: Optional[int] = None
+    confianca: int = 0
+    martingale: str = "1x"
+    aposta: Optional[float] = None
+    gale_level: int = 1
+    gale_display: str = ""
+    estrategia: str = ""
+    trace_id: str = ""
+    t_server: int = 0
+    bet_advice: Optional[Dict[str, Any]] = None
+    action_reason: str = ""
+
+
+@dataclass
+class Sugestao:
+    type: str = "sugestao"
+    data: Optional[SugestaoData] = None
+
+
+@dataclass
+class TraceMessage:
+    """Broadcast do trace de um spin para os dashboards."""
+    type: str = "trace"
+    trace_id: str = ""
+    steps: Optional[List[Dict[str, Any]]] = None
+    total_ms: float = 0.0
+    spin: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    strategy: Optional[Dict[str, Any]] = None
+    performance: Optional[Dict[str, Any]] = None
+    state: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class EnsembleMessage:
+    """Voto do ensemble de estratégias de um spin (depois da sugestao)."""
+    type: str = "ensemble"
+    trace_id: str = ""
+    data: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class StateSync:
+    """
+    Estado completo. `data` continua dict: é a base dos deltas
+    (diff_state) e o histórico do StateSyncCache.
+    """
+    type: str = "state_sync"
+    data: Optional[Dict[str, Any]] = None
+    seq: Optional[int] = None
+
+
+@dataclass
+class Ack:
+    type: str = "ack"
+    received: int = 0
+    message: str = ""
+    t_server: int = 0
+
+
+@dataclass
+class ErrorMessage:
+    """Erro de processamento (mesmos campos do antigo ErrorOutput)."""
+    type: str = "error"
+    trace_id: str = "unknown"
+    code: int = 500
+    message: str = ""
+    t_server: int = 0
@@ -0,0 +1,153 @@
+# Roleta Cloud - Formato de Fio por Conexão (JSON ou binário)
+"""
+Cada conexão fala JSON (padrão) ou o protocolo binário, escolhido no
+handshake pelo subprotocolo WebSocket:
+
+    new WebSocket(url, ["roleta.msgpack.v1"])   // frames binários
+    new WebSocket(url)                          // JSON, como sempre
+
+Conexões binárias recebem e enviam frames binários (codec.binary);
+frames de texto continuam aceitos como JSON.
+
+Broadcasts e heartbeats usam Frame: a mensagem é serializada no máximo
+uma vez por formato, sob demanda, e o mesmo Frame vai para todas as
+conexões.
+"""
+
+from typing import Any, Dict, Optional, Sequence, Union
+
+from app_config.settings import settings
+
+from .backends import create_backend
+from .binary import SCHEMAS_BY_ID, binary_codec
+
+# Backend JSON do processo (exportado como codec.codec; cada worker escolhe o seu)
+text_codec = create_backend(settings.server.codec)
+
+SUBPROTOCOL_MSGPACK = "roleta.msgpack.v1"
+SUBPROTOCOL_JSON = "roleta.json.v1"
+
+
+SUBPROTOCOLS = (SUBPROTOCOL_MSGPACK, SUBPROTOCOL_JSON)
+
+_JSON_PREFIXES = (b'{"type":"', b'{"type": "')
+_PEEK_BYTES = 64
+
+
+def select_subprotocol(first: Any, second: Sequence[str]) -> Optional[str]:
+    """
+    Escolhe o subprotocolo oferecido pelo cliente; sem nenhum conhecido,
+    a conexão segue em JSON (o padrão do websockets seria recusar com 400).
+    Assinaturas: (conexão, oferecidos) no servidor atual e
+    (oferecidos, suportados) no servidor legado.
+    """
+    offered = first if isinstance(first, (list, tuple)) else second
+    for name in SUBPROTOCOLS:
+        if name in offered:
+            return name
+    return None
+
+
+def serve_options() -> Dict[str, Any]:
+    """Argumentos de negociação para websockets.serve (vazio se WS_BINARY=false)."""
+    if not settings.server.binary_wire:
+        return {}
+    return {"subprotocols": list(SUBPROTOCOLS), "select_subprotocol": select_subprotocol}
+
+
+def peek_type(message: Any) -> Optional[str]:
+    """
+    Tipo da mensagem pelo início do frame, sem decodificar: `{"type": "..."`
+    no JSON e a chave 0 (id do tipo, sempre a primeira) no binário.
+    None se não reconhecível (o chamador decodifica para saber).
+    """
+    if isinstance(message, str):
+        head = message[:_PEEK_BYTES].encode("utf-8", "replace")
+    else:
+        head = bytes(message[:_PEEK_BYTES])
+    if head[:1] == b"{":
+        for prefix in _JSON_PREFIXES:
+            if head.startswith(prefix):
+                end = head.find(b'"', len(prefix))
+                return head[len(prefix):end].decode("utf-8", "replace") if end > 0 else None
+        return None
+    if not head:
+        return None
+    # Binário: fixmap / map16 / map32 com a chave 0 (id do tipo) primeiro
+    first = head[0]
+    if 0x80 <= first <= 0x8F:
+        pos = 1
+    elif first == 0xDE:
+        pos = 3
+    elif first == 0xDF:
+        pos = 5
+    else:
+        return None
+    if len(head) > pos + 1 and head[pos] == 0 and head[pos + 1] < 0x80:
+        known = SCHEMAS_BY_ID.get(head[pos + 1])
+        return known[0] if known else None
+    return None
+
+
+def is_binary(websocket: Any) -> bool:
+    return getattr(websocket, "subprotocol", None) == SUBPROTOCOL_MSGPACK
+
+
+class Frame:
+    """Mensagem serializada sob demanda, uma vez por formato."""
+    __slots__ = ("message", "_text", "_binary")
+
+    def __init__(self, message: Any):
+        self.message = message
+        self._text: Optional[str] = None
+        self._binary: Optional[bytes] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = text_codec.dumps(self.message)
+        return self._text
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = binary_codec.dumps(self.message)
+        return self._binary
+
+    def encode(self, binary: bool) -> Union[str, bytes]:
+        return self.binary if binary else self.text
+
+
+def encode(message: Any, binary: bool) -> Union[str, bytes]:
+    """
+    Mensagem -> frame no formato da conexão. Aceita Frame, struct/dict
+    ou texto JSON já serializado (convertido para binário se preciso).
+    """
+    if isinstance(message, Frame):
+        return message.encode(binary)
+    if isinstance(message, str):
+        if not binary:
+            return message
+        return binary_codec.dumps(text_codec.loads(message))
+    if isinstance(message, (bytes, bytearray)):
+        return message
+    if binary:
+        return binary_codec.dumps(message)
+    return text_codec.dumps(message)
+
+
+def encode_for(websocket: Any, message: Any) -> Union[str, bytes]:
+    return encode(message, is_binary(websocket))
+
+
+async def send_message(websocket: Any, message: Any) -> None:
+    """Envia direto (sem fila) no formato da conexão."""
+    await websocket.send(encode(message, is_binary(websocket)))
+
+
+def loads_for(websocket: Any, message: Union[str, bytes]) -> Any:
+    """Decodifica um frame recebido (DecodeError se inválido)."""
+    if isinstance(message, (bytes, bytearray, memoryview)) and is_binary(websocket):
+        return binary_codec.loads(message)
+    return text_codec.loads(message)
+
@@ -1,10 +1,23 @@
 # Roleta Cloud - Core Package
 
-from .roulette import RouletteCore, Direction, Color, roulette
+from .roulette import (
+    RouletteCore,
+    CompiledWheel,
+    Direction,
+    Color,
+    compile_wheel,
+    is_clockwise,
+    roulette,
+    wheel,
+)
 
 __all__ = [
     "RouletteCore",
+    "CompiledWheel",
     "Direction",
     "Color",
+    "compile_wheel",
+    "is_clockwise",
     "roulette",
+    "wheel",
 ]
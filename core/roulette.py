@@ -12,7 +12,7 @@ Autor: Roleta Cloud Team
 Versão: 1.0.0
 """
 
-from typing import List, Set, Tuple, Optional
+from typing import Dict, List, Sequence, Set, Tuple, Optional, Union
 from dataclasses import dataclass
 from enum import Enum
 
@@ -37,6 +37,15 @@ class Direction(Enum):
         return cls.COUNTERCLOCKWISE
 
 
+# Chaves aceitas como sentido horário (enum, nomes do protocolo e das timelines)
+_CLOCKWISE_KEYS = frozenset({Direction.CLOCKWISE, "horario", "clockwise", "cw"})
+
+
+def is_clockwise(direction: Union[Direction, str]) -> bool:
+    """Retorna True se a direção (enum ou string) é sentido horário."""
+    return direction in _CLOCKWISE_KEYS
+
+
 class Color(Enum):
     """Cores dos números da roleta"""
     RED = "vermelho"
@@ -58,6 +67,112 @@ class RouletteNumber:
         return f"RouletteNumber({self.value}, pos={self.position}, {self.color.value})"
 
 
+class CompiledWheel:
+    """
+    Tabelas pré-calculadas da roda para o hot path.
+    
+    Todos os cálculos de força, alvo e vizinhança viram leituras
+    de tabela O(1), sem `list.index()` nem aritmética modular por chamada:
+    
+    - force_cw[de][para] / force_ccw[de][para]: força (0-36) em cada direção
+    - target_cw[de][força] / target_ccw[de][força]: número alvo (força 0-37)
+    - neighbors(centro, raio): vizinhos pré-calculados por raio (0-18)
+    
+    As tabelas são listas aninhadas (indexação mais rápida em CPython)
+    e devem ser tratadas como somente-leitura.
+    """
+    
+    MAX_RADIUS: int = 18
+    
+    def __init__(self, sequence: Sequence[int]):
+        self.sequence: List[int] = list(sequence)
+        self.size: int = len(self.sequence)
+        size = self.size
+        
+        # Número -> posição na roda
+        self.position: List[int] = [0] * size
+        for idx, num in enumerate(self.sequence):
+            self.position[num] = idx
+        
+        # Forças: distância em casas de 'de' até 'para' em cada direção
+        self.force_cw: List[List[int]] = [
+            [(self.position[to] - self.position[frm]) % size for to in range(size)]
+            for frm in range(size)
+        ]
+        self.force_ccw: List[List[int]] = [
+            [(self.position[frm] - self.position[to]) % size for to in range(size)]
+            for frm in range(size)
+        ]
+        
+        # Alvos: (número, força, direção) -> número (força 0 até size inclusive)
+        self.target_cw: List[List[int]] = [
+            [self.sequence[(self.position[frm] + force) % size] for force in range(size + 1)]
+            for frm in range(size)
+        ]
+        self.target_ccw: List[List[int]] = [
+            [self.sequence[(self.position[frm] - force) % size] for force in range(size + 1)]
+            for frm in range(size)
+        ]
+        
+        # Vizinhos por raio: _neighbors[raio][centro] -> tupla (inclui centro)
+        self._neighbors: List[List[Tuple[int, ...]]] = [
+            [
+                tuple(
+                    self.sequence[(self.position[center] + offset) % size]
+                    for offset in range(-radius, radius + 1)
+                )
+                for center in range(size)
+            ]
+            for radius in range(self.MAX_RADIUS + 1)
+        ]
+    
+    def _check(self, number: int) -> None:
+        if not 0 <= number < self.size:
+            raise ValueError(f"Número inválido: {number}. Deve ser 0-{self.size - 1}.")
+    
+    def force(self, from_number: int, to_number: int, direction: Union[Direction, str]) -> int:
+        """
+        Força (distância em casas) de from_number até to_number.
+        
+        Mesmo número = 0. Levanta ValueError para números fora da roda.
+        """
+        self._check(from_number)
+        self._check(to_number)
+        table = self.force_cw if direction in _CLOCKWISE_KEYS else self.force_ccw
+        return table[from_number][to_number]
+    
+    def target(self, from_number: int, force: int, direction: Union[Direction, str]) -> int:
+        """
+        Número alvo ao aplicar 'force' casas a partir de from_number.
+        
+        Levanta ValueError para números fora da roda.
+        """
+        self._check(from_number)
+        table = self.target_cw if direction in _CLOCKWISE_KEYS else self.target_ccw
+        if 0 <= force <= self.size:
+            return table[from_number][force]
+        return table[from_number][force % self.size]
+    
+    def neighbors(self, center: int, radius: int) -> List[int]:
+        """
+        Vizinhos de um número (inclui o centro): radius * 2 + 1 números.
+        
+        Levanta ValueError para números fora da roda.
+        """
+        self._check(center)
+        if 0 <= radius <= self.MAX_RADIUS:
+            return list(self._neighbors[radius][center])
+        # Raio maior que meia roda: cálculo direto (caso raro)
+        center_pos = self.position[center]
+        return [
+            self.sequence[(center_pos + offset) % self.size]
+            for offset in range(-radius, radius + 1)
+        ]
+    
+    def __repr__(self):
+        return f"CompiledWheel(slots={self.size})"
+
+
 class RouletteCore:
     """
     Núcleo imutável da roleta europeia.
@@ -88,15 +203,9 @@ class RouletteCore:
     BLACK_NUMBERS: Set[int] = {2, 4, 6, 8, 10, 11, 13, 15, 17, 20, 22, 24, 26, 28, 29, 31, 33, 35}
     GREEN_NUMBERS: Set[int] = {0}
     
-    # Mapeamento número -> posição (calculado uma vez)
-    _position_map: dict = None
-    
     def __init__(self):
-        """Inicializa os mapeamentos internos"""
-        if RouletteCore._position_map is None:
-            RouletteCore._position_map = {
-                num: idx for idx, num in enumerate(self.WHEEL_SEQUENCE)
-            }
+        """Usa as tabelas pré-calculadas compartilhadas (ver CompiledWheel)"""
+        self._wheel = compile_wheel(self.WHEEL_SEQUENCE)
     
     # ========== MÉTODOS DE CONSULTA ==========
     
@@ -112,7 +221,7 @@ class RouletteCore:
         """
         if number < 0 or number > 36:
             raise ValueError(f"Número inválido: {number}. Deve ser 0-36.")
-        return self._position_map[number]
+        return self._wheel.position[number]
     
     def get_number_at_position(self, position: int) -> int:
         """
@@ -164,15 +273,7 @@ class RouletteCore:
         Returns:
             Distância em casas (1-36)
         """
-        from_pos = self.get_position(from_number)
-        to_pos = self.get_position(to_number)
-        
-        if direction == Direction.CLOCKWISE:
-            # Sentido horário: to - from (com wrap-around)
-            distance = (to_pos - from_pos) % self.TOTAL_SLOTS
-        else:
-            # Sentido anti-horário: from - to (com wrap-around)
-            distance = (from_pos - to_pos) % self.TOTAL_SLOTS
+        distance = self._wheel.force(from_number, to_number, direction)
         
         # Distância 0 significa mesmo número, mas se são diferentes, é 37 (volta completa)
         if distance == 0 and from_number != to_number:
@@ -221,14 +322,7 @@ class RouletteCore:
         Returns:
             Número de destino
         """
-        from_pos = self.get_position(from_number)
-        
-        if direction == Direction.CLOCKWISE:
-            target_pos = (from_pos + force) % self.TOTAL_SLOTS
-        else:
-            target_pos = (from_pos - force) % self.TOTAL_SLOTS
-        
-        return self.get_number_at_position(target_pos)
+        return self._wheel.target(from_number, force, direction)
     
     # ========== REGIÕES E VIZINHOS ==========
     
@@ -244,14 +338,7 @@ class RouletteCore:
             Lista de números (inclui o centro)
             Total: radius * 2 + 1 números
         """
-        center_pos = self.get_position(center)
-        neighbors = []
-        
-        for offset in range(-radius, radius + 1):
-            pos = (center_pos + offset) % self.TOTAL_SLOTS
-            neighbors.append(self.get_number_at_position(pos))
-        
-        return neighbors
+        return self._wheel.neighbors(center, radius)
     
     def get_region(self, center: int, radius: int) -> Set[int]:
         """
@@ -320,7 +407,42 @@ class RouletteCore:
         return f"RouletteCore(slots={self.TOTAL_SLOTS})"
 
 
-# ========== INSTÂNCIA SINGLETON ==========
+# ========== TABELAS COMPILADAS ==========
+
+# Cache de rodas compiladas pelo conteúdo da sequência (tupla): uma lista
+# alterada depois gera outra chave, e o cache não guarda as listas dos
+# chamadores. Limitado a _COMPILED_CACHE_SIZE rodas distintas.
+_COMPILED_CACHE_SIZE = 32
+_compiled_cache: Dict[Tuple[int, ...], CompiledWheel] = {}
+
+
+def compile_wheel(sequence: Optional[Sequence[int]] = None) -> CompiledWheel:
+    """
+    Retorna as tabelas compiladas para uma sequência da roda.
+    
+    Sequências iguais à roda europeia reutilizam a instância global `wheel`;
+    as demais são compiladas uma vez por conteúdo.
+    """
+    if sequence is None:
+        return wheel
+    key = tuple(sequence)
+    compiled = _compiled_cache.get(key)
+    if compiled is not None:
+        return compiled
+    if "wheel" in globals() and list(key) == wheel.sequence:
+        compiled = wheel
+    else:
+        compiled = CompiledWheel(key)
+    if len(_compiled_cache) >= _COMPILED_CACHE_SIZE:
+        _compiled_cache.clear()
+    _compiled_cache[key] = compiled
+    return compiled
+
+
+# ========== INSTÂNCIAS SINGLETON ==========
+
+# Tabelas da roda europeia (compartilhadas por state, estratégias e core)
+wheel = compile_wheel(RouletteCore.WHEEL_SEQUENCE)
 
 # Instância global para uso em todo o sistema
 roulette = RouletteCore()
@@ -1,12 +1,17 @@
 # Roleta Cloud - Database Package
 # Sistema de logging de decisões para análise posterior
 
+from app_config.settings import settings
+
 from .models import Decision, Session, GaleWindow, WindowPlay
 from .repository import DecisionRepository
+from .connection import SQLiteConnectionManager
 from .sqlite_repo import SQLiteDecisionRepository
+from .writer import BatchedDecisionWriter, WriterOverloaded, resolve
 
 # Singleton para fácil acesso
 _repository: DecisionRepository = None
+_writer: BatchedDecisionWriter = None
 
 
 def get_repository() -> DecisionRepository:
@@ -25,9 +30,43 @@ def init_database(db_path: str = None) -> None:
         db_path: Caminho para o arquivo SQLite (opcional)
     """
     global _repository
+    close_database()
     _repository = SQLiteDecisionRepository(db_path)
 
 
+def get_writer() -> BatchedDecisionWriter:
+    """Retorna o escritor em lote do repositório (singleton)."""
+    global _writer
+    if _writer is None:
+        cfg = settings.database
+        _writer = BatchedDecisionWriter(
+            get_repository(),
+            async_mode=cfg.async_writes,
+            max_queue=cfg.queue_size,
+            batch_size=cfg.batch_size,
+            policy=cfg.queue_policy,
+            block_timeout=cfg.block_timeout
+        )
+    return _writer
+
+
+def close_writer() -> None:
+    """Grava as escritas pendentes e encerra o escritor (shutdown)."""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+
+def close_database() -> None:
+    """Grava as escritas pendentes e fecha as conexões (shutdown)."""
+    global _repository
+    close_writer()
+    if _repository is not None:
+        _repository.close()
+        _repository = None
+
+
 __all__ = [
     "Decision",
     "Session",
@@ -35,7 +74,14 @@ __all__ = [
     "WindowPlay",
     "DecisionRepository",
     "SQLiteDecisionRepository",
+    "SQLiteConnectionManager",
+    "BatchedDecisionWriter",
+    "WriterOverloaded",
+    "resolve",
     "get_repository",
+    "get_writer",
+    "close_writer",
+    "close_database",
     "init_database"
 ]
 
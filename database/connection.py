@@ -0,0 +1,237 @@
+# Roleta Cloud - Gerenciador de Conexões SQLite
+# Uma conexão de escrita persistente + pool de conexões somente-leitura
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteConnectionManager:
+    """
+    Conexões SQLite de longa duração com PRAGMAs ajustados.
+
+    - Escrita: UMA conexão persistente protegida por lock (SQLite só
+      aceita um escritor por vez; serializar aqui evita SQLITE_BUSY)
+    - Leitura: pool de até `read_pool_size` conexões somente-leitura,
+      criadas sob demanda. Em WAL, leitores não bloqueiam o escritor.
+    - Cada conexão reaproveita statements preparados (cached_statements)
+      e mantém o cache de páginas entre operações.
+    - Checkpoint PASSIVE do WAL a cada `checkpoint_interval` segundos,
+      disparado após commits (o autocheckpoint do SQLite continua ativo).
+
+    As conexões usam check_same_thread=False: o escritor em lote usa a
+    conexão de escrita na sua thread e o event loop usa os leitores.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        cache_size_kb: int = 8192,
+        mmap_size: int = 64 * 1024 * 1024,
+        temp_store: str = "MEMORY",
+        busy_timeout_ms: int = 5000,
+        read_pool_size: int = 4,
+        cached_statements: int = 256,
+        checkpoint_interval: float = 60.0
+    ):
+        """
+        Args:
+            db_path: Arquivo .db
+            journal_mode: PRAGMA journal_mode (WAL recomendado)
+            synchronous: PRAGMA synchronous (NORMAL é seguro com WAL)
+            cache_size_kb: Cache de páginas por conexão, em KiB
+            mmap_size: Bytes mapeados em memória (0 desativa)
+            temp_store: PRAGMA temp_store (MEMORY, FILE ou DEFAULT)
+            busy_timeout_ms: Espera por lock antes de SQLITE_BUSY
+            read_pool_size: Máximo de conexões de leitura
+            cached_statements: Statements preparados mantidos por conexão
+            checkpoint_interval: Segundos entre checkpoints (0 desativa)
+        """
+        self.db_path = Path(db_path)
+        self.journal_mode = journal_mode.upper()
+        self.synchronous = synchronous.upper()
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.temp_store = temp_store.upper()
+        self.busy_timeout_ms = busy_timeout_ms
+        self.read_pool_size = max(1, read_pool_size)
+        self.cached_statements = cached_statements
+        self.checkpoint_interval = checkpoint_interval
+
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._writer: Optional[sqlite3.Connection] = None
+        self._readers: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all_readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._last_checkpoint = time.monotonic()
+        self._closed = False
+
+        # Métricas
+        self.commits = 0
+        self.checkpoints = 0
+        self.last_checkpoint: Dict[str, int] = {}
+
+    # ========== CRIAÇÃO ==========
+
+    def _apply_pragmas(self, conn: sqlite3.Connection) -> None:
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+
+    def _open_writer(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        mode = conn.execute(f"PRAGMA journal_mode = {self.journal_mode}").fetchone()[0]
+        if mode.upper() != self.journal_mode:
+            logger.warning(f"SQLite: journal_mode {self.journal_mode} indisponível, usando {mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        self._apply_pragmas(conn)
+        logger.debug(f"SQLite: conexão de escrita aberta ({self.db_path}, journal_mode={mode})")
+        return conn
+
+    def _open_reader(self) -> sqlite3.Connection:
+        # O arquivo (e o modo WAL) precisam existir antes do primeiro leitor
+        self._writer_connection()
+        conn = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        self._apply_pragmas(conn)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _writer_connection(self) -> sqlite3.Connection:
+        with self._write_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("SQLiteConnectionManager fechado")
+            if self._writer is None:
+                self._writer = self._open_writer()
+            return self._writer
+
+    # ========== USO ==========
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Conexão de escrita exclusiva. Commit ao sair, rollback em exceção.
+
+        Reentrante na mesma thread: só o bloco mais externo faz commit.
+        """
+        with self._write_lock:
+            conn = self._writer_connection()
+            self._write_depth += 1
+            try:
+                yield conn
+            except BaseException:
+                if self._write_depth == 1:
+                    conn.rollback()
+                raise
+            else:
+                if self._write_depth == 1:
+                    conn.commit()
+                    self.commits += 1
+                    self._maybe_checkpoint(conn)
+            finally:
+                self._write_depth -= 1
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Conexão somente-leitura do pool (devolvida ao sair)."""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._readers.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if len(self._all_readers) < self.read_pool_size:
+                conn = self._open_reader()
+                self._all_readers.append(conn)
+                return conn
+        return self._readers.get(timeout=self.busy_timeout_ms / 1000)
+
+    # ========== MANUTENÇÃO ==========
+
+    def _maybe_checkpoint(self, conn: sqlite3.Connection) -> None:
+        if self.checkpoint_interval <= 0 or self.journal_mode != "WAL":
+            return
+        now = time.monotonic()
+        if now - self._last_checkpoint >= self.checkpoint_interval:
+            self._last_checkpoint = now
+            self._checkpoint(conn, "PASSIVE")
+
+    def _checkpoint(self, conn: sqlite3.Connection, mode: str) -> Dict[str, int]:
+        try:
+            busy, wal_pages, moved = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite: checkpoint {mode} falhou: {e}")
+            return {}
+        self.checkpoints += 1
+        self.last_checkpoint = {"busy": busy, "wal_pages": wal_pages, "checkpointed": moved}
+        logger.debug(f"SQLite: checkpoint {mode} {self.last_checkpoint}")
+        return self.last_checkpoint
+
+    def checkpoint(self, mode: str = "PASSIVE") -> Dict[str, int]:
+        """Executa wal_checkpoint (PASSIVE, FULL, RESTART ou TRUNCATE)."""
+        with self._write_lock:
+            self._last_checkpoint = time.monotonic()
+            return self._checkpoint(self._writer_connection(), mode.upper())
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas das conexões."""
+        return {
+            "journal_mode": self.journal_mode,
+            "readers_open": len(self._all_readers),
+            "readers_idle": self._readers.qsize(),
+            "commits": self.commits,
+            "checkpoints": self.checkpoints,
+            "last_checkpoint": self.last_checkpoint
+        }
+
+    def close(self) -> None:
+        """Fecha os leitores, faz checkpoint final (TRUNCATE) e fecha o escritor."""
+        with self._readers_lock:
+            self._closed = True
+            while True:
+                try:
+                    self._readers.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._all_readers.clear()
+        with self._write_lock:
+            if self._writer is not None:
+                if self.journal_mode == "WAL":
+                    self._checkpoint(self._writer, "TRUNCATE")
+                self._writer.close()
+                self._writer = None
@@ -4,7 +4,6 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-import json
 
 
 @dataclass
@@ -141,6 +140,7 @@ class GaleWindow:
     Usado para análise ML e visualização no dashboard.
     """
     id: Optional[int] = None
+    mesa_id: str = "default"  # Mesa de origem (ver server/tables.py)
     direction: str = ""  # "cw" ou "ccw"
     gale_level: int = 1  # 1, 2 ou 3
     started_at: datetime = field(default_factory=datetime.utcnow)
@@ -160,6 +160,7 @@ class GaleWindow:
     def to_dict(self) -> Dict[str, Any]:
         return {
             "id": self.id,
+            "mesa_id": self.mesa_id,
             "direction": self.direction,
             "gale_level": self.gale_level,
             "started_at": self.started_at.isoformat() if self.started_at else None,
@@ -1,9 +1,13 @@
 # Roleta Cloud - Database Service
 
 import logging
-from typing import Dict, Optional, Any
-from database import get_repository
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional, Any, Union
+from database import get_repository, get_writer, resolve
+from database.writer import DecisionId
 from database.models import GaleWindow, WindowPlay, Decision, Session
+from metrics.instruments import db_read_ms
 from state.game import GameState
 
 logger = logging.getLogger(__name__)
@@ -12,10 +16,21 @@ class DatabaseService:
     """
     Serviço para encapsular lógica de negócios relacionada ao banco de dados.
     Gerencia janelas de martingale e sessões.
+
+    Uma instância por mesa: janelas ativas e histórico são filtrados por
+    `mesa_id` (o banco e o escritor em lote são compartilhados).
     """
 
-    def __init__(self):
-        self.active_window_ids: Dict[str, Optional[int]] = {"cw": None, "ccw": None}
+    def __init__(self, mesa_id: str = "default"):
+        self.mesa_id = mesa_id
+        # Ids das janelas ativas (Future enquanto o INSERT está na fila)
+        self.active_window_ids: Dict[str, Union[int, Future, None]] = {"cw": None, "ccw": None}
+        # Janelas perdidas: criação descartada (fila cheia) ou com erro no banco
+        self.windows_lost = 0
+        # Versão do histórico de janelas: incrementada quando uma escrita
+        # de janela/jogada é gravada (cache de get_window_history)
+        self.window_version = 0
+        self._window_history_cache: Optional[tuple] = None
         # Inicializa janelas ativas
         self._init_active_window_ids()
 
@@ -23,6 +38,10 @@ class DatabaseService:
     def repository(self):
         return get_repository()
 
+    @property
+    def writer(self):
+        return get_writer()
+
     def _init_active_window_ids(self):
         """
         Restaura active_window_ids do banco de dados após restart do servidor.
@@ -31,10 +50,10 @@ class DatabaseService:
         try:
             repo = self.repository
             for dir_key in ["cw", "ccw"]:
-                window = repo.get_active_window(dir_key)
+                window = repo.get_active_window(dir_key, mesa_id=self.mesa_id)
                 if window:
                     self.active_window_ids[dir_key] = window.id
-                    logger.info(f"[GALE_WINDOW] Restaurada janela ativa ID={window.id} dir={dir_key}")
+                    logger.info(f"[GALE_WINDOW] Restaurada janela ativa ID={window.id} mesa={self.mesa_id} dir={dir_key}")
         except Exception as e:
             logger.warning(f"Erro ao restaurar janelas ativas: {e}")
 
@@ -54,44 +73,56 @@ class DatabaseService:
         """
         Gerencia o tracking de janelas de Martingale no banco de dados.
         Chamado após cada atualização do martingale.
+
+        As escritas vão para o escritor em lote: o id de uma janela recém
+        criada é um Future, resolvido dentro das operações seguintes.
         """
         repo = self.repository
+        writer = self.writer
+        last_write: Optional[Future] = None
 
         # Normalizar direção
         dir_key = "cw" if direction in ("cw", "horario") else "ccw"
 
         # Obter ou criar janela ativa
-        window_id = self.active_window_ids.get(dir_key)
+        window_id = self._active_window(dir_key)
 
         # Se é a primeira jogada da janela (window_count == 1), criar nova janela
         if martingale_info.get("window_count", 0) == 1:
             # Se tinha janela ativa anterior, fechar primeiro (caso edge)
             if window_id is not None:
-                logger.warning(f"Fechando janela órfã {window_id} para {dir_key}")
-                repo.close_gale_window(window_id, "orphan", 1)
+                orphan_id = window_id
+                logger.warning(f"Fechando janela órfã para {dir_key}")
+                last_write = writer.call(lambda conn: repo.mark_window_closed(conn, resolve(orphan_id), "orphan", 1))
 
             # Obter taxas atuais para ML features
             stats = game_state.get_performance_stats()
             sda_rate = stats.get(f"sda17_{dir_key}", {}).get("rate", 0)
             bet_rate = stats.get(f"bet_{dir_key}", {}).get("rate", 0)
-            calibration = game_state.calibration_cw if dir_key == "cw" else game_state.calibration_ccw
 
-            # Criar nova janela
+            # Criar nova janela (calibração não existe mais no GameState)
             new_window = GaleWindow(
+                mesa_id=self.mesa_id,
                 direction=dir_key,
                 gale_level=martingale_info.get("level_before", 1),
                 sda17_rate_at_start=sda_rate,
                 bet_rate_at_start=bet_rate,
-                calibration_offset=calibration.offset if calibration else 0
+                calibration_offset=0
             )
-            window_id = repo.create_gale_window(new_window)
+
+            def create_window(conn):
+                created_id = repo.insert_gale_window(conn, new_window)
+                logger.info(f"[GALE_WINDOW] Nova janela criada ID={created_id} dir={dir_key} level={new_window.gale_level}")
+                return created_id
+
+            window_id = last_write = writer.call(create_window)
             self.active_window_ids[dir_key] = window_id
-            logger.info(f"[GALE_WINDOW] Nova janela criada ID={window_id} dir={dir_key} level={new_window.gale_level}")
+            # Descartada na hora (fila cheia): a janela não existe
+            window_id = self._active_window(dir_key)
 
         # Adicionar play à janela ativa
         if window_id is not None:
             play = WindowPlay(
-                window_id=window_id,
                 play_number=martingale_info.get("window_count", 0),
                 spin_number=numero,
                 spin_direction=direction,
@@ -103,8 +134,14 @@ class DatabaseService:
                 tr_confidence=advice_confidence,
                 tr_reason=advice_reason
             )
-            repo.add_window_play(play)
-            logger.debug(f"[GALE_WINDOW] Play adicionado: window={window_id} play={play.play_number} hit={hit}")
+            play_window_id = window_id
+
+            def add_play(conn):
+                play.window_id = resolve(play_window_id)
+                return repo.insert_window_play(conn, play)
+
+            last_write = writer.call(add_play)
+            logger.debug(f"[GALE_WINDOW] Play agendado: dir={dir_key} play={play.play_number} hit={hit}")
 
         # Se teve transição de janela (5 plays completos), fechar
         transition = martingale_info.get("transition", "")
@@ -119,38 +156,87 @@ class DatabaseService:
                     result = "stop"
 
                 next_level = martingale_info.get("level_after", 1)
-                repo.close_gale_window(window_id, result, next_level)
-                logger.info(f"[GALE_WINDOW] Janela fechada ID={window_id} result={result} next_level={next_level}")
+                closing_id = window_id
+
+                def close_window(conn):
+                    closed_id = resolve(closing_id)
+                    repo.mark_window_closed(conn, closed_id, result, next_level)
+                    logger.info(f"[GALE_WINDOW] Janela fechada ID={closed_id} result={result} next_level={next_level}")
+
+                last_write = writer.call(close_window)
 
             # Limpar referência para nova janela
             self.active_window_ids[dir_key] = None
 
+        # Invalida o cache do histórico quando a última escrita for gravada
+        if last_write is not None:
+            last_write.add_done_callback(self._bump_window_version)
+
+    def _active_window(self, dir_key: str) -> Union[int, Future, None]:
+        """
+        Janela ativa da direção. Criação que falhou (descartada pelo
+        escritor ou com erro no INSERT) libera a direção: sem isso o
+        Future com erro ficaria em active_window_ids e derrubaria todas as
+        jogadas e o fechamento seguintes.
+        """
+        window_id = self.active_window_ids.get(dir_key)
+        if isinstance(window_id, Future) and window_id.done() and window_id.exception() is not None:
+            self.active_window_ids[dir_key] = None
+            self.windows_lost += 1
+            logger.error(
+                f"[GALE_WINDOW] Janela {dir_key} mesa={self.mesa_id} não foi gravada "
+                f"({window_id.exception()}): jogadas dela descartadas ({self.windows_lost} perdidas)"
+            )
+            return None
+        return window_id
+
+    def _bump_window_version(self, _future: Optional[Future] = None) -> None:
+        self.window_version += 1
+
     def get_window_history(self) -> Dict[str, Any]:
-        """Retorna histórico de janelas para ambas as direções."""
+        """
+        Retorna histórico de janelas para ambas as direções.
+        Consulta o banco apenas se window_version mudou desde a última leitura.
+        """
+        version = self.window_version
+        cached = self._window_history_cache
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
         repo = self.repository
+        start = time.perf_counter()
         try:
-            return {
-                "cw": repo.get_window_history("cw", limit=5),
-                "ccw": repo.get_window_history("ccw", limit=5)
+            history = {
+                "cw": repo.get_window_history("cw", limit=5, mesa_id=self.mesa_id),
+                "ccw": repo.get_window_history("ccw", limit=5, mesa_id=self.mesa_id)
             }
         except Exception as e:
             logger.warning(f"Erro ao obter window_history: {e}")
             return {"cw": [], "ccw": []}
+        db_read_ms.labels("window_history").observe((time.perf_counter() - start) * 1000)
+        self._window_history_cache = (version, history)
+        return history
 
-    def create_session(self, session_id: str):
-        """Cria uma nova sessão."""
-        try:
-            self.repository.create_session(Session(id=session_id))
-        except Exception as e:
-            logger.warning(f"Erro ao criar sessão no DB: {e}")
-
-    def save_decision(self, decision: Decision) -> int:
-        """Salva uma decisão."""
-        return self.repository.save_decision(decision)
-
-    def update_result(self, decision_id: int, hit: bool, actual_number: int):
-        """Atualiza resultado de uma decisão."""
-        self.repository.update_result(decision_id, hit, actual_number)
+    def create_session(self, session_id: str) -> Future:
+        """Agenda a criação de uma nova sessão (escritor em lote). Future -> id."""
+        repo = self.repository
+        session = Session(id=session_id)
+        future = self.writer.call(lambda conn: repo.insert_session(conn, session))
+        future.add_done_callback(self._log_session_error)
+        return future
+
+    @staticmethod
+    def _log_session_error(future: Future) -> None:
+        if future.exception() is not None:
+            logger.warning(f"Erro ao criar sessão no DB: {future.exception()}")
+
+    def save_decision(self, decision: Decision) -> Future:
+        """Agenda gravação de uma decisão. Future -> id da decisão."""
+        return self.writer.save_decision(decision)
+
+    def update_result(self, decision_id: DecisionId, hit: bool, actual_number: int) -> Future:
+        """Agenda atualização do resultado (decision_id pode ser o Future de save_decision)."""
+        return self.writer.update_result(decision_id, hit, actual_number)
 
 # Singleton
 db_service = DatabaseService()
@@ -8,6 +8,9 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 
+from app_config.settings import settings
+
+from .connection import SQLiteConnectionManager
 from .repository import DecisionRepository
 from .models import Decision, Session
 
@@ -31,25 +34,41 @@ class SQLiteDecisionRepository(DecisionRepository):
         Args:
             db_path: Caminho para o arquivo .db (usa default se None)
         """
-        self.db_path = Path(db_path) if db_path else self.DEFAULT_DB_PATH
+        cfg = settings.database
+        if db_path:
+            self.db_path = Path(db_path)
+        else:
+            self.db_path = Path(cfg.db_path) if cfg.db_path else self.DEFAULT_DB_PATH
         
         # Criar diretório se não existe
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # Conexão de escrita persistente + pool de leitura (PRAGMAs ajustados)
+        self.connections = SQLiteConnectionManager(
+            self.db_path,
+            journal_mode=cfg.journal_mode,
+            synchronous=cfg.synchronous,
+            cache_size_kb=cfg.cache_size_kb,
+            mmap_size=cfg.mmap_size,
+            temp_store=cfg.temp_store,
+            busy_timeout_ms=cfg.busy_timeout_ms,
+            read_pool_size=cfg.read_pool_size,
+            cached_statements=cfg.cached_statements,
+            checkpoint_interval=cfg.checkpoint_interval
+        )
+        
         # Inicializar schema
         self._init_schema()
         
         logger.info(f"SQLite repository initialized: {self.db_path}")
     
-    def _get_connection(self) -> sqlite3.Connection:
-        """Retorna nova conexão com SQLite."""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row
-        return conn
+    def close(self) -> None:
+        """Fecha as conexões persistentes (shutdown)."""
+        self.connections.close()
     
     def _init_schema(self) -> None:
         """Cria tabelas se não existirem."""
-        with self._get_connection() as conn:
+        with self.connections.writer() as conn:
             conn.executescript("""
                 -- Tabela de sessões
                 CREATE TABLE IF NOT EXISTS sessions (
@@ -168,74 +187,115 @@ class SQLiteDecisionRepository(DecisionRepository):
                 CREATE INDEX IF NOT EXISTS idx_window_plays_window 
                     ON window_plays(window_id);
             """)
-            conn.commit()
+            self._migrate_schema(conn)
+    
+    def _migrate_schema(self, conn: sqlite3.Connection) -> None:
+        """Migrações de bancos criados por versões anteriores."""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(gale_windows)")}
+        if "mesa_id" not in columns:
+            # Janelas anteriores ao multi-mesa pertencem à mesa padrão
+            conn.execute("ALTER TABLE gale_windows ADD COLUMN mesa_id TEXT NOT NULL DEFAULT 'default'")
+            logger.info("SQLite: coluna gale_windows.mesa_id adicionada")
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_gale_windows_mesa
+                ON gale_windows(mesa_id, direction, started_at)
+        """)
     
     # =========================================================================
     # CRUD de Decisões
     # =========================================================================
     
+    _INSERT_DECISION_SQL = """
+        INSERT INTO decisions (
+            timestamp, session_id,
+            spin_number, spin_direction, spin_force,
+            tr_should_bet, tr_confidence, tr_reason,
+            tr_c4_rate, tr_m6_rate, tr_l12_rate,
+            sda_should_bet, sda_score, sda_center,
+            sda_numbers, sda_predicted_force,
+            final_action, action_reason,
+            gale_level, gale_window_hits, gale_window_count, gale_bet_value,
+            result_hit, result_actual,
+            calibration_offset, calibration_error,
+            performance_snapshot
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    _UPDATE_RESULT_SQL = """
+        UPDATE decisions 
+        SET result_hit = ?, result_actual = ?
+        WHERE id = ?
+    """
+    
+    @staticmethod
+    def _decision_params(decision: Decision) -> tuple:
+        """Parâmetros do INSERT de uma decisão."""
+        return (
+            decision.timestamp.isoformat(),
+            decision.session_id,
+            decision.spin_number,
+            decision.spin_direction,
+            decision.spin_force,
+            decision.tr_should_bet,
+            decision.tr_confidence,
+            decision.tr_reason,
+            decision.tr_c4_rate,
+            decision.tr_m6_rate,
+            decision.tr_l12_rate,
+            decision.sda_should_bet,
+            decision.sda_score,
+            decision.sda_center,
+            json.dumps(decision.sda_numbers),
+            decision.sda_predicted_force,
+            decision.final_action,
+            decision.action_reason,
+            decision.gale_level,
+            decision.gale_window_hits,
+            decision.gale_window_count,
+            decision.gale_bet_value,
+            decision.result_hit,
+            decision.result_actual,
+            decision.calibration_offset,
+            decision.calibration_error,
+            json.dumps(decision.performance_snapshot)
+        )
+    
+    def insert_decisions(self, conn: sqlite3.Connection, decisions: List[Decision]) -> List[int]:
+        """
+        Insere decisões em lote (executemany) na transação do caller.
+        
+        Com um único escritor, ids AUTOINCREMENT inseridos na mesma
+        transação são consecutivos: os ids saem de last_insert_rowid().
+        """
+        if len(decisions) == 1:
+            cursor = conn.execute(self._INSERT_DECISION_SQL, self._decision_params(decisions[0]))
+            return [cursor.lastrowid]
+        conn.executemany(self._INSERT_DECISION_SQL, [self._decision_params(d) for d in decisions])
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        first_id = last_id - len(decisions) + 1
+        return list(range(first_id, last_id + 1))
+    
+    def update_results(self, conn: sqlite3.Connection, rows: List[tuple]) -> None:
+        """Atualiza resultados em lote: rows = [(decision_id, hit, actual_number), ...]."""
+        conn.executemany(
+            self._UPDATE_RESULT_SQL,
+            [(hit, actual, decision_id) for decision_id, hit, actual in rows]
+        )
+    
     def save_decision(self, decision: Decision) -> int:
         """Salva uma nova decisão."""
-        with self._get_connection() as conn:
-            cursor = conn.execute("""
-                INSERT INTO decisions (
-                    timestamp, session_id,
-                    spin_number, spin_direction, spin_force,
-                    tr_should_bet, tr_confidence, tr_reason,
-                    tr_c4_rate, tr_m6_rate, tr_l12_rate,
-                    sda_should_bet, sda_score, sda_center,
-                    sda_numbers, sda_predicted_force,
-                    final_action, action_reason,
-                    gale_level, gale_window_hits, gale_window_count, gale_bet_value,
-                    result_hit, result_actual,
-                    calibration_offset, calibration_error,
-                    performance_snapshot
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                decision.timestamp.isoformat(),
-                decision.session_id,
-                decision.spin_number,
-                decision.spin_direction,
-                decision.spin_force,
-                decision.tr_should_bet,
-                decision.tr_confidence,
-                decision.tr_reason,
-                decision.tr_c4_rate,
-                decision.tr_m6_rate,
-                decision.tr_l12_rate,
-                decision.sda_should_bet,
-                decision.sda_score,
-                decision.sda_center,
-                json.dumps(decision.sda_numbers),
-                decision.sda_predicted_force,
-                decision.final_action,
-                decision.action_reason,
-                decision.gale_level,
-                decision.gale_window_hits,
-                decision.gale_window_count,
-                decision.gale_bet_value,
-                decision.result_hit,
-                decision.result_actual,
-                decision.calibration_offset,
-                decision.calibration_error,
-                json.dumps(decision.performance_snapshot)
-            ))
-            conn.commit()
-            return cursor.lastrowid
+        with self.connections.writer() as conn:
+            decision_id = self.insert_decisions(conn, [decision])[0]
+            return decision_id
     
     def update_result(self, decision_id: int, hit: bool, actual_number: int) -> None:
         """Atualiza o resultado de uma decisão."""
-        with self._get_connection() as conn:
-            conn.execute("""
-                UPDATE decisions 
-                SET result_hit = ?, result_actual = ?
-                WHERE id = ?
-            """, (hit, actual_number, decision_id))
-            conn.commit()
+        with self.connections.writer() as conn:
+            self.update_results(conn, [(decision_id, hit, actual_number)])
     
     def get_decision(self, decision_id: int) -> Optional[Decision]:
         """Busca uma decisão por ID."""
-        with self._get_connection() as conn:
+        with self.connections.reader() as conn:
             row = conn.execute(
                 "SELECT * FROM decisions WHERE id = ?",
                 (decision_id,)
@@ -276,13 +336,13 @@ class SQLiteDecisionRepository(DecisionRepository):
         query += " ORDER BY timestamp DESC LIMIT ?"
         params.append(limit)
         
-        with self._get_connection() as conn:
+        with self.connections.reader() as conn:
             rows = conn.execute(query, params).fetchall()
             return [self._row_to_decision(row) for row in rows]
     
     def get_last_decision_id(self, session_id: str) -> Optional[int]:
         """Retorna o ID da última decisão da sessão."""
-        with self._get_connection() as conn:
+        with self.connections.reader() as conn:
             row = conn.execute("""
                 SELECT id FROM decisions 
                 WHERE session_id = ? AND final_action = 'APOSTAR'
@@ -328,19 +388,22 @@ class SQLiteDecisionRepository(DecisionRepository):
     # CRUD de Sessões
     # =========================================================================
     
+    def insert_session(self, conn: sqlite3.Connection, session: Session) -> str:
+        """Insere sessão na transação do caller."""
+        conn.execute("""
+            INSERT INTO sessions (id, start_time)
+            VALUES (?, ?)
+        """, (session.id, session.start_time.isoformat()))
+        return session.id
+    
     def create_session(self, session: Session) -> str:
         """Cria uma nova sessão."""
-        with self._get_connection() as conn:
-            conn.execute("""
-                INSERT INTO sessions (id, start_time)
-                VALUES (?, ?)
-            """, (session.id, session.start_time.isoformat()))
-            conn.commit()
-            return session.id
+        with self.connections.writer() as conn:
+            return self.insert_session(conn, session)
     
     def update_session(self, session: Session) -> None:
         """Atualiza estatísticas da sessão."""
-        with self._get_connection() as conn:
+        with self.connections.writer() as conn:
             conn.execute("""
                 UPDATE sessions SET
                     total_spins = ?,
@@ -359,11 +422,10 @@ class SQLiteDecisionRepository(DecisionRepository):
                 session.total_stops,
                 session.id
             ))
-            conn.commit()
     
     def get_session(self, session_id: str) -> Optional[Session]:
         """Busca sessão por ID."""
-        with self._get_connection() as conn:
+        with self.connections.reader() as conn:
             row = conn.execute(
                 "SELECT * FROM sessions WHERE id = ?",
                 (session_id,)
@@ -385,12 +447,11 @@ class SQLiteDecisionRepository(DecisionRepository):
     
     def end_session(self, session_id: str) -> None:
         """Marca sessão como finalizada."""
-        with self._get_connection() as conn:
+        with self.connections.writer() as conn:
             conn.execute("""
                 UPDATE sessions SET end_time = ?
                 WHERE id = ?
             """, (datetime.utcnow().isoformat(), session_id))
-            conn.commit()
     
     # =========================================================================
     # Analytics
@@ -426,7 +487,7 @@ class SQLiteDecisionRepository(DecisionRepository):
             query += " AND timestamp <= ?"
             params.append(end_time.isoformat())
         
-        with self._get_connection() as conn:
+        with self.connections.reader() as conn:
             row = conn.execute(query, params).fetchone()
             
             return {
@@ -456,7 +517,7 @@ class SQLiteDecisionRepository(DecisionRepository):
         
         query += " GROUP BY gale_level ORDER BY gale_level"
         
-        with self._get_connection() as conn:
+        with self.connections.reader() as conn:
             rows = conn.execute(query, params).fetchall()
             
             return {
@@ -477,7 +538,7 @@ class SQLiteDecisionRepository(DecisionRepository):
             base_query += " AND session_id = ?"
             params.append(session_id)
         
-        with self._get_connection() as conn:
+        with self.connections.reader() as conn:
             # Vezes que Triple Rate recomendou pular
             skipped = conn.execute(f"""
                 SELECT 
@@ -515,89 +576,94 @@ class SQLiteDecisionRepository(DecisionRepository):
     # CRUD de Gale Windows (ML-Ready)
     # =========================================================================
     
+    def insert_gale_window(self, conn: sqlite3.Connection, window: "GaleWindow") -> int:
+        """Insere janela de gale na transação do caller."""
+        cursor = conn.execute("""
+            INSERT INTO gale_windows (
+                mesa_id, direction, gale_level, started_at,
+                sda17_rate_at_start, bet_rate_at_start, calibration_offset
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            window.mesa_id,
+            window.direction,
+            window.gale_level,
+            window.started_at.isoformat(),
+            window.sda17_rate_at_start,
+            window.bet_rate_at_start,
+            window.calibration_offset
+        ))
+        return cursor.lastrowid
+    
+    def insert_window_play(self, conn: sqlite3.Connection, play: "WindowPlay") -> int:
+        """Insere jogada e atualiza contadores da janela na transação do caller."""
+        cursor = conn.execute("""
+            INSERT INTO window_plays (
+                window_id, play_number, timestamp,
+                spin_number, spin_direction, spin_force, center_predicted,
+                hit, actual_number, sda_score, tr_confidence, tr_reason
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            play.window_id,
+            play.play_number,
+            play.timestamp.isoformat(),
+            play.spin_number,
+            play.spin_direction,
+            play.spin_force,
+            play.center_predicted,
+            play.hit,
+            play.actual_number,
+            play.sda_score,
+            play.tr_confidence,
+            play.tr_reason
+        ))
+        
+        # Atualizar contadores na janela
+        conn.execute("""
+            UPDATE gale_windows 
+            SET total_plays = total_plays + 1,
+                total_hits = total_hits + ?
+            WHERE id = ?
+        """, (1 if play.hit else 0, play.window_id))
+        return cursor.lastrowid
+    
+    def mark_window_closed(self, conn: sqlite3.Connection, window_id: int, result: str, next_level: int) -> None:
+        """Fecha janela de gale na transação do caller."""
+        conn.execute("""
+            UPDATE gale_windows 
+            SET ended_at = ?, result = ?, next_level = ?
+            WHERE id = ?
+        """, (datetime.utcnow().isoformat(), result, next_level, window_id))
+    
     def create_gale_window(self, window: "GaleWindow") -> int:
         """Cria uma nova janela de gale."""
-        from .models import GaleWindow
-        with self._get_connection() as conn:
-            cursor = conn.execute("""
-                INSERT INTO gale_windows (
-                    direction, gale_level, started_at,
-                    sda17_rate_at_start, bet_rate_at_start, calibration_offset
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                window.direction,
-                window.gale_level,
-                window.started_at.isoformat(),
-                window.sda17_rate_at_start,
-                window.bet_rate_at_start,
-                window.calibration_offset
-            ))
-            conn.commit()
-            return cursor.lastrowid
+        with self.connections.writer() as conn:
+            window_id = self.insert_gale_window(conn, window)
+            return window_id
     
     def add_window_play(self, play: "WindowPlay") -> int:
         """Adiciona uma jogada a uma janela com transação atômica."""
-        from .models import WindowPlay
-        with self._get_connection() as conn:
-            try:
-                cursor = conn.execute("""
-                    INSERT INTO window_plays (
-                        window_id, play_number, timestamp,
-                        spin_number, spin_direction, spin_force, center_predicted,
-                        hit, actual_number, sda_score, tr_confidence, tr_reason
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    play.window_id,
-                    play.play_number,
-                    play.timestamp.isoformat(),
-                    play.spin_number,
-                    play.spin_direction,
-                    play.spin_force,
-                    play.center_predicted,
-                    play.hit,
-                    play.actual_number,
-                    play.sda_score,
-                    play.tr_confidence,
-                    play.tr_reason
-                ))
-                
-                # Atualizar contadores na janela
-                conn.execute("""
-                    UPDATE gale_windows 
-                    SET total_plays = total_plays + 1,
-                        total_hits = total_hits + ?
-                    WHERE id = ?
-                """, (1 if play.hit else 0, play.window_id))
-                
-                conn.commit()
-                return cursor.lastrowid
-            except Exception:
-                conn.rollback()
-                raise
+        with self.connections.writer() as conn:
+            return self.insert_window_play(conn, play)
     
     def close_gale_window(self, window_id: int, result: str, next_level: int) -> None:
         """Fecha uma janela de gale com resultado."""
-        with self._get_connection() as conn:
-            conn.execute("""
-                UPDATE gale_windows 
-                SET ended_at = ?, result = ?, next_level = ?
-                WHERE id = ?
-            """, (datetime.utcnow().isoformat(), result, next_level, window_id))
-            conn.commit()
+        with self.connections.writer() as conn:
+            self.mark_window_closed(conn, window_id, result, next_level)
     
-    def get_active_window(self, direction: str) -> Optional["GaleWindow"]:
-        """Retorna janela ativa (não fechada) para uma direção."""
+    def get_active_window(self, direction: str, mesa_id: str = "default") -> Optional["GaleWindow"]:
+        """Retorna janela ativa (não fechada) de uma mesa para uma direção."""
         from .models import GaleWindow
-        with self._get_connection() as conn:
+        with self.connections.reader() as conn:
             row = conn.execute("""
                 SELECT * FROM gale_windows 
-                WHERE direction = ? AND ended_at IS NULL
+                WHERE mesa_id = ? AND direction = ? AND ended_at IS NULL
                 ORDER BY started_at DESC LIMIT 1
-            """, (direction,)).fetchone()
+            """, (mesa_id, direction)).fetchone()
             
             if row:
                 return GaleWindow(
                     id=row["id"],
+                    mesa_id=row["mesa_id"],
                     direction=row["direction"],
                     gale_level=row["gale_level"],
                     started_at=datetime.fromisoformat(row["started_at"]) if row["started_at"] else None,
@@ -609,9 +675,9 @@ class SQLiteDecisionRepository(DecisionRepository):
                 )
             return None
     
-    def get_window_history(self, direction: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Retorna histórico de janelas para uma direção com plays (otimizado com JOIN)."""
-        with self._get_connection() as conn:
+    def get_window_history(self, direction: str, limit: int = 10, mesa_id: str = "default") -> List[Dict[str, Any]]:
+        """Retorna histórico de janelas de uma mesa para uma direção com plays (otimizado com JOIN)."""
+        with self.connections.reader() as conn:
             # Query única com LEFT JOIN (evita N+1)
             rows = conn.execute("""
                 SELECT 
@@ -620,10 +686,10 @@ class SQLiteDecisionRepository(DecisionRepository):
                     p.play_number, p.spin_number, p.hit, p.center_predicted
                 FROM gale_windows w
                 LEFT JOIN window_plays p ON p.window_id = w.id
-                WHERE w.direction = ?
+                WHERE w.mesa_id = ? AND w.direction = ?
                 ORDER BY w.started_at DESC, p.play_number ASC
                 LIMIT ?
-            """, (direction, limit * 6)).fetchall()  # limit * 6 para garantir plays
+            """, (mesa_id, direction, limit * 6)).fetchall()  # limit * 6 para garantir plays
             
             # Agrupar por window no Python
             windows_map = {}
@@ -0,0 +1,302 @@
+# Roleta Cloud - Escritor Assíncrono em Lote
+# Tira as escritas SQLite do event loop: fila limitada + thread dedicada
+
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from metrics.instruments import db_batch_ms, db_batch_size, db_ops_total, db_queue_wait_ms
+
+from .models import Decision
+from .sqlite_repo import SQLiteDecisionRepository
+
+logger = logging.getLogger(__name__)
+
+# Tipos de operação
+OP_DECISION = "decision"  # INSERT de decisão (agrupado via executemany)
+OP_RESULT = "result"      # UPDATE de resultado (agrupado via executemany)
+OP_CALL = "call"          # Função arbitrária fn(conn) -> Any (janelas de gale)
+
+# Políticas de backpressure (fila cheia)
+POLICY_DROP = "drop"    # Descarta a operação nova imediatamente (padrão)
+POLICY_BLOCK = "block"  # Fora do event loop: bloqueia o caller até block_timeout, depois falha
+
+DecisionId = Union[int, Future, None]
+
+
+class WriterOverloaded(Exception):
+    """Fila do escritor cheia (backpressure)."""
+
+
+# Resultados do lote em execução (antes do commit os Futures ainda não
+# foram resolvidos, mas operações posteriores do mesmo lote dependem deles)
+_inflight = threading.local()
+
+
+def resolve(value: Any) -> Any:
+    """Resolve um Future do escritor (ou retorna o valor se já resolvido)."""
+    if isinstance(value, Future):
+        if not value.done():
+            results = getattr(_inflight, "results", None)
+            if results is not None and value in results:
+                return results[value]
+        return value.result()
+    return value
+
+
+def _on_event_loop() -> bool:
+    """True se a thread atual está rodando um event loop asyncio."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+@dataclass
+class _WriteOp:
+    kind: str
+    payload: Any
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class BatchedDecisionWriter:
+    """
+    Escritor de decisões/resultados/janelas em thread dedicada.
+
+    - Fila limitada (max_queue) alimentada pelo event loop sem I/O
+    - A thread drena até batch_size operações e grava tudo em UMA transação
+      na conexão de escrita persistente do repositório
+    - Operações consecutivas do mesmo tipo viram um único executemany
+    - Cada submit retorna um concurrent.futures.Future com o resultado
+      (ex: id da decisão). Futures podem ser passados como decision_id /
+      window_id para operações seguintes: a fila é FIFO, então já estarão
+      resolvidos (ou calculados no mesmo lote) quando a operação
+      dependente executar.
+    - Se a transação do lote falhar, cada operação é reexecutada isolada
+      para que uma operação ruim não derrube as outras.
+
+    Com async_mode=False as operações executam na hora, no caller
+    (mesma API, Future já resolvido).
+
+    Fila cheia: a operação falha com WriterOverloaded (métrica
+    roleta_db_ops_total{status="dropped"}). POLICY_BLOCK só espera
+    quando o caller não está em um event loop (scripts, threads): no
+    loop a espera travaria todas as conexões, então descarta na hora.
+    """
+
+    def __init__(
+        self,
+        repository: SQLiteDecisionRepository,
+        async_mode: bool = True,
+        max_queue: int = 1000,
+        batch_size: int = 100,
+        policy: str = POLICY_DROP,
+        block_timeout: float = 0.5
+    ):
+        self.repository = repository
+        self.async_mode = async_mode
+        self.batch_size = max(1, batch_size)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue[Optional[_WriteOp]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+
+        # Métricas
+        self.batches = 0
+        self.ops_written = 0
+        self.ops_failed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.last_wait_ms = 0.0
+
+        if async_mode:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    # ========== API ==========
+
+    def save_decision(self, decision: Decision) -> Future:
+        """Agenda INSERT de decisão. Future -> id da decisão."""
+        return self._submit(_WriteOp(OP_DECISION, decision))
+
+    def update_result(self, decision_id: DecisionId, hit: bool, actual_number: int) -> Future:
+        """Agenda UPDATE de resultado (decision_id pode ser Future de save_decision)."""
+        return self._submit(_WriteOp(OP_RESULT, (decision_id, hit, actual_number)))
+
+    def call(self, fn: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Agenda fn(conn) na transação do lote. Future -> retorno de fn."""
+        return self._submit(_WriteOp(OP_CALL, fn))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidade da fila e latências de flush."""
+        return {
+            "async": self.async_mode,
+            "queue_depth": self.queue_depth,
+            "max_depth": self.max_depth,
+            "batches": self.batches,
+            "ops_written": self.ops_written,
+            "ops_failed": self.ops_failed,
+            "dropped": self.dropped,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "last_wait_ms": round(self.last_wait_ms, 3)
+        }
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda a fila esvaziar (todas as operações enfileiradas gravadas)."""
+        if not self.async_mode:
+            return True
+        # Espera vaga na fila (flush já é bloqueante; não segue a política)
+        marker = _WriteOp(OP_CALL, lambda conn: None)
+        try:
+            self._queue.put(marker, timeout=timeout)
+            marker.future.result(timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Grava o que está pendente e encerra a thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ========== ENFILEIRAMENTO ==========
+
+    def _submit(self, op: _WriteOp) -> Future:
+        if not self.async_mode:
+            self._execute_batch([op])
+            return op.future
+
+        try:
+            if self.policy == POLICY_BLOCK and not _on_event_loop():
+                self._queue.put(op, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(op)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            db_ops_total.labels(op.kind, "dropped").inc()
+            op.future.set_exception(WriterOverloaded(
+                f"Fila do escritor cheia ({self._queue.maxsize}), operação {op.kind} descartada"
+            ))
+            logger.error(
+                f"[DB_WRITER] Backpressure: operação {op.kind} descartada (fila cheia, "
+                f"{self.dropped} descartadas)"
+            )
+            return op.future
+
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return op.future
+
+    # ========== THREAD ==========
+
+    def _run(self) -> None:
+        while True:
+            op = self._queue.get()
+            if op is None:
+                break
+            batch = [op]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._execute_batch(batch)
+            if stop:
+                break
+
+    def _execute_batch(self, batch: List[_WriteOp]) -> None:
+        """Grava o lote em uma transação (fallback: uma transação por operação)."""
+        start = time.perf_counter()
+        connections = self.repository.connections
+        try:
+            with connections.writer() as conn:
+                results = self._apply(conn, batch)
+            for op, result in zip(batch, results):
+                op.future.set_result(result)
+                db_ops_total.labels(op.kind, "ok").inc()
+            written = len(batch)
+            failed = 0
+        except Exception as e:
+            logger.warning(f"[DB_WRITER] Lote de {len(batch)} falhou ({e}), reexecutando individualmente")
+            written = failed = 0
+            for op in batch:
+                try:
+                    with connections.writer() as conn:
+                        result = self._apply(conn, [op])[0]
+                    op.future.set_result(result)
+                    db_ops_total.labels(op.kind, "ok").inc()
+                    written += 1
+                except Exception as op_error:
+                    logger.error(f"[DB_WRITER] Operação {op.kind} falhou: {op_error}")
+                    op.future.set_exception(op_error)
+                    db_ops_total.labels(op.kind, "failed").inc()
+                    failed += 1
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        wait_ms = (start - batch[0].enqueued_at) * 1000
+        db_batch_ms.observe(elapsed_ms)
+        db_batch_size.observe(len(batch))
+        db_queue_wait_ms.observe(wait_ms)
+        with self._stats_lock:
+            self.batches += 1
+            self.ops_written += written
+            self.ops_failed += failed
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.last_wait_ms = wait_ms
+
+    def _apply(self, conn: sqlite3.Connection, batch: List[_WriteOp]) -> List[Any]:
+        """Executa o lote agrupando operações consecutivas do mesmo tipo."""
+        results: List[Any] = []
+        _inflight.results = {}
+        try:
+            self._apply_runs(conn, batch, results)
+        finally:
+            _inflight.results = None
+        return results
+
+    def _apply_runs(self, conn: sqlite3.Connection, batch: List[_WriteOp], results: List[Any]) -> None:
+        i = 0
+        while i < len(batch):
+            kind = batch[i].kind
+            j = i
+            while j < len(batch) and batch[j].kind == kind and kind != OP_CALL:
+                j += 1
+            if kind == OP_DECISION:
+                results.extend(self.repository.insert_decisions(conn, [op.payload for op in batch[i:j]]))
+            elif kind == OP_RESULT:
+                rows = [(resolve(d_id), hit, actual) for d_id, hit, actual in (op.payload for op in batch[i:j])]
+                self.repository.update_results(conn, rows)
+                results.extend([None] * (j - i))
+            else:
+                results.append(batch[i].payload(conn))
+                j = i + 1
+            for k in range(i, j):
+                _inflight.results[batch[k].future] = results[k]
+            i = j
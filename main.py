@@ -9,31 +9,64 @@ Recebe spins via WebSocket e retorna sugestões.
 Uso:
     python main.py                    # Sem SSL
     SSL_ENABLED=true python main.py   # Com SSL
+    SHARD_WORKERS=4 python main.py    # Roteador + 4 processos worker
 
 Variáveis de ambiente:
-    WS_HOST      - Host do servidor (default: 0.0.0.0)
-    WS_PORT      - Porta do servidor (default: 8765)
-    SSL_ENABLED  - Habilitar SSL (default: false)
-    SSL_CERT     - Caminho do certificado
-    SSL_KEY      - Caminho da chave privada
-    AUTH_ENABLED - Habilitar autenticação (default: false)
+    WS_HOST       - Host do servidor (default: 0.0.0.0)
+    WS_PORT       - Porta do servidor (default: 8765)
+    SSL_ENABLED   - Habilitar SSL (default: false)
+    SSL_CERT      - Caminho do certificado
+    SSL_KEY       - Caminho da chave privada
+    AUTH_ENABLED  - Habilitar autenticação (default: false)
+    SHARD_WORKERS - Processos worker donos de mesas (default: 0 = processo único)
+    METRICS_PORT  - Porta do /metrics Prometheus (default: WS_PORT + 1)
 """
 
 import asyncio
+import logging
 import signal
 import sys
 
-from server.websocket import start_server, game_state
+from app_config.settings import settings
+
+# Modo sharded: o roteador não carrega mesas (server.websocket não é importado)
+_router = None
 
 
 def handle_shutdown(signum, frame):
     """Handler para shutdown graceful."""
     print("\n🛑 Encerrando servidor...")
-    game_state.save()
+    if _router is not None:
+        # Cada worker grava as próprias mesas ao receber SIGTERM
+        _router.stop_workers()
+    else:
+        from server.websocket import tables
+        from database import close_database
+
+        tables.flush_sync()
+        close_database()
     print("💾 Estado salvo.")
     sys.exit(0)
 
 
+def run_sharded() -> None:
+    """Roteador WebSocket + SHARD_WORKERS processos worker."""
+    global _router
+    from server.shard import ShardRouter
+    from server.tls import get_ssl_context
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] [router] %(message)s',
+        handlers=[
+            logging.FileHandler(settings.log_file),
+            logging.StreamHandler()
+        ]
+    )
+    _router = ShardRouter(settings.shard.workers)
+    asyncio.run(_router.serve(get_ssl_context()))
+
+
 def main():
     """Ponto de entrada principal."""
     # Registrar handler de shutdown
@@ -49,7 +82,11 @@ def main():
     """)
     
     try:
-        asyncio.run(start_server())
+        if settings.shard.workers > 0:
+            run_sharded()
+        else:
+            from server.websocket import start_server
+            asyncio.run(start_server())
     except KeyboardInterrupt:
         handle_shutdown(None, None)
 
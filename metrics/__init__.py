@@ -0,0 +1,26 @@
+# Roleta Cloud - Métricas
+"""
+Registro de métricas em memória (contadores, gauges e histogramas de
+buckets fixos) exportado em formato texto do Prometheus por um listener
+HTTP ao lado da porta WebSocket.
+
+    curl http://127.0.0.1:8766/metrics
+
+Processo único: METRICS_PORT (padrão WS_PORT + 1). Modo sharded: o
+roteador usa METRICS_PORT e o worker N usa METRICS_PORT + 1 + N.
+"""
+
+from .exporter import MetricsExporter, metrics_port, start_exporter
+from .registry import DEFAULT_BUCKETS_MS, Counter, Gauge, Histogram, MetricsRegistry, registry
+
+__all__ = [
+    "DEFAULT_BUCKETS_MS",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsExporter",
+    "MetricsRegistry",
+    "metrics_port",
+    "registry",
+    "start_exporter",
+]
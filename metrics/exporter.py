@@ -0,0 +1,97 @@
+# Roleta Cloud - Exportador HTTP de Métricas
+# GET /metrics no formato texto do Prometheus, no mesmo event loop do servidor
+
+import asyncio
+import logging
+from typing import Optional
+
+from app_config.settings import settings
+
+from .registry import MetricsRegistry, registry as default_registry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsExporter:
+    """
+    Listener HTTP mínimo (asyncio.start_server): responde GET /metrics
+    com o registro renderizado e 404 para o resto. Uma requisição por
+    conexão; a coleta roda no event loop, então os gauges leem o estado
+    sem locks.
+    """
+
+    def __init__(self, host: str, port: int, registry: Optional[MetricsRegistry] = None):
+        self.host = host
+        self.port = port
+        self.registry = registry or default_registry
+        self.scrapes = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"📈 Métricas em http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Cabeçalhos ignorados (lidos até a linha em branco)
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+            parts = request.decode("latin-1").split()
+            method, path = (parts[0], parts[1]) if len(parts) >= 2 else ("", "")
+
+            if method in ("GET", "HEAD") and path.split("?")[0] in ("/metrics", "/"):
+                self.scrapes += 1
+                body = self.registry.render().encode("utf-8")
+                status, content_type = "200 OK", CONTENT_TYPE
+            else:
+                body = b"not found\n"
+                status, content_type = "404 Not Found", "text/plain; charset=utf-8"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1")
+            )
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.warning(f"Erro no endpoint de métricas: {e}")
+        finally:
+            writer.close()
+
+
+def metrics_port(offset: int = 0) -> int:
+    """Porta do /metrics: METRICS_PORT (0 = WS_PORT + 1) + offset do processo."""
+    base = settings.metrics.port or settings.server.port + 1
+    return base + offset
+
+
+async def start_exporter(offset: int = 0) -> Optional[MetricsExporter]:
+    """
+    Sobe o exportador do processo (None se METRICS_ENABLED=false).
+    Falha ao abrir a porta só gera aviso: o servidor segue sem métricas.
+    """
+    if not settings.metrics.enabled:
+        return None
+    exporter = MetricsExporter(settings.metrics.host, metrics_port(offset))
+    try:
+        await exporter.start()
+    except OSError as e:
+        logger.warning(f"Métricas desabilitadas: não foi possível abrir {exporter.host}:{exporter.port} ({e})")
+        return None
+    return exporter
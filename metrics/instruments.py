@@ -0,0 +1,152 @@
+# Roleta Cloud - Métricas do Servidor
+# Instrumentos usados no hot path (trace, banco, broadcast) e gauges
+# lidos na coleta (conexões, mesas, profundidade das filas)
+
+from typing import Any, Dict
+
+from .registry import registry
+
+# ========== TRACE (handle_new_result e demais mensagens) ==========
+
+# Tipos conhecidos viram label; o resto conta como "other" (cardinalidade fixa)
+MESSAGE_TYPES = frozenset({
+    "novo_resultado", "historico_inicial", "correcao_historico", "nova_sessao",
+    "get_state", "register", "force_master", "state_subscribe", "state_ack",
+    "state_resync", "extrair_mesa", "listar_mesas", "obter_config_mesa", "get_traces", "spin"
+})
+
+messages_total = registry.counter(
+    "roleta_messages_total", "Mensagens WebSocket processadas, por tipo", ("type",)
+)
+messages_rejected_total = registry.counter(
+    "roleta_messages_rejected_total", "Mensagens recusadas antes do handler, por tipo e motivo", ("type", "reason")
+)
+message_errors_total = registry.counter(
+    "roleta_message_errors_total", "Mensagens cujo handler falhou, por tipo", ("type",)
+)
+trace_stage_ms = registry.histogram(
+    "roleta_trace_stage_ms", "Duração de cada etapa do trace (desde a etapa anterior)", ("type", "stage")
+)
+trace_total_ms = registry.histogram(
+    "roleta_trace_total_ms", "Duração total do processamento da mensagem", ("type",)
+)
+
+# ========== BANCO (escritor em lote) ==========
+
+db_ops_total = registry.counter(
+    "roleta_db_ops_total", "Operações do escritor em lote, por tipo e resultado", ("op", "status")
+)
+db_batch_ms = registry.histogram(
+    "roleta_db_batch_ms", "Duração da transação de um lote do escritor"
+)
+db_batch_size = registry.histogram(
+    "roleta_db_batch_size", "Operações por lote do escritor", buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+db_queue_wait_ms = registry.histogram(
+    "roleta_db_queue_wait_ms", "Espera na fila do escritor até o início do lote"
+)
+db_read_ms = registry.histogram(
+    "roleta_db_read_ms", "Leituras do banco no event loop, por consulta", ("op",)
+)
+
+# ========== BROADCAST (fan-out por conexão) ==========
+
+broadcast_publish_ms = registry.histogram(
+    "roleta_broadcast_publish_ms", "Custo de enfileirar um broadcast em todas as conexões", ("kind",)
+)
+broadcast_delivery_ms = registry.histogram(
+    "roleta_broadcast_delivery_ms", "Enfileiramento -> envio concluído, por tipo de mensagem", ("kind",)
+)
+broadcast_messages_total = registry.counter(
+    "roleta_broadcast_messages_total", "Mensagens entregues pelas filas de saída", ("kind",)
+)
+broadcast_dropped_total = registry.counter(
+    "roleta_broadcast_dropped_total", "Mensagens descartadas/coalescidas e conexões derrubadas por fila", ("reason",)
+)
+
+# ========== ENSEMBLE DE ESTRATÉGIAS ==========
+
+strategy_ms = registry.histogram(
+    "roleta_strategy_ms", "Duração do analyze de cada estratégia do ensemble (inclui as atrasadas)", ("strategy",)
+)
+strategy_dropped_total = registry.counter(
+    "roleta_strategy_dropped_total", "Estratégias fora do voto de um spin, por motivo (late, error, busy)",
+    ("strategy", "reason")
+)
+ensemble_ms = registry.histogram(
+    "roleta_ensemble_ms", "Spin -> voto combinado do ensemble (limitado pelo deadline)"
+)
+
+# ========== COMPRESSÃO (permessage-deflate) ==========
+
+compression_frames_total = registry.counter(
+    "roleta_compression_frames_total", "Mensagens enviadas com extensão deflate, por decisão", ("decision",)
+)
+compression_bytes_total = registry.counter(
+    "roleta_compression_bytes_total", "Bytes das mensagens cruas (raw) e das comprimidas antes/depois (compressed_in/out)", ("stage",)
+)
+
+# ========== GAUGES (lidos na coleta) ==========
+
+connections = registry.gauge(
+    "roleta_connections", "Conexões WebSocket abertas, por role", ("role",)
+)
+tables_loaded = registry.gauge(
+    "roleta_tables_loaded", "Mesas carregadas em memória"
+)
+send_queue_depth = registry.gauge(
+    "roleta_send_queue_depth", "Mensagens nas filas de saída (soma de todas as conexões)"
+)
+send_queue_max_depth = registry.gauge(
+    "roleta_send_queue_max_depth", "Maior fila de saída atual entre as conexões"
+)
+db_queue_depth = registry.gauge(
+    "roleta_db_queue_depth", "Operações aguardando o escritor em lote"
+)
+
+
+def track_tables(tables) -> None:
+    """Gauges do processo que serve mesas (processo único ou worker)."""
+
+    def by_role() -> Dict[tuple, float]:
+        counts = {"master": 0, "slave": 0}
+        for table in list(tables.tables.values()):
+            for info in list(table.connections.connections.values()):
+                counts[info.role] = counts.get(info.role, 0) + 1
+        return {(role,): n for role, n in counts.items()}
+
+    def senders():
+        return [s for t in list(tables.tables.values()) for s in list(t.connections.fanout.senders.values())]
+
+    connections.set_function(by_role)
+    tables_loaded.set_function(lambda: len(tables.tables))
+    send_queue_depth.set_function(lambda: sum(s.depth for s in senders()))
+    send_queue_max_depth.set_function(lambda: max((s.depth for s in senders()), default=0))
+    db_queue_depth.set_function(_db_queue_depth)
+
+
+def track_router(router) -> None:
+    """Gauges do roteador do modo sharded (só conexões e filas de saída)."""
+    connections.set_function(lambda: {("router",): len(router.clients)})
+    send_queue_depth.set_function(lambda: sum(c.sender.depth for c in list(router.clients.values())))
+    send_queue_max_depth.set_function(
+        lambda: max((c.sender.depth for c in list(router.clients.values())), default=0)
+    )
+
+
+def _db_queue_depth() -> float:
+    from database import get_writer
+
+    return get_writer().queue_depth
+
+
+def message_label(msg_type: Any) -> str:
+    """Label do tipo de mensagem (tipos desconhecidos -> "other")."""
+    return msg_type if isinstance(msg_type, str) and msg_type in MESSAGE_TYPES else "other"
+
+
+def observe_trace(trace: Any, msg_type: str) -> None:
+    """Etapas e duração total de um TraceContext concluído."""
+    for stage, ms in trace.stage_durations_ms():
+        trace_stage_ms.labels(msg_type, stage).observe(ms)
+    trace_total_ms.labels(msg_type).observe(trace.elapsed_ms())
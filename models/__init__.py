@@ -2,11 +2,16 @@
 
 from .input import SpinInput
 from .output import SuggestionOutput
-from .trace import TraceContext, TraceStep
+from .trace import Span, TraceBuffer, TraceContext, TraceRecord, TraceStep, Tracer, tracer
 
 __all__ = [
     "SpinInput",
     "SuggestionOutput", 
+    "Span",
+    "TraceBuffer",
     "TraceContext",
+    "TraceRecord",
     "TraceStep",
+    "Tracer",
+    "tracer",
 ]
@@ -1,8 +1,11 @@
 # Roleta Cloud - Tracing Context
+# Spans aninhados em perf_counter_ns, amostragem e buffer circular de traces
 
+import random
 import time
-from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Any, Optional
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 
 def now_ms() -> int:
@@ -10,54 +13,311 @@ def now_ms() -> int:
     return int(time.time() * 1000)
 
 
+def _ms(ns: int) -> float:
+    return round(ns / 1e6, 3)
+
+
 @dataclass
 class TraceStep:
-    """Um passo no trace."""
+    """
+    Um passo (etapa) no trace.
+    `t` é o relógio de parede (ms); `at_ms` e `ms` vêm do relógio
+    monotônico: offset desde o início e duração desde o passo anterior.
+    """
     name: str
     t: int = field(default_factory=now_ms)
     data: Dict[str, Any] = field(default_factory=dict)
+    at_ms: float = 0.0
+    ms: float = 0.0
+
+
+class Span:
+    """Intervalo nomeado com atributos e filhos (usar com `with`)."""
+    __slots__ = ("name", "start_ns", "end_ns", "attrs", "children", "_trace")
+
+    def __init__(self, name: str, trace: Optional["TraceContext"] = None, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = 0
+        self.attrs = attrs or {}
+        self.children: List["Span"] = []
+        self._trace = trace
+
+    def set(self, **attrs: Any) -> "Span":
+        """Adiciona atributos ao span."""
+        self.attrs.update(attrs)
+        return self
+
+    def end(self) -> None:
+        if not self.end_ns:
+            self.end_ns = time.perf_counter_ns()
+            if self._trace is not None:
+                self._trace._close(self)
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.end()
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+    def to_dict(self, origin_ns: int) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "name": self.name,
+            "at_ms": _ms(self.start_ns - origin_ns),
+            "ms": _ms(self.duration_ns)
+        }
+        if self.attrs:
+            result["attrs"] = self.attrs
+        if self.children:
+            result["children"] = [c.to_dict(origin_ns) for c in self.children]
+        return result
+
+
+class _NoopSpan:
+    """Span de trace não amostrado: mesma interface, custo ~zero."""
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> "_NoopSpan":
+        return self
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
 
 
 @dataclass
 class TraceContext:
     """
     Contexto de rastreamento para uma operação.
-    Registra cada passo com timestamp.
+
+    Passos (`step`) marcam as etapas do fluxo e são sempre registrados
+    (alimentam as métricas por etapa). Spans (`span`) detalham o que
+    acontece dentro de cada etapa, com atributos e aninhamento; só são
+    registrados quando o trace é amostrado.
     """
     trace_id: str
     t_start: int = field(default_factory=now_ms)
     steps: List[TraceStep] = field(default_factory=list)
-    
+    sampled: bool = True
+    t_start_ns: int = field(default_factory=time.perf_counter_ns, repr=False)
+    t_end_ns: int = field(default=0, repr=False)
+    spans: List[Span] = field(default_factory=list, repr=False)
+    _open: List[Span] = field(default_factory=list, repr=False)
+    _last_ns: int = field(default=0, repr=False)
+
     def step(self, name: str, data: Optional[Dict[str, Any]] = None) -> None:
         """Registra um passo no trace."""
+        mark = time.perf_counter_ns()
+        previous = self._last_ns or self.t_start_ns
+        self._last_ns = mark
         self.steps.append(TraceStep(
             name=name,
             t=now_ms(),
-            data=data or {}
+            data=data or {},
+            at_ms=_ms(mark - self.t_start_ns),
+            ms=_ms(mark - previous)
         ))
-    
+
+    def span(self, name: str, **attrs: Any):
+        """Abre um span filho do span aberto mais interno (no-op se não amostrado)."""
+        if not self.sampled:
+            return NOOP_SPAN
+        span = Span(name, self, attrs)
+        (self._open[-1].children if self._open else self.spans).append(span)
+        self._open.append(span)
+        return span
+
+    def _close(self, span: Span) -> None:
+        # Fecha também filhos esquecidos abertos (saída por exceção)
+        while self._open:
+            if self._open.pop() is span:
+                break
+
     def finish(self) -> Dict[str, Any]:
-        """Finaliza e retorna o trace completo."""
-        t_end = now_ms()
+        """Finaliza (idempotente) e retorna o trace completo."""
+        if not self.t_end_ns:
+            self.t_end_ns = time.perf_counter_ns()
         return {
             "trace_id": self.trace_id,
             "t_start": self.t_start,
-            "t_end": t_end,
-            "duration_ms": t_end - self.t_start,
-            "steps": [asdict(s) for s in self.steps]
+            "duration_ms": self.elapsed_ms(),
+            "sampled": self.sampled,
+            "steps": self.steps_dict,
+            "spans": [s.to_dict(self.t_start_ns) for s in self.spans]
         }
-    
+
     def to_log_line(self) -> str:
         """Gera uma linha de log resumida."""
-        duration = now_ms() - self.t_start
-        steps_names = " → ".join(s.name for s in self.steps)
-        return f"[{self.trace_id}] {duration}ms | {steps_names}"
-    
-    def total_ms(self) -> int:
-        """Retorna duração total em ms."""
-        return now_ms() - self.t_start
-    
+        steps = " → ".join(f"{s.name}({s.ms:.3f})" for s in self.steps)
+        return f"[{self.trace_id}] {self.elapsed_ms():.3f}ms | {steps}"
+
+    def total_ms(self) -> float:
+        """Retorna duração total em ms (sub-ms)."""
+        return self.elapsed_ms()
+
+    def elapsed_ms(self) -> float:
+        """Duração desde o início em ms (até finish(), se já finalizado)."""
+        return _ms((self.t_end_ns or time.perf_counter_ns()) - self.t_start_ns)
+
+    def stage_durations_ms(self) -> List[Tuple[str, float]]:
+        """(passo, ms desde o passo anterior) para cada passo registrado."""
+        return [(s.name, s.ms) for s in self.steps]
+
     @property
     def steps_dict(self) -> List[Dict]:
-        """Retorna steps como lista de dicts para JSON."""
-        return [asdict(s) for s in self.steps]
+        """Retorna steps como lista de dicts para JSON (sem asdict: hot path)."""
+        return [
+            {"name": s.name, "t": s.t, "data": s.data, "at_ms": s.at_ms, "ms": s.ms}
+            for s in self.steps
+        ]
+
+
+# ============================================================================
+# BUFFER DE TRACES
+# ============================================================================
+
+@dataclass
+class TraceRecord:
+    """Trace concluído guardado no buffer (forma compacta + árvore de spans)."""
+    trace_id: str
+    msg_type: str
+    mesa_id: str
+    t_start: int
+    total_ms: float
+    sampled: bool
+    stages: List[Tuple[str, float]]
+    spans: List[Dict[str, Any]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "type": self.msg_type,
+            "mesa_id": self.mesa_id,
+            "t_start": self.t_start,
+            "total_ms": self.total_ms,
+            "sampled": self.sampled,
+            "stages": [{"name": n, "ms": ms} for n, ms in self.stages],
+            "spans": self.spans
+        }
+
+
+def _percentile(values: List[float], p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _summary(values: List[float]) -> Dict[str, Any]:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": _percentile(values, 0.50),
+        "p90": _percentile(values, 0.90),
+        "p99": _percentile(values, 0.99),
+        "max": values[-1]
+    }
+
+
+class TraceBuffer:
+    """
+    Últimos N traces concluídos (deque circular), com consultas para o
+    get_traces: mais recentes, mais lentos e percentis por etapa.
+    """
+
+    def __init__(self, size: int = 1000):
+        self.records: Deque[TraceRecord] = deque(maxlen=size)
+        self.added = 0
+
+    def add(self, record: TraceRecord) -> None:
+        self.records.append(record)
+        self.added += 1
+
+    def select(self, msg_type: Optional[str] = None, mesa_id: Optional[str] = None) -> List[TraceRecord]:
+        return [
+            r for r in self.records
+            if (msg_type is None or r.msg_type == msg_type) and (mesa_id is None or r.mesa_id == mesa_id)
+        ]
+
+    def recent(self, limit: int = 20, **filters: Optional[str]) -> List[TraceRecord]:
+        return self.select(**filters)[-limit:][::-1]
+
+    def slowest(self, limit: int = 20, **filters: Optional[str]) -> List[TraceRecord]:
+        return sorted(self.select(**filters), key=lambda r: r.total_ms, reverse=True)[:limit]
+
+    def percentiles(self, **filters: Optional[str]) -> Dict[str, Any]:
+        """
+        p50/p90/p99/max do total e de cada etapa. Só traces amostrados:
+        os guardados por serem lentos distorceriam a distribuição.
+        """
+        records = [r for r in self.select(**filters) if r.sampled]
+        if not records:
+            return {"count": 0, "total": None, "stages": {}}
+        stages: Dict[str, List[float]] = {}
+        for r in records:
+            for name, ms in r.stages:
+                stages.setdefault(name, []).append(ms)
+        return {
+            "count": len(records),
+            "total": _summary([r.total_ms for r in records]),
+            "stages": {name: _summary(values) for name, values in stages.items()}
+        }
+
+
+class Tracer:
+    """
+    Cria traces com a decisão de amostragem e guarda os concluídos.
+
+    Trace amostrado (sample_rate) registra spans e entra no buffer;
+    não amostrado só entra se passar de slow_ms (sem spans, mas com as
+    etapas), para que os piores casos nunca se percam.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, slow_ms: float = 50.0, buffer_size: int = 1000):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.buffer = TraceBuffer(buffer_size)
+        self._random = random.random
+
+    def start(self, trace_id: str) -> TraceContext:
+        sampled = self.sample_rate >= 1.0 or self._random() < self.sample_rate
+        return TraceContext(trace_id=trace_id, sampled=sampled)
+
+    def record(self, trace: TraceContext, msg_type: str, mesa_id: str = "default") -> None:
+        """Finaliza o trace e o guarda se amostrado ou lento."""
+        trace.finish()
+        total = trace.elapsed_ms()
+        if not trace.sampled and (self.slow_ms <= 0 or total < self.slow_ms):
+            return
+        self.buffer.add(TraceRecord(
+            trace_id=trace.trace_id,
+            msg_type=msg_type,
+            mesa_id=mesa_id,
+            t_start=trace.t_start,
+            total_ms=total,
+            sampled=trace.sampled,
+            stages=trace.stage_durations_ms(),
+            spans=[s.to_dict(trace.t_start_ns) for s in trace.spans]
+        ))
+
+
+def _default_tracer() -> Tracer:
+    from app_config.settings import settings
+
+    cfg = settings.trace
+    return Tracer(sample_rate=cfg.sample_rate, slow_ms=cfg.slow_ms, buffer_size=cfg.buffer_size)
+
+
+# Tracer do processo (cada worker do modo sharded tem o seu)
+tracer = _default_tracer()
@@ -1,5 +1,12 @@
 # Roleta Cloud - Server Package
 
-from .websocket import start_server
-
 __all__ = ["start_server"]
+
+
+def __getattr__(name):
+    # Import tardio: server.websocket carrega a mesa padrão e o banco ao ser
+    # importado, o que o roteador e os workers do modo sharded não podem fazer
+    if name == "start_server":
+        from .websocket import start_server
+        return start_server
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,173 @@
+# Roleta Cloud - Política de Compressão (permessage-deflate)
+"""
+permessage-deflate com decisão por mensagem.
+
+O padrão do websockets comprime todo frame. Em frames pequenos
+(sugestao, ack, heartbeat) isso só gasta CPU e latência: o ganho são
+poucos bytes. Já o state_sync com window_history encolhe bem.
+
+Modo "policy" (WS_COMPRESSION): cada mensagem de dados é comprimida ou
+enviada crua (RSV1 desligado, permitido pela RFC 7692) conforme:
+
+    1. tipo em never_types  -> crua
+    2. tipo em always_types -> comprimida
+    3. senão                -> comprimida se tiver >= min_size bytes
+
+O tipo é lido do início do frame, como em codec.peek_type, mas com os
+prefixos dos tipos listados pré-calculados (um startswith por frame).
+Frame sem tipo reconhecível cai na regra de tamanho. Frames cru e
+comprimidos aparecem em roleta_compression_frames_total /
+roleta_compression_bytes_total.
+
+Janela (bits), nível e memLevel do zlib vêm da configuração em todos os
+modos. Benchmark: python -m bench.compression
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import CTRL_OPCODES, Opcode
+
+from app_config.settings import settings
+from codec.binary import SCHEMAS_BY_ID
+from metrics.instruments import compression_bytes_total, compression_frames_total
+
+MODE_POLICY = "policy"  # Por tipo de mensagem / tamanho
+MODE_ALL = "all"        # Todo frame (comportamento do websockets)
+MODE_OFF = "off"        # Sem permessage-deflate
+
+_JSON_PREFIXES = (b'{"type":"', b'{"type": "')
+_CONT = Opcode.CONT
+
+
+def _type_prefixes(types: Iterable[str]) -> Tuple[bytes, ...]:
+    """Inícios de frame (JSON e binário fixmap) que identificam os tipos dados."""
+    prefixes: List[bytes] = []
+    ids = {name: type_id for type_id, (name, _) in SCHEMAS_BY_ID.items()}
+    for name in types:
+        encoded = name.encode("utf-8")
+        prefixes.extend(prefix + encoded + b'"' for prefix in _JSON_PREFIXES)
+        type_id = ids.get(name)
+        if type_id is not None and type_id < 0x80:
+            prefixes.extend(bytes((0x80 | n, 0, type_id)) for n in range(1, 16))
+    return tuple(prefixes)
+
+
+@dataclass
+class CompressionPolicy:
+    """
+    Decide, por mensagem, se o frame sai comprimido. Os tipos viram
+    prefixos pré-calculados: a decisão é um startswith, sem decodificar.
+    """
+    min_size: int = 512
+    always_types: FrozenSet[str] = field(default_factory=frozenset)
+    never_types: FrozenSet[str] = field(default_factory=frozenset)
+    compress_all: bool = False
+
+    def __post_init__(self):
+        self._never = _type_prefixes(self.never_types)
+        self._always = _type_prefixes(self.always_types)
+
+    def should_compress(self, data: Any) -> bool:
+        if self.compress_all:
+            return True
+        if self._never and data.startswith(self._never):
+            return False
+        if self._always and data.startswith(self._always):
+            return True
+        return len(data) >= self.min_size
+
+
+_FRAMES_RAW = compression_frames_total.labels("raw")
+_FRAMES_COMPRESSED = compression_frames_total.labels("compressed")
+_BYTES_RAW = compression_bytes_total.labels("raw")
+_BYTES_IN = compression_bytes_total.labels("compressed_in")
+_BYTES_OUT = compression_bytes_total.labels("compressed_out")
+
+
+class PolicyPerMessageDeflate(PerMessageDeflate):
+    """
+    PerMessageDeflate que pode enviar mensagens sem compressão.
+
+    A decisão é tomada no primeiro frame da mensagem e vale para as
+    continuações. Mensagens cruas não passam pelo compressor, então o
+    contexto (context takeover) das comprimidas continua válido.
+    """
+
+    def __init__(self, policy: CompressionPolicy, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.policy = policy
+        self._raw_message = False
+
+    def encode(self, frame):
+        if frame.opcode in CTRL_OPCODES:
+            return frame
+        if frame.opcode is not _CONT:
+            self._raw_message = not self.policy.should_compress(frame.data)
+        if self._raw_message:
+            _FRAMES_RAW.inc()
+            _BYTES_RAW.inc(len(frame.data))
+            return frame
+        encoded = super().encode(frame)
+        _FRAMES_COMPRESSED.inc()
+        _BYTES_IN.inc(len(frame.data))
+        _BYTES_OUT.inc(len(encoded.data))
+        return encoded
+
+
+class PolicyDeflateFactory(ServerPerMessageDeflateFactory):
+    """Fábrica do servidor que entrega PolicyPerMessageDeflate na negociação."""
+
+    def __init__(self, policy: CompressionPolicy, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.policy = policy
+
+    def process_request_params(self, params, accepted_extensions):
+        response, extension = super().process_request_params(params, accepted_extensions)
+        return response, PolicyPerMessageDeflate(
+            self.policy,
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings
+        )
+
+
+def _types(values: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(v.strip() for v in values if v and v.strip())
+
+
+def build_policy(mode: Optional[str] = None) -> CompressionPolicy:
+    cfg = settings.compression
+    mode = mode or cfg.mode
+    return CompressionPolicy(
+        min_size=cfg.min_size,
+        always_types=_types(cfg.always_types),
+        never_types=_types(cfg.never_types),
+        compress_all=mode == MODE_ALL
+    )
+
+
+def compress_settings() -> Dict[str, int]:
+    cfg = settings.compression
+    return {"level": cfg.level, "memLevel": cfg.mem_level}
+
+
+def serve_options(mode: Optional[str] = None) -> Dict[str, Any]:
+    """Argumentos de compressão para websockets.serve."""
+    cfg = settings.compression
+    mode = mode or cfg.mode
+    if mode not in (MODE_POLICY, MODE_ALL, MODE_OFF):
+        raise ValueError(f"WS_COMPRESSION inválido: {mode} (use {MODE_POLICY}, {MODE_ALL} ou {MODE_OFF})")
+    if mode == MODE_OFF:
+        return {"compression": None}
+    factory = PolicyDeflateFactory(
+        build_policy(mode),
+        server_max_window_bits=cfg.window_bits,
+        client_max_window_bits=cfg.client_window_bits,
+        compress_settings=compress_settings()
+    )
+    extensions: List[Any] = [factory]
+    return {"compression": None, "extensions": extensions}
@@ -1,14 +1,18 @@
 # Roleta Cloud - Connection Manager
 
 import asyncio
-import json
 import time
 import logging
 from dataclasses import dataclass
-from typing import Dict, Optional, Set, List
+from typing import Any, Callable, Dict, Optional, Set, Tuple
 from websockets.server import WebSocketServerProtocol
 import uuid
 
+from app_config.settings import settings
+from codec import send_message
+from metrics.instruments import broadcast_publish_ms
+from server.fanout import Fanout, KIND_EVENT
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -20,6 +24,12 @@ class ConnectionInfo:
     role: str                  # "master" | "slave"
     connected_at: float        # timestamp
     last_activity: float = 0.0
+    # Sincronização do state_sync (ver server/state_sync.py)
+    sync_mode: str = "full"            # "full" | "delta"
+    synced_seq: Optional[int] = None   # full: último seq entregue ao socket
+    acked_seq: Optional[int] = None    # delta: último seq confirmado (state_ack)
+    inflight_seq: Optional[int] = None # delta: seq enviado aguardando ack
+    inflight_at: float = 0.0
 
 
 class ConnectionManager:
@@ -27,11 +37,19 @@ class ConnectionManager:
 
     def __init__(self):
         self.connections: Dict[str, ConnectionInfo] = {}
+        # Filas de saída por conexão (broadcast não espera socket lento)
+        self.fanout = Fanout(
+            max_queue=settings.broadcast.queue_size,
+            policy=settings.broadcast.slow_policy,
+            send_timeout=settings.broadcast.send_timeout,
+            on_failure=self.disconnect
+        )
         self.master_id: Optional[str] = None
         self.master_device_id: Optional[str] = None       # 🆕 ID do dispositivo MASTER
         self.last_master_device_id: Optional[str] = None  # 🆕 Para reconexão no grace period
         self.master_lock = asyncio.Lock()
         self.master_disconnect_time: Optional[float] = None
+        self._grace_task: Optional[asyncio.Task] = None
         self.MASTER_GRACE_PERIOD = 10  # 🆕 Aumentado para 10s para estabilidade
 
     @property
@@ -90,13 +108,14 @@ class ConnectionManager:
                 connected_at=time.time(),
                 last_activity=time.time()
             )
+            self.fanout.add(conn_id, websocket)
 
         # Notificar nova conexão sobre seu role
-        await websocket.send(json.dumps({
+        await send_message(websocket, {
             "type": "role_assigned",
             "role": role,
             "connection_id": conn_id
-        }))
+        })
 
         return conn_id
 
@@ -110,11 +129,11 @@ class ConnectionManager:
             old_master = self.connections[self.master_id]
             old_master.role = "slave"
             try:
-                await old_master.websocket.send(json.dumps({
+                await send_message(old_master.websocket, {
                     "type": "role_changed",
                     "role": "slave",
                     "reason": reason
-                }))
+                })
                 logger.info(f"👑→📱 {self.master_id} rebaixado para SLAVE: {reason}")
             except Exception as e:
                 logger.warning(f"Erro ao notificar rebaixamento de {self.master_id}: {e}")
@@ -129,6 +148,7 @@ class ConnectionManager:
 
             info = self.connections[conn_id]
             del self.connections[conn_id]
+            await self.fanout.remove(conn_id)
 
             if conn_id == self.master_id:
                 logger.info(f"👑 MASTER {info.device_id} ({conn_id}) desconectou - iniciando grace period de {self.MASTER_GRACE_PERIOD}s")
@@ -137,9 +157,10 @@ class ConnectionManager:
                 self.master_id = None
                 self.master_device_id = None
 
-        # Grace period (fora do lock)
+        # Grace period (fora do lock e em background: quem desconecta, ou
+        # troca de mesa, não espera os MASTER_GRACE_PERIOD segundos)
         if self.master_disconnect_time:
-            await self.handle_grace_period()
+            self._grace_task = asyncio.create_task(self.handle_grace_period())
 
     async def handle_grace_period(self):
         """Aguarda grace period e promove novo MASTER se necessário."""
@@ -162,11 +183,11 @@ class ConnectionManager:
                     self.master_disconnect_time = None
 
                     try:
-                        await new_master.websocket.send(json.dumps({
+                        await send_message(new_master.websocket, {
                             "type": "role_changed",
                             "role": "master",
                             "reason": "MASTER anterior desconectou"
-                        }))
+                        })
                         logger.info(f"📱→👑 {new_master.id} promovido a MASTER")
                     except:
                         pass
@@ -188,11 +209,11 @@ class ConnectionManager:
             self.master_device_id = new_master.device_id
             
             try:
-                await new_master.websocket.send(json.dumps({
+                await send_message(new_master.websocket, {
                     "type": "role_changed",
                     "role": "master",
                     "reason": "Você assumiu o controle"
-                }))
+                })
                 logger.info(f"🎯 {conn_id} forçou MASTER")
             except Exception as e:
                 logger.error(f"Erro ao notificar promoção de {conn_id}: {e}")
@@ -229,11 +250,11 @@ class ConnectionManager:
                     self.master_disconnect_time = None
                     
                     try:
-                        await info.websocket.send(json.dumps({
+                        await send_message(info.websocket, {
                             "type": "role_assigned",
                             "role": "master",
                             "reason": "MASTER reconectou (grace period)"
-                        }))
+                        })
                         logger.info(f"👑 MASTER {device_id} restaurado após registro")
                     except Exception:
                         pass
@@ -246,11 +267,11 @@ class ConnectionManager:
                     self.master_device_id = device_id
                     
                     try:
-                        await info.websocket.send(json.dumps({
+                        await send_message(info.websocket, {
                             "type": "role_assigned",
                             "role": "master",
                             "reason": "Primeiro dispositivo registrado"
-                        }))
+                        })
                         logger.info(f"👑 Novo MASTER assumiu após registro: {device_id}")
                     except Exception:
                         pass
@@ -266,18 +287,27 @@ class ConnectionManager:
         if conn_id in self.connections:
             self.connections[conn_id].last_activity = time.time()
 
-    async def broadcast(self, message: str, exclude_disconnected: bool = True):
-        """Envia mensagem para todas as conexões."""
-        disconnected = set()
-        # Usar list() para criar cópia e evitar "dictionary changed size during iteration"
-        for conn in list(self.connections.values()):
-            try:
-                await conn.websocket.send(message)
-            except:
-                disconnected.add(conn.id)
+    async def broadcast(self, message: Any, exclude_disconnected: bool = True, key: Optional[str] = None):
+        """
+        Envia mensagem para todas as conexões (via filas do fan-out).
 
-        if exclude_disconnected:
-            for conn_id in disconnected:
-                await self.disconnect(conn_id)
+        Não espera nenhum socket: falhas de envio desconectam a conexão em
+        background (exclude_disconnected mantido por compatibilidade).
+        Com a política "coalesce", `key` permite substituir uma mensagem
+        ainda enfileirada do mesmo tipo (ex: "trace").
+        """
+        self.fanout.publish(message, KIND_EVENT, key)
+
+    async def broadcast_state(self, render: Callable[[ConnectionInfo], Tuple[Any, str, Optional[Callable[[], None]]]]):
+        """
+        Heartbeat: enfileira para cada conexão a mensagem de render(conn)
+        -> (mensagem, tipo, on_sent): state_sync completo, delta ou
+        keep-alive; on_sent roda quando o fan-out de fato enviou.
+        """
+        start = time.perf_counter()
+        for conn in list(self.connections.values()):
+            message, kind, on_sent = render(conn)
+            self.fanout.send(conn.id, message, kind, on_sent=on_sent)
+        broadcast_publish_ms.labels("state").observe((time.perf_counter() - start) * 1000)
 
 connection_manager = ConnectionManager()
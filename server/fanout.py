@@ -0,0 +1,312 @@
+# Roleta Cloud - Fan-out de Broadcast
+# Fila de saída limitada + task escritora por conexão
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Union
+
+from websockets.server import WebSocketServerProtocol
+
+from codec import Frame, encode, is_binary
+from metrics.instruments import (
+    broadcast_delivery_ms, broadcast_dropped_total, broadcast_messages_total, broadcast_publish_ms
+)
+
+logger = logging.getLogger(__name__)
+
+# Tipos de mensagem na fila
+KIND_EVENT = "event"          # sugestao, trace, etc. (entregues em ordem)
+KIND_STATE = "state"          # state_sync / state_delta (só a mais nova importa)
+KIND_HEARTBEAT = "heartbeat"  # keep-alive (descartável)
+
+# Políticas para consumidor lento (fila cheia)
+POLICY_DROP_OLDEST_HEARTBEAT = "drop_oldest_heartbeat"  # Descarta o state/heartbeat mais antigo
+POLICY_COALESCE = "coalesce"      # Mensagens com a mesma chave substituem a enfileirada
+POLICY_DISCONNECT = "disconnect"  # Desconecta o consumidor lento
+
+_DROPPABLE = (KIND_STATE, KIND_HEARTBEAT)
+
+
+@dataclass
+class _Outbound:
+    message: Union[str, bytes, Frame]
+    kind: str
+    key: Optional[str]
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    on_sent: Optional[Callable[[], None]] = None  # Chamado após o envio (não se descartada)
+
+
+class ConnectionSender:
+    """
+    Fila de saída de uma conexão, drenada por uma task própria.
+
+    Quem publica nunca espera o socket: enqueue() é síncrono. Um cliente
+    lento só atrasa a própria fila; quando ela enche, a política decide
+    entre descartar, coalescer ou desconectar.
+
+    Regras fixas:
+    - heartbeat não entra se já há state/heartbeat na fila (a mensagem
+      enfileirada já prova que a conexão está viva)
+    - com POLICY_COALESCE, mensagens com a mesma chave (state: "state",
+      trace: "trace") substituem a enfileirada, mantendo a posição
+    - on_sent só é chamado depois que o socket aceitou a mensagem; uma
+      mensagem descartada ou substituída nunca o chama
+    """
+
+    def __init__(
+        self,
+        conn_id: str,
+        websocket: WebSocketServerProtocol,
+        max_queue: int = 64,
+        policy: str = POLICY_DROP_OLDEST_HEARTBEAT,
+        send_timeout: float = 10.0,
+        on_failure: Optional[Callable[[str], Awaitable[Any]]] = None
+    ):
+        self.conn_id = conn_id
+        self.websocket = websocket
+        self.binary = is_binary(websocket)  # Subprotocolo negociado no handshake
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+        self._queue: Deque[_Outbound] = deque()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._failed = False
+        self._stopped = False
+
+        # Métricas
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.avg_lag_ms = 0.0  # média móvel exponencial
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"fanout-{self.conn_id}")
+
+    async def stop(self) -> None:
+        self._stopped = True
+        self._queue.clear()
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            # wait_for pode engolir o cancelamento se o envio terminar junto:
+            # a flag _stopped encerra o loop, e a espera aqui é limitada
+            await asyncio.wait({task}, timeout=1.0)
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    # ========== ENFILEIRAMENTO ==========
+
+    def enqueue(
+        self,
+        message: Union[str, bytes, Frame],
+        kind: str = KIND_EVENT,
+        key: Optional[str] = None,
+        on_sent: Optional[Callable[[], None]] = None
+    ) -> bool:
+        """Enfileira sem bloquear. Retorna False se a mensagem foi descartada."""
+        if self._failed or self._stopped:
+            return False
+        queue = self._queue
+
+        if kind == KIND_HEARTBEAT and any(item.kind in _DROPPABLE for item in queue):
+            self.coalesced += 1
+            broadcast_dropped_total.labels("coalesced").inc()
+            return True
+
+        if kind == KIND_STATE:
+            key = key or KIND_STATE
+        if self.policy == POLICY_COALESCE or kind == KIND_STATE:
+            for item in queue:
+                if (key is not None and item.key == key) or (kind == KIND_STATE and item.kind == KIND_HEARTBEAT):
+                    item.message, item.kind, item.key, item.on_sent = message, kind, key, on_sent
+                    self.coalesced += 1
+                    broadcast_dropped_total.labels("coalesced").inc()
+                    return True
+
+        if len(queue) >= self.max_queue:
+            if self.policy == POLICY_DISCONNECT:
+                self._fail(f"fila cheia ({self.max_queue})")
+                return False
+            if not self._evict_one(kind):
+                self.dropped += 1
+                broadcast_dropped_total.labels("dropped").inc()
+                return False
+
+        queue.append(_Outbound(message, kind, key, on_sent=on_sent))
+        if len(queue) > self.max_depth:
+            self.max_depth = len(queue)
+        self._wake.set()
+        return True
+
+    def _evict_one(self, incoming_kind: str) -> bool:
+        """Libera uma posição: state/heartbeat mais antigo, senão o evento mais antigo."""
+        queue = self._queue
+        for i, item in enumerate(queue):
+            if item.kind in _DROPPABLE:
+                del queue[i]
+                self.dropped += 1
+                broadcast_dropped_total.labels("evicted").inc()
+                return True
+        if incoming_kind in _DROPPABLE:
+            # Não sacrifica um evento por um heartbeat/state
+            return False
+        queue.popleft()
+        self.dropped += 1
+        broadcast_dropped_total.labels("evicted").inc()
+        return True
+
+    # ========== ESCRITA ==========
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while not self._stopped:
+            while not queue:
+                self._wake.clear()
+                await self._wake.wait()
+                if self._stopped:
+                    return
+            item = queue.popleft()
+            try:
+                await asyncio.wait_for(self.websocket.send(encode(item.message, self.binary)), timeout=self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._fail(f"envio falhou: {e!r}")
+                return
+            if item.on_sent is not None:
+                item.on_sent()
+
+            lag_ms = (time.perf_counter() - item.enqueued_at) * 1000
+            broadcast_delivery_ms.labels(item.kind).observe(lag_ms)
+            broadcast_messages_total.labels(item.kind).inc()
+            self.sent += 1
+            self.last_lag_ms = lag_ms
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            self.avg_lag_ms = lag_ms if self.sent == 1 else self.avg_lag_ms * 0.9 + lag_ms * 0.1
+
+    def _fail(self, reason: str) -> None:
+        """Marca a conexão como falha e agenda a desconexão (sem bloquear o publicador)."""
+        if self._failed:
+            return
+        self._failed = True
+        self._queue.clear()
+        broadcast_dropped_total.labels("disconnected").inc()
+        logger.warning(f"[FANOUT] {self.conn_id}: {reason} - desconectando")
+        if self.on_failure is not None:
+            asyncio.get_running_loop().create_task(self.on_failure(self.conn_id))
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de atraso e descarte da conexão."""
+        oldest_ms = (time.perf_counter() - self._queue[0].enqueued_at) * 1000 if self._queue else 0.0
+        return {
+            "depth": len(self._queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "oldest_queued_ms": round(oldest_ms, 3),
+            "last_lag_ms": round(self.last_lag_ms, 3),
+            "avg_lag_ms": round(self.avg_lag_ms, 3),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+            "failed": self._failed
+        }
+
+
+class Fanout:
+    """
+    Distribui mensagens para todas as conexões sem esperar nenhum socket.
+
+    Cada mensagem é serializada no máximo UMA vez por formato (Frame:
+    JSON e/ou binário, sob demanda) e o mesmo objeto é enfileirado em
+    todas as conexões; as tasks escritoras enviam em paralelo. O custo
+    de publish() é O(conexões) em enqueue, independente de quão lentos
+    estão os clientes.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 64,
+        policy: str = POLICY_DROP_OLDEST_HEARTBEAT,
+        send_timeout: float = 10.0,
+        on_failure: Optional[Callable[[str], Awaitable[Any]]] = None
+    ):
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+        self.senders: Dict[str, ConnectionSender] = {}
+
+    def add(self, conn_id: str, websocket: WebSocketServerProtocol) -> ConnectionSender:
+        """Cria a fila + task escritora de uma conexão."""
+        sender = ConnectionSender(
+            conn_id, websocket,
+            max_queue=self.max_queue,
+            policy=self.policy,
+            send_timeout=self.send_timeout,
+            on_failure=self.on_failure
+        )
+        self.senders[conn_id] = sender
+        sender.start()
+        return sender
+
+    async def remove(self, conn_id: str) -> None:
+        """Encerra a task escritora de uma conexão."""
+        sender = self.senders.pop(conn_id, None)
+        if sender is not None:
+            await sender.stop()
+
+    def publish(
+        self,
+        message: Union[str, bytes, Frame, Dict[str, Any]],
+        kind: str = KIND_EVENT,
+        key: Optional[str] = None,
+        targets: Optional[Iterable[str]] = None
+    ) -> int:
+        """Enfileira a mensagem para todas as conexões (ou `targets`). Retorna quantas aceitaram."""
+        if not isinstance(message, (str, bytes, Frame)):
+            message = Frame(message)
+        start = time.perf_counter()
+        senders = self.senders if targets is None else {t: self.senders[t] for t in targets if t in self.senders}
+        accepted = 0
+        for sender in list(senders.values()):
+            if sender.enqueue(message, kind, key):
+                accepted += 1
+        broadcast_publish_ms.labels(kind).observe((time.perf_counter() - start) * 1000)
+        return accepted
+
+    def send(
+        self,
+        conn_id: str,
+        message: Union[str, bytes, Frame],
+        kind: str = KIND_EVENT,
+        key: Optional[str] = None,
+        on_sent: Optional[Callable[[], None]] = None
+    ) -> bool:
+        """Enfileira para uma única conexão."""
+        sender = self.senders.get(conn_id)
+        return sender.enqueue(message, kind, key, on_sent) if sender is not None else False
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas agregadas + por conexão."""
+        per_connection = {conn_id: s.stats() for conn_id, s in self.senders.items()}
+        return {
+            "connections": len(per_connection),
+            "policy": self.policy,
+            "max_queue": self.max_queue,
+            "total_depth": sum(s["depth"] for s in per_connection.values()),
+            "max_lag_ms": max((s["max_lag_ms"] for s in per_connection.values()), default=0.0),
+            "dropped": sum(s["dropped"] for s in per_connection.values()),
+            "per_connection": per_connection
+        }
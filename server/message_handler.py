@@ -1,22 +1,32 @@
 # Roleta Cloud - Message Handler
 
 import asyncio
-import json
 import logging
 import uuid
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 
 from websockets.server import WebSocketServerProtocol
 
 from app_config.settings import settings
+from codec import (
+    Ack, DecodeError, EnsembleMessage, ErrorMessage, Frame, LegacySpin, NovoResultado, Sugestao, SugestaoData, TraceMessage,
+    encode_for, is_binary, loads_for, send_message
+)
 from database.models import Decision
-from database.service import db_service
-from models.input import SpinInput
-from models.output import ErrorOutput
-from models.trace import TraceContext, now_ms
-from server.connection_manager import connection_manager
+from database.service import DatabaseService, db_service
+from database.writer import DecisionId
+from metrics.instruments import (
+    message_errors_total, message_label, messages_rejected_total, messages_total, observe_trace
+)
+from models.trace import now_ms, tracer
+from server.connection_manager import ConnectionManager, connection_manager
+from server.message_router import LEGACY_TYPE, ROUTES, Request
+from server.state_sync import StateSyncCache
 from state.game import GameState
+from state.journal import SpinJournal
+from state.snapshot import SnapshotService
 from strategies.base import StrategyBase
+from strategies.ensemble import EnsembleRunner, snapshot
 from server.extractor_service import ExtractorService
 
 logger = logging.getLogger(__name__)
@@ -24,14 +34,53 @@ logger = logging.getLogger(__name__)
 class MessageHandler:
     """Manipulador de mensagens WebSocket."""
 
-    def __init__(self, game_state: GameState, strategy: StrategyBase, state_lock: asyncio.Lock, configs_path: str):
+    def __init__(self, game_state: GameState, strategy: StrategyBase, state_lock: asyncio.Lock, configs_path: str,
+                 snapshotter: Optional[SnapshotService] = None, journal: Optional[SpinJournal] = None,
+                 state_sync: Optional[StateSyncCache] = None, connections: Optional[ConnectionManager] = None,
+                 db: Optional[DatabaseService] = None, extractor_service: Optional[ExtractorService] = None,
+                 mesa_id: str = "default", ensemble: Optional[EnsembleRunner] = None):
         self.game_state = game_state
         self.strategy = strategy
+        # Ensemble (STRATEGY_ENSEMBLE): avaliado depois da sugestao, fora do caminho da resposta
+        self.ensemble = ensemble
+        self._ensemble_tasks: set = set()
         self.state_lock = state_lock
+        self.snapshotter = snapshotter
+        self.journal = journal
+        self.state_sync = state_sync
+        # Sala de broadcast e banco da mesa (padrão: singletons da mesa padrão)
+        self.connections = connections if connections is not None else connection_manager
+        self.db = db if db is not None else db_service
+        self.mesa_id = mesa_id
         self.current_session_id: str = str(uuid.uuid4())[:8]
-        self.last_decision_id: Optional[int] = None
+        self.last_decision_id: DecisionId = None  # Future do escritor em lote
         self.last_spin_hash: str = ""
-        self.extractor_service = ExtractorService(configs_path)
+        self.extractor_service = extractor_service or ExtractorService(configs_path)
+
+    def persist_state(self, spins: int = 1) -> None:
+        """Agenda gravação do estado (write-behind) ou grava direto se não há snapshotter."""
+        if self.snapshotter is not None:
+            self.snapshotter.mark_dirty(spins)
+        else:
+            self.game_state.save()
+
+    def journal_spin(self, numero: int, direcao: str, t_client: int = 0, trace_id: str = "", result: bool = False) -> None:
+        """
+        Anexa o spin ao journal e avança o checkpoint do estado.
+        result=True para novo_resultado (reaplicado com GameState.apply_result).
+        """
+        if self.journal is None:
+            return
+        try:
+            self.game_state.journal_seq = self.journal.append_spin(
+                numero, direcao,
+                t_client=t_client if isinstance(t_client, int) else 0,
+                t_server=now_ms(),
+                trace_id=str(trace_id or ""),
+                result=result
+            )
+        except Exception as e:
+            logger.error(f"Erro ao gravar journal: {e}")
 
     def is_duplicate_spin(self, numero: int, timestamp: int) -> bool:
         """Verifica se é um spin duplicado (mesmo número no mesmo segundo)."""
@@ -41,137 +90,144 @@ class MessageHandler:
         self.last_spin_hash = current_hash
         return False
 
-    async def process_message(self, websocket: WebSocketServerProtocol, message: str, conn_id: str) -> None:
-        """Processa uma mensagem recebida."""
+    async def process_message(self, websocket: WebSocketServerProtocol, message: Union[str, bytes, Dict], conn_id: str) -> None:
+        """
+        Processa uma mensagem recebida (frame JSON/binário ou já decodificada)
+        pela rota do tipo (server.message_router): role -> schema ->
+        deduplicação -> handler.
+        """
         trace = None
+        metric_label = "other"
 
         try:
-            data = json.loads(message)
-            msg_type = data.get("type", "spin")
+            data = loads_for(websocket, message) if isinstance(message, (str, bytes)) else message
+            msg_type = data.get("type", LEGACY_TYPE)
+            metric_label = message_label(msg_type)
+            messages_total.labels(metric_label).inc()
+
+            # === Recusas baratas (antes do trace e da validação) ===
+            route = ROUTES.resolve(msg_type, data)
+            if route is None:
+                messages_rejected_total.labels(metric_label, "unknown_type").inc()
+                await send_message(websocket, {
+                    "type": "error",
+                    "message": f"Tipo de mensagem desconhecido: {msg_type}",
+                    "code": "UNKNOWN_TYPE"
+                })
+                return
+
+            if route.role is not None:
+                role = self.connections.get_role(conn_id)
+                if role != route.role:
+                    messages_rejected_total.labels(metric_label, "role").inc()
+                    logger.warning(f"⚠️ {str(role).upper()} {conn_id} tentou enviar {msg_type} - ignorando")
+                    await send_message(websocket, {
+                        "type": "error",
+                        "message": f"Apenas {route.role.upper()} pode enviar {msg_type}. Seu role: {role}",
+                        "code": "NOT_MASTER"
+                    })
+                    return
+
             timestamp = data.get("timestamp", now_ms())
             trace_id = data.get("trace_id", str(timestamp))
-            trace = TraceContext(trace_id=trace_id)
+            trace = tracer.start(trace_id)
             trace.step("received", {"type": msg_type})
 
-            # === VERIFICAÇÃO DE ROLE PARA MENSAGENS DE DADOS ===
-            data_messages = ["novo_resultado", "historico_inicial", "correcao_historico"]
-            if msg_type in data_messages:
-                role = connection_manager.get_role(conn_id)
-                if role != "master":
-                    logger.warning(f"⚠️ SLAVE {conn_id} tentou enviar {msg_type} - ignorando")
-                    await websocket.send(json.dumps({
-                        "type": "error",
-                        "message": f"Apenas MASTER pode enviar {msg_type}. Seu role: {role}",
-                        "code": "NOT_MASTER"
-                    }))
+            payload = None
+            if route.schema is not None:
+                try:
+                    payload = route.schema(data)
+                except ValueError as e:
+                    messages_rejected_total.labels(metric_label, "invalid").inc()
+                    await send_message(websocket, ErrorMessage(
+                        trace_id=trace.trace_id, code=400, message=str(e), t_server=now_ms()
+                    ))
                     return
 
-                # Deduplicação para novo_resultado
-                if msg_type == "novo_resultado":
-                    numero = data.get("numero")
-                    if self.is_duplicate_spin(numero, timestamp):
-                        logger.info(f"🔄 Spin duplicado ignorado: {numero}")
-                        return
-
-            # === Dispatch por tipo ===
-            if msg_type == "novo_resultado":
-                await self.handle_new_result(websocket, data, trace)
-            elif msg_type == "historico_inicial":
-                await self.handle_initial_history(websocket, data)
-            elif msg_type == "correcao_historico":
-                await self.handle_history_correction(websocket, data)
-            elif msg_type == "nova_sessao":
-                await self.handle_new_session(websocket, data)
-            elif msg_type == "get_state":
-                await self.handle_get_state(websocket)
-            elif msg_type == "register":
-                device_id = data.get("device_id")
-                logger.info(f"📩 Recebido REGISTER de {conn_id} com device_id={device_id}")
-                await connection_manager.update_device_id(conn_id, device_id)
-            elif msg_type == "force_master":
-                await connection_manager.force_master(conn_id)
-            elif msg_type == "extrair_mesa":
-                await self.handle_extrair_mesa(websocket, data, trace)
-            elif msg_type == "listar_mesas":
-                await self.handle_listar_mesas(websocket)
-            elif msg_type == "obter_config_mesa":
-                await self.handle_get_mesa_config(websocket, data)
-            else:
-                # Compatibilidade legado
-                await self.handle_legacy_spin(websocket, data, trace)
+            if route.dedup and self.is_duplicate_spin(payload.numero, timestamp):
+                messages_rejected_total.labels(metric_label, "duplicate").inc()
+                logger.info(f"🔄 Spin duplicado ignorado: {payload.numero}")
+                return
 
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON inválido: {e}")
-            error = ErrorOutput(
+            request = Request(websocket, data, conn_id, msg_type, trace, payload)
+            await getattr(self, route.handler)(request)
+
+            observe_trace(trace, metric_label)
+            tracer.record(trace, metric_label, self.mesa_id)
+
+        except DecodeError as e:
+            kind = "Frame binário" if isinstance(message, bytes) and is_binary(websocket) else "JSON"
+            logger.error(f"{kind} inválido: {e}")
+            messages_rejected_total.labels(metric_label, "decode").inc()
+            error = ErrorMessage(
                 trace_id=trace.trace_id if trace else "unknown",
                 code=400,
-                message=f"JSON inválido: {str(e)}",
+                message=f"{kind} inválido: {str(e)}",
                 t_server=now_ms()
             )
-            await websocket.send(error.model_dump_json())
+            await send_message(websocket, error)
 
         except Exception as e:
             logger.error(f"Erro ao processar: {e}")
-            error = ErrorOutput(
+            message_errors_total.labels(metric_label).inc()
+            error = ErrorMessage(
                 trace_id=trace.trace_id if trace else "unknown",
                 code=500,
                 message=str(e),
                 t_server=now_ms()
             )
-            await websocket.send(error.model_dump_json())
-
-    async def handle_new_result(self, websocket: WebSocketServerProtocol, data: Dict, trace: TraceContext):
-        numero = data.get("numero")
-        direcao = data.get("direcao", "horario")
-
-        if numero is None:
-            raise ValueError("Campo 'numero' obrigatório")
+            await send_message(websocket, error)
 
-        # Validar range da roleta (0-36)
-        if not isinstance(numero, int) or not 0 <= numero <= 36:
-            raise ValueError(f"Número inválido: {numero} (deve ser 0-36)")
+    async def handle_new_result(self, req: Request):
+        websocket, trace = req.websocket, req.trace
+        # Validação tipada (numero 0-36 obrigatório, inteiros opcionais): feita pelo schema da rota
+        spin = req.payload if req.payload is not None else NovoResultado.from_dict(req.data)
+        numero = spin.numero
+        direcao = spin.direcao
 
         # Log da predição pendente antes de verificar
         pending = self.game_state.pending_prediction
         if pending:
             logger.info(f"VERIFICANDO: numero={numero}, centro_previsto={pending.get('center')}, numeros={pending.get('numbers', [])[:5]}...")
 
-        # Verificar predição anterior (performance tracking)
-        hit_result = self.game_state.check_prediction(numero)
+        # Verificar predição anterior (performance tracking) e o Martingale
+        # da direção apostada (se havia predição E apostou)
+        with trace.span("check_prediction") as span:
+            pending, hit_result, martingale_info = self.game_state.settle_prediction(numero)
+            span.set(hit=hit_result)
 
-        # Atualizar Martingale da direção da predição (se havia predição E apostou)
-        martingale_info = {}
-        if pending and hit_result is not None and pending.get("bet_placed", False):
+        if martingale_info:
             # Martingale da direção que FOI apostada
             bet_direction = pending.get("direction", "")
-            if bet_direction in ("cw", "horario"):
-                martingale_info = self.game_state.martingale_cw.update(hit_result)
-            else:
-                martingale_info = self.game_state.martingale_ccw.update(hit_result)
-
             if martingale_info.get("transition"):
                 logger.info(f"  MARTINGALE ({bet_direction}): {martingale_info['transition']}")
             logger.info(f"  Resultado: {'HIT' if hit_result else 'MISS'} | Gale {martingale_info.get('level_after', 1)} ({martingale_info.get('window_hits', 0)}/{martingale_info.get('window_count', 0)})")
 
             # Tracking de janelas para ML/Dashboard
             try:
-                db_service.track_gale_window(
-                    game_state=self.game_state,
-                    direction=bet_direction,
-                    hit=hit_result,
-                    martingale_info=martingale_info,
-                    pending=pending,
-                    force=pending.get("predicted_force", 0),
-                    numero=numero,
-                    advice_confidence=pending.get("tr_confidence", ""),
-                    advice_reason=pending.get("tr_reason", ""),
-                    sda_score=pending.get("sda_score", 0)
-                )
+                with trace.span("db.track_gale_window", direction=bet_direction):
+                    self.db.track_gale_window(
+                        game_state=self.game_state,
+                        direction=bet_direction,
+                        hit=hit_result,
+                        martingale_info=martingale_info,
+                        pending=pending,
+                        force=pending.get("predicted_force", 0),
+                        numero=numero,
+                        advice_confidence=pending.get("tr_confidence", ""),
+                        advice_reason=pending.get("tr_reason", ""),
+                        sda_score=pending.get("sda_score", 0)
+                    )
             except Exception as e:
                 logger.error(f"Erro ao trackear gale window: {e}")
 
         # Processar spin
-        force = self.game_state.process_spin(numero, direcao)
+        with trace.span("process_spin") as span:
+            force = self.game_state.process_spin(numero, direcao)
+            span.set(force=force)
+        with trace.span("journal"):
+            t_client = spin.t_client if spin.t_client is not None else spin.timestamp
+            self.journal_spin(numero, direcao, t_client or 0, trace.trace_id, result=True)
         trace.step("processed", {
             "numero": numero,
             "direcao": direcao,
@@ -179,17 +235,17 @@ class MessageHandler:
             "prediction_hit": hit_result
         })
 
-        # Salvar estado
-        self.game_state.save()
+        # Salvar estado (write-behind: apenas marca como sujo)
+        self.persist_state()
         trace.step("saved")
 
         # Analisar com estratégia (sem calibração momentum - removido)
-        result = self.strategy.analyze(
-            self.game_state.target_timeline,
-            self.game_state.last_number,
-            settings.game.wheel_sequence,
-            calibration=0  # Momentum desabilitado
-        )
+        with trace.span("strategy.analyze", strategy=self.strategy.name):
+            result = self.strategy.analyze(
+                self.game_state.target_timeline,
+                self.game_state.last_number,
+                settings.game.wheel_sequence
+            )  # Sem calibração (momentum desabilitado)
         trace.step("analyzed", {
             "should_bet": result.should_bet,
             "score": result.score,
@@ -199,8 +255,10 @@ class MessageHandler:
 
         # ====================================================
         # TRIPLE RATE ADVISOR - Pode vetar a aposta
+        # (mesmas transições do replay: GameState.apply_result)
         # ====================================================
-        advice = self.game_state.get_bet_advice()
+        with trace.span("bet_advice"):
+            acao, action_reason, advice = self.game_state.decide(result)
         trace.step("triple_rate", {
             "should_bet": advice.should_bet,
             "confidence": advice.confidence,
@@ -208,53 +266,17 @@ class MessageHandler:
             "rates": {"c4": advice.c4_rate, "m6": advice.m6_rate, "l12": advice.l12_rate}
         })
 
-        # Decisão combinada: Triple Rate pode VETAR
-        action_reason = ""
-        if result.should_bet:
-            # SDA17 recomenda: SEMPRE registrar para Triple Rate (bet_placed depende do veto)
-            if advice.should_bet:
-                acao = "APOSTAR"
-                action_reason = f"SDA17 + Triple Rate aprovaram ({advice.confidence})"
-                # Registrar com bet_placed=True (realmente apostou)
-                self.game_state.store_prediction(
-                    result.numbers,
-                    self.game_state.target_direction,
-                    result.center,
-                    predicted_force=result.details.get("predicted_force", 0),
-                    bet_placed=True,
-                    tr_confidence=advice.confidence,
-                    tr_reason=advice.reason,
-                    sda_score=result.score
-                )
-            else:
-                acao = "PULAR"
-                action_reason = f"Triple Rate vetou: {advice.reason}"
-                # SDA17 recomendou mas TR vetou - registrar para TR com bet_placed=False
-                self.game_state.store_prediction(
-                    result.numbers,
-                    self.game_state.target_direction,
-                    result.center,
-                    predicted_force=result.details.get("predicted_force", 0),
-                    bet_placed=False,  # Não apostou, mas registra para análise TR
-                    tr_confidence=advice.confidence,
-                    tr_reason=advice.reason,
-                    sda_score=result.score
-                )
-        else:
-            acao = "PULAR"
-            action_reason = "SDA17 não recomendou (forças insuficientes)"
-            # SDA17 não recomendou - não há predição para verificar
-
         # Obter info do martingale da direção ALVO (para overlay)
         mg = self.game_state.target_martingale
 
         # ====================================================
         # LOGGING - Salvar decisão no banco de dados
         # ====================================================
+        db_span = trace.span("db.save_decision", acao=acao)
         try:
             # Atualizar resultado da decisão anterior (se existia)
             if self.last_decision_id and hit_result is not None:
-                db_service.update_result(self.last_decision_id, hit_result, numero)
+                self.db.update_result(self.last_decision_id, hit_result, numero)
 
             # Salvar nova decisão
             decision = Decision(
@@ -280,80 +302,104 @@ class MessageHandler:
                 gale_window_count=mg.window_count,
                 gale_bet_value=mg.current_bet,
                 calibration_offset=0,
-                performance_snapshot=self.game_state.target_performance[:12]
+                performance_snapshot=self.game_state.target_performance.to_list(12)
             )
 
             # Atualizar last_decision_id apenas se apostou
             if acao == "APOSTAR":
-                self.last_decision_id = db_service.save_decision(decision)
+                self.last_decision_id = self.db.save_decision(decision)
             else:
-                db_service.save_decision(decision)
+                self.db.save_decision(decision)
                 self.last_decision_id = None  # Não há predição para verificar
 
         except Exception as db_error:
             logger.warning(f"Erro ao salvar decisão no DB: {db_error}")
+            db_span.set(error=type(db_error).__name__)
+        db_span.end()
 
         # Formato esperado pelo overlay
-        overlay_response = {
-            "type": "sugestao",
-            "data": {
-                "acao": acao,
-                "numeros": result.numbers,
-                "centro": result.center,
-                "regiao": result.visual,
-                "ultimo_numero": self.game_state.last_number,
-                "confianca": int(result.score / 6 * 100),
-                "martingale": mg.multiplier,
-                "aposta": mg.current_bet,
-                "gale_level": mg.level,
-                "gale_display": mg.gale_display,
-                "estrategia": self.strategy.name,
-                "trace_id": trace.trace_id,
-                "t_server": now_ms(),
-                # Novo: Triple Rate advice
-                "bet_advice": advice.to_dict(),
-                "action_reason": action_reason
-            }
-        }
-
-        await websocket.send(json.dumps(overlay_response))
+        overlay_response = Sugestao(data=SugestaoData(
+            acao=acao,
+            numeros=result.numbers,
+            centro=result.center,
+            regiao=result.visual,
+            ultimo_numero=self.game_state.last_number,
+            confianca=int(result.score / 6 * 100),
+            martingale=mg.multiplier,
+            aposta=mg.current_bet,
+            gale_level=mg.level,
+            gale_display=mg.gale_display,
+            estrategia=self.strategy.name,
+            trace_id=trace.trace_id,
+            t_server=now_ms(),
+            # Novo: Triple Rate advice
+            bet_advice=advice.to_dict(),
+            action_reason=action_reason
+        ))
+
+        with trace.span("send") as span:
+            frame = encode_for(websocket, overlay_response)
+            span.set(bytes=len(frame))
+            await websocket.send(frame)
         trace.step("sent")
 
         # Broadcast trace para dashboards conectados
-        trace_broadcast = {
-            "type": "trace",
-            "trace_id": trace.trace_id,
-            "steps": trace.steps_dict,
-            "total_ms": trace.total_ms(),
-            "spin": {
+        trace_broadcast = TraceMessage(
+            trace_id=trace.trace_id,
+            steps=trace.steps_dict,
+            total_ms=trace.total_ms(),
+            spin={
                 "numero": numero,
                 "direcao": direcao,
                 "force": force
             },
-            "result": {
+            result={
                 "acao": acao,
                 "centro": result.center,
                 "score": result.score,
                 "numeros": result.numbers,
                 "trend": result.details.get("trend", "")
             },
-            "strategy": {
+            strategy={
                 "name": self.strategy.name,
                 "description": getattr(self.strategy, 'description', ''),
             },
-            "performance": self.game_state.get_performance_stats(),
-            "state": {
+            performance=self.game_state.get_performance_stats(),
+            state={
                 "timeline_cw": self.game_state.timeline_cw.size,
                 "timeline_ccw": self.game_state.timeline_ccw.size,
                 "last_number": self.game_state.last_number
             }
-        }
-        await connection_manager.broadcast(json.dumps(trace_broadcast), exclude_disconnected=False)
+        )
+        with trace.span("broadcast", connections=len(self.connections.connections)):
+            await self.connections.broadcast(Frame(trace_broadcast), key="trace")
+
+        if self.ensemble is not None:
+            self.schedule_ensemble(trace.trace_id)
 
         logger.info(trace.to_log_line())
 
-    async def handle_initial_history(self, websocket: WebSocketServerProtocol, data: Dict):
-        resultados = data.get("resultados", [])
+    def schedule_ensemble(self, trace_id: str) -> None:
+        """Avalia o ensemble em background sobre um snapshot do spin atual."""
+        task = asyncio.create_task(self.run_ensemble(
+            snapshot(self.game_state.target_timeline, self.game_state), self.game_state.last_number, trace_id
+        ))
+        self._ensemble_tasks.add(task)
+        task.add_done_callback(self._ensemble_tasks.discard)
+
+    async def run_ensemble(self, timeline, last_number: int, trace_id: str) -> None:
+        """Voto do ensemble -> broadcast "ensemble" para os dashboards."""
+        try:
+            result = await self.ensemble.evaluate(timeline, last_number, settings.game.wheel_sequence)
+        except Exception as e:
+            logger.error(f"Erro no ensemble: {e}")
+            return
+        message = EnsembleMessage(trace_id=trace_id, data=result.to_dict())
+        await self.connections.broadcast(Frame(message), key="ensemble")
+
+    async def handle_initial_history(self, req: Request):
+        websocket = req.websocket
+        resultados = req.data.get("resultados", [])
         count = 0
 
         # IMPORTANTE: Extensão envia índice 0 = mais recente
@@ -363,28 +409,28 @@ class MessageHandler:
             direcao = item.get("direcao", "horario")
             if numero is not None:
                 self.game_state.process_spin(numero, direcao)
+                self.journal_spin(numero, direcao)
                 count += 1
 
-        self.game_state.save()
+        self.persist_state(count)
 
         # ACK
-        ack_response = {
-            "type": "ack",
-            "received": count,
-            "message": f"Histórico inicial: {count} spins processados",
-            "t_server": now_ms()
-        }
-        await websocket.send(json.dumps(ack_response))
+        ack_response = Ack(
+            received=count,
+            message=f"Histórico inicial: {count} spins processados",
+            t_server=now_ms()
+        )
+        await send_message(websocket, ack_response)
         logger.info(f"Histórico inicial: {count} spins processados")
 
-    async def handle_history_correction(self, websocket: WebSocketServerProtocol, data: Dict):
-        resultados = data.get("resultados", [])
+    async def handle_history_correction(self, req: Request):
+        websocket = req.websocket
+        resultados = req.data.get("resultados", [])
 
         # Reset das timelines
-        self.game_state.timeline_cw.clear()
-        self.game_state.timeline_ccw.clear()
-        self.game_state.last_number = 0
-        self.game_state.last_direction = ""
+        self.game_state.clear_history()
+        if self.journal is not None:
+            self.game_state.journal_seq = self.journal.append_clear(t_server=now_ms())
 
         count = 0
         # Processar do mais antigo para o mais recente
@@ -393,31 +439,38 @@ class MessageHandler:
             direcao = item.get("direcao", "horario")
             if numero is not None:
                 self.game_state.process_spin(numero, direcao)
+                self.journal_spin(numero, direcao)
                 count += 1
 
-        self.game_state.save()
+        self.persist_state(count)
 
         # ACK
-        ack_response = {
-            "type": "ack",
-            "received": count,
-            "message": f"Correção: {count} spins reprocessados",
-            "t_server": now_ms()
-        }
-        await websocket.send(json.dumps(ack_response))
+        ack_response = Ack(
+            received=count,
+            message=f"Correção: {count} spins reprocessados",
+            t_server=now_ms()
+        )
+        await send_message(websocket, ack_response)
         logger.info(f"Correção histórico: {count} spins reprocessados")
 
-    async def handle_new_session(self, websocket: WebSocketServerProtocol, data: Dict):
+    async def handle_new_session(self, req: Request):
         logger.info("🔄 RESET DE SESSÃO SOLICITADO")
 
-        keep_last = data.get("manter_ultimo", False)
+        keep_last = req.data.get("manter_ultimo", False)
 
         async with self.state_lock:
-            reset_info = self.game_state.reset_session(keep_last_number=keep_last)
+            if self.journal is not None:
+                self.game_state.journal_seq = self.journal.append_reset(keep_last, t_server=now_ms())
+            if self.snapshotter is not None:
+                reset_info = self.game_state.reset_session(keep_last_number=keep_last, save=False)
+                # Reset sempre grava imediatamente (fora do event loop)
+                await self.snapshotter.flush(force=True)
+            else:
+                reset_info = self.game_state.reset_session(keep_last_number=keep_last)
 
             # Criar nova sessão no DB
             new_session_id = f"session_{now_ms()}"
-            db_service.create_session(new_session_id)
+            self.db.create_session(new_session_id)
             self.current_session_id = new_session_id
 
         # Resposta de confirmação
@@ -430,10 +483,10 @@ class MessageHandler:
                 "t_server": now_ms()
             }
         }
-        await websocket.send(json.dumps(response))
+        await send_message(req.websocket, response)
         logger.info(f"✅ Sessão resetada: {self.current_session_id}")
 
-    async def handle_get_state(self, websocket: WebSocketServerProtocol):
+    async def handle_get_state(self, req: Request):
         state_response = {
             "type": "state",
             "timeline_cw": self.game_state.timeline_cw.size,
@@ -442,14 +495,51 @@ class MessageHandler:
             "last_direction": self.game_state.last_direction,
             "t_server": now_ms()
         }
-        await websocket.send(json.dumps(state_response))
+        await send_message(req.websocket, state_response)
         logger.info("Estado enviado para dashboard")
 
-    async def handle_legacy_spin(self, websocket: WebSocketServerProtocol, data: Dict, trace: TraceContext):
-        # Tentar processar como SpinInput direto
-        spin = SpinInput(**data)
+    async def handle_register(self, req: Request):
+        device_id = req.data.get("device_id")
+        logger.info(f"📩 Recebido REGISTER de {req.conn_id} com device_id={device_id}")
+        await self.connections.update_device_id(req.conn_id, device_id)
+
+    async def handle_force_master(self, req: Request):
+        await self.connections.force_master(req.conn_id)
+
+    async def handle_state_sync_control(self, req: Request):
+        """Controle do state_sync: state_subscribe {mode}, state_ack {seq}, state_resync."""
+        websocket, data, conn_id, msg_type = req.websocket, req.data, req.conn_id, req.msg_type
+        conn = self.connections.connections.get(conn_id)
+        if self.state_sync is None or conn is None:
+            return
+
+        if msg_type == "state_ack":
+            self.state_sync.ack(conn, data.get("seq"))
+            return
+
+        if msg_type == "state_subscribe":
+            mode = self.state_sync.subscribe(conn, data.get("mode", "full"))
+            await send_message(websocket, {
+                "type": "state_subscribed",
+                "mode": mode,
+                "seq": self.state_sync.seq
+            })
+            logger.info(f"📡 {conn_id} state_sync em modo {mode}")
+        else:
+            self.state_sync.resync(conn)
+
+        # Estado completo imediato (não espera o próximo heartbeat)
+        seq = await self.state_sync.refresh(self.state_lock)
+        await send_message(websocket, self.state_sync.message_for(conn))
+        self.state_sync.mark_synced(conn, seq)
+
+    async def handle_legacy_spin(self, req: Request):
+        # Spin no formato antigo (regras do SpinInput, validadas pelo schema da rota)
+        websocket, trace = req.websocket, req.trace
+        spin = req.payload if req.payload is not None else LegacySpin.from_dict(req.data)
         self.game_state.process_spin(spin.numero, spin.direcao)
-        self.game_state.save()
+        self.journal_spin(spin.numero, spin.direcao, spin.t_client, spin.trace_id)
+        self.persist_state()
 
         result = self.strategy.analyze(
             self.game_state.target_timeline,
@@ -474,12 +564,51 @@ class MessageHandler:
                 "t_server": now_ms()
             }
         }
-        await websocket.send(json.dumps(overlay_response))
+        await send_message(websocket, overlay_response)
         if trace:
             logger.info(trace.to_log_line())
 
-    async def handle_extrair_mesa(self, websocket: WebSocketServerProtocol, data: Dict, trace: TraceContext):
+    async def handle_get_traces(self, req: Request):
+        """
+        Consulta o buffer de traces do processo: view "recent" (padrão),
+        "slowest" ou "percentiles"; filtros msg_type e all_mesas (senão
+        só a mesa desta conexão).
+        """
+        websocket, data = req.websocket, req.data
+        view = data.get("view", "recent")
+        limit = data.get("limit", 20)
+        limit = max(1, min(limit, tracer.buffer.records.maxlen)) if isinstance(limit, int) else 20
+        filters = {
+            "msg_type": data.get("msg_type") if isinstance(data.get("msg_type"), str) else None,
+            "mesa_id": None if data.get("all_mesas") else self.mesa_id
+        }
+
+        response: Dict[str, Any] = {
+            "type": "traces",
+            "view": view,
+            "mesa_id": filters["mesa_id"],
+            "sample_rate": tracer.sample_rate,
+            "buffered": len(tracer.buffer.records),
+            "t_server": now_ms()
+        }
+        if view == "percentiles":
+            response["stats"] = tracer.buffer.percentiles(**filters)
+        elif view == "slowest":
+            response["traces"] = [r.to_dict() for r in tracer.buffer.slowest(limit, **filters)]
+        elif view == "recent":
+            response["traces"] = [r.to_dict() for r in tracer.buffer.recent(limit, **filters)]
+        else:
+            await send_message(websocket, {
+                "type": "error",
+                "message": f"view inválida: {view} (recent, slowest ou percentiles)",
+                "code": "INVALID_VIEW"
+            })
+            return
+        await send_message(websocket, response)
+
+    async def handle_extrair_mesa(self, req: Request):
         """Processa extração de mesa e salva config."""
+        websocket, data, trace = req.websocket, req.data, req.trace
         logger.info(f"📥 Recebida solicitação de extração: {data.get('url')}")
         result = self.extractor_service.process_mesa(data)
         
@@ -488,31 +617,32 @@ class MessageHandler:
             "auto_start": True,
             **result
         }
-        await websocket.send(json.dumps(response))
+        await send_message(websocket, response)
         if trace:
             trace.step("mesa_extraida", {"mesa_id": result.get("mesa_id")})
 
-    async def handle_listar_mesas(self, websocket: WebSocketServerProtocol):
+    async def handle_listar_mesas(self, req: Request):
         """Retorna lista de mesas configuradas."""
         mesas = self.extractor_service.list_mesas()
-        await websocket.send(json.dumps({
+        await send_message(req.websocket, {
             "type": "mesas_disponiveis",
             "mesas": mesas
-        }))
+        })
 
-    async def handle_get_mesa_config(self, websocket: WebSocketServerProtocol, data: Dict):
+    async def handle_get_mesa_config(self, req: Request):
         """Retorna config de uma mesa específica."""
-        mesa_id = data.get("mesa_id")
+        websocket = req.websocket
+        mesa_id = req.data.get("mesa_id")
         config = self.extractor_service.get_mesa_config(mesa_id)
         if config:
-            await websocket.send(json.dumps({
+            await send_message(websocket, {
                 "type": "config_mesa",
                 "mesa_id": mesa_id,
                 "config": config
-            }))
+            })
         else:
-            await websocket.send(json.dumps({
+            await send_message(websocket, {
                 "type": "error",
                 "message": f"Mesa {mesa_id} não encontrada",
                 "code": "MESA_NOT_FOUND"
-            }))
+            })
@@ -0,0 +1,191 @@
+# Roleta Cloud - Roteador de Mensagens
+"""
+Tabela declarativa das mensagens do cliente. Cada tipo declara o método
+do MessageHandler, o role exigido, o schema e a classe de rate limit:
+
+    Route("novo_resultado", "handle_new_result", role=ROLE_MASTER,
+          schema=NovoResultado.from_dict, limit=LIMIT_SPIN, dedup=True)
+
+O MessageHandler aplica role -> schema -> deduplicação -> handler, com
+contadores por tipo (roleta_messages_total, roleta_messages_rejected_total,
+roleta_message_errors_total) e duração em roleta_trace_total_ms. Tipo
+desconhecido sem "numero" é recusado sem passar pelo spin legado.
+
+Rate limit: token bucket por conexão e classe (spin, control, query).
+O tipo é lido do início do frame (codec.peek_type), então o excedente é
+descartado antes do decode, e uma rajada de get_state/listar_mesas não
+consome os tokens dos spins. Roda na borda: TableRegistry.serve no
+processo único, ShardRouter.handler no modo sharded.
+
+Sem dependências de estado/banco: usado pelo roteador do modo sharded.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from app_config.settings import settings
+from codec import DecodeError, LegacySpin, NovoResultado, loads_for, peek_type, send_message
+from metrics.instruments import message_label, messages_rejected_total
+
+logger = logging.getLogger(__name__)
+
+ROLE_MASTER = "master"
+
+LIMIT_SPIN = "spin"        # Dados do MASTER (spins, históricos)
+LIMIT_CONTROL = "control"  # Registro, roles, controle do state_sync
+LIMIT_QUERY = "query"      # Consultas (estado, mesas, traces) e tipos desconhecidos
+
+# Tipo das mensagens antigas, sem "type"
+LEGACY_TYPE = "spin"
+
+
+@dataclass(frozen=True)
+class Route:
+    """Declaração de um tipo de mensagem."""
+    type: str
+    handler: str                                      # Método do MessageHandler: async (req: Request)
+    role: Optional[str] = None                        # Role exigido (None = qualquer)
+    schema: Optional[Callable[[Dict], Any]] = None    # dict -> payload validado (ValueError se inválido)
+    limit: str = LIMIT_QUERY
+    dedup: bool = False                               # Ignora spin repetido (mesmo número no mesmo segundo)
+
+
+@dataclass
+class Request:
+    """Mensagem em processamento (o que os handlers recebem)."""
+    websocket: Any
+    data: Dict[str, Any]
+    conn_id: str
+    msg_type: str
+    trace: Any = None
+    payload: Any = None  # Resultado do schema da rota
+
+
+class MessageRouter:
+    """Rotas por tipo, com a rota legada para spins sem tipo."""
+
+    def __init__(self, routes: Iterable[Route], fallback: Route):
+        self.routes: Dict[str, Route] = {route.type: route for route in routes}
+        self.fallback = fallback
+
+    def resolve(self, msg_type: str, data: Dict[str, Any]) -> Optional[Route]:
+        """Rota da mensagem; None se o tipo é desconhecido e não parece um spin."""
+        route = self.routes.get(msg_type)
+        if route is None and (msg_type == LEGACY_TYPE or "numero" in data):
+            return self.fallback
+        return route
+
+    def limit_for(self, msg_type: Optional[str]) -> str:
+        route = self.routes.get(msg_type) if msg_type is not None else None
+        if route is not None:
+            return route.limit
+        return LIMIT_SPIN if msg_type in (None, LEGACY_TYPE) else LIMIT_QUERY
+
+
+ROUTES = MessageRouter(
+    [
+        # Dados do MASTER
+        Route("novo_resultado", "handle_new_result", role=ROLE_MASTER, schema=NovoResultado.from_dict,
+              limit=LIMIT_SPIN, dedup=True),
+        Route("historico_inicial", "handle_initial_history", role=ROLE_MASTER, limit=LIMIT_SPIN),
+        Route("correcao_historico", "handle_history_correction", role=ROLE_MASTER, limit=LIMIT_SPIN),
+        Route("nova_sessao", "handle_new_session", limit=LIMIT_SPIN),
+        # Controle
+        Route("register", "handle_register", limit=LIMIT_CONTROL),
+        Route("force_master", "handle_force_master", limit=LIMIT_CONTROL),
+        Route("state_subscribe", "handle_state_sync_control", limit=LIMIT_CONTROL),
+        Route("state_ack", "handle_state_sync_control", limit=LIMIT_CONTROL),
+        Route("state_resync", "handle_state_sync_control", limit=LIMIT_CONTROL),
+        # Consultas
+        Route("get_state", "handle_get_state"),
+        Route("get_traces", "handle_get_traces"),
+        Route("extrair_mesa", "handle_extrair_mesa"),
+        Route("listar_mesas", "handle_listar_mesas"),
+        Route("obter_config_mesa", "handle_get_mesa_config"),
+    ],
+    fallback=Route(LEGACY_TYPE, "handle_legacy_spin", schema=LegacySpin.from_dict, limit=LIMIT_SPIN)
+)
+
+
+class TokenBucket:
+    """`rate` tokens/s, até `burst` acumulados; cada mensagem gasta um."""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def retry_after_ms(self) -> int:
+        return int((1.0 - self.tokens) / self.rate * 1000) + 1
+
+
+class RateLimiter:
+    """
+    Buckets de uma conexão, por classe de mensagem (rate <= 0 = sem limite).
+    O cliente recebe um erro RATE_LIMITED na primeira recusa de cada
+    rajada; as seguintes são descartadas em silêncio.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, router: MessageRouter = ROUTES):
+        cfg = settings.rate_limit
+        self.enabled = cfg.enabled if enabled is None else enabled
+        self.router = router
+        limits = {
+            LIMIT_SPIN: (cfg.spin_rate, cfg.spin_burst),
+            LIMIT_CONTROL: (cfg.control_rate, cfg.control_burst),
+            LIMIT_QUERY: (cfg.query_rate, cfg.query_burst),
+        }
+        self.buckets: Dict[str, TokenBucket] = {
+            name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items() if rate > 0
+        }
+        self._notified: set = set()
+
+    async def allow(self, websocket: Any, msg_type: Optional[str]) -> bool:
+        """Consome um token da classe do tipo; recusada, avisa o cliente (uma vez por rajada)."""
+        limit = self.router.limit_for(msg_type)
+        bucket = self.buckets.get(limit)
+        if bucket is None or bucket.take(time.monotonic()):
+            self._notified.discard(limit)
+            return True
+
+        messages_rejected_total.labels(message_label(msg_type), "rate_limited").inc()
+        if limit not in self._notified:
+            self._notified.add(limit)
+            logger.warning(f"⚠️ Rate limit ({limit}) excedido por {msg_type}")
+            await send_message(websocket, {
+                "type": "error",
+                "message": f"Muitas mensagens {limit}: limite de {bucket.rate:g}/s",
+                "code": "RATE_LIMITED",
+                "retry_after_ms": bucket.retry_after_ms()
+            })
+        return False
+
+    async def screen(self, websocket: Any, message: Any, invalid: Any = None) -> Tuple[bool, Any]:
+        """
+        Rate limit + decode de um frame recebido: (passa, data). O tipo vem
+        do início do frame; só frames sem tipo reconhecível são decodificados
+        antes da decisão. Frame inválido passa com data = `invalid`.
+        """
+        msg_type = peek_type(message) if self.enabled else None
+        if msg_type is not None and not await self.allow(websocket, msg_type):
+            return False, None
+        try:
+            data = loads_for(websocket, message)
+        except DecodeError:
+            return True, invalid
+        if self.enabled and msg_type is None and isinstance(data, dict):
+            if not await self.allow(websocket, data.get("type", LEGACY_TYPE)):
+                return False, None
+        return True, data
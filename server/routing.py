@@ -0,0 +1,29 @@
+# Roleta Cloud - Identificação de Mesas
+# Sem dependências de estado/banco: usado pelo roteador do modo sharded
+
+import re
+import zlib
+from typing import Any, Optional
+
+# Mesa das conexões que nunca enviaram mesa_id (caminhos legados)
+DEFAULT_MESA_ID = "default"
+
+# mesa_id vira nome de diretório: sem separadores nem "." inicial
+_MESA_ID_RE = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$")
+
+# Mensagens que carregam mesa_id mas não trocam a mesa da conexão
+UNSCOPED_MESSAGES = {"extrair_mesa", "listar_mesas", "obter_config_mesa"}
+
+
+def normalize_mesa_id(value: Any) -> Optional[str]:
+    """mesa_id validado (None se ausente). ValueError se inválido."""
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str) or not _MESA_ID_RE.match(value):
+        raise ValueError(f"mesa_id inválido: {value!r}")
+    return value
+
+
+def shard_for(mesa_id: str, workers: int) -> int:
+    """Worker dono da mesa (partição estável por hash entre reinícios)."""
+    return zlib.crc32(mesa_id.encode("utf-8")) % workers
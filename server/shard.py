@@ -0,0 +1,469 @@
+# Roleta Cloud - Modo Sharded
+# Processo roteador (WebSocket) + N workers donos de mesas, via Unix socket
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import struct
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import websockets
+from websockets.server import WebSocketServerProtocol
+
+from app_config.settings import settings
+from auth.middleware import verify_auth
+from codec import serve_options
+from metrics import start_exporter
+from metrics.instruments import track_router, track_tables
+from server.compression import serve_options as compression_options
+from server.fanout import ConnectionSender
+from server.message_router import RateLimiter
+from server.routing import DEFAULT_MESA_ID, UNSCOPED_MESSAGES, normalize_mesa_id, shard_for
+
+logger = logging.getLogger(__name__)
+
+# Frame IPC: tamanho do cabeçalho JSON, tamanho do corpo (mensagem crua)
+FRAME = struct.Struct(">II")
+
+# Operações roteador -> worker
+OP_OPEN = "open"     # conexão entrou no worker {cid, mesa_id, device_id, addr, subprotocol, switch}
+OP_MESSAGE = "msg"   # mensagem do cliente {cid} + corpo
+# Operações worker -> roteador
+OP_SEND = "send"     # mensagem para o cliente {cid} + corpo
+# Ambos os sentidos
+OP_CLOSE = "close"   # conexão saiu do worker / worker fechou a conexão {cid, code, reason}
+
+
+def shards_root() -> Path:
+    return Path(settings.shard.data_dir or settings.base_dir / "data" / "shards")
+
+
+def shard_dir(index: int) -> Path:
+    return shards_root() / str(index)
+
+
+def socket_path(index: int) -> Path:
+    return shards_root() / f"worker-{index}.sock"
+
+
+def shard_db_path(index: int) -> Path:
+    """Banco SQLite do worker (DB_PATH ganha o sufixo .shardN)."""
+    if settings.database.db_path:
+        path = Path(settings.database.db_path)
+        return path.with_name(f"{path.stem}.shard{index}{path.suffix}")
+    return shard_dir(index) / "decisions.db"
+
+
+def encode_frame(header: Dict[str, Any], body: Union[str, bytes] = b"") -> bytes:
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    else:
+        header["bin"] = True
+    raw_header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return FRAME.pack(len(raw_header), len(body)) + raw_header + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[Dict[str, Any], Union[str, bytes]]:
+    """Lê um frame IPC. IncompleteReadError quando o outro lado fecha."""
+    header_size, body_size = FRAME.unpack(await reader.readexactly(FRAME.size))
+    header = json.loads(await reader.readexactly(header_size))
+    body = await reader.readexactly(body_size) if body_size else b""
+    if not header.get("bin"):
+        body = body.decode("utf-8")
+    return header, body
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+class RemoteSocket:
+    """
+    Conexão de um cliente do roteador, vista pelo worker.
+
+    Implementa o que TableRegistry.serve / ConnectionManager / Fanout
+    usam de um WebSocketServerProtocol: send, close, remote_address e
+    iteração assíncrona das mensagens recebidas.
+    """
+
+    def __init__(
+        self,
+        cid: str,
+        writer: asyncio.StreamWriter,
+        remote_address: Optional[Tuple[str, int]] = None,
+        subprotocol: Optional[str] = None
+    ):
+        self.cid = cid
+        self.remote_address = remote_address
+        self.subprotocol = subprotocol  # Negociado pelo roteador: o worker já serializa no formato do cliente
+        self._writer = writer
+        self._inbox: "asyncio.Queue[Optional[Union[str, bytes]]]" = asyncio.Queue()
+        self.closed = False
+
+    def feed(self, message: Optional[Union[str, bytes]]) -> None:
+        """Entrega uma mensagem do cliente (None = conexão encerrada)."""
+        self._inbox.put_nowait(message)
+
+    async def send(self, message: Union[str, bytes]) -> None:
+        if self.closed:
+            raise websockets.ConnectionClosed(None, None)
+        self._writer.write(encode_frame({"op": OP_SEND, "cid": self.cid}, message))
+        await self._writer.drain()
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.feed(None)
+        self._writer.write(encode_frame({"op": OP_CLOSE, "cid": self.cid, "code": code, "reason": reason}))
+        await self._writer.drain()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Union[str, bytes]:
+        message = await self._inbox.get()
+        if message is None:
+            self.closed = True
+            raise StopAsyncIteration
+        return message
+
+
+class ShardWorker:
+    """
+    Processo dono de uma partição das mesas.
+
+    Tem o próprio TableRegistry (GameState, lock, estratégia, journal,
+    heartbeat por mesa) e o próprio banco SQLite. Recebe do roteador as
+    mensagens das conexões cujas mesas pertencem a este worker e devolve
+    tudo que o servidor enviaria ao cliente.
+    """
+
+    def __init__(self, index: int, workers: int):
+        self.index = index
+        self.workers = workers
+        self.path = socket_path(index)
+        self.sockets: Dict[str, RemoteSocket] = {}
+        self.tables = None  # TableRegistry (criado em run, após configurar o banco)
+
+    async def run(self) -> None:
+        from server.tables import TableRegistry
+
+        configs_path = os.path.join(os.path.dirname(__file__), "configs")
+        if shard_for(DEFAULT_MESA_ID, self.workers) == self.index:
+            # Dono da mesa padrão: caminhos legados
+            self.tables = TableRegistry(configs_path)
+        else:
+            self.tables = TableRegistry(
+                configs_path,
+                state_file=shard_dir(self.index) / "default" / "state.json",
+                journal_file=shard_dir(self.index) / "default" / "spins.journal"
+            )
+        self.tables.start()
+        track_tables(self.tables)
+        exporter = await start_exporter(1 + self.index)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+        loop.add_signal_handler(signal.SIGINT, lambda: None)  # O roteador decide o encerramento
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+        server = await asyncio.start_unix_server(self._on_link, path=str(self.path))
+        heartbeat = asyncio.create_task(self._heartbeat())
+        logger.info(f"Worker {self.index}/{self.workers} ouvindo em {self.path}")
+
+        async with server:
+            await stop.wait()
+        heartbeat.cancel()
+        if exporter is not None:
+            await exporter.stop()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(1)
+            await self.tables.heartbeat()
+
+    async def _on_link(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Conexão IPC do roteador: multiplexa todos os clientes deste worker."""
+        try:
+            while True:
+                header, body = await read_frame(reader)
+                op = header.get("op")
+                cid = header.get("cid")
+                if op == OP_MESSAGE:
+                    ws = self.sockets.get(cid)
+                    if ws is not None:
+                        ws.feed(body)
+                elif op == OP_OPEN:
+                    addr = header.get("addr")
+                    ws = RemoteSocket(cid, writer, tuple(addr) if addr else None, header.get("subprotocol"))
+                    self.sockets[cid] = ws
+                    asyncio.create_task(self._serve(
+                        ws, header.get("mesa_id"), header.get("device_id"), bool(header.get("switch"))
+                    ))
+                elif op == OP_CLOSE:
+                    ws = self.sockets.get(cid)
+                    if ws is not None:
+                        ws.feed(None)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.warning(f"Worker {self.index}: roteador desconectou")
+        finally:
+            for ws in list(self.sockets.values()):
+                ws.closed = True
+                ws.feed(None)
+
+    async def _serve(self, ws: RemoteSocket, mesa_id: Optional[str], device_id: Optional[str],
+                     switch: bool = False) -> None:
+        try:
+            await self.tables.serve(ws, mesa_id=mesa_id, device_id=device_id, rate_limit=False, announce=switch)
+        except Exception as e:
+            logger.error(f"Worker {self.index}: erro na conexão {ws.cid}: {e}")
+        finally:
+            # A conexão pode ter voltado a este worker com o mesmo cid
+            if self.sockets.get(ws.cid) is ws:
+                del self.sockets[ws.cid]
+
+    def shutdown(self) -> None:
+        """Grava o estado das mesas e fecha o banco (fim do processo)."""
+        from database import close_database
+
+        if self.tables is not None:
+            self.tables.flush_sync()
+        close_database()
+
+
+def run_worker(index: int, workers: int) -> None:
+    """Ponto de entrada do processo worker (multiprocessing spawn)."""
+    # Banco próprio: precisa estar configurado antes de importar database.service
+    settings.database.db_path = shard_db_path(index)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s [%(levelname)s] [shard {index}] %(message)s',
+        handlers=[
+            logging.FileHandler(settings.log_file),
+            logging.StreamHandler()
+        ]
+    )
+    worker = ShardWorker(index, workers)
+    try:
+        asyncio.run(worker.run())
+    finally:
+        worker.shutdown()
+        logger.info(f"Worker {index} encerrado")
+
+
+# ============================================================================
+# ROTEADOR
+# ============================================================================
+
+class _Client:
+    __slots__ = ("cid", "websocket", "worker", "device_id", "sender")
+
+    def __init__(self, cid: str, websocket: WebSocketServerProtocol, sender):
+        self.cid = cid
+        self.websocket = websocket
+        self.worker: Optional[int] = None
+        self.device_id: Optional[str] = None
+        self.sender = sender
+
+
+class ShardRouter:
+    """
+    Front-end WebSocket do modo sharded.
+
+    Aceita as conexões, descobre a mesa de cada mensagem (mesa_id) e a
+    encaminha ao worker dono (shard_for). Não executa estratégia, banco
+    nem state_sync: só decodifica o suficiente para rotear. Quando a
+    conexão troca para uma mesa de outro worker, sai do worker anterior
+    (OP_CLOSE) e entra no novo (OP_OPEN) com o device_id já registrado;
+    o novo worker confirma com mesa_ativa, como na troca de sala local.
+
+    As respostas dos workers passam por uma fila de saída por cliente
+    (ConnectionSender), então um cliente lento não trava o link IPC.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self.processes: List[multiprocessing.Process] = []
+        self.links: List[Optional[asyncio.StreamWriter]] = [None] * self.workers
+        self.clients: Dict[str, _Client] = {}
+        self._link_tasks: List[asyncio.Task] = []
+
+    # ========== WORKERS ==========
+
+    def start_workers(self) -> None:
+        ctx = multiprocessing.get_context("spawn")
+        for index in range(self.workers):
+            process = ctx.Process(target=run_worker, args=(index, self.workers), name=f"roleta-shard-{index}")
+            process.start()
+            self.processes.append(process)
+        logger.info(f"{self.workers} workers iniciados")
+
+    async def connect_workers(self) -> None:
+        """Abre o link IPC com cada worker (aguarda o socket aparecer)."""
+        timeout = settings.shard.start_timeout
+        loop = asyncio.get_running_loop()
+        for index in range(self.workers):
+            path = str(socket_path(index))
+            deadline = loop.time() + timeout
+            while True:
+                try:
+                    reader, writer = await asyncio.open_unix_connection(path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if loop.time() > deadline:
+                        raise RuntimeError(f"Worker {index} não abriu {path} em {timeout}s")
+                    await asyncio.sleep(0.05)
+            self.links[index] = writer
+            self._link_tasks.append(asyncio.create_task(self._read_link(index, reader)))
+
+    def stop_workers(self, timeout: float = 10.0) -> None:
+        """SIGTERM nos workers (cada um grava as suas mesas) e aguarda."""
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"{process.name} não encerrou em {timeout}s - matando")
+                process.kill()
+
+    async def _read_link(self, index: int, reader: asyncio.StreamReader) -> None:
+        """Respostas de um worker -> filas de saída dos clientes."""
+        try:
+            while True:
+                header, body = await read_frame(reader)
+                client = self.clients.get(header.get("cid"))
+                if client is None or client.worker != index:
+                    continue
+                if header.get("op") == OP_SEND:
+                    client.sender.enqueue(body)
+                elif header.get("op") == OP_CLOSE:
+                    await client.websocket.close(header.get("code", 1000), header.get("reason", ""))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        logger.error(f"Link com o worker {index} perdido - fechando suas conexões")
+        self.links[index] = None
+        for client in list(self.clients.values()):
+            if client.worker == index:
+                await client.websocket.close(1011, "Worker indisponível")
+
+    async def _send(self, index: int, header: Dict[str, Any], body: Union[str, bytes] = b"") -> None:
+        """Frame para o worker; aguarda o buffer do link esvaziar (worker lento segura quem envia)."""
+        writer = self.links[index]
+        if writer is None:
+            raise ConnectionError(f"Worker {index} indisponível")
+        writer.write(encode_frame(header, body))
+        await writer.drain()
+
+    # ========== CONEXÕES ==========
+
+    async def _join(self, client: _Client, index: int, mesa_id: str) -> None:
+        switch = client.worker is not None
+        if switch:
+            await self._send(client.worker, {"op": OP_CLOSE, "cid": client.cid})
+        client.worker = index
+        addr = client.websocket.remote_address
+        await self._send(index, {
+            "op": OP_OPEN,
+            "cid": client.cid,
+            "mesa_id": mesa_id,
+            "device_id": client.device_id,
+            "addr": list(addr[:2]) if addr else None,
+            "subprotocol": client.websocket.subprotocol,
+            "switch": switch
+        })
+
+    async def handler(self, websocket: WebSocketServerProtocol, path: str = "") -> None:
+        client_ip = websocket.remote_address[0] if websocket.remote_address else "unknown"
+        if not await verify_auth(None):
+            logger.warning(f"Conexão rejeitada de {client_ip}: não autorizado")
+            await websocket.close(4001, "Unauthorized")
+            return
+
+        cid = uuid.uuid4().hex[:12]
+        cfg = settings.broadcast
+        sender = ConnectionSender(
+            cid, websocket,
+            max_queue=cfg.queue_size,
+            policy=cfg.slow_policy,
+            send_timeout=cfg.send_timeout,
+            on_failure=lambda _cid: websocket.close(1011, "Fila de saída")
+        )
+        client = _Client(cid, websocket, sender)
+        limiter = RateLimiter()
+        self.clients[cid] = client
+        sender.start()
+
+        try:
+            # Conexão nova começa na mesa padrão (role_assigned imediato)
+            await self._join(client, shard_for(DEFAULT_MESA_ID, self.workers), DEFAULT_MESA_ID)
+            async for message in websocket:
+                # Rate limit na borda (o worker não limita de novo); frame inválido: o worker responde o erro
+                allowed, data = await limiter.screen(websocket, message)
+                if not allowed:
+                    continue
+
+                if isinstance(data, dict):
+                    if data.get("type") == "register" and isinstance(data.get("device_id"), str):
+                        client.device_id = data["device_id"]
+                    if data.get("type") not in UNSCOPED_MESSAGES:
+                        try:
+                            mesa_id = normalize_mesa_id(data.get("mesa_id"))
+                        except ValueError:
+                            mesa_id = None  # O worker responde INVALID_MESA
+                        if mesa_id is not None:
+                            index = shard_for(mesa_id, self.workers)
+                            if index != client.worker:
+                                await self._join(client, index, mesa_id)
+
+                await self._send(client.worker, {"op": OP_MESSAGE, "cid": cid}, message)
+        except websockets.ConnectionClosed:
+            logger.info(f"Conexão fechada de {client_ip} (ID: {cid})")
+        except ConnectionError as e:
+            logger.error(f"{cid}: {e}")
+            await websocket.close(1011, "Worker indisponível")
+        finally:
+            self.clients.pop(cid, None)
+            await sender.stop()
+            if client.worker is not None and self.links[client.worker] is not None:
+                try:
+                    await self._send(client.worker, {"op": OP_CLOSE, "cid": cid})
+                except ConnectionError:
+                    pass  # Link caiu durante o drain: o worker já encerrou a conexão
+
+    async def serve(self, ssl_context=None) -> None:
+        """Sobe os workers e o servidor WebSocket (roda até ser cancelado)."""
+        self.start_workers()
+        try:
+            await self.connect_workers()
+            track_router(self)
+            await start_exporter()
+            async with websockets.serve(
+                self.handler,
+                settings.server.host,
+                settings.server.port,
+                ssl=ssl_context,
+                **serve_options(),
+                **compression_options(),
+                ping_interval=20,
+                ping_timeout=60
+            ):
+                logger.info(
+                    f"Roteador em {settings.server.host}:{settings.server.port} "
+                    f"com {self.workers} workers. Pressione Ctrl+C para parar."
+                )
+                await asyncio.Future()  # Run forever
+        finally:
+            for task in self._link_tasks:
+                task.cancel()
+            self.stop_workers()
@@ -0,0 +1,297 @@
+# Roleta Cloud - Cache do state_sync (heartbeat)
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app_config.settings import settings
+from codec import Frame, StateSync
+from database.service import DatabaseService
+from models.trace import now_ms
+from server.connection_manager import ConnectionInfo
+from server.fanout import KIND_HEARTBEAT, KIND_STATE
+from state.game import GameState
+
+logger = logging.getLogger(__name__)
+
+# (GameState.generation, DatabaseService.window_version)
+SyncKey = Tuple[int, int]
+
+# Modos de sincronização por conexão
+SYNC_MODE_FULL = "full"    # state_sync completo a cada mudança (padrão)
+SYNC_MODE_DELTA = "delta"  # state_delta a partir do último state_ack
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any], prefix: str = "") -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Diferença entre dois estados: (changed, removed).
+
+    Dicts presentes nos dois lados são comparados recursivamente; os
+    demais valores entram inteiros em `changed` quando diferentes.
+    """
+    changed: Dict[str, Any] = {}
+    removed: List[str] = []
+    for k, value in new.items():
+        if k not in old:
+            changed[k] = value
+            continue
+        previous = old[k]
+        if previous == value:
+            continue
+        if isinstance(value, dict) and isinstance(previous, dict):
+            sub_changed, sub_removed = diff_state(previous, value, f"{prefix}{k}.")
+            if sub_changed:
+                changed[k] = sub_changed
+            removed.extend(sub_removed)
+        else:
+            changed[k] = value
+    for k in old:
+        if k not in new:
+            removed.append(f"{prefix}{k}")
+    return changed, removed
+
+
+def build_state_sync(game_state: GameState, window_history: Dict[str, Any]) -> Dict[str, Any]:
+    """Monta a mensagem state_sync completa (chamar com o state_lock)."""
+    # Martingale da direção ALVO (próxima aposta)
+    mg = game_state.target_martingale
+
+    # Verificar se a última predição foi uma aposta real
+    last_bet_placed = game_state.pending_prediction.get("bet_placed", False)
+
+    return {
+        "type": "state_sync",
+        "data": {
+            "gale_level": mg.level,
+            "gale_display": mg.gale_display,
+            "martingale": mg.multiplier,
+            "aposta": mg.current_bet,
+            "last_number": game_state.last_number,
+            "target_direction": game_state.target_direction,
+            "performance": game_state.get_performance_stats(),
+            # Ambos Martingales para dashboard
+            "martingale_cw": game_state.martingale_cw.to_dict(),
+            "martingale_ccw": game_state.martingale_ccw.to_dict(),
+            "pending_prediction": dict(game_state.pending_prediction),
+            # Histórico de janelas para visualização
+            "window_history": window_history,
+            # Flag para overlay saber se deve sincronizar Gale
+            "bet_placed": last_bet_placed,
+            "generation": game_state.generation,
+            # Momento em que o estado foi montado (não o envio)
+            "timestamp": now_ms()
+        }
+    }
+
+
+class StateSyncCache:
+    """
+    Frame state_sync serializado uma vez por versão do estado.
+
+    A chave é (geração do GameState, versão do histórico de janelas).
+    Enquanto a chave não muda, o mesmo Frame é reaproveitado entre ticks
+    do heartbeat e entre conexões: sem get_performance_stats, sem
+    consulta ao banco e sem serializar de novo (cada formato, JSON ou
+    binário, é serializado na primeira conexão que o pede).
+
+    Cada versão montada recebe um `seq` crescente. Conexões em modo
+    delta (state_subscribe {"mode": "delta"}) recebem apenas o que mudou
+    desde o último seq confirmado por state_ack:
+
+        {"type": "state_delta", "seq": N, "base_seq": B,
+         "changed": {...}, "removed": ["campo.subcampo", ...]}
+
+    - `changed`: dicts são mesclados recursivamente no estado do cliente,
+      qualquer outro valor (listas inclusive) substitui o anterior
+    - `removed`: caminhos (separados por ponto) a apagar
+
+    Protocolo stop-and-wait: um delta por vez; o próximo só sai após o
+    ack (ou após `resend_timeout`, reenviando a partir do último ack).
+    Se o cliente detectar base_seq diferente do seu seq, envia
+    state_resync e recebe o state_sync completo (que também tem `seq`).
+    O modo padrão continua sendo o state_sync completo (overlays antigos).
+    """
+
+    def __init__(
+        self,
+        game_state: GameState,
+        db: DatabaseService,
+        history_size: Optional[int] = None,
+        resend_timeout: Optional[float] = None
+    ):
+        self.game_state = game_state
+        self.db = db
+        self.history_size = history_size if history_size is not None else settings.state_sync.history_size
+        self.resend_timeout = resend_timeout if resend_timeout is not None else settings.state_sync.resend_timeout
+        self._key: Optional[SyncKey] = None
+        self._frame: Optional[Frame] = None
+        self.seq = 0
+        # seq -> "data" do state_sync (base para deltas)
+        self._history: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # base_seq -> delta serializado até o seq atual
+        self._deltas: Dict[int, Frame] = {}
+        self._keepalive: Optional[Tuple[int, Frame]] = None
+
+        # Métricas
+        self.builds = 0
+        self.hits = 0
+        self.deltas_sent = 0
+        self.fulls_sent = 0
+        self.resends = 0
+
+    @property
+    def key(self) -> SyncKey:
+        """Chave atual (sem montar nada)."""
+        return (self.game_state.generation, self.db.window_version)
+
+    async def refresh(self, state_lock: asyncio.Lock) -> int:
+        """Remonta o state_sync se a chave mudou. Retorna o seq atual."""
+        if self._frame is not None and self.key == self._key:
+            self.hits += 1
+            return self.seq
+
+        # Versão capturada ANTES da leitura: se mudar durante, o próximo tick remonta
+        window_version = self.db.window_version
+        # Histórico de janelas FORA do lock (I/O não deve bloquear)
+        window_history = self.db.get_window_history()
+
+        # Snapshot do estado com lock para evitar race condition
+        async with state_lock:
+            key = (self.game_state.generation, window_version)
+            message = build_state_sync(self.game_state, window_history)
+
+        self.seq += 1
+        self._frame = Frame(StateSync(data=message["data"], seq=self.seq))
+        self._key = key
+        self._history[self.seq] = message["data"]
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+        self._deltas = {}
+        self.builds += 1
+        return self.seq
+
+    @property
+    def full_frame(self) -> Optional[Frame]:
+        """Último state_sync completo serializado (None antes do primeiro refresh)."""
+        return self._frame
+
+    def keepalive(self) -> Frame:
+        """Mensagem mínima para conexões já sincronizadas (uma por seq)."""
+        if self._keepalive is None or self._keepalive[0] != self.seq:
+            self._keepalive = (self.seq, Frame({
+                "type": "heartbeat",
+                "seq": self.seq,
+                "generation": self._key[0] if self._key else 0
+            }))
+        return self._keepalive[1]
+
+    def delta_frame(self, base_seq: int) -> Optional[Frame]:
+        """Delta serializado de base_seq até o seq atual (None se base fora do histórico)."""
+        cached = self._deltas.get(base_seq)
+        if cached is not None:
+            return cached
+        base = self._history.get(base_seq)
+        if base is None:
+            return None
+        changed, removed = diff_state(base, self._history[self.seq])
+        message: Dict[str, Any] = {
+            "type": "state_delta",
+            "seq": self.seq,
+            "base_seq": base_seq,
+            "changed": changed
+        }
+        if removed:
+            message["removed"] = removed
+        frame = Frame(message)
+        self._deltas[base_seq] = frame
+        return frame
+
+    # ========== POR CONEXÃO ==========
+
+    def render(self, conn: ConnectionInfo) -> Tuple[Frame, str, Optional[Callable[[], None]]]:
+        """
+        (mensagem, tipo no fan-out, on_sent) do heartbeat para uma conexão.
+
+        No modo full, on_sent marca o seq como sincronizado só quando o
+        fan-out envia o frame: se ele for descartado ou despejado da fila,
+        o próximo heartbeat manda o state_sync completo de novo.
+        """
+        seq = self.seq
+        message = self.message_for(conn)
+        is_keepalive = self._keepalive is not None and message is self._keepalive[1]
+        kind = KIND_HEARTBEAT if is_keepalive else KIND_STATE
+        on_sent = None
+        if kind == KIND_STATE and conn.sync_mode != SYNC_MODE_DELTA:
+            on_sent = partial(self.mark_synced, conn, seq)
+        return message, kind, on_sent
+
+    def message_for(self, conn: ConnectionInfo, now: Optional[float] = None) -> Frame:
+        """
+        Mensagem do heartbeat para uma conexão (chamar após refresh).
+        No modo full, quem envia chama mark_synced depois do envio.
+        """
+        seq = self.seq
+        if conn.sync_mode != SYNC_MODE_DELTA:
+            if conn.synced_seq == seq:
+                return self.keepalive()
+            return self._frame
+
+        if conn.acked_seq == seq:
+            return self.keepalive()
+        now = now if now is not None else time.monotonic()
+        if conn.inflight_seq is not None:
+            if now - conn.inflight_at < self.resend_timeout:
+                return self.keepalive()
+            self.resends += 1
+
+        frame = self.delta_frame(conn.acked_seq) if conn.acked_seq is not None else None
+        if frame is None:
+            frame = self._frame
+            self.fulls_sent += 1
+        else:
+            self.deltas_sent += 1
+        conn.inflight_seq = seq
+        conn.inflight_at = now
+        return frame
+
+    def mark_synced(self, conn: ConnectionInfo, seq: int) -> None:
+        """state_sync completo `seq` entregue ao socket (modo full)."""
+        conn.synced_seq = seq
+
+    def subscribe(self, conn: ConnectionInfo, mode: str) -> str:
+        """Define o modo da conexão (full/delta) e reinicia a sincronização."""
+        conn.sync_mode = SYNC_MODE_DELTA if mode == SYNC_MODE_DELTA else SYNC_MODE_FULL
+        self.resync(conn)
+        return conn.sync_mode
+
+    def ack(self, conn: ConnectionInfo, seq: int) -> bool:
+        """Registra state_ack. Retorna False se o seq é desconhecido/antigo."""
+        if not isinstance(seq, int) or seq not in self._history:
+            return False
+        if conn.acked_seq is not None and seq <= conn.acked_seq:
+            return False
+        conn.acked_seq = seq
+        if conn.inflight_seq is not None and seq >= conn.inflight_seq:
+            conn.inflight_seq = None
+        return True
+
+    def resync(self, conn: ConnectionInfo) -> None:
+        """Descarta o estado de sincronização: próximo envio é o state_sync completo."""
+        conn.synced_seq = None
+        conn.acked_seq = None
+        conn.inflight_seq = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do cache."""
+        return {
+            "key": self._key,
+            "seq": self.seq,
+            "builds": self.builds,
+            "hits": self.hits,
+            "deltas_sent": self.deltas_sent,
+            "fulls_sent": self.fulls_sent,
+            "resends": self.resends
+        }
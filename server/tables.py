@@ -0,0 +1,438 @@
+# Roleta Cloud - Registro de Mesas
+# Estado, estratégia, lock e sala de broadcast isolados por mesa_id
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import websockets
+from websockets.server import WebSocketServerProtocol
+
+from app_config.settings import settings
+from codec import send_message
+from database.service import DatabaseService, db_service
+from server.connection_manager import ConnectionManager, connection_manager
+from server.extractor_service import ExtractorService
+from server.message_handler import MessageHandler
+from server.message_router import RateLimiter
+from server.routing import DEFAULT_MESA_ID, UNSCOPED_MESSAGES, normalize_mesa_id
+from server.state_sync import StateSyncCache
+from state.game import GameState
+from state.journal import SpinJournal
+from state.snapshot import SnapshotService
+from strategies import EnsembleRunner, StrategyBase, create_strategy
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TableContext:
+    """Tudo que pertence a uma mesa: estado, persistência, banco e sala de broadcast."""
+    mesa_id: str
+    game_state: GameState
+    strategy: StrategyBase
+    state_lock: asyncio.Lock
+    journal: Optional[SpinJournal]
+    snapshotter: SnapshotService
+    db: DatabaseService
+    connections: ConnectionManager
+    state_sync: StateSyncCache
+    handler: MessageHandler
+    last_used: float = field(default_factory=time.monotonic)
+
+    def prepare(self) -> None:
+        """Pré-cálculos da estratégia e do ensemble (bloqueante: rodar fora do event loop)."""
+        self.strategy.prepare()
+        if self.handler.ensemble is not None:
+            self.handler.ensemble.prepare()
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    @property
+    def idle(self) -> bool:
+        """Sem conexões na sala?"""
+        return not self.connections.connections
+
+    async def close(self) -> None:
+        """Grava o estado pendente e fecha o journal (descarregamento)."""
+        await self.snapshotter.stop()
+        if self.journal is not None:
+            self.journal.close()
+
+    def flush_sync(self) -> None:
+        """Grava o estado no caller (shutdown)."""
+        self.snapshotter.flush_sync()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self.connections.connections),
+            "idle_s": round(time.monotonic() - self.last_used, 1),
+            "generation": self.game_state.generation,
+            "snapshot": self.snapshotter.stats()
+        }
+
+
+class TableRegistry:
+    """
+    Mesas carregadas sob demanda, chaveadas por mesa_id.
+
+    Cada mesa tem GameState, estratégia (STRATEGY_PRIMARY), state_lock, journal,
+    snapshotter, DatabaseService, StateSyncCache, MessageHandler e
+    ConnectionManager (sala de broadcast com MASTER/SLAVE próprios).
+    Nada é compartilhado entre mesas além do banco/escritor em lote e
+    do ExtractorService.
+
+    - A mesa padrão (DEFAULT_MESA_ID) usa state.json / spins.journal
+      legados e os singletons connection_manager / db_service; nunca é
+      descarregada.
+    - As demais ficam em settings.tables_dir/<mesa_id>/, são carregadas
+      em uma thread (checkpoint, replay do journal, banco e pré-cálculos
+      da estratégia) e descarregadas (estado gravado, journal fechado)
+      quando passam `idle_timeout` sem conexões, ou as menos usadas
+      quando há mais de `max_tables` carregadas.
+    """
+
+    def __init__(
+        self,
+        configs_path: str,
+        max_tables: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        tables_dir: Optional[Path] = None,
+        state_file: Optional[Path] = None,
+        journal_file: Optional[Path] = None
+    ):
+        cfg = settings.tables
+        self.max_tables = max(1, max_tables if max_tables is not None else cfg.max_tables)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else cfg.idle_timeout
+        self.tables_dir = Path(tables_dir or settings.tables_dir)
+        # Caminhos da mesa padrão (legados por padrão)
+        self.state_file = Path(state_file or settings.state_file)
+        self.journal_file = Path(journal_file or settings.journal_file)
+        self.configs_path = configs_path
+        self.extractor_service = ExtractorService(configs_path)
+        # Ordem LRU: mais recente no fim
+        self.tables: "OrderedDict[str, TableContext]" = OrderedDict()
+        # Mesas descarregadas ainda gravando (recarregar espera o fim)
+        self._closing: Dict[str, asyncio.Task] = {}
+        # Mesas sendo carregadas (conexões simultâneas esperam a mesma carga)
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self._warmup: Optional[asyncio.Future] = None
+        self._started = False
+
+        # Métricas
+        self.loaded = 0
+        self.evicted = 0
+
+        self.default = self._register(self._build(DEFAULT_MESA_ID))
+
+    # ========== CRIAÇÃO ==========
+
+    def paths(self, mesa_id: str) -> Tuple[Path, Path]:
+        """(state.json, journal) de uma mesa."""
+        if mesa_id == DEFAULT_MESA_ID:
+            return self.state_file, self.journal_file
+        table_dir = self.tables_dir / mesa_id
+        return table_dir / "state.json", table_dir / "spins.journal"
+
+    def _build(self, mesa_id: str) -> TableContext:
+        """
+        Monta a mesa sem registrá-la. Bloqueante (state.json, journal e
+        replay, banco): fora do construtor, roda em uma thread (_load).
+        """
+        state_path, journal_path = self.paths(mesa_id)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+
+        strategy = create_strategy(settings.strategy.primary)
+        ensemble = EnsembleRunner.from_settings()
+        journal: Optional[SpinJournal] = None
+        if settings.persistence.journal_enabled:
+            journal = SpinJournal(
+                journal_path,
+                compact_every=settings.persistence.journal_compact_every,
+                fsync=settings.persistence.journal_fsync
+            )
+        # Checkpoint (state.json) + replay da cauda do journal com a estratégia da mesa
+        game_state = GameState.load(state_path, journal, strategy, attach=[ensemble])
+
+        is_default = mesa_id == DEFAULT_MESA_ID
+        state_lock = asyncio.Lock()
+        snapshotter = SnapshotService(game_state, path=state_path, journal=journal)
+        db = db_service if is_default else DatabaseService(mesa_id)
+        connections = connection_manager if is_default else ConnectionManager()
+        state_sync = StateSyncCache(game_state, db)
+        handler = MessageHandler(
+            game_state, strategy, state_lock, self.configs_path,
+            snapshotter=snapshotter, journal=journal, state_sync=state_sync,
+            connections=connections, db=db,
+            extractor_service=self.extractor_service, mesa_id=mesa_id,
+            ensemble=ensemble
+        )
+        return TableContext(
+            mesa_id=mesa_id,
+            game_state=game_state,
+            strategy=strategy,
+            state_lock=state_lock,
+            journal=journal,
+            snapshotter=snapshotter,
+            db=db,
+            connections=connections,
+            state_sync=state_sync,
+            handler=handler
+        )
+
+    def _build_prepared(self, mesa_id: str) -> TableContext:
+        """_build + pré-cálculos da estratégia (thread do executor)."""
+        table = self._build(mesa_id)
+        try:
+            table.prepare()
+        except Exception as e:
+            logger.warning(f"[{mesa_id}] Pré-cálculo da estratégia falhou (fica para o primeiro spin): {e}")
+        return table
+
+    def _register(self, table: TableContext) -> TableContext:
+        self.tables[table.mesa_id] = table
+        self.loaded += 1
+        if self._started:
+            table.snapshotter.start()
+        if table.mesa_id != DEFAULT_MESA_ID:
+            logger.info(f"🎰 Mesa {table.mesa_id} carregada ({len(self.tables)} em memória)")
+        return table
+
+    async def _load(self, mesa_id: str) -> TableContext:
+        """
+        Carrega a mesa fora do event loop. Uma carga por mesa_id: quem
+        chega durante a carga espera o mesmo Future (shield: a conexão
+        que desistir não cancela a carga das outras).
+        """
+        loading = self._loading.get(mesa_id)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load_table(mesa_id))
+            self._loading[mesa_id] = loading
+            loading.add_done_callback(lambda _f: self._loading.pop(mesa_id, None))
+        return await asyncio.shield(loading)
+
+    async def _load_table(self, mesa_id: str) -> TableContext:
+        closing = self._closing.get(mesa_id)
+        if closing is not None:
+            await asyncio.wait({closing})
+        table = self.tables.get(mesa_id)
+        if table is None:
+            table = await asyncio.get_running_loop().run_in_executor(None, self._build_prepared, mesa_id)
+            self._register(table)
+        return table
+
+    async def acquire(self, mesa_id: Optional[str]) -> TableContext:
+        """Mesa pelo id (carrega se preciso). None -> mesa padrão."""
+        mesa_id = normalize_mesa_id(mesa_id) or DEFAULT_MESA_ID
+        table = self.tables.get(mesa_id)
+        if table is None:
+            table = await self._load(mesa_id)
+            self.tables.move_to_end(mesa_id)
+            self._enforce_limit(keep=table)
+        else:
+            self.tables.move_to_end(mesa_id)
+        table.touch()
+        return table
+
+    # ========== DESCARREGAMENTO ==========
+
+    def _evict(self, table: TableContext) -> None:
+        del self.tables[table.mesa_id]
+        self.evicted += 1
+        task = asyncio.get_running_loop().create_task(table.close())
+        self._closing[table.mesa_id] = task
+        task.add_done_callback(lambda _t, mesa_id=table.mesa_id: self._closing.pop(mesa_id, None))
+        logger.info(f"💤 Mesa {table.mesa_id} descarregada ({len(self.tables)} em memória)")
+
+    def _enforce_limit(self, keep: Optional[TableContext] = None) -> None:
+        """Descarrega as mesas ociosas menos usadas acima de max_tables."""
+        excess = len(self.tables) - self.max_tables
+        if excess <= 0:
+            return
+        for table in list(self.tables.values()):
+            if excess <= 0:
+                break
+            if table is self.default or table is keep or not table.idle:
+                continue
+            self._evict(table)
+            excess -= 1
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Descarrega mesas sem conexões há mais de idle_timeout. Retorna quantas."""
+        if self.idle_timeout <= 0:
+            return 0
+        now = now if now is not None else time.monotonic()
+        expired = [
+            t for t in self.tables.values()
+            if t is not self.default and t.idle and now - t.last_used >= self.idle_timeout
+        ]
+        for table in expired:
+            self._evict(table)
+        return len(expired)
+
+    async def _run_sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(settings.tables.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Erro na varredura de mesas: {e}")
+
+    # ========== ROTEAMENTO ==========
+
+    async def route(
+        self,
+        websocket: WebSocketServerProtocol,
+        data: Any,
+        table: TableContext,
+        conn_id: str
+    ) -> Tuple[TableContext, str]:
+        """
+        Mesa da mensagem: se traz mesa_id de outra mesa, a conexão muda de
+        sala (sai da atual, entra na nova com o mesmo device_id).
+        Retorna (mesa, conn_id na mesa). ValueError se mesa_id inválido.
+        """
+        if not isinstance(data, dict) or data.get("type") in UNSCOPED_MESSAGES:
+            return table, conn_id
+        mesa_id = normalize_mesa_id(data.get("mesa_id"))
+        if mesa_id is None or mesa_id == table.mesa_id:
+            return table, conn_id
+
+        target = await self.acquire(mesa_id)
+        info = table.connections.connections.get(conn_id)
+        device_id = info.device_id if info is not None and info.device_id != "unknown" else None
+        sync_mode = info.sync_mode if info is not None else "full"
+
+        await table.connections.disconnect(conn_id)
+        table.touch()
+        new_id = await target.connections.connect(websocket, device_id)
+        new_info = target.connections.connections.get(new_id)
+        if new_info is not None:
+            new_info.sync_mode = sync_mode
+        await send_message(websocket, {
+            "type": "mesa_ativa",
+            "mesa_id": mesa_id,
+            "connection_id": new_id
+        })
+        logger.info(f"🔀 {conn_id} mudou de mesa: {table.mesa_id} -> {mesa_id} (ID: {new_id})")
+        return target, new_id
+
+    async def serve(
+        self,
+        websocket: WebSocketServerProtocol,
+        mesa_id: Optional[str] = None,
+        device_id: Optional[str] = None,
+        rate_limit: Optional[bool] = None,
+        announce: bool = False
+    ) -> None:
+        """
+        Loop de mensagens de uma conexão (já autenticada).
+
+        A conexão entra na mesa `mesa_id` (padrão se None); mensagens com
+        mesa_id de outra mesa a movem de sala (ver route). Rate limit por
+        conexão (RATE_LIMIT_*); rate_limit=False quando a borda já limita
+        (worker do modo sharded). announce=True envia mesa_ativa logo após
+        entrar, como route faz na troca de sala (conexão que veio de
+        outro worker).
+        """
+        client_ip = websocket.remote_address[0] if websocket.remote_address else "unknown"
+        table = await self.acquire(mesa_id)
+        conn_id = await table.connections.connect(websocket, device_id)
+        if announce:
+            await send_message(websocket, {
+                "type": "mesa_ativa",
+                "mesa_id": table.mesa_id,
+                "connection_id": conn_id
+            })
+        limiter = RateLimiter(enabled=rate_limit)
+
+        try:
+            async for message in websocket:
+                # Excedente do rate limit sai antes do decode; frame inválido vai cru (o handler responde o erro)
+                allowed, data = await limiter.screen(websocket, message, invalid=message)
+                if not allowed:
+                    continue
+
+                # Rotear pela mesa (troca de sala se mesa_id mudou)
+                try:
+                    table, conn_id = await self.route(websocket, data, table, conn_id)
+                except ValueError as e:
+                    await send_message(websocket, {
+                        "type": "error",
+                        "message": str(e),
+                        "code": "INVALID_MESA"
+                    })
+                    continue
+
+                # Atualizar last_activity
+                table.touch()
+                table.connections.update_activity(conn_id)
+                # Processar mensagem com o handler da mesa
+                await table.handler.process_message(websocket, data, conn_id)
+        except websockets.ConnectionClosed:
+            logger.info(f"Conexão fechada de {client_ip} (ID: {conn_id})")
+        finally:
+            await table.connections.disconnect(conn_id)
+            table.touch()
+
+    async def heartbeat(self) -> None:
+        """
+        Um tick do heartbeat: state_sync/delta/keep-alive das mesas com
+        conexões (ociosas não custam nada).
+        """
+        for table in self.active():
+            try:
+                await table.state_sync.refresh(table.state_lock)
+                await table.connections.broadcast_state(table.state_sync.render)
+            except Exception as e:
+                logger.error(f"[{table.mesa_id}] Erro no heartbeat: {e}")
+
+    # ========== CICLO DE VIDA ==========
+
+    def start(self) -> None:
+        """
+        Inicia snapshotters e a varredura de ociosas no event loop atual.
+        Os pré-cálculos das estratégias (ex: tabela SDA17) rodam em uma
+        thread; as tabelas ficam em cache no processo para as demais mesas.
+        """
+        self._started = True
+        for table in self.tables.values():
+            table.snapshotter.start()
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._run_sweeper())
+        if self._warmup is None:
+            self._warmup = asyncio.get_running_loop().run_in_executor(None, self.default.prepare)
+            self._warmup.add_done_callback(self._warmup_done)
+
+    @staticmethod
+    def _warmup_done(future: asyncio.Future) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"Pré-cálculo das estratégias falhou (fica para o primeiro spin): {error}")
+
+    def active(self) -> List[TableContext]:
+        """Mesas com conexões (alvo do heartbeat)."""
+        return [t for t in self.tables.values() if not t.idle]
+
+    def flush_sync(self) -> None:
+        """Grava o estado de todas as mesas carregadas (shutdown)."""
+        for table in list(self.tables.values()):
+            try:
+                table.flush_sync()
+            except Exception as e:
+                logger.error(f"[{table.mesa_id}] Erro ao gravar estado: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": len(self.tables),
+            "max_tables": self.max_tables,
+            "total_loaded": self.loaded,
+            "evicted": self.evicted,
+            "tables": {mesa_id: t.stats() for mesa_id, t in self.tables.items()}
+        }
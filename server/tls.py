@@ -0,0 +1,28 @@
+# Roleta Cloud - Contexto TLS do servidor WebSocket
+
+import logging
+import ssl
+from pathlib import Path
+from typing import Optional
+
+from app_config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_ssl_context() -> Optional[ssl.SSLContext]:
+    """Cria contexto SSL se habilitado."""
+    if not settings.server.ssl_enabled:
+        return None
+    
+    cert_path = Path(settings.server.ssl_cert)
+    key_path = Path(settings.server.ssl_key)
+    
+    if not cert_path.exists() or not key_path.exists():
+        logger.warning("Certificados SSL não encontrados. Iniciando sem SSL.")
+        return None
+    
+    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ssl_context.load_cert_chain(cert_path, key_path)
+    logger.info("SSL habilitado")
+    return ssl_context
@@ -1,11 +1,8 @@
 # Roleta Cloud - WebSocket Server
 
 import asyncio
-import json
 import logging
-import ssl
 import os
-from pathlib import Path
 from typing import Optional
 
 import websockets
@@ -13,12 +10,14 @@ from websockets.server import WebSocketServerProtocol
 
 from app_config.settings import settings
 from auth.middleware import verify_auth
-from database.service import db_service
-from models.trace import now_ms
-from server.connection_manager import connection_manager
-from server.message_handler import MessageHandler
+from codec import serve_options
+from metrics import start_exporter
+from metrics.instruments import track_tables
+from server.compression import serve_options as compression_options
+from server.tables import TableRegistry
+from server.tls import get_ssl_context
 from state.game import GameState
-from strategies.sda17 import SDA17Strategy
+from state.journal import SpinJournal
 
 # Logging
 logging.basicConfig(
@@ -31,63 +30,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Estado global
-state_lock = asyncio.Lock()
-game_state: GameState = GameState.load()
-strategy = SDA17Strategy()  # SDA-17 com regressão linear
+# Mesas (estado, lock, estratégia e sala de broadcast por mesa_id)
 configs_path = os.path.join(os.path.dirname(__file__), "configs")
-message_handler = MessageHandler(game_state, strategy, state_lock, configs_path)
+tables = TableRegistry(configs_path)
+
+# Mesa padrão: conexões sem mesa_id (aliases mantidos por compatibilidade)
+default_table = tables.default
+state_lock = default_table.state_lock
+game_state: GameState = default_table.game_state
+journal: Optional[SpinJournal] = default_table.journal
+snapshotter = default_table.snapshotter  # Persistência write-behind do state.json
+strategy = default_table.strategy  # SDA-17 com regressão linear
+state_sync = default_table.state_sync  # state_sync serializado por geração
+message_handler = default_table.handler
 
 
 async def broadcast_heartbeat():
-    """Envia estado atual para todos os clientes a cada 1 segundo."""
+    """
+    Envia estado atual para todos os clientes a cada 1 segundo.
+    
+    O state_sync só é remontado quando o estado muda (StateSyncCache);
+    conexões já sincronizadas recebem apenas um keep-alive e conexões
+    em modo delta recebem só os campos alterados.
+    """
     while True:
         await asyncio.sleep(1)
-        
-        if not connection_manager.active_connections_set:
-            continue
-        
-        try:
-            # Obter histórico de janelas FORA do lock (I/O não deve bloquear)
-            window_history = db_service.get_window_history()
-            
-            # Snapshot do estado com lock para evitar race condition
-            async with state_lock:
-                # Martingale da direção ALVO (próxima aposta)
-                mg = game_state.target_martingale
-                
-                # Verificar se a última predição foi uma aposta real
-                last_bet_placed = game_state.pending_prediction.get("bet_placed", False)
-                
-                state_sync = {
-                    "type": "state_sync",
-                    "data": {
-                        "gale_level": mg.level,
-                        "gale_display": mg.gale_display,
-                        "martingale": mg.multiplier,
-                        "aposta": mg.current_bet,
-                        "last_number": game_state.last_number,
-                        "target_direction": game_state.target_direction,
-                        "performance": game_state.get_performance_stats(),
-                        # Ambos Martingales para dashboard
-                        "martingale_cw": game_state.martingale_cw.to_dict(),
-                        "martingale_ccw": game_state.martingale_ccw.to_dict(),
-                        "pending_prediction": game_state.pending_prediction,
-                        # Histórico de janelas para visualização
-                        "window_history": window_history,
-                        # Flag para overlay saber se deve sincronizar Gale
-                        "bet_placed": last_bet_placed,
-                        "timestamp": now_ms()
-                    }
-                }
-            
-            message = json.dumps(state_sync)
-            
-            # Broadcast para todas as conexões
-            await connection_manager.broadcast(message)
-                
-        except Exception as e:
-            logger.error(f"Erro no heartbeat: {e}")
+        await tables.heartbeat()
 
 
 async def handler(websocket: WebSocketServerProtocol, path: str = "") -> None:
@@ -98,6 +66,9 @@ async def handler(websocket: WebSocketServerProtocol, path: str = "") -> None:
     - Nova conexão SEMPRE vira MASTER
     - MASTER anterior vira SLAVE
     - Se MASTER desconectar, último SLAVE é promovido após grace period
+    
+    Mesas: a conexão começa na mesa padrão; uma mensagem com `mesa_id`
+    de outra mesa a move para a sala dessa mesa (roles por mesa).
     """
     client_ip = websocket.remote_address[0] if websocket.remote_address else "unknown"
     
@@ -107,37 +78,8 @@ async def handler(websocket: WebSocketServerProtocol, path: str = "") -> None:
         await websocket.close(4001, "Unauthorized")
         return
     
-    # Registrar conexão e atribuir role
-    conn_id = await connection_manager.connect(websocket)
-    
-    try:
-        async for message in websocket:
-            # Atualizar last_activity
-            connection_manager.update_activity(conn_id)
-            # Processar mensagem com o handler dedicado
-            await message_handler.process_message(websocket, message, conn_id)
-    except websockets.ConnectionClosed:
-        logger.info(f"Conexão fechada de {client_ip} (ID: {conn_id})")
-    finally:
-        await connection_manager.disconnect(conn_id)
-
-
-def get_ssl_context() -> Optional[ssl.SSLContext]:
-    """Cria contexto SSL se habilitado."""
-    if not settings.server.ssl_enabled:
-        return None
-    
-    cert_path = Path(settings.server.ssl_cert)
-    key_path = Path(settings.server.ssl_key)
-    
-    if not cert_path.exists() or not key_path.exists():
-        logger.warning("Certificados SSL não encontrados. Iniciando sem SSL.")
-        return None
-    
-    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-    ssl_context.load_cert_chain(cert_path, key_path)
-    logger.info("SSL habilitado")
-    return ssl_context
+    # Registrar conexão (mesa padrão), atribuir role e processar mensagens
+    await tables.serve(websocket)
 
 
 async def start_server() -> None:
@@ -150,15 +92,25 @@ async def start_server() -> None:
     logger.info(f"Timeline CW: {game_state.timeline_cw.size} forças")
     logger.info(f"Timeline CCW: {game_state.timeline_ccw.size} forças")
     
+    # Iniciar write-behind do estado e varredura de mesas ociosas
+    tables.start()
+    logger.info(f"Mesas: até {tables.max_tables} em memória, ociosas descarregadas após {tables.idle_timeout}s")
+    
     # Iniciar heartbeat task
     asyncio.create_task(broadcast_heartbeat())
     logger.info("Heartbeat broadcast iniciado (intervalo: 1s)")
+
+    # Endpoint /metrics ao lado da porta WebSocket
+    track_tables(tables)
+    await start_exporter()
     
     async with websockets.serve(
         handler,
         settings.server.host,
         settings.server.port,
         ssl=ssl_context,
+        **serve_options(),
+        **compression_options(),
         ping_interval=20,
         ping_timeout=60
     ):
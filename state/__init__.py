@@ -1,12 +1,22 @@
 # Roleta Cloud - State Package
 
-from .timeline import Timeline
+from .ring_buffer import ForceRing
+from .timeline import Timeline, TimelineSnapshot
+from .hit_history import HitHistory
 from .game import GameState
 from .bet_advisor import TripleRateAdvisor, BetAdvice
+from .journal import SpinJournal, JournalRecord
+from .snapshot import SnapshotService
 
 __all__ = [
+    "ForceRing",
     "Timeline",
+    "TimelineSnapshot",
+    "HitHistory",
     "GameState",
     "TripleRateAdvisor",
     "BetAdvice",
+    "SpinJournal",
+    "JournalRecord",
+    "SnapshotService",
 ]
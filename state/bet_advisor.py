@@ -2,7 +2,13 @@
 # Sistema de aconselhamento de apostas baseado em análise de tendência multi-timeframe
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Optional, Sequence, Tuple, Union
+
+from app_config.settings import settings
+from .hit_history import HitHistory
+
+# Histórico aceito pelo advisor: HitHistory (O(1)) ou lista legada
+Performance = Union[HitHistory, Sequence[bool]]
 
 
 @dataclass
@@ -49,17 +55,32 @@ class TripleRateAdvisor:
     """
     
     MIN_DATA = 2  # Reduzido de 4 para início mais rápido
+    WINDOWS = (4, 6, 12)  # Janelas C4 / M6 / L12 (padrão)
+    COLD_THRESHOLD = 0.25  # Taxa curta abaixo disso = cold streak (padrão)
     
-    def __init__(self):
-        """Inicializa o advisor."""
-        pass
+    def __init__(
+        self,
+        windows: Optional[Sequence[int]] = None,
+        cold_threshold: Optional[float] = None
+    ):
+        """
+        Args:
+            windows: Janelas (curta, média, longa). Padrão: settings.strategy
+            cold_threshold: Limite de cold streak. Padrão: settings.strategy
+        """
+        config = settings.strategy
+        windows = tuple(windows if windows is not None else config.triple_rate_windows)
+        if len(windows) != 3:
+            raise ValueError(f"Triple Rate precisa de 3 janelas, recebeu {windows}")
+        self.windows: Tuple[int, int, int] = windows
+        self.cold_threshold = cold_threshold if cold_threshold is not None else config.triple_rate_cold_threshold
     
-    def analyze(self, performance: List[bool]) -> BetAdvice:
+    def analyze(self, performance: Performance) -> BetAdvice:
         """
         Analisa performance histórica e retorna recomendação.
         
         Args:
-            performance: Lista de resultados (True=acertou, False=errou)
+            performance: HitHistory ou lista de resultados (True=acertou, False=errou)
                          Índice 0 = mais recente
         
         Returns:
@@ -77,12 +98,13 @@ class TripleRateAdvisor:
             )
         
         # Calcular taxas por janela temporal
-        c4 = self._calculate_rate(performance, 4)
-        m6 = self._calculate_rate(performance, 6)
-        l12 = self._calculate_rate(performance, 12)
+        short, medium, long_ = self.windows
+        c4 = self._calculate_rate(performance, short)
+        m6 = self._calculate_rate(performance, medium)
+        l12 = self._calculate_rate(performance, long_)
         
         # Verificação de taxa mínima (cold streak protection)
-        if c4 < 0.25:
+        if c4 < self.cold_threshold:
             return BetAdvice(
                 should_bet=False,
                 confidence="baixa",
@@ -124,17 +146,20 @@ class TripleRateAdvisor:
                 l12_rate=l12
             )
     
-    def _calculate_rate(self, performance: List[bool], window: int) -> float:
+    def _calculate_rate(self, performance: Performance, window: int) -> float:
         """
         Calcula taxa de acerto para uma janela específica.
         
         Args:
-            performance: Lista de resultados
-            window: Tamanho da janela (4, 6, ou 12)
+            performance: HitHistory (contadores O(1)) ou lista de resultados
+            window: Tamanho da janela (ex: 4, 6 ou 12)
         
         Returns:
             Taxa de acerto (0.0 a 1.0)
         """
+        if isinstance(performance, HitHistory):
+            return performance.rate(window)
+        
         if len(performance) < window:
             # Se não tem dados suficientes, usa o que tem
             if len(performance) == 0:
@@ -145,18 +170,32 @@ class TripleRateAdvisor:
         window_data = performance[:window]
         return sum(window_data) / len(window_data)
     
-    def get_stats(self, performance: List[bool]) -> dict:
+    def get_stats(self, performance: Performance) -> dict:
         """
         Retorna estatísticas detalhadas para debug/dashboard.
         
         Args:
-            performance: Lista de resultados
+            performance: HitHistory ou lista de resultados
             
         Returns:
             Dicionário com estatísticas
         """
         advice = self.analyze(performance)
         
+        if isinstance(performance, HitHistory):
+            streak_type = performance[0] if performance else None
+            total = len(performance)
+            return {
+                "advice": advice.to_dict(),
+                "stats": {
+                    "total_results": total,
+                    "total_hits": performance.hits,
+                    "overall_rate": performance.hits / total if total else 0,
+                    "current_streak": performance.streak(),
+                    "streak_type": "hit" if streak_type else "miss" if streak_type is not None else None
+                }
+            }
+        
         # Streak atual
         streak = 0
         streak_type = performance[0] if performance else None
@@ -0,0 +1,42 @@
+# Roleta Cloud - Extensões do Estado do Jogo
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+
+class StateExtension(ABC):
+    """
+    Estado extra mantido junto do GameState (ex: filtros de uma estratégia).
+
+    Registrada com GameState.attach_extension: recebe cada força em
+    on_spin (dentro de process_spin, inclusive no replay do journal),
+    é zerada junto com as timelines (reset) e gravada no state.json em
+    "extensions"[name]. Tudo roda no event loop: on_spin deve ser O(1)
+    e to_dict deve devolver cópias (o snapshot é serializado em outra
+    thread).
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def on_spin(self, direction: str, force: int) -> None:
+        """Nova força na timeline `direction` ("cw" ou "ccw")."""
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Timelines zeradas (nova sessão ou correção de histórico)."""
+
+    @abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot serializável em JSON."""
+
+    @abstractmethod
+    def load(self, data: Dict[str, Any]) -> None:
+        """Restaura um snapshot de to_dict (dados inválidos: ignorar e manter o estado inicial)."""
+
+    def freeze(self, direction: str) -> Any:
+        """
+        Valor imutável da direção para estratégias que rodam fora do event
+        loop (ver strategies.ensemble.snapshot). Padrão: None.
+        """
+        return None
@@ -1,14 +1,43 @@
 # Roleta Cloud - Estado do Jogo
 
 import json
+import logging
 from dataclasses import dataclass, field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence, Tuple
 from pathlib import Path
 
 from app_config.settings import settings
+from core.roulette import CompiledWheel, compile_wheel
 from .timeline import Timeline
+from .hit_history import HitHistory
 from .bet_advisor import TripleRateAdvisor, BetAdvice
+from .journal import SpinJournal, RECORD_SPIN, RECORD_CLEAR, RECORD_RESET
+from .extensions import StateExtension
 
+logger = logging.getLogger(__name__)
+
+
+def history_capacity(windows: Optional[Sequence[int]] = None) -> int:
+    """
+    Resultados mantidos por histórico: performance_history_size, ampliado
+    até a maior janela do Triple Rate (senão a janela longa seria cortada
+    no tamanho do histórico).
+    """
+    windows = settings.strategy.triple_rate_windows if windows is None else windows
+    return max(settings.game.performance_history_size, *windows)
+
+
+def new_hit_history(
+    results: Optional[List[bool]] = None,
+    windows: Optional[Sequence[int]] = None
+) -> HitHistory:
+    """Cria histórico de acertos com contadores para as janelas do Triple Rate."""
+    windows = settings.strategy.triple_rate_windows if windows is None else windows
+    return HitHistory(
+        capacity=history_capacity(windows),
+        windows=windows,
+        results=results or ()
+    )
 
 
 @dataclass
@@ -133,12 +162,12 @@ class GameState:
     timeline_ccw: Timeline = field(default_factory=lambda: Timeline("ccw"))
     
     # Performance SDA17 - SEMPRE que SDA17 recomenda (base para Triple Rate)
-    performance_sda17_cw: List[bool] = field(default_factory=list)
-    performance_sda17_ccw: List[bool] = field(default_factory=list)
+    performance_sda17_cw: HitHistory = field(default_factory=new_hit_history)
+    performance_sda17_ccw: HitHistory = field(default_factory=new_hit_history)
     
     # Performance Apostas - APENAS quando realmente aposta (base para Martingale)
-    performance_bet_cw: List[bool] = field(default_factory=list)
-    performance_bet_ccw: List[bool] = field(default_factory=list)
+    performance_bet_cw: HitHistory = field(default_factory=new_hit_history)
+    performance_bet_ccw: HitHistory = field(default_factory=new_hit_history)
     
     # Calibração removida (momentum desabilitado)
     
@@ -153,7 +182,48 @@ class GameState:
     # Triple Rate Advisor
     bet_advisor: TripleRateAdvisor = field(default_factory=TripleRateAdvisor)
     
-    def reset_session(self, keep_last_number: bool = False) -> Dict[str, Any]:
+    # Último registro do journal refletido neste estado (checkpoint)
+    journal_seq: int = 0
+    
+    # Extensões registradas (attach_extension): recebem cada força e vão
+    # para o state.json em "extensions". extension_data guarda o que foi
+    # carregado de extensões ainda não registradas (preservado ao salvar).
+    extensions: Dict[str, StateExtension] = field(default_factory=dict, compare=False, repr=False)
+    extension_data: Dict[str, Any] = field(default_factory=dict, repr=False)
+    
+    # Contador de mudanças (não persistido): todo mutador chama touch().
+    # Permite reaproveitar o state_sync serializado enquanto nada mudou.
+    generation: int = field(default=0, compare=False)
+    
+    # Tabelas da roda (settings.game.wheel_sequence), resolvidas uma vez por estado
+    wheel: CompiledWheel = field(
+        default_factory=lambda: compile_wheel(settings.game.wheel_sequence),
+        init=False, repr=False, compare=False
+    )
+    
+    def touch(self) -> int:
+        """Marca o estado como alterado. Retorna a nova geração."""
+        self.generation += 1
+        return self.generation
+    
+    def attach_extension(self, extension: StateExtension) -> StateExtension:
+        """
+        Registra uma extensão e restaura seu snapshot (se o state.json tinha).
+        
+        Se já existe uma com o mesmo nome, ela é mantida e devolvida: quem
+        registra deve usar o retorno (ex: duas instâncias da mesma estratégia
+        compartilham o filtro).
+        """
+        existing = self.extensions.get(extension.name)
+        if existing is not None:
+            return existing
+        data = self.extension_data.pop(extension.name, None)
+        if data is not None:
+            extension.load(data)
+        self.extensions[extension.name] = extension
+        return extension
+    
+    def reset_session(self, keep_last_number: bool = False, save: bool = True) -> Dict[str, Any]:
         """
         Reseta estado para nova sessão/dealer.
         
@@ -164,6 +234,8 @@ class GameState:
         
         Args:
             keep_last_number: Se True, mantém last_number para continuidade
+            save: Se True, grava o estado limpo imediatamente (False quando
+                  o chamador força o flush pelo SnapshotService)
         
         Returns:
             Dict com informações do reset
@@ -181,13 +253,14 @@ class GameState:
         self.timeline_cw = Timeline("cw")
         self.timeline_ccw = Timeline("ccw")
         
-        # Reset Performance SDA17
-        self.performance_sda17_cw = []
-        self.performance_sda17_ccw = []
+        # Reset Performance SDA17 (janelas do advisor desta mesa)
+        windows = self.bet_advisor.windows
+        self.performance_sda17_cw = new_hit_history(windows=windows)
+        self.performance_sda17_ccw = new_hit_history(windows=windows)
         
         # Reset Performance Apostas
-        self.performance_bet_cw = []
-        self.performance_bet_ccw = []
+        self.performance_bet_cw = new_hit_history(windows=windows)
+        self.performance_bet_ccw = new_hit_history(windows=windows)
         
         # Calibração removida (momentum desabilitado)
         
@@ -198,13 +271,21 @@ class GameState:
         # Reset Prediction pendente
         self.pending_prediction = {}
         
+        # Reset das extensões (acompanham as timelines)
+        for extension in self.extensions.values():
+            extension.reset()
+        self.extension_data.clear()
+        
         # Reset último número (opcional)
         if not keep_last_number:
             self.last_number = 0
             self.last_direction = ""
         
+        self.touch()
+        
         # Salvar estado limpo
-        self.save()
+        if save:
+            self.save()
         
         return {"reset": True, "old_state": old_state}
     
@@ -225,13 +306,19 @@ class GameState:
             # Adiciona à timeline correta
             if direcao == "horario":
                 self.timeline_cw.add(force)
+                timeline = "cw"
             else:
                 self.timeline_ccw.add(force)
+                timeline = "ccw"
+            
+            for extension in self.extensions.values():
+                extension.on_spin(timeline, force)
         
         # Atualiza último spin
         self.last_number = numero
         self.last_direction = direcao
         
+        self.touch()
         return force
     
     def check_prediction(self, actual_number: int) -> Optional[bool]:
@@ -260,32 +347,112 @@ class GameState:
         
         # SEMPRE adicionar ao histórico SDA17 (base para Triple Rate)
         if direction in ("cw", "horario"):
-            self.performance_sda17_cw.insert(0, hit)
-            if len(self.performance_sda17_cw) > 12:
-                self.performance_sda17_cw.pop()
+            self.performance_sda17_cw.record(hit)
         else:
-            self.performance_sda17_ccw.insert(0, hit)
-            if len(self.performance_sda17_ccw) > 12:
-                self.performance_sda17_ccw.pop()
+            self.performance_sda17_ccw.record(hit)
         
         # APENAS adicionar ao histórico BET se realmente apostou
         if bet_placed:
             if direction in ("cw", "horario"):
-                self.performance_bet_cw.insert(0, hit)
-                if len(self.performance_bet_cw) > 12:
-                    self.performance_bet_cw.pop()
+                self.performance_bet_cw.record(hit)
             else:
-                self.performance_bet_ccw.insert(0, hit)
-                if len(self.performance_bet_ccw) > 12:
-                    self.performance_bet_ccw.pop()
+                self.performance_bet_ccw.record(hit)
         
         # Limpar predição pendente
         self.pending_prediction = {}
         
+        self.touch()
         return hit
     
+    def settle_prediction(self, actual_number: int) -> Tuple[Dict[str, Any], Optional[bool], Dict[str, Any]]:
+        """
+        Resolve a predição pendente com o número sorteado: performance
+        (check_prediction) e, se apostou, o Martingale da direção apostada.
+        
+        Returns:
+            (predição verificada, hit ou None, info do Martingale ou {})
+        """
+        pending = self.pending_prediction
+        hit = self.check_prediction(actual_number)
+        martingale_info: Dict[str, Any] = {}
+        if pending and hit is not None and pending.get("bet_placed", False):
+            martingale_info = self.update_martingale(pending.get("direction", ""), hit)
+        return pending, hit, martingale_info
+    
     # _circular_diff e _update_calibration removidos (momentum desabilitado)
     
+    def update_martingale(self, direction: str, hit: bool) -> Dict[str, Any]:
+        """
+        Atualiza o Martingale da direção apostada (ver MartingaleState.update).
+        
+        Args:
+            direction: Direção da aposta ("cw"/"horario" ou "ccw"/"anti-horario")
+            hit: Resultado da aposta
+        """
+        if direction in ("cw", "horario"):
+            info = self.martingale_cw.update(hit)
+        else:
+            info = self.martingale_ccw.update(hit)
+        self.touch()
+        return info
+    
+    def clear_history(self) -> None:
+        """Zera timelines e último spin (correção de histórico)."""
+        self.timeline_cw.clear()
+        self.timeline_ccw.clear()
+        for extension in self.extensions.values():
+            extension.reset()
+        self.extension_data.clear()
+        self.last_number = 0
+        self.last_direction = ""
+        self.touch()
+    
+    def apply_result(self, numero: int, direcao: str, strategy: Any) -> Tuple[int, str]:
+        """
+        Transições de estado de um novo_resultado, na ordem do
+        MessageHandler.handle_new_result: settle_prediction -> process_spin
+        -> strategy.analyze -> decide. Usado no replay do journal.
+        
+        Returns:
+            (força, ação)
+        """
+        self.settle_prediction(numero)
+        force = self.process_spin(numero, direcao)
+        result = strategy.analyze(self.target_timeline, self.last_number, settings.game.wheel_sequence)
+        acao, _reason, _advice = self.decide(result)
+        return force, acao
+    
+    def replay_journal(self, journal: SpinJournal, strategy: Any = None) -> int:
+        """
+        Reaplica os registros do journal posteriores ao checkpoint (journal_seq).
+        
+        Spins de novo_resultado (FLAG_RESULT) passam por apply_result com a
+        estratégia da mesa: performance, Martingale e predição pendente
+        ficam como no processamento ao vivo. Os demais spins (histórico,
+        correção, legado) só alimentam as timelines, como ao vivo.
+        
+        Returns:
+            Quantidade de registros reaplicados
+        """
+        replayed = 0
+        for record in journal.records(after_seq=self.journal_seq):
+            if record.kind == RECORD_SPIN:
+                if record.is_result:
+                    if strategy is None:
+                        raise ValueError("Replay de novo_resultado exige a estratégia da mesa")
+                    self.apply_result(record.numero, record.direcao, strategy)
+                else:
+                    self.process_spin(record.numero, record.direcao)
+            elif record.kind == RECORD_CLEAR:
+                self.clear_history()
+            elif record.kind == RECORD_RESET:
+                self.reset_session(keep_last_number=bool(record.numero), save=False)
+            self.journal_seq = record.seq
+            replayed += 1
+        
+        journal.align(self.journal_seq)
+        return replayed
+    
     def store_prediction(self, numbers: List[int], direction: str, center: int, 
                          predicted_force: int = 0, bet_placed: bool = False,
                          tr_confidence: str = "", tr_reason: str = "", sda_score: int = 0) -> None:
@@ -308,6 +475,35 @@ class GameState:
             "tr_reason": tr_reason,
             "sda_score": sda_score
         }
+        self.touch()
+    
+    def decide(self, result: Any) -> Tuple[str, str, BetAdvice]:
+        """
+        Decisão combinada sobre o StrategyResult da rodada: o Triple Rate
+        pode VETAR. Toda recomendação da estratégia vira predição pendente
+        (base do Triple Rate); bet_placed só se o Triple Rate aprovou.
+        
+        Returns:
+            (ação "APOSTAR"/"PULAR", motivo, BetAdvice)
+        """
+        advice = self.get_bet_advice()
+        if not result.should_bet:
+            # Sem recomendação: não há predição para verificar
+            return "PULAR", "SDA17 não recomendou (forças insuficientes)", advice
+        
+        self.store_prediction(
+            result.numbers,
+            self.target_direction,
+            result.center,
+            predicted_force=result.details.get("predicted_force", 0),
+            bet_placed=advice.should_bet,
+            tr_confidence=advice.confidence,
+            tr_reason=advice.reason,
+            sda_score=result.score
+        )
+        if advice.should_bet:
+            return "APOSTAR", f"SDA17 + Triple Rate aprovaram ({advice.confidence})", advice
+        return "PULAR", f"Triple Rate vetou: {advice.reason}", advice
     
     def get_performance_stats(self) -> Dict[str, Any]:
         """
@@ -316,11 +512,11 @@ class GameState:
         - performance_sda17: base para Triple Rate (todas recomendações SDA17)
         - performance_bet: base para Martingale (apenas apostas reais)
         """
-        def calc_stats(perf_list: List[bool]) -> Dict:
-            hits = sum(perf_list) if perf_list else 0
-            total = len(perf_list)
+        def calc_stats(history: HitHistory) -> Dict:
+            hits = history.hits
+            total = len(history)
             return {
-                "results": perf_list,
+                "results": history.to_list(),
                 "hits": hits,
                 "total": total,
                 "rate": round(hits / total * 100) if total else 0
@@ -340,23 +536,10 @@ class GameState:
         }
     
     def _calculate_force(self, from_num: int, to_num: int, direction: str) -> int:
-        """Calcula a distância (força) entre dois números."""
+        """Calcula a distância (força) entre dois números (tabela pré-calculada)."""
         try:
-            from_pos = settings.game.wheel_sequence.index(from_num)
-            to_pos = settings.game.wheel_sequence.index(to_num)
-            wheel_size = len(settings.game.wheel_sequence)
-            
-            if direction == "horario":
-                force = (to_pos - from_pos) % wheel_size
-            else:
-                force = (from_pos - to_pos) % wheel_size
-            
-            # Força 0 significa volta completa
-            if force == 0 and from_num != to_num:
-                force = wheel_size
-            
-            return force
-        except ValueError:
+            return self.wheel.force(from_num, to_num, "horario" if direction == "horario" else "anti-horario")
+        except (ValueError, TypeError):
             return 0
     
     @property
@@ -376,7 +559,7 @@ class GameState:
     # target_calibration removido (momentum desabilitado)
     
     @property
-    def target_performance(self) -> List[bool]:
+    def target_performance(self) -> HitHistory:
         """
         Retorna performance SDA17 da direção ALVO (oposta à última).
         Usado pelo Triple Rate Advisor para analisar tendência.
@@ -405,26 +588,40 @@ class GameState:
         """
         return self.bet_advisor.analyze(self.target_performance)
     
-    def save(self, path: Optional[Path] = None) -> None:
-        """Salva estado em arquivo JSON (v1.5 - sem calibração) com escrita atômica."""
-        import os
-        import tempfile
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Snapshot serializável do estado (v1.6 - extensões em "extensions").
         
-        path = path or settings.state_file
-        data = {
-            "version": "1.5.0",
+        Todas as listas/dicts são cópias: o snapshot pode ser serializado
+        em outra thread enquanto o estado continua mudando.
+        """
+        return {
+            "version": "1.6.0",
             "last_number": self.last_number,
             "last_direction": self.last_direction,
             "timeline_cw": self.timeline_cw.to_dict(),
             "timeline_ccw": self.timeline_ccw.to_dict(),
-            "performance_sda17_cw": self.performance_sda17_cw,
-            "performance_sda17_ccw": self.performance_sda17_ccw,
-            "performance_bet_cw": self.performance_bet_cw,
-            "performance_bet_ccw": self.performance_bet_ccw,
+            "performance_sda17_cw": self.performance_sda17_cw.to_list(),
+            "performance_sda17_ccw": self.performance_sda17_ccw.to_list(),
+            "performance_bet_cw": self.performance_bet_cw.to_list(),
+            "performance_bet_ccw": self.performance_bet_ccw.to_list(),
             "martingale_cw": self.martingale_cw.to_dict(),
             "martingale_ccw": self.martingale_ccw.to_dict(),
-            "pending_prediction": self.pending_prediction
+            "pending_prediction": dict(self.pending_prediction),
+            "journal_seq": self.journal_seq,
+            "extensions": {
+                **self.extension_data,
+                **{name: extension.to_dict() for name, extension in self.extensions.items()}
+            }
         }
+    
+    @staticmethod
+    def write_snapshot(data: Dict[str, Any], path: Optional[Path] = None) -> None:
+        """Grava um snapshot (ver to_dict) em arquivo JSON com escrita atômica."""
+        import os
+        import tempfile
+        
+        path = path or settings.state_file
         
         # Escrita atômica: escreve em temp, depois renomeia
         dir_path = Path(path).parent
@@ -436,12 +633,46 @@ class GameState:
         
         # os.replace é atômico na maioria dos sistemas de arquivos
         os.replace(temp_path, path)
+    
+    def save(self, path: Optional[Path] = None) -> None:
+        """Salva estado em arquivo JSON (v1.6) com escrita atômica."""
+        self.write_snapshot(self.to_dict(), path)
 
     
     @classmethod
-    def load(cls, path: Optional[Path] = None) -> "GameState":
+    def load(
+        cls,
+        path: Optional[Path] = None,
+        journal: Optional[SpinJournal] = None,
+        strategy: Any = None,
+        attach: Sequence[Any] = ()
+    ) -> "GameState":
+        """
+        Carrega o checkpoint (state.json) e reaplica a cauda do journal.
+        
+        Args:
+            path: state.json (padrão: settings.state_file)
+            journal: Journal da mesa; None = só o checkpoint
+            strategy: Estratégia da mesa, usada no replay dos novo_resultado
+            attach: Outros donos de extensões (ex: EnsembleRunner)
+        
+        A estratégia e os de `attach` são ligados ao estado (attach) antes
+        do replay, para que suas extensões vejam os spins reaplicados.
+        """
+        state = cls.read(path)
+        for owner in (strategy, *attach):
+            if owner is not None:
+                owner.attach(state)
+        if journal is not None:
+            replayed = state.replay_journal(journal, strategy)
+            if replayed:
+                logger.info(f"Journal {journal.path}: {replayed} registros reaplicados após checkpoint (seq {state.journal_seq})")
+        return state
+    
+    @classmethod
+    def read(cls, path: Optional[Path] = None) -> "GameState":
         """
-        Carrega estado de arquivo JSON.
+        Carrega estado de arquivo JSON (só o checkpoint, sem journal).
         
         MIGRAÇÕES:
         - v1.3 -> v1.4: performance_cw/ccw -> performance_sda17_cw/ccw
@@ -471,28 +702,30 @@ class GameState:
                     last_direction=data.get("last_direction", ""),
                     timeline_cw=Timeline.from_dict(data.get("timeline_cw", {})),
                     timeline_ccw=Timeline.from_dict(data.get("timeline_ccw", {})),
-                    performance_sda17_cw=perf_cw,
-                    performance_sda17_ccw=perf_ccw,
-                    performance_bet_cw=[],
-                    performance_bet_ccw=[],
+                    performance_sda17_cw=new_hit_history(perf_cw),
+                    performance_sda17_ccw=new_hit_history(perf_ccw),
+                    performance_bet_cw=new_hit_history(),
+                    performance_bet_ccw=new_hit_history(),
                     martingale_cw=MartingaleState.from_dict(old_martingale),
                     martingale_ccw=MartingaleState.from_dict(old_martingale),
                     pending_prediction=data.get("pending_prediction", {})
                 )
             
-            # v1.4+ / v1.5+ - formato atual (ignora calibração se presente)
+            # v1.4+ / v1.5+ / v1.6+ - formato atual (ignora calibração se presente; extensões desde v1.6)
             return cls(
                 last_number=data.get("last_number", 0),
                 last_direction=data.get("last_direction", ""),
                 timeline_cw=Timeline.from_dict(data.get("timeline_cw", {})),
                 timeline_ccw=Timeline.from_dict(data.get("timeline_ccw", {})),
-                performance_sda17_cw=data.get("performance_sda17_cw", []),
-                performance_sda17_ccw=data.get("performance_sda17_ccw", []),
-                performance_bet_cw=data.get("performance_bet_cw", []),
-                performance_bet_ccw=data.get("performance_bet_ccw", []),
+                performance_sda17_cw=new_hit_history(data.get("performance_sda17_cw", [])),
+                performance_sda17_ccw=new_hit_history(data.get("performance_sda17_ccw", [])),
+                performance_bet_cw=new_hit_history(data.get("performance_bet_cw", [])),
+                performance_bet_ccw=new_hit_history(data.get("performance_bet_ccw", [])),
                 martingale_cw=MartingaleState.from_dict(data.get("martingale_cw", {})),
                 martingale_ccw=MartingaleState.from_dict(data.get("martingale_ccw", {})),
-                pending_prediction=data.get("pending_prediction", {})
+                pending_prediction=data.get("pending_prediction", {}),
+                journal_seq=data.get("journal_seq", 0),
+                extension_data=dict(data.get("extensions") or {})
             )
         except Exception:
             return cls()
@@ -0,0 +1,145 @@
+# Roleta Cloud - Histórico de Acertos (bitset)
+
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+
+class HitHistory:
+    """
+    Histórico de acertos/erros de capacidade fixa, empacotado em bits.
+
+    CONVENÇÃO: índice 0 = mais recente, índice -1 = mais antigo
+
+    Os resultados ficam em um inteiro (bit 0 = mais recente). Para cada
+    janela rastreada (ex: 4, 6, 12 do Triple Rate) mantém um contador
+    incremental, então:
+
+    - record(hit) é O(número de janelas), independente do tamanho delas
+    - hits_in(janela) e rate(janela) são O(1) para janelas rastreadas
+      (janelas não rastreadas usam popcount da máscara)
+    """
+
+    __slots__ = ("capacity", "_bits", "_mask", "_size", "_hits", "_windows", "_counts")
+
+    def __init__(
+        self,
+        capacity: int = 12,
+        windows: Sequence[int] = (),
+        results: Iterable[bool] = ()
+    ):
+        """
+        Args:
+            capacity: Quantidade máxima de resultados mantidos
+            windows: Janelas com contador incremental
+            results: Resultados iniciais (mais recente primeiro)
+        """
+        self.capacity = max(1, int(capacity))
+        self._mask = (1 << self.capacity) - 1
+        self._bits = 0
+        self._size = 0
+        self._hits = 0
+        # Janelas >= capacidade equivalem ao total (usa _hits)
+        self._windows = {w: i for i, w in enumerate(sorted({int(w) for w in windows if 0 < w < self.capacity}))}
+        self._counts = [0] * len(self._windows)
+
+        initial = list(results)[:self.capacity]
+        for hit in reversed(initial):
+            self.record(hit)
+
+    def record(self, hit: bool) -> None:
+        """Registra um resultado como mais recente (descarta o mais antigo se cheio)."""
+        bit = 1 if hit else 0
+        bits = (self._bits << 1) | bit
+        counts = self._counts
+        for window, i in self._windows.items():
+            # O bit que estava na posição window-1 sai da janela
+            counts[i] += bit - ((bits >> window) & 1)
+        self._hits += bit - ((bits >> self.capacity) & 1)
+        self._bits = bits & self._mask
+        if self._size < self.capacity:
+            self._size += 1
+
+    def hits_in(self, window: int) -> int:
+        """Acertos nos últimos `window` resultados."""
+        if window >= self.capacity:
+            return self._hits
+        if window <= 0:
+            return 0
+        idx = self._windows.get(window)
+        if idx is not None:
+            return self._counts[idx]
+        return (self._bits & ((1 << window) - 1)).bit_count()
+
+    def rate(self, window: int) -> float:
+        """
+        Taxa de acerto nos últimos `window` resultados (0.0 a 1.0).
+        Se há menos resultados que a janela, usa os disponíveis.
+        """
+        n = min(window, self._size)
+        if n <= 0:
+            return 0.0
+        return self.hits_in(window) / n
+
+    @property
+    def hits(self) -> int:
+        """Total de acertos armazenados."""
+        return self._hits
+
+    def streak(self) -> int:
+        """Tamanho da sequência atual (acertos ou erros iguais ao mais recente)."""
+        if not self._size:
+            return 0
+        bits = self._bits if self._bits & 1 else ~self._bits & self._mask
+        # Quantidade de 1s consecutivos a partir do bit 0
+        run = (~bits & (bits + 1)).bit_length() - 1
+        return min(run, self._size)
+
+    def to_list(self, n: Optional[int] = None) -> List[bool]:
+        """Cópia dos resultados como lista de bool (mais recentes primeiro)."""
+        size = self._size if n is None else max(0, min(n, self._size))
+        bits = self._bits
+        return [bool((bits >> i) & 1) for i in range(size)]
+
+    def clear(self) -> None:
+        """Descarta todos os resultados (mantém capacidade e janelas)."""
+        self._bits = 0
+        self._size = 0
+        self._hits = 0
+        self._counts = [0] * len(self._windows)
+
+    @classmethod
+    def from_list(
+        cls,
+        results: Iterable[bool],
+        capacity: int = 12,
+        windows: Sequence[int] = ()
+    ) -> "HitHistory":
+        """Cria a partir de lista (formato JSON do state.json)."""
+        return cls(capacity=capacity, windows=windows, results=results)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __iter__(self) -> Iterator[bool]:
+        return iter(self.to_list())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("HitHistory index out of range")
+        return bool((self._bits >> index) & 1)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, HitHistory):
+            return self.to_list() == other.to_list()
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"HitHistory(capacity={self.capacity}, results={self.to_list()})"
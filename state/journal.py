@@ -0,0 +1,320 @@
+# Roleta Cloud - Journal Binário de Spins (append-only)
+
+import logging
+import os
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tipos de registro
+RECORD_SPIN = 0   # Spin processado (process_spin)
+RECORD_CLEAR = 1  # Correção de histórico: timelines + último número zerados
+RECORD_RESET = 2  # reset_session (numero = 1 se manteve o último número)
+
+# Flags de RECORD_SPIN
+FLAG_RESULT = 0x01  # novo_resultado: verifica a predição pendente e gera a próxima (GameState.apply_result)
+
+_DIRECTIONS = ("horario", "anti-horario")
+
+
+@dataclass(frozen=True)
+class JournalRecord:
+    """Um registro do journal."""
+    seq: int
+    kind: int
+    numero: int
+    direcao: str
+    t_client: int
+    t_server: int
+    trace_id: str
+    flags: int = 0
+
+    @property
+    def is_result(self) -> bool:
+        """Spin de novo_resultado (reaplicado com predição e Martingale)."""
+        return bool(self.flags & FLAG_RESULT)
+
+
+class SpinJournal:
+    """
+    Journal append-only de spins em formato binário de tamanho fixo.
+
+    Layout do arquivo:
+    - Cabeçalho: magic "RSJ1" + seq base (uint64)
+    - Registros de 60 bytes: tipo, número, direção, flags, t_client,
+      t_server, trace_id (36 bytes, truncado) e CRC32 do registro
+
+    O seq de cada registro é implícito (seq base + índice), então anexar
+    um spin é um único write de 60 bytes. Na abertura, um registro final
+    incompleto ou com CRC inválido (escrita interrompida) é truncado.
+
+    Compactação: quando um snapshot (state.json) com `journal_seq` = S é
+    gravado, os registros com seq <= S saem do segmento ativo e vão para
+    um segmento arquivado `<arquivo>.<seq_base>` (mantido como dataset de
+    backtest). O segmento ativo só guarda a cauda a reaplicar no startup.
+    """
+
+    MAGIC = b"RSJ1"
+    HEADER = struct.Struct("<4sQ")
+    RECORD = struct.Struct("<BBBBqq36sI")
+    TRACE_ID_SIZE = 36
+
+    def __init__(self, path: Path, compact_every: int = 1000, fsync: bool = False):
+        """
+        Args:
+            path: Arquivo do segmento ativo
+            compact_every: Mínimo de registros já cobertos por snapshot para compactar
+            fsync: Se True, força fsync a cada registro (mais lento, mais durável)
+        """
+        self.path = Path(path)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        # Uma compactação por vez (ela só segura _lock na troca do arquivo)
+        self._compact_lock = threading.Lock()
+        self._file = None
+        self.base_seq = 1
+        self.count = 0
+        self._open()
+
+    # ========== ARQUIVO ==========
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists() or self.path.stat().st_size < self.HEADER.size:
+            self._write_segment(self.path, self.base_seq, [])
+
+        with open(self.path, "rb") as f:
+            magic, base_seq = self.HEADER.unpack(f.read(self.HEADER.size))
+            if magic != self.MAGIC:
+                raise ValueError(f"Journal inválido: {self.path}")
+            body = f.read()
+
+        self.base_seq = base_seq
+        valid = len(body) // self.RECORD.size
+        # Descarta cauda corrompida (registro parcial ou CRC inválido)
+        while valid > 0 and not self._crc_ok(body, valid - 1):
+            valid -= 1
+        self.count = valid
+
+        expected = self.HEADER.size + valid * self.RECORD.size
+        if self.path.stat().st_size != expected:
+            logger.warning(f"Journal: cauda inválida truncada em {self.path} ({valid} registros válidos)")
+            with open(self.path, "r+b") as f:
+                f.truncate(expected)
+
+        self._file = open(self.path, "ab", buffering=0)
+
+    def _crc_ok(self, body: bytes, index: int) -> bool:
+        start = index * self.RECORD.size
+        raw = body[start:start + self.RECORD.size]
+        return zlib.crc32(raw[:-4]) == struct.unpack_from("<I", raw, self.RECORD.size - 4)[0]
+
+    def _build_segment(self, path: Path, base_seq: int, raw_records: List[bytes]) -> Path:
+        """Grava um segmento completo (com fsync) em `<path>.tmp`. Retorna o temporário."""
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, base_seq))
+            for raw in raw_records:
+                f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        return temp_path
+
+    def _write_segment(self, path: Path, base_seq: int, raw_records: List[bytes]) -> None:
+        """Grava um segmento completo com escrita atômica."""
+        os.replace(self._build_segment(path, base_seq, raw_records), path)
+
+    def _read_raw(self, start: int, stop: int) -> List[bytes]:
+        """Registros brutos [start, stop) do segmento ativo (índices, não seqs)."""
+        size = self.RECORD.size
+        with open(self.path, "rb") as f:
+            f.seek(self.HEADER.size + start * size)
+            body = f.read((stop - start) * size)
+        return [body[i * size:(i + 1) * size] for i in range(len(body) // size)]
+
+    def _pack(
+        self, kind: int, numero: int, direcao: str, t_client: int, t_server: int, trace_id: str, flags: int = 0
+    ) -> bytes:
+        direction_code = 0 if direcao == "horario" else 1
+        trace = trace_id.encode("utf-8")[:self.TRACE_ID_SIZE]
+        payload = self.RECORD.pack(kind, numero & 0xFF, direction_code, flags, t_client, t_server, trace, 0)
+        return payload[:-4] + struct.pack("<I", zlib.crc32(payload[:-4]))
+
+    def _unpack(self, seq: int, raw: bytes) -> JournalRecord:
+        kind, numero, direction_code, flags, t_client, t_server, trace, _crc = self.RECORD.unpack(raw)
+        return JournalRecord(
+            seq=seq,
+            kind=kind,
+            numero=numero,
+            direcao=_DIRECTIONS[direction_code] if direction_code < 2 else "anti-horario",
+            t_client=t_client,
+            t_server=t_server,
+            trace_id=trace.rstrip(b"\x00").decode("utf-8", errors="replace"),
+            flags=flags
+        )
+
+    # ========== ESCRITA ==========
+
+    @property
+    def last_seq(self) -> int:
+        """Seq do último registro (base - 1 se vazio)."""
+        return self.base_seq + self.count - 1
+
+    def _append(self, raw: bytes) -> int:
+        with self._lock:
+            self._file.write(raw)
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.count += 1
+            return self.last_seq
+
+    def append_spin(
+        self,
+        numero: int,
+        direcao: str,
+        t_client: int = 0,
+        t_server: int = 0,
+        trace_id: str = "",
+        result: bool = False
+    ) -> int:
+        """
+        Anexa um spin. Retorna o seq do registro.
+
+        result=True para spins de novo_resultado (FLAG_RESULT); os demais
+        (histórico inicial, correção, spin legado) só alimentam as timelines.
+        """
+        flags = FLAG_RESULT if result else 0
+        return self._append(self._pack(RECORD_SPIN, numero, direcao, t_client, t_server, trace_id, flags))
+
+    def append_clear(self, t_server: int = 0) -> int:
+        """Anexa marcador de correção de histórico (timelines zeradas)."""
+        return self._append(self._pack(RECORD_CLEAR, 0, "", 0, t_server, ""))
+
+    def append_reset(self, keep_last_number: bool = False, t_server: int = 0) -> int:
+        """Anexa marcador de reset de sessão."""
+        return self._append(self._pack(RECORD_RESET, 1 if keep_last_number else 0, "", 0, t_server, ""))
+
+    # ========== LEITURA ==========
+
+    def records(self, after_seq: int = 0) -> Iterator[JournalRecord]:
+        """Registros do segmento ativo com seq > after_seq."""
+        with self._lock:
+            base_seq, count = self.base_seq, self.count
+        yield from self._read_segment(self.path, base_seq, count, after_seq)
+
+    def _read_segment(self, path: Path, base_seq: int, count: Optional[int], after_seq: int) -> Iterator[JournalRecord]:
+        with open(path, "rb") as f:
+            magic, file_base = self.HEADER.unpack(f.read(self.HEADER.size))
+            if magic != self.MAGIC:
+                return
+            base_seq = file_base
+            skip = max(0, after_seq - base_seq + 1)
+            if count is not None and skip >= count:
+                return
+            f.seek(self.HEADER.size + skip * self.RECORD.size)
+            body = f.read() if count is None else f.read((count - skip) * self.RECORD.size)
+        size = self.RECORD.size
+        for i in range(len(body) // size):
+            yield self._unpack(base_seq + skip + i, body[i * size:(i + 1) * size])
+
+    def archived_segments(self) -> List[Path]:
+        """Segmentos arquivados, do mais antigo para o mais novo."""
+        prefix = self.path.name + "."
+        segments = [
+            p for p in self.path.parent.glob(self.path.name + ".*")
+            if p.name[len(prefix):].isdigit()
+        ]
+        return sorted(segments, key=lambda p: int(p.name[len(prefix):]))
+
+    def iter_all(self) -> Iterator[JournalRecord]:
+        """Todos os registros (arquivados + ativo) em ordem. Para backtests/auditoria."""
+        for segment in self.archived_segments():
+            yield from self._read_segment(segment, 0, None, 0)
+        yield from self.records()
+
+    # ========== COMPACTAÇÃO ==========
+
+    def compact(self, upto_seq: int) -> int:
+        """
+        Move registros com seq <= upto_seq para um segmento arquivado.
+
+        Os dois segmentos são gravados (com fsync) sem segurar o lock de
+        escrita: append_spin só espera a cópia dos registros anexados
+        durante a compactação, o os.replace e a troca do arquivo aberto.
+
+        Returns:
+            Quantidade de registros arquivados
+        """
+        with self._compact_lock:
+            with self._lock:
+                base_seq, count = self.base_seq, self.count
+            covered = min(count, upto_seq - base_seq + 1)
+            if covered <= 0:
+                return 0
+
+            # Registros [0, count) já estão no arquivo: só crescem no fim
+            raws = self._read_raw(0, count)
+            archive_path = self.path.with_name(f"{self.path.name}.{base_seq:012d}")
+            self._write_segment(archive_path, base_seq, raws[:covered])
+            new_base = base_seq + covered
+            temp_path = self._build_segment(self.path, new_base, raws[covered:])
+
+            with self._lock:
+                # Anexados durante a gravação: copiados para o novo segmento
+                if self.count > count:
+                    with open(temp_path, "ab") as f:
+                        for raw in self._read_raw(count, self.count):
+                            f.write(raw)
+                        f.flush()
+                        if self.fsync:
+                            os.fsync(f.fileno())
+                self._file.close()
+                os.replace(temp_path, self.path)
+                self.base_seq = new_base
+                self.count -= covered
+                self._file = open(self.path, "ab", buffering=0)
+
+        logger.info(f"Journal compactado: {covered} registros arquivados em {archive_path.name}")
+        return covered
+
+    def maybe_compact(self, checkpoint_seq: int) -> int:
+        """Compacta se há pelo menos `compact_every` registros cobertos pelo checkpoint."""
+        if checkpoint_seq - self.base_seq + 1 >= self.compact_every:
+            return self.compact(checkpoint_seq)
+        return 0
+
+    def align(self, checkpoint_seq: int) -> None:
+        """
+        Garante que novos registros terão seq > checkpoint_seq.
+
+        Necessário quando o journal foi apagado/recriado mas o state.json
+        já registra um journal_seq maior (senão a cauda seria ignorada).
+        """
+        if self.last_seq >= checkpoint_seq:
+            return
+        if self.count:
+            self.compact(self.last_seq)
+        with self._lock:
+            self._file.close()
+            self.base_seq = checkpoint_seq + 1
+            self._write_segment(self.path, self.base_seq, [])
+            self._file = open(self.path, "ab", buffering=0)
+
+    def close(self) -> None:
+        """Fecha o arquivo do segmento ativo."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self):
+        return f"SpinJournal(path={self.path.name!r}, base_seq={self.base_seq}, count={self.count})"
@@ -0,0 +1,177 @@
+# Roleta Cloud - Filtro de Kalman das Forças
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .extensions import StateExtension
+
+
+@dataclass
+class ForceKalman:
+    """
+    Filtro de Kalman de aceleração constante sobre a posição da bola.
+
+    Estado [posição, velocidade, aceleração] com dt = 1 spin; observa só
+    a posição. Porte de KalmanFilter (archive/backup_antes_sync/force_kalman.py)
+    com as contas em forma fechada: F, Q e H são constantes, então
+    predict/update viram algumas multiplicações de float, sem montar
+    matrizes NumPy a cada spin.
+
+    A posição é relativa à última medição (rebase após cada update):
+    observar a força f é observar a posição f, e a próxima força prevista
+    é simplesmente a próxima posição prevista. O resultado é o mesmo da
+    linha absoluta do arquivo, sem o número crescer para sempre.
+    """
+    # Ruído do processo (jerk) e da medição
+    process_noise: float = 0.5
+    measurement_noise: float = 1.0
+    # Estado
+    pos: float = 0.0
+    vel: float = 0.0
+    acc: float = 0.0
+    # Covariância (simétrica: 6 termos)
+    p00: float = 1.0
+    p01: float = 0.0
+    p02: float = 0.0
+    p11: float = 10.0
+    p12: float = 0.0
+    p22: float = 10.0
+    # Forças observadas desde o último reset
+    updates: int = 0
+
+    def reset(self) -> None:
+        self.pos = self.vel = self.acc = 0.0
+        self.p00, self.p01, self.p02, self.p11, self.p12, self.p22 = 1.0, 0.0, 0.0, 10.0, 0.0, 10.0
+        self.updates = 0
+
+    def predict(self) -> None:
+        """x = F x;  P = F P F' + Q (F de aceleração constante, dt = 1)."""
+        self.pos += self.vel + 0.5 * self.acc
+        self.vel += self.acc
+
+        p00, p01, p02, p11, p12, p22 = self.p00, self.p01, self.p02, self.p11, self.p12, self.p22
+        # Linhas 0 e 1 de F P
+        a0 = p00 + p01 + 0.5 * p02
+        a1 = p01 + p11 + 0.5 * p12
+        a2 = p02 + p12 + 0.5 * p22
+        b1 = p11 + p12
+        b2 = p12 + p22
+        q = self.process_noise
+        self.p00 = a0 + a1 + 0.5 * a2 + 0.25 * q
+        self.p01 = a1 + a2 + 0.5 * q
+        self.p02 = a2 + 0.5 * q
+        self.p11 = b1 + b2 + q
+        self.p12 = b2 + q
+        self.p22 = p22 + q
+
+    def update(self, z: float) -> None:
+        """Correção com a posição medida z (H = [1, 0, 0])."""
+        p00, p01, p02 = self.p00, self.p01, self.p02
+        s = p00 + self.measurement_noise
+        k0, k1, k2 = p00 / s, p01 / s, p02 / s
+        innovation = z - self.pos
+        self.pos += k0 * innovation
+        self.vel += k1 * innovation
+        self.acc += k2 * innovation
+        # P = (I - K H) P
+        self.p00 = p00 - k0 * p00
+        self.p01 = p01 - k0 * p01
+        self.p02 = p02 - k0 * p02
+        self.p11 -= k1 * p01
+        self.p12 -= k1 * p02
+        self.p22 -= k2 * p02
+
+    def observe(self, force: int) -> None:
+        """Um spin: predict + update com a força, e rebase da posição."""
+        self.predict()
+        self.update(force)
+        self.pos -= force
+        self.updates += 1
+
+    def forecast(self) -> Tuple[float, float]:
+        """(próxima força prevista, confiança 0-1 pela variância da posição prevista)."""
+        predicted = self.pos + self.vel + 0.5 * self.acc
+        p01, p02, p12 = self.p01, self.p02, self.p12
+        variance = (self.p00 + 2 * p01 + p02 + self.p11 + p12 + 0.25 * self.p22
+                    + 0.25 * self.process_noise)
+        return predicted, 1.0 / (1.0 + max(variance, 0.0))
+
+    def to_list(self) -> list:
+        return [self.pos, self.vel, self.acc, self.p00, self.p01, self.p02, self.p11, self.p12, self.p22, self.updates]
+
+    def load_list(self, values: Iterable[Any]) -> bool:
+        """Restaura de to_list (False e nada muda se o formato não bate)."""
+        values = list(values)
+        if len(values) != 10 or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            return False
+        (self.pos, self.vel, self.acc, self.p00, self.p01, self.p02,
+         self.p11, self.p12, self.p22) = (float(v) for v in values[:9])
+        self.updates = int(values[9])
+        return True
+
+    @classmethod
+    def from_forces(cls, forces: Iterable[int], **kwargs: Any) -> "ForceKalman":
+        """Filtro que observou `forces` (mais antiga primeiro)."""
+        kf = cls(**kwargs)
+        for force in forces:
+            kf.observe(force)
+        return kf
+
+
+class KalmanExtension(StateExtension):
+    """
+    Um ForceKalman por direção, atualizado em O(1) a cada process_spin e
+    gravado no state.json ("extensions"["kalman"]).
+
+    A cada spin guarda também a previsão pronta (forecasts[direção]):
+    analyze só lê uma tupla. No ensemble a tupla vai congelada no
+    snapshot (freeze), então uma estratégia atrasada não lê a previsão
+    do spin seguinte.
+    """
+
+    name = "kalman"
+
+    def __init__(self, process_noise: float = 0.5, measurement_noise: float = 1.0):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.filters: Dict[str, ForceKalman] = {}
+        self.forecasts: Dict[str, Tuple[float, float, int]] = {}
+        self.reset()
+
+    def _new_filter(self) -> ForceKalman:
+        return ForceKalman(process_noise=self.process_noise, measurement_noise=self.measurement_noise)
+
+    def _refresh(self, direction: str) -> None:
+        kf = self.filters[direction]
+        predicted, confidence = kf.forecast()
+        self.forecasts[direction] = (predicted, confidence, kf.updates)
+
+    def forecast(self, direction: str) -> Optional[Tuple[float, float, int]]:
+        """(força prevista, confiança, forças observadas) da direção."""
+        return self.forecasts.get(direction)
+
+    def freeze(self, direction: str) -> Optional[Tuple[float, float, int]]:
+        return self.forecast(direction)
+
+    def on_spin(self, direction: str, force: int) -> None:
+        kf = self.filters.get(direction)
+        if kf is None:
+            return
+        kf.observe(force)
+        self._refresh(direction)
+
+    def reset(self) -> None:
+        self.filters = {"cw": self._new_filter(), "ccw": self._new_filter()}
+        for direction in self.filters:
+            self._refresh(direction)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {direction: kf.to_list() for direction, kf in self.filters.items()}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict):
+            return
+        for direction, kf in self.filters.items():
+            values = data.get(direction)
+            if isinstance(values, list) and kf.load_list(values):
+                self._refresh(direction)
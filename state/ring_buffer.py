@@ -0,0 +1,80 @@
+# Roleta Cloud - Ring Buffer de Forças
+
+from array import array
+from typing import Iterable, Iterator, List
+
+
+class ForceRing:
+    """
+    Buffer circular de capacidade fixa para forças (0-255).
+
+    CONVENÇÃO: índice 0 = mais recente, índice -1 = mais antigo
+
+    Armazenamento compacto em `array('B')` espelhado (2x capacidade):
+    cada valor é escrito em `pos` e `pos + capacidade`, então as últimas
+    N forças estão sempre contíguas em `buf[head:head + N]`, já na ordem
+    mais-recente-primeiro. Isso permite:
+
+    - push O(1) com descarte implícito do mais antigo
+    - recent(n) O(1) retornando memoryview somente-leitura (sem cópia)
+
+    As views refletem o buffer vivo: são válidas até o próximo push/clear.
+    """
+
+    __slots__ = ("capacity", "_buf", "_view", "_head", "_size")
+
+    TYPECODE = "B"
+
+    def __init__(self, capacity: int, values: Iterable[int] = ()):
+        """
+        Args:
+            capacity: Quantidade máxima de forças mantidas
+            values: Forças iniciais (mais recente primeiro)
+        """
+        self.capacity = max(1, int(capacity))
+        self._buf = array(self.TYPECODE, bytes(2 * self.capacity))
+        self._view = memoryview(self._buf).toreadonly()
+        self._head = 0
+        self._size = 0
+
+        initial = list(values)[:self.capacity]
+        for value in reversed(initial):
+            self.push(value)
+
+    def push(self, value: int) -> None:
+        """Adiciona uma força como mais recente (descarta a mais antiga se cheio)."""
+        capacity = self.capacity
+        head = self._head - 1
+        if head < 0:
+            head = capacity - 1
+        self._buf[head] = value
+        self._buf[head + capacity] = value
+        self._head = head
+        if self._size < capacity:
+            self._size += 1
+
+    def recent(self, n: int) -> memoryview:
+        """View somente-leitura das últimas N forças (mais recentes primeiro)."""
+        n = max(0, min(n, self._size))
+        return self._view[self._head:self._head + n]
+
+    def tolist(self) -> List[int]:
+        """Cópia de todas as forças como lista (mais recentes primeiro)."""
+        return self._view[self._head:self._head + self._size].tolist()
+
+    def clear(self) -> None:
+        """Descarta todas as forças (mantém a capacidade)."""
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._view[self._head:self._head + self._size])
+
+    def __getitem__(self, index):
+        return self._view[self._head:self._head + self._size][index]
+
+    def __repr__(self):
+        return f"ForceRing(capacity={self.capacity}, size={self._size})"
@@ -0,0 +1,166 @@
+# Roleta Cloud - Snapshot Write-Behind do Estado
+
+import asyncio
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app_config.settings import settings
+from .game import GameState
+from .journal import SpinJournal
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotService:
+    """
+    Persistência write-behind do GameState.
+
+    Os handlers apenas marcam o estado como sujo (mark_dirty). Uma task
+    em background grava o snapshot quando:
+    - passou `interval` segundos desde a marcação, ou
+    - acumulou `every_spins` marcações (flush antecipado)
+
+    O snapshot (GameState.to_dict) é capturado no event loop, mas o
+    json.dump + rename atômico rodam em uma worker thread. Rajadas de
+    spins durante uma escrita são coalescidas em uma única escrita
+    seguinte. Cada captura recebe um número de sequência e a escrita é
+    descartada se um snapshot mais novo já foi gravado (flush síncrono
+    no shutdown x escrita em andamento na thread).
+
+    Com journal, cada snapshot gravado é um checkpoint: a mesma thread
+    compacta os registros já cobertos por ele (SpinJournal.maybe_compact).
+    """
+
+    def __init__(
+        self,
+        game_state: GameState,
+        path: Optional[Path] = None,
+        interval: Optional[float] = None,
+        every_spins: Optional[int] = None,
+        journal: Optional[SpinJournal] = None
+    ):
+        self.game_state = game_state
+        self.journal = journal
+        self.path = path or settings.state_file
+        self.interval = interval if interval is not None else settings.persistence.snapshot_interval
+        self.every_spins = every_spins if every_spins is not None else settings.persistence.snapshot_every_spins
+
+        self._dirty = False
+        self._pending_spins = 0
+        self._seq = 0
+        self._written_seq = 0
+        self._write_lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Métricas
+        self.flushes = 0
+        self.coalesced = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def dirty(self) -> bool:
+        """Há mudanças ainda não gravadas?"""
+        return self._dirty
+
+    def mark_dirty(self, spins: int = 1) -> None:
+        """Marca o estado como alterado (não grava nada no caller)."""
+        if self._dirty:
+            self.coalesced += 1
+        self._dirty = True
+        self._pending_spins += spins
+        if self._wake is not None and self._pending_spins >= self.every_spins:
+            self._wake.set()
+
+    def _capture(self) -> tuple:
+        """Captura snapshot no event loop e limpa a flag de sujo."""
+        self._seq += 1
+        self._dirty = False
+        self._pending_spins = 0
+        return self._seq, self.game_state.to_dict()
+
+    def _write(self, seq: int, data: Dict[str, Any]) -> bool:
+        """Grava snapshot (roda na worker thread ou no shutdown)."""
+        with self._write_lock:
+            if seq <= self._written_seq:
+                return False
+            start = time.perf_counter()
+            GameState.write_snapshot(data, self.path)
+            self._written_seq = seq
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+            self.flushes += 1
+        
+        if self.journal is not None:
+            try:
+                self.journal.maybe_compact(data.get("journal_seq", 0))
+            except Exception as e:
+                logger.error(f"Erro ao compactar journal: {e}")
+        return True
+
+    async def flush(self, force: bool = False) -> None:
+        """Grava o snapshot atual fora do event loop (se sujo ou force=True)."""
+        if not (self._dirty or force):
+            return
+        seq, data = self._capture()
+        try:
+            await asyncio.to_thread(self._write, seq, data)
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Erro ao gravar snapshot: {e}")
+
+    def flush_sync(self) -> None:
+        """Grava o snapshot atual no caller (shutdown / fora do event loop)."""
+        seq, data = self._capture()
+        self._write(seq, data)
+
+    async def run(self) -> None:
+        """Loop de flush periódico."""
+        # wait_for pode engolir o cancelamento se o evento disparar junto:
+        # a flag _stopping encerra o loop mesmo assim
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._stopping:
+                return
+            await self.flush()
+
+    def start(self) -> None:
+        """Inicia a task de flush no event loop atual."""
+        if self._task is None:
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+            logger.info(
+                f"Snapshot write-behind iniciado "
+                f"(intervalo: {self.interval}s, a cada {self.every_spins} spins)"
+            )
+
+    async def stop(self) -> None:
+        """Para a task e grava o que estiver pendente."""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas do snapshotter."""
+        return {
+            "dirty": self._dirty,
+            "pending_spins": self._pending_spins,
+            "flushes": self.flushes,
+            "coalesced": self.coalesced,
+            "last_flush_ms": round(self.last_flush_ms, 3)
+        }
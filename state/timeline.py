@@ -1,54 +1,76 @@
 # Roleta Cloud - Timeline por Direção
 
-from dataclasses import dataclass, field
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence
 from app_config.settings import settings
+from .ring_buffer import ForceRing
 
 
-@dataclass
 class Timeline:
     """
     Linha temporal de forças para uma direção específica.
-    
+
     CONVENÇÃO: índice 0 = mais recente, índice -1 = mais antigo
+
+    As forças ficam em um ForceRing de capacidade fixa
+    (settings.game.max_timeline_size): add é O(1) e recent(n) devolve
+    uma view sem cópia, então o custo por spin não cresce com o tamanho.
     """
-    direction: str  # 'cw' (clockwise/horário) ou 'ccw' (counter-clockwise/anti-horário)
-    forces: List[int] = field(default_factory=list)
-    
+
+    def __init__(
+        self,
+        direction: str,
+        forces: Optional[Sequence[int]] = None,
+        capacity: Optional[int] = None
+    ):
+        self.direction = direction  # 'cw' (clockwise/horário) ou 'ccw' (counter-clockwise/anti-horário)
+        self._ring = ForceRing(capacity or settings.game.max_timeline_size, forces or ())
+
+    @property
+    def forces(self) -> List[int]:
+        """Cópia das forças armazenadas (mais recentes primeiro)."""
+        return self._ring.tolist()
+
     def add(self, force: int) -> None:
         """
         Adiciona uma força no início (mais recente).
         Remove a mais antiga se ultrapassar o limite.
         """
-        self.forces.insert(0, force)
-        if len(self.forces) > settings.game.max_timeline_size:
-            self.forces.pop()
-    
+        self._ring.push(force)
+
+    def recent(self, n: int) -> memoryview:
+        """View somente-leitura das últimas N forças (válida até o próximo add)."""
+        return self._ring.recent(n)
+
     def get_last_n(self, n: int) -> List[int]:
         """Retorna as últimas N forças (mais recentes primeiro)."""
-        return self.forces[:n]
-    
+        return self._ring.recent(n).tolist()
+
     @property
     def size(self) -> int:
         """Quantidade de forças armazenadas."""
-        return len(self.forces)
-    
+        return len(self._ring)
+
+    @property
+    def capacity(self) -> int:
+        """Quantidade máxima de forças mantidas."""
+        return self._ring.capacity
+
     @property
     def is_ready(self) -> bool:
         """Tem forças suficientes para análise?"""
         return self.size >= settings.game.sda_forces_analyzed
-    
+
     def clear(self) -> None:
         """Limpa todas as forças da timeline."""
-        self.forces = []
-    
+        self._ring.clear()
+
     def to_dict(self) -> dict:
         """Serializa para JSON."""
         return {
             "direction": self.direction,
-            "forces": self.forces
+            "forces": self._ring.tolist()
         }
-    
+
     @classmethod
     def from_dict(cls, data: dict) -> "Timeline":
         """Deserializa de JSON."""
@@ -56,3 +78,23 @@ class Timeline:
             direction=data.get("direction", "cw"),
             forces=data.get("forces", [])
         )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Timeline):
+            return NotImplemented
+        return self.direction == other.direction and self.forces == other.forces
+
+    def __repr__(self):
+        return f"Timeline(direction={self.direction!r}, forces={self.forces})"
+
+
+class TimelineSnapshot(Timeline):
+    """
+    Cópia independente de uma timeline, para leitura fora do spin atual
+    (ensemble), com o valor congelado de cada StateExtension naquele spin
+    (`extensions[name]` = StateExtension.freeze).
+    """
+
+    def __init__(self, timeline: Timeline, extensions: Optional[Dict[str, Any]] = None):
+        super().__init__(timeline.direction, forces=timeline.forces, capacity=timeline.capacity)
+        self.extensions: Dict[str, Any] = dict(extensions or {})
@@ -1,8 +1,18 @@
 # Roleta Cloud - Strategies Package
 
 from .base import StrategyBase, StrategyResult
+from .ensemble import VOTING_RULES, EnsembleResult, EnsembleRunner, StrategyVote
+from .registry import STRATEGIES, available_strategies, create_strategy, register_strategy
 
 __all__ = [
+    "EnsembleResult",
+    "EnsembleRunner",
+    "STRATEGIES",
     "StrategyBase",
     "StrategyResult",
+    "StrategyVote",
+    "VOTING_RULES",
+    "available_strategies",
+    "create_strategy",
+    "register_strategy",
 ]
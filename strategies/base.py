@@ -2,8 +2,11 @@
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any
 
+from app_config.settings import settings
+from core.roulette import CompiledWheel, compile_wheel
+from state.game import GameState
 from state.timeline import Timeline
 
 
@@ -27,6 +30,28 @@ class StrategyBase(ABC):
         self.name = name
         self.num_neighbors = num_neighbors
         self.enabled = True
+        # Tabelas da roda resolvidas uma vez (a sequência passada no analyze é quase sempre esta)
+        self._wheel_sequence = settings.game.wheel_sequence
+        self.wheel = compile_wheel(self._wheel_sequence)
+    
+    def _wheel_for(self, wheel_sequence: List[int]) -> CompiledWheel:
+        """Roda compilada de wheel_sequence (a da instância, sem lookup, se for a mesma lista)."""
+        if wheel_sequence is self._wheel_sequence:
+            return self.wheel
+        return compile_wheel(wheel_sequence)
+    
+    def attach(self, game_state: GameState) -> None:
+        """
+        Liga a estratégia ao estado da mesa antes do replay do journal
+        (ex: registrar uma StateExtension). Padrão: nada.
+        """
+    
+    def prepare(self) -> None:
+        """
+        Trabalho caro e único (ex: tabela pré-calculada), rodado fora do
+        event loop no start do servidor; sem ele, feito no primeiro
+        analyze. Idempotente. Padrão: nada.
+        """
     
     @abstractmethod
     def analyze(
@@ -55,19 +80,11 @@ class StrategyBase(ABC):
         wheel_sequence: List[int]
     ) -> List[int]:
         """
-        Retorna vizinhos de um número na roleta.
+        Retorna vizinhos de um número na roleta (tabela pré-calculada).
         """
         try:
-            center_idx = wheel_sequence.index(center)
-            wheel_size = len(wheel_sequence)
-            neighbors = []
-            
-            for offset in range(-radius, radius + 1):
-                idx = (center_idx + offset) % wheel_size
-                neighbors.append(wheel_sequence[idx])
-            
-            return neighbors
-        except ValueError:
+            return self._wheel_for(wheel_sequence).neighbors(center, radius)
+        except (ValueError, TypeError):
             return [center]
     
     def get_visual_region(
@@ -86,3 +103,17 @@ class StrategyBase(ABC):
             else:
                 parts.append(str(num))
         return ", ".join(parts)
+
+    def _apply_force(
+        self,
+        from_number: int,
+        force: int,
+        target_direction: str,
+        wheel_sequence: List[int]
+    ) -> int:
+        """Aplica força ao número, retorna número resultado (tabela pré-calculada)."""
+        try:
+            direction = "cw" if target_direction in ("cw", "horario") else "ccw"
+            return self._wheel_for(wheel_sequence).target(from_number, force, direction)
+        except (ValueError, TypeError):
+            return from_number
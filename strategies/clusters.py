@@ -0,0 +1,50 @@
+# Roleta Cloud - Agrupamento de Forças
+"""
+Cestas e clusters de forças usados pelas estratégias portadas do
+RoletaV11 (archive/RoletaV11/strategies/legacy.py). Os helpers de lá
+(RouletteLogic._encontrar_melhores_cestas etc.) não estão no arquivo;
+estes seguem a mesma ideia sobre a distância circular entre forças.
+
+Forças vão de 1 a 37; listas seguem a convenção da Timeline
+(índice 0 = mais recente).
+"""
+
+from statistics import mean
+from typing import List, Optional, Sequence
+
+FORCE_SLOTS = 37
+
+
+def force_distance(a: int, b: int) -> int:
+    """Menor distância circular entre duas forças."""
+    diff = abs(a - b)
+    return min(diff, FORCE_SLOTS - diff)
+
+
+def clamp_force(force: float) -> int:
+    return max(1, min(FORCE_SLOTS, round(force)))
+
+
+def best_baskets(forces: Sequence[int], radius: int, min_size: int = 1) -> List[List[int]]:
+    """
+    Cestas gulosas: a força com mais vizinhas a até `radius` vira a
+    primeira cesta (empate: a mais recente), os membros saem e repete.
+    Cestas com menos de `min_size` forças são descartadas.
+    """
+    remaining = list(forces)
+    baskets: List[List[int]] = []
+    while remaining:
+        members = [[f for f in remaining if force_distance(f, center) <= radius] for center in remaining]
+        best = max(members, key=len)
+        if len(best) < min_size:
+            break
+        baskets.append(best)
+        for f in best:
+            remaining.remove(f)
+    return baskets
+
+
+def best_cluster_mean(forces: Sequence[int], width: int, min_size: int) -> Optional[float]:
+    """Média da cesta mais densa de largura `width` (None se tiver menos de `min_size` forças)."""
+    baskets = best_baskets(forces, width // 2, min_size)
+    return mean(baskets[0]) if baskets else None
@@ -0,0 +1,198 @@
+# Roleta Cloud - Tabela de Decisão do SDA17
+"""
+Cluster mode do SDA17 pré-calculado para todas as tuplas de forças.
+
+Com min_forces=3 e forças 0-36 são 37^3 = 50.653 entradas: a predição
+vira uma leitura de tabela, tanto no analyze quanto no backtest.
+
+    table = get_decision_table(min_forces=3, proximity=5)
+    predicted, size, members = table.lookup(forces)      # None fora da faixa
+
+A tabela fica em settings.cache_dir (data/cache) com os parâmetros no
+nome do arquivo; mudar SDA_MIN_FORCES / SDA_CLUSTER_PROXIMITY gera (e
+grava) outra na primeira vez. Arquivo ausente, corrompido ou de outra
+versão é recalculado; get_decision_table(..., rebuild=True) força.
+"""
+
+import logging
+import os
+import struct
+import tempfile
+import time
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app_config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalho: magic, versão, min_forces, proximidade, base (forças 0..base-1), entradas
+_HEADER = struct.Struct("<4sBBBBI")
+_MAGIC = b"SDAT"
+_VERSION = 1
+
+# Força predita limitada a 1..37 (ver SDA17Strategy._predict_cluster)
+MIN_FORCE = 1
+MAX_FORCE = 37
+
+
+def cluster_mode(forces: Sequence[int], proximity: int) -> Tuple[int, int, int]:
+    """
+    Cluster mode do SDA17 para uma tupla (mais recente primeiro).
+
+    Mesma regra de SDA17Strategy._predict_cluster: cada força entra no
+    primeiro cluster cujo PRIMEIRO elemento está a <= proximity; o maior
+    cluster vence (empate: o aberto primeiro).
+
+    Returns:
+        (força_predita, tamanho_do_cluster, máscara das posições do cluster)
+    """
+    anchors: List[int] = []
+    masks: List[int] = []
+    for pos, force in enumerate(forces):
+        for idx, anchor in enumerate(anchors):
+            if abs(anchor - force) <= proximity:
+                masks[idx] |= 1 << pos
+                break
+        else:
+            anchors.append(force)
+            masks.append(1 << pos)
+
+    best = max(masks, key=lambda m: bin(m).count("1"))
+    members = [forces[pos] for pos in range(len(forces)) if best >> pos & 1]
+    predicted = max(MIN_FORCE, min(MAX_FORCE, sum(members) // len(members)))
+    return predicted, len(members), best
+
+
+class DecisionTable:
+    """
+    Resultado do cluster mode por tupla de forças, em três arrays de bytes
+    indexados por sum(f[i] * base^(k-1-i)) (f[0] = mais recente).
+    """
+
+    __slots__ = ("min_forces", "proximity", "base", "predicted", "sizes", "masks")
+
+    def __init__(self, min_forces: int, proximity: int, base: int,
+                 predicted: bytes, sizes: bytes, masks: bytes):
+        self.min_forces = min_forces
+        self.proximity = proximity
+        self.base = base
+        self.predicted = predicted
+        self.sizes = sizes
+        self.masks = masks
+
+    @property
+    def entries(self) -> int:
+        return len(self.predicted)
+
+    @classmethod
+    def build(cls, min_forces: int, proximity: int, base: int) -> "DecisionTable":
+        """Calcula todas as base^min_forces entradas (product já sai na ordem do índice)."""
+        count = base ** min_forces
+        predicted = bytearray(count)
+        sizes = bytearray(count)
+        masks = bytearray(count)
+        for idx, forces in enumerate(product(range(base), repeat=min_forces)):
+            predicted[idx], sizes[idx], masks[idx] = cluster_mode(forces, proximity)
+        return cls(min_forces, proximity, base, bytes(predicted), bytes(sizes), bytes(masks))
+
+    def index(self, forces: Sequence[int]) -> Optional[int]:
+        """Índice da tupla (None se alguma força está fora de 0..base-1)."""
+        base = self.base
+        idx = 0
+        for force in forces:
+            if not 0 <= force < base:
+                return None
+            idx = idx * base + force
+        return idx
+
+    def lookup(self, forces: Sequence[int]) -> Optional[Tuple[int, int, List[int]]]:
+        """(força_predita, tamanho, membros do cluster) ou None fora da faixa."""
+        idx = self.index(forces)
+        if idx is None:
+            return None
+        mask = self.masks[idx]
+        members = [forces[pos] for pos in range(self.min_forces) if mask >> pos & 1]
+        return self.predicted[idx], self.sizes[idx], members
+
+    # ========== CACHE EM DISCO ==========
+
+    @staticmethod
+    def filename(min_forces: int, proximity: int, base: int) -> str:
+        return f"sda17_k{min_forces}_p{proximity}_b{base}.v{_VERSION}.bin"
+
+    def save(self, path: Path) -> None:
+        """Grava a tabela com escrita atômica (temp + os.replace)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = _HEADER.pack(_MAGIC, _VERSION, self.min_forces, self.proximity, self.base, self.entries)
+        with tempfile.NamedTemporaryFile(mode="wb", suffix=".tmp", dir=path.parent, delete=False) as f:
+            f.write(header)
+            f.write(self.predicted)
+            f.write(self.sizes)
+            f.write(self.masks)
+            temp_path = f.name
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, min_forces: int, proximity: int, base: int) -> Optional["DecisionTable"]:
+        """Tabela gravada em `path`, ou None se ausente, inválida ou de outros parâmetros."""
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, version, k, prox, b, count = _HEADER.unpack_from(data)
+        expected = (_MAGIC, _VERSION, min_forces, proximity, base, base ** min_forces)
+        if (magic, version, k, prox, b, count) != expected or len(data) != _HEADER.size + 3 * count:
+            return None
+        start = _HEADER.size
+        return cls(
+            min_forces, proximity, base,
+            data[start:start + count],
+            data[start + count:start + 2 * count],
+            data[start + 2 * count:]
+        )
+
+
+# Tabelas já carregadas neste processo: (min_forces, proximity, base) -> tabela
+_tables: Dict[Tuple[int, int, int], DecisionTable] = {}
+
+
+def table_fits(min_forces: int, base: int) -> bool:
+    """A tabela cabe no limite (SDA_TABLE_MAX_ENTRIES) e na máscara de 8 bits?"""
+    return 1 <= min_forces <= 8 and base ** min_forces <= settings.strategy.sda_table_max_entries
+
+
+def get_decision_table(min_forces: int, proximity: int, base: Optional[int] = None,
+                       cache_dir: Optional[Path] = None, rebuild: bool = False) -> Optional[DecisionTable]:
+    """
+    Tabela para os parâmetros: memória do processo > arquivo em cache_dir
+    > cálculo (gravado em seguida). None se desligada (SDA_DECISION_TABLE)
+    ou grande demais (SDA_TABLE_MAX_ENTRIES); aí vale o cálculo por spin.
+    """
+    base = base or len(settings.game.wheel_sequence)
+    if not settings.strategy.sda_decision_table or not table_fits(min_forces, base) or not 0 <= proximity <= 255:
+        return None
+    key = (min_forces, proximity, base)
+    table = _tables.get(key)
+    if table is not None and not rebuild:
+        return table
+
+    path = (cache_dir or settings.cache_dir) / DecisionTable.filename(*key)
+    table = None if rebuild else DecisionTable.load(path, *key)
+    if table is None:
+        start = time.perf_counter()
+        table = DecisionTable.build(*key)
+        logger.info(
+            f"Tabela SDA17 calculada (k={min_forces}, proximidade={proximity}): "
+            f"{table.entries} entradas em {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        try:
+            table.save(path)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar a tabela SDA17 em {path}: {e}")
+    _tables[key] = table
+    return table
+
@@ -0,0 +1,293 @@
+# Roleta Cloud - Ensemble de Estratégias
+"""
+Avalia várias estratégias por spin, em paralelo, sob um prazo.
+
+    runner = EnsembleRunner.from_settings()       # None se STRATEGY_ENSEMBLE vazio
+    result = await runner.evaluate(snapshot(timeline, game_state), last_number, wheel_sequence)
+    result.result    # StrategyResult combinado pela regra de voto
+    result.votes     # status (ok, late, error, busy) e ms de cada estratégia
+
+Cada analyze roda em um pool de threads compartilhado. O que não
+terminar até o deadline, ou falhar, fica fora do voto daquele spin.
+Uma estratégia ainda rodando do spin anterior não é disparada de novo
+(status busy), então uma estratégia lenta não enche o pool. A duração
+de todas, inclusive as atrasadas, vai para roleta_strategy_ms.
+
+evaluate recebe uma cópia da timeline (snapshot): a original muda no
+próximo spin, enquanto uma estratégia atrasada ainda pode estar lendo.
+Pelo mesmo motivo o snapshot leva o valor congelado das extensões do
+GameState (StateExtension.freeze, ex: a previsão do Kalman), tirado no
+event loop; analyze no pool não lê estado vivo da mesa.
+
+Regras de voto (VOTING_RULES, plugáveis):
+    majority   aposta se mais da metade das que responderam apostar
+    weighted   idem, com peso = score de cada estratégia
+    unanimous  todas apostam; números = interseção
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app_config.settings import settings
+from metrics.instruments import ensemble_ms, strategy_dropped_total, strategy_ms
+from state.game import GameState
+from state.timeline import Timeline, TimelineSnapshot
+from .base import StrategyBase, StrategyResult
+from .registry import create_strategy
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_LATE = "late"
+STATUS_ERROR = "error"
+STATUS_BUSY = "busy"
+
+
+@dataclass
+class StrategyVote:
+    """Participação de uma estratégia em um spin."""
+    name: str
+    status: str
+    ms: float = 0.0
+    result: Optional[StrategyResult] = None
+    error: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"name": self.name, "status": self.status, "ms": round(self.ms, 3)}
+        if self.result is not None:
+            out.update(should_bet=self.result.should_bet, center=self.result.center, score=self.result.score)
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+@dataclass
+class EnsembleResult:
+    """Voto combinado de um spin."""
+    result: StrategyResult
+    rule: str
+    votes: List[StrategyVote] = field(default_factory=list)
+    ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rule": self.rule,
+            "should_bet": self.result.should_bet,
+            "numeros": self.result.numbers,
+            "centro": self.result.center,
+            "score": self.result.score,
+            "details": self.result.details,
+            "votes": [vote.to_dict() for vote in self.votes],
+            "ms": round(self.ms, 3)
+        }
+
+
+# ========== REGRAS DE VOTO ==========
+
+VotingRule = Callable[[Sequence[StrategyVote]], StrategyResult]
+
+
+def _combine(bettors: Sequence[StrategyResult], weights: Sequence[float], voters: int, agreement: float) -> StrategyResult:
+    """Números e centro mais votados entre as que apostaram (tamanho = mediana das apostas)."""
+    numbers: Counter = Counter()
+    centers: Counter = Counter()
+    for result, weight in zip(bettors, weights):
+        numbers.update({n: weight for n in result.numbers})
+        centers[result.center] += weight
+    size = sorted(len(r.numbers) for r in bettors)[len(bettors) // 2]
+    chosen = [n for n, _ in numbers.most_common(size)]
+    return StrategyResult(
+        should_bet=True,
+        numbers=chosen,
+        center=centers.most_common(1)[0][0],
+        score=round(6 * agreement),
+        visual=", ".join(str(n) for n in chosen),
+        details={"bettors": len(bettors), "voters": voters, "agreement": round(agreement, 3)}
+    )
+
+
+def _no_bet(reason: str, voters: int, agreement: float = 0.0) -> StrategyResult:
+    return StrategyResult(details={"reason": reason, "voters": voters, "agreement": round(agreement, 3)})
+
+
+def majority_vote(votes: Sequence[StrategyVote]) -> StrategyResult:
+    results = [v.result for v in votes if v.status == STATUS_OK]
+    if not results:
+        return _no_bet("Nenhuma estratégia respondeu no prazo", 0)
+    bettors = [r for r in results if r.should_bet]
+    agreement = len(bettors) / len(results)
+    if agreement <= 0.5:
+        return _no_bet("Maioria não recomendou", len(results), agreement)
+    return _combine(bettors, [1.0] * len(bettors), len(results), agreement)
+
+
+def weighted_vote(votes: Sequence[StrategyVote]) -> StrategyResult:
+    results = [v.result for v in votes if v.status == STATUS_OK]
+    if not results:
+        return _no_bet("Nenhuma estratégia respondeu no prazo", 0)
+    # Estratégia que não aposta pesa como a confiança máxima contra
+    total = sum(max(r.score, 1) if r.should_bet else 6 for r in results)
+    bettors = [r for r in results if r.should_bet]
+    agreement = sum(max(r.score, 1) for r in bettors) / total
+    if agreement <= 0.5:
+        return _no_bet("Peso dos votos insuficiente", len(results), agreement)
+    return _combine(bettors, [max(r.score, 1) for r in bettors], len(results), agreement)
+
+
+def unanimous_vote(votes: Sequence[StrategyVote]) -> StrategyResult:
+    results = [v.result for v in votes if v.status == STATUS_OK]
+    if not results:
+        return _no_bet("Nenhuma estratégia respondeu no prazo", 0)
+    if not all(r.should_bet for r in results):
+        agreement = sum(r.should_bet for r in results) / len(results)
+        return _no_bet("Sem unanimidade", len(results), agreement)
+    common = set(results[0].numbers).intersection(*(r.numbers for r in results[1:]))
+    if not common:
+        return _no_bet("Regiões sem interseção", len(results), 1.0)
+    numbers = [n for n in results[0].numbers if n in common]
+    center = Counter(r.center for r in results).most_common(1)[0][0]
+    return StrategyResult(
+        should_bet=True,
+        numbers=numbers,
+        center=center if center in common else numbers[len(numbers) // 2],
+        score=6,
+        visual=", ".join(str(n) for n in numbers),
+        details={"bettors": len(results), "voters": len(results), "agreement": 1.0}
+    )
+
+
+VOTING_RULES: Dict[str, VotingRule] = {
+    "majority": majority_vote,
+    "weighted": weighted_vote,
+    "unanimous": unanimous_vote,
+}
+
+
+# ========== RUNNER ==========
+
+def snapshot(timeline: Timeline, game_state: Optional[GameState] = None) -> TimelineSnapshot:
+    """
+    Cópia independente da timeline, para leitura fora do spin atual, com
+    StateExtension.freeze de cada extensão de `game_state` (no event loop).
+    """
+    extensions = {}
+    if game_state is not None:
+        extensions = {
+            name: extension.freeze(timeline.direction) for name, extension in game_state.extensions.items()
+        }
+    return TimelineSnapshot(timeline, extensions)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Pool de threads das estratégias (um por processo, criado sob demanda)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.strategy.ensemble_workers), thread_name_prefix="strategy"
+        )
+    return _executor
+
+
+class EnsembleRunner:
+    """Estratégias avaliadas em paralelo por spin, combinadas por uma regra de voto."""
+
+    def __init__(self, strategies: Dict[str, StrategyBase], deadline_ms: float = 50.0,
+                 rule: str = "majority", executor: Optional[ThreadPoolExecutor] = None):
+        if rule not in VOTING_RULES:
+            raise ValueError(f"Regra de voto desconhecida: {rule} (use {', '.join(VOTING_RULES)})")
+        self.strategies = strategies
+        self.deadline = deadline_ms / 1000
+        self.rule = rule
+        self.vote = VOTING_RULES[rule]
+        self.executor = executor
+        # Futures ainda rodando (de um spin anterior, se atrasaram)
+        self._running: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_settings(cls) -> Optional["EnsembleRunner"]:
+        """Runner de STRATEGY_ENSEMBLE (None se vazio)."""
+        cfg = settings.strategy
+        if not cfg.ensemble:
+            return None
+        strategies = {name: create_strategy(name) for name in dict.fromkeys(cfg.ensemble)}
+        return cls(strategies, deadline_ms=cfg.ensemble_deadline_ms, rule=cfg.ensemble_vote)
+
+    def attach(self, game_state: GameState) -> None:
+        """Liga cada estratégia ao estado da mesa (ver StrategyBase.attach)."""
+        for strategy in self.strategies.values():
+            strategy.attach(game_state)
+
+    def prepare(self) -> None:
+        """StrategyBase.prepare de cada estratégia."""
+        for strategy in self.strategies.values():
+            strategy.prepare()
+
+    @staticmethod
+    def _timed(name: str, strategy: StrategyBase, timeline: Timeline, last_number: int,
+               wheel_sequence: List[int]) -> Tuple[StrategyResult, float]:
+        """analyze na thread do pool -> (resultado, ms). Mede também as que atrasarem."""
+        start = time.perf_counter()
+        try:
+            result = strategy.analyze(timeline, last_number, wheel_sequence)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            strategy_ms.labels(name).observe(elapsed)
+        return result, elapsed
+
+    async def evaluate(self, timeline: Timeline, last_number: int, wheel_sequence: List[int]) -> EnsembleResult:
+        """
+        Roda todas as estratégias até o deadline e combina as que responderam.
+        `timeline` deve ser um snapshot (não muda durante a avaliação).
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor or get_executor()
+        start = time.perf_counter()
+
+        votes: Dict[str, StrategyVote] = {}
+        pending: Dict[asyncio.Future, str] = {}
+        for name, strategy in self.strategies.items():
+            running = self._running.get(name)
+            if running is not None and not running.done():
+                votes[name] = StrategyVote(name, STATUS_BUSY)
+                continue
+            future = loop.run_in_executor(
+                executor, self._timed, name, strategy, timeline, last_number, wheel_sequence
+            )
+            self._running[name] = future
+            pending[future] = name
+
+        if pending:
+            done, late = await asyncio.wait(pending, timeout=self.deadline)
+        else:
+            done, late = set(), set()
+        for future in done:
+            name = pending[future]
+            error = future.exception()
+            if error is not None:
+                logger.warning(f"Estratégia {name} falhou: {error}")
+                ms = (time.perf_counter() - start) * 1000
+                votes[name] = StrategyVote(name, STATUS_ERROR, ms, error=f"{type(error).__name__}: {error}")
+            else:
+                result, ms = future.result()
+                votes[name] = StrategyVote(name, STATUS_OK, ms, result=result)
+        for future in late:
+            votes[pending[future]] = StrategyVote(pending[future], STATUS_LATE, self.deadline * 1000)
+            # Resultado descartado; a exceção (se houver) não vira "never retrieved"
+            future.add_done_callback(lambda f: f.exception())
+
+        ordered = [votes[name] for name in self.strategies]
+        for vote in ordered:
+            if vote.status != STATUS_OK:
+                strategy_dropped_total.labels(vote.name, vote.status).inc()
+        result = self.vote(ordered)
+        elapsed = (time.perf_counter() - start) * 1000
+        ensemble_ms.observe(elapsed)
+        return EnsembleResult(result=result, rule=self.rule, votes=ordered, ms=elapsed)
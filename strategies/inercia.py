@@ -0,0 +1,47 @@
+# Roleta Cloud - Inércia Preditiva (portada do RoletaV11)
+
+from typing import List
+
+from state.timeline import Timeline
+from .base import StrategyBase, StrategyResult
+from .clusters import best_baskets, clamp_force
+
+
+class InerciaPreditivaStrategy(StrategyBase):
+    """
+    Estratégia "Inércia Preditiva": a cesta mais densa das últimas forças
+    (largura 11, mínimo 3) define a força; 1 região de aposta.
+
+    Porte de EstrategiaInerciaPreditiva (archive/RoletaV11).
+    """
+
+    def __init__(self, forces_analyzed: int = 6, basket_width: int = 11,
+                 min_cluster: int = 3, num_neighbors: int = 5):
+        super().__init__(name="Inércia Preditiva", num_neighbors=num_neighbors)
+        self.forces_analyzed = forces_analyzed
+        self.basket_width = basket_width
+        self.min_cluster = min_cluster
+        self.description = f"Cluster mais denso, {num_neighbors * 2 + 1} números"
+
+    def analyze(self, timeline: Timeline, last_number: int, wheel_sequence: List[int]) -> StrategyResult:
+        forces = timeline.get_last_n(self.forces_analyzed)
+        if len(forces) < self.min_cluster:
+            return StrategyResult(details={"reason": f"Forças insuficientes ({len(forces)}/{self.min_cluster})"})
+
+        baskets = best_baskets(forces, self.basket_width // 2, self.min_cluster)
+        if not baskets:
+            return StrategyResult(details={"reason": "Sem cluster denso", "forces": forces})
+
+        cluster = baskets[0]
+        force = clamp_force(sum(cluster) / len(cluster))
+        center = self._apply_force(last_number, force, timeline.direction, wheel_sequence)
+        numbers = self.get_neighbors(center, self.num_neighbors, wheel_sequence)
+
+        return StrategyResult(
+            should_bet=True,
+            numbers=numbers,
+            center=center,
+            score=min(6, len(cluster)),
+            visual=self.get_visual_region(center, numbers),
+            details={"forces": forces, "predicted_force": force, "cluster": cluster}
+        )
@@ -0,0 +1,77 @@
+# Roleta Cloud - Kalman de Forças (portada de archive/backup_antes_sync)
+
+from typing import List, Optional
+
+from state.game import GameState
+from state.kalman import ForceKalman, KalmanExtension
+from state.timeline import Timeline, TimelineSnapshot
+from .base import StrategyBase, StrategyResult
+from .clusters import clamp_force
+
+
+class KalmanForceStrategy(StrategyBase):
+    """
+    Estratégia "Kalman": próxima força prevista por um filtro de Kalman de
+    aceleração constante (posição, velocidade, aceleração) por direção.
+
+    Com attach(game_state) o filtro é uma KalmanExtension do GameState:
+    atualizado em O(1) a cada process_spin e gravado no state.json, então
+    analyze só lê a previsão pronta (a congelada no snapshot, quando roda
+    no ensemble). Sem estado ligado (backtest, bench) o filtro é
+    recalculado sobre as forças da timeline.
+
+    Porte de KalmanFilter / LinhaDirecional (force_kalman.py,
+    force_predictor_v2.py) sem clustering nem detecção de outliers.
+    """
+
+    def __init__(self, min_forces: int = 3, process_noise: float = 0.5,
+                 measurement_noise: float = 1.0, num_neighbors: int = 8):
+        super().__init__(name="Kalman", num_neighbors=num_neighbors)
+        self.min_forces = min_forces
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.extension: Optional[KalmanExtension] = None
+        self.description = f"Filtro de Kalman (aceleração constante), {num_neighbors * 2 + 1} números"
+
+    def attach(self, game_state: GameState) -> None:
+        extension = game_state.attach_extension(KalmanExtension(self.process_noise, self.measurement_noise))
+        if isinstance(extension, KalmanExtension):
+            self.extension = extension
+
+    def analyze(self, timeline: Timeline, last_number: int, wheel_sequence: List[int]) -> StrategyResult:
+        if isinstance(timeline, TimelineSnapshot) and KalmanExtension.name in timeline.extensions:
+            forecast = timeline.extensions[KalmanExtension.name]
+        elif self.extension is not None:
+            forecast = self.extension.forecast(timeline.direction)
+        else:
+            forecast = None
+        if forecast is None:
+            kf = ForceKalman.from_forces(
+                reversed(timeline.forces),
+                process_noise=self.process_noise, measurement_noise=self.measurement_noise
+            )
+            predicted, confidence = kf.forecast()
+            observed = kf.updates
+        else:
+            predicted, confidence, observed = forecast
+
+        if observed < self.min_forces:
+            return StrategyResult(details={"reason": f"Forças insuficientes ({observed}/{self.min_forces})"})
+
+        force = clamp_force(predicted)
+        center = self._apply_force(last_number, force, timeline.direction, wheel_sequence)
+        numbers = self.get_neighbors(center, self.num_neighbors, wheel_sequence)
+
+        return StrategyResult(
+            should_bet=True,
+            numbers=numbers,
+            center=center,
+            score=3,
+            visual=self.get_visual_region(center, numbers),
+            details={
+                "predicted_force": force,
+                "kalman_force": round(predicted, 2),
+                "confidence": round(confidence, 3),
+                "observed": observed
+            }
+        )
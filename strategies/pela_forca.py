@@ -0,0 +1,67 @@
+# Roleta Cloud - Pela Força (portada do RoletaV11)
+
+from statistics import median
+from typing import List
+
+from state.timeline import Timeline
+from .base import StrategyBase, StrategyResult
+from .clusters import best_baskets, clamp_force
+
+
+class PelaForcaStrategy(StrategyBase):
+    """
+    Estratégia "Pela Força": as duas cestas mais cheias das forças recentes
+    viram duas regiões de aposta. A cesta que contém a última força é a
+    principal e recebe um ajuste na direção da variação mais recente.
+
+    Porte de EstrategiaPelaForca (archive/RoletaV11): lê a timeline alvo
+    em vez do histórico completo.
+    """
+
+    def __init__(self, forces_analyzed: int = 6, basket_radius: int = 3,
+                 adjust_factor: float = 3.0, num_neighbors: int = 4):
+        super().__init__(name="Pela Força", num_neighbors=num_neighbors)
+        self.forces_analyzed = forces_analyzed
+        self.basket_radius = basket_radius
+        self.adjust_factor = adjust_factor
+        self.description = f"2 regiões das cestas de força, {num_neighbors * 2 + 1} números cada"
+
+    def analyze(self, timeline: Timeline, last_number: int, wheel_sequence: List[int]) -> StrategyResult:
+        forces = timeline.get_last_n(self.forces_analyzed)
+        if len(forces) < 2:
+            return StrategyResult(details={"reason": f"Forças insuficientes ({len(forces)}/2)"})
+
+        baskets = best_baskets(forces, self.basket_radius)
+        if len(baskets) < 2:
+            return StrategyResult(details={"reason": "Menos de 2 cestas", "forces": forces})
+
+        basket_a, basket_b = baskets[0], baskets[1]
+        last, previous = forces[0], forces[1]
+        if last not in basket_a and last in basket_b:
+            basket_a, basket_b = basket_b, basket_a
+
+        adjust = round(abs(last - previous) / self.adjust_factor)
+        force_a = clamp_force(median(basket_a) + (adjust if last >= previous else -adjust))
+        force_b = clamp_force(median(basket_b))
+
+        centers = [self._apply_force(last_number, force, timeline.direction, wheel_sequence)
+                   for force in (force_a, force_b)]
+        numbers: List[int] = []
+        for center in centers:
+            numbers.extend(n for n in self.get_neighbors(center, self.num_neighbors, wheel_sequence) if n not in numbers)
+
+        return StrategyResult(
+            should_bet=True,
+            numbers=numbers,
+            center=centers[0],
+            score=min(6, len(basket_a) + len(basket_b)),
+            visual=" / ".join(
+                self.get_visual_region(c, self.get_neighbors(c, self.num_neighbors, wheel_sequence)) for c in centers
+            ),
+            details={
+                "forces": forces,
+                "centers": centers,
+                "predicted_forces": [force_a, force_b],
+                "baskets": [basket_a, basket_b]
+            }
+        )
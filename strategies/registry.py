@@ -0,0 +1,53 @@
+# Roleta Cloud - Registro de Estratégias
+"""
+Estratégias disponíveis por nome (STRATEGY_PRIMARY, STRATEGY_ENSEMBLE):
+
+    sda17, sda11, sda9, sda7   SDA-17 e variantes com menos vizinhos
+    pela_forca                 2 regiões pelas cestas de força
+    inercia                    cluster mais denso, 11 números
+    ressonancia                tendência polinomial + centro gravitacional
+    kalman                     filtro de Kalman por direção (estado no state.json)
+
+    strategy = create_strategy("inercia")
+    register_strategy("minha", lambda: MinhaStrategy(...))
+"""
+
+from functools import partial
+from typing import Callable, Dict, List
+
+from .base import StrategyBase
+from .inercia import InerciaPreditivaStrategy
+from .kalman import KalmanForceStrategy
+from .pela_forca import PelaForcaStrategy
+from .ressonancia import RessonanciaPolinomialStrategy
+from .sda17 import SDA17Strategy
+
+StrategyFactory = Callable[[], StrategyBase]
+
+STRATEGIES: Dict[str, StrategyFactory] = {
+    "sda17": SDA17Strategy,
+    "sda11": partial(SDA17Strategy, num_neighbors=5),
+    "sda9": partial(SDA17Strategy, num_neighbors=4),
+    "sda7": partial(SDA17Strategy, num_neighbors=3),
+    "pela_forca": PelaForcaStrategy,
+    "inercia": InerciaPreditivaStrategy,
+    "ressonancia": RessonanciaPolinomialStrategy,
+    "kalman": KalmanForceStrategy,
+}
+
+
+def register_strategy(name: str, factory: StrategyFactory) -> None:
+    """Registra (ou substitui) uma estratégia."""
+    STRATEGIES[name] = factory
+
+
+def available_strategies() -> List[str]:
+    return list(STRATEGIES)
+
+
+def create_strategy(name: str) -> StrategyBase:
+    """Nova instância da estratégia `name` (ValueError se desconhecida)."""
+    factory = STRATEGIES.get(name)
+    if factory is None:
+        raise ValueError(f"Estratégia desconhecida: {name} (disponíveis: {', '.join(STRATEGIES)})")
+    return factory()
@@ -0,0 +1,65 @@
+# Roleta Cloud - Ressonância Polinomial (portada do RoletaV11)
+
+from statistics import median
+from typing import List
+
+import numpy as np
+
+from state.timeline import Timeline
+from .base import StrategyBase, StrategyResult
+from .clusters import best_cluster_mean, clamp_force
+
+
+class RessonanciaPolinomialStrategy(StrategyBase):
+    """
+    Estratégia "Ressonância Polinomial": mistura a tendência (polinômio de
+    grau 2 sobre as últimas 12 forças, extrapolado um passo) com o centro
+    gravitacional das 6 mais recentes (cluster, ou mediana).
+
+    Porte de EstrategiaRessonanciaPolinomial (archive/RoletaV11). A
+    confiança lá subia/descia com o acerto anterior; aqui é fixa
+    (`confidence`), porque analyze não recebe o resultado e a mesma
+    instância roda em paralelo no ensemble.
+    """
+
+    def __init__(self, memory: int = 12, gravity_forces: int = 6, basket_width: int = 11,
+                 confidence: float = 0.5, num_neighbors: int = 9):
+        super().__init__(name="Ressonância Polinomial", num_neighbors=num_neighbors)
+        self.memory = memory
+        self.gravity_forces = gravity_forces
+        self.basket_width = basket_width
+        self.confidence = confidence
+        self.description = f"Tendência polinomial + centro gravitacional, {num_neighbors * 2 + 1} números"
+
+    def analyze(self, timeline: Timeline, last_number: int, wheel_sequence: List[int]) -> StrategyResult:
+        forces = timeline.get_last_n(self.memory)
+        if len(forces) < 4:
+            return StrategyResult(details={"reason": f"Forças insuficientes ({len(forces)}/4)"})
+
+        # Mais antiga -> mais recente, extrapola o próximo ponto
+        y = np.array(forces[::-1], dtype=float)
+        x = np.arange(len(y))
+        trend = float(np.polyval(np.polyfit(x, y, 2), len(y)))
+
+        recent = forces[:self.gravity_forces]
+        gravity = best_cluster_mean(recent, self.basket_width, 1)
+        if gravity is None:
+            gravity = median(recent)
+
+        force = clamp_force(trend * self.confidence + gravity * (1 - self.confidence))
+        center = self._apply_force(last_number, force, timeline.direction, wheel_sequence)
+        numbers = self.get_neighbors(center, self.num_neighbors, wheel_sequence)
+
+        return StrategyResult(
+            should_bet=True,
+            numbers=numbers,
+            center=center,
+            score=3,
+            visual=self.get_visual_region(center, numbers),
+            details={
+                "forces": forces,
+                "predicted_force": force,
+                "trend_force": round(trend, 2),
+                "gravity_force": round(float(gravity), 2)
+            }
+        )
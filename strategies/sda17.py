@@ -1,9 +1,11 @@
 # Roleta Cloud - SDA-17 Strategy (Cluster + Momentum)
 
-from typing import List, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any
 from statistics import mean
+from app_config.settings import settings
 from state.timeline import Timeline
 from .base import StrategyBase, StrategyResult
+from .decision_table import DecisionTable, get_decision_table
 
 
 class SDA17Strategy(StrategyBase):
@@ -16,13 +18,45 @@ class SDA17Strategy(StrategyBase):
     - Sugere 17 números (1 centro + 8 de cada lado)
     
     Melhoria comprovada: +80% vs regressão linear
+    
+    Parâmetros ausentes vêm de settings.strategy (SDA_MIN_FORCES,
+    SDA_CLUSTER_PROXIMITY, SDA_NUM_NEIGHBORS); ver backtest.sweep.
+
+    O cluster mode vem da tabela pré-calculada (strategies.decision_table)
+    quando ela existe para os parâmetros; senão, _predict_cluster por spin.
+    A tabela é carregada (ou calculada) em prepare, não no construtor:
+    criar a estratégia não faz I/O.
     """
     
-    def __init__(self):
-        super().__init__(name="SDA-17", num_neighbors=8)
-        self.min_forces = 3  # Reduzido de 5 para início mais rápido
-        self.description = "Cluster + Momentum, 17 números"
-        self.cluster_proximity = 5  # Agrupa forças dentro de ±5
+    def __init__(
+        self,
+        min_forces: Optional[int] = None,
+        cluster_proximity: Optional[int] = None,
+        num_neighbors: Optional[int] = None
+    ):
+        config = settings.strategy
+        num_neighbors = num_neighbors if num_neighbors is not None else config.sda_num_neighbors
+        # SDA-17 no padrão; variantes com menos vizinhos viram SDA-11, SDA-9...
+        super().__init__(name=f"SDA-{num_neighbors * 2 + 1}", num_neighbors=num_neighbors)
+        # Padrão 3 (reduzido de 5 para início mais rápido)
+        self.min_forces = min_forces if min_forces is not None else config.sda_min_forces
+        self.description = f"Cluster + Momentum, {self.num_neighbors * 2 + 1} números"
+        # Agrupa forças dentro de ±N (padrão 5)
+        self.cluster_proximity = cluster_proximity if cluster_proximity is not None else config.sda_cluster_proximity
+        self._table: Optional[DecisionTable] = None
+        self._prepared = False
+    
+    def prepare(self) -> None:
+        if not self._prepared:
+            self._table = get_decision_table(self.min_forces, self.cluster_proximity)
+            self._prepared = True
+    
+    @property
+    def table(self) -> Optional[DecisionTable]:
+        """Tabela de decisão (None se desligada ou grande demais); carrega no primeiro uso."""
+        if not self._prepared:
+            self.prepare()
+        return self._table
     
     def analyze(
         self,
@@ -41,11 +75,17 @@ class SDA17Strategy(StrategyBase):
                 details={"reason": f"Forças insuficientes ({timeline.size}/{self.min_forces})"}
             )
         
-        # Pegar últimas 5 forças
-        forces = timeline.get_last_n(self.min_forces)
+        # Pegar últimas forças (view sem cópia do ring buffer)
+        forces = timeline.recent(self.min_forces)
         
-        # Prever próxima força usando CLUSTER MODE
-        predicted_force, cluster_info = self._predict_cluster(forces)
+        # Prever próxima força usando CLUSTER MODE (leitura de tabela se disponível)
+        table = self.table
+        decision = table.lookup(forces) if table is not None else None
+        if decision is not None:
+            predicted_force, cluster_size, cluster_members = decision
+        else:
+            predicted_force, cluster_info = self._predict_cluster(forces)
+            cluster_size, cluster_members = cluster_info["cluster_size"], cluster_info["cluster_members"]
         
         # Aplicar offset de momentum
         original_force = predicted_force
@@ -53,7 +93,7 @@ class SDA17Strategy(StrategyBase):
             predicted_force = max(1, min(37, predicted_force + calibration))
         
         # Calcular confiança baseada no tamanho do cluster
-        confidence = min(6, cluster_info["cluster_size"] + 1)
+        confidence = min(6, cluster_size + 1)
         
         # Aplicar força predita ao último número
         center_number = self._apply_force(
@@ -74,11 +114,11 @@ class SDA17Strategy(StrategyBase):
             score=confidence,
             visual=visual,
             details={
-                "forces": forces,
+                "forces": forces.tolist(),
                 "predicted_force": predicted_force,
                 "original_prediction": original_force,
-                "cluster": cluster_info["cluster_members"],
-                "cluster_size": cluster_info["cluster_size"],
+                "cluster": cluster_members,
+                "cluster_size": cluster_size,
                 "method": "cluster+momentum",
                 "calibration": calibration
             }
@@ -155,24 +195,3 @@ class SDA17Strategy(StrategyBase):
         
         # Limitar a ±8
         return max(-8, min(8, new_offset))
-    
-    def _apply_force(
-        self,
-        from_number: int,
-        force: int,
-        target_direction: str,
-        wheel_sequence: List[int]
-    ) -> int:
-        """Aplica força ao número, retorna número resultado."""
-        try:
-            from_idx = wheel_sequence.index(from_number)
-            wheel_size = len(wheel_sequence)
-            
-            if target_direction in ("cw", "horario"):
-                target_idx = (from_idx + force) % wheel_size
-            else:
-                target_idx = (from_idx - force) % wheel_size
-            
-            return wheel_sequence[target_idx]
-        except ValueError:
-            return from_number
@@ -0,0 +1,24 @@
+# Roleta Cloud - Configuração dos Testes
+"""
+Estado, journal, mesas, banco e caches apontam para um diretório
+temporário antes de qualquer import de app_config.settings.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_workdir = Path(tempfile.mkdtemp(prefix="roleta-tests-"))
+os.environ.update({
+    "STATE_FILE": str(_workdir / "state.json"),
+    "JOURNAL_FILE": str(_workdir / "spins.journal"),
+    "TABLES_DIR": str(_workdir / "tables"),
+    "CACHE_DIR": str(_workdir / "cache"),
+    "DB_PATH": str(_workdir / "decisions.db"),
+    "LOG_FILE": str(_workdir / "roleta.log"),
+})
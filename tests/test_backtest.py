@@ -0,0 +1,42 @@
+# Roleta Cloud - Testes do Backtest (janelas do Triple Rate)
+
+import argparse
+
+import pytest
+
+from backtest.data import random_spins
+from backtest.engine import BacktestParams, run
+from backtest.reference import replay
+from backtest.sweep import parse_windows
+from state.game import history_capacity, new_hit_history
+
+
+@pytest.mark.parametrize("windows", [(4, 6, 12), (4, 12, 24), (3, 20, 40)])
+def test_engine_matches_reference(windows):
+    sequence = random_spins(1500, seed=5)
+    params = BacktestParams.from_production(windows=windows)
+    assert run(sequence, params).to_dict() == replay(sequence, params).to_dict()
+
+
+def test_long_window_is_not_clamped():
+    sequence = random_spins(1500, seed=5)
+    report = run(sequence, BacktestParams.from_production(windows=(4, 12, 24)))
+    # Com a janela longa cortada em 12, média == longa e "media" nunca aparecia
+    assert report.confidence["media"] > 0
+
+
+def test_history_covers_largest_window():
+    assert history_capacity((4, 6, 12)) == 12
+    assert history_capacity((4, 12, 24)) == 24
+    history = new_hit_history([True] * 30, windows=(4, 12, 24))
+    assert history.capacity == 24
+    assert history.hits_in(24) == 24
+    assert BacktestParams(windows=(4, 12, 24)).history_capacity == 24
+
+
+def test_parse_windows():
+    assert parse_windows("4/6/12, 4/12/24") == [(4, 6, 12), (4, 12, 24)]
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_windows("4/12")
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_windows("0/6/12")
@@ -0,0 +1,96 @@
+# Roleta Cloud - Testes do Codec (frames malformados)
+
+import asyncio
+
+import pytest
+
+from codec import DecodeError, LegacySpin, SUBPROTOCOL_MSGPACK, binary_codec, codec, create_backend
+from codec.binary import MAX_DEPTH, BinaryCodec, Packer
+from server.message_router import RateLimiter
+
+MALFORMED_BINARY = [
+    pytest.param(b"\x81\x90\x01", id="list-key"),
+    pytest.param(b"\x81\x80\x01", id="map-key"),
+    pytest.param(b"\x91" * 5000 + b"\x00", id="deep-array"),
+    pytest.param(b"\x81" * 5000, id="deep-map"),
+    pytest.param(b"\x81\x00\x91\x01", id="unhashable-type-id"),
+    pytest.param(b"\x81\x00\x63", id="unknown-type-id"),
+    pytest.param(b"\xa3ab", id="truncated-str"),
+    pytest.param(b"\xa2\xff\xfe", id="invalid-utf8"),
+    pytest.param(b"\xc1", id="unsupported-format"),
+    pytest.param(b"\x01\x02", id="trailing-bytes"),
+    pytest.param(b"", id="empty"),
+]
+
+
+class FakeWebSocket:
+    def __init__(self, subprotocol=None):
+        self.subprotocol = subprotocol
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+@pytest.mark.parametrize("frame", MALFORMED_BINARY)
+def test_pure_python_decoder_raises_decode_error(frame):
+    with pytest.raises(DecodeError):
+        BinaryCodec(native=False).loads(frame)
+
+
+@pytest.mark.parametrize("frame", MALFORMED_BINARY)
+def test_default_decoder_raises_decode_error(frame):
+    with pytest.raises(DecodeError):
+        binary_codec.loads(frame)
+
+
+@pytest.mark.parametrize("frame", MALFORMED_BINARY)
+def test_screen_passes_malformed_binary_as_invalid(frame):
+    websocket = FakeWebSocket(SUBPROTOCOL_MSGPACK)
+    allowed, data = asyncio.run(RateLimiter(enabled=True).screen(websocket, frame, invalid="INVALID"))
+    assert allowed is True
+    assert data == "INVALID"
+
+
+def test_nesting_within_limit_decodes():
+    nested = 0
+    for _ in range(MAX_DEPTH - 1):
+        nested = [nested]
+    assert BinaryCodec(native=False).loads(Packer().pack(nested)) == nested
+
+
+@pytest.mark.parametrize("backend", ["json", "orjson"])
+def test_deep_json_raises_decode_error(backend):
+    try:
+        text = create_backend(backend)
+    except ImportError:
+        pytest.skip(f"{backend} não instalado")
+    with pytest.raises(DecodeError):
+        text.loads("[" * 100000)
+
+
+def test_round_trip_still_works():
+    message = {"type": "ack", "received": 3, "message": "ok", "t_server": 1}
+    assert binary_codec.loads(binary_codec.dumps(message)) == message
+    assert codec.loads(codec.dumps(message)) == message
+
+
+LAX_VALUES = [17, "17", " 17 ", "17.0", "-0", "+3", "1_0", 17.0, True, 17.5, "17.5", "1e1", "0x11", "", None, [17]]
+
+
+@pytest.mark.parametrize("value", LAX_VALUES, ids=repr)
+def test_legacy_spin_accepts_what_spin_input_accepted(value):
+    """LegacySpin segue a coerção lax do SpinInput (pydantic) em numero e t_client."""
+    pydantic = pytest.importorskip("pydantic")
+    from models.input import SpinInput
+
+    data = {"numero": value, "direcao": "horario", "trace_id": "abcd", "t_client": value}
+    try:
+        expected = SpinInput(**data).model_dump()
+    except pydantic.ValidationError:
+        with pytest.raises(ValueError):
+            LegacySpin.from_dict(data)
+    else:
+        spin = LegacySpin.from_dict(data)
+        assert vars(spin) == expected
+        assert type(spin.numero) is int and type(spin.t_client) is int
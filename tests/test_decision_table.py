@@ -0,0 +1,57 @@
+# Roleta Cloud - Testes da Tabela de Decisão do SDA17
+
+import random
+
+import pytest
+
+from app_config.settings import settings
+from strategies import decision_table
+from strategies.decision_table import DecisionTable, get_decision_table
+from strategies.sda17 import SDA17Strategy
+
+
+@pytest.fixture
+def empty_cache(tmp_path, monkeypatch):
+    """Sem tabelas em memória e cache_dir vazio."""
+    monkeypatch.setattr(decision_table, "_tables", {})
+    monkeypatch.setattr(settings, "cache_dir", tmp_path / "cache")
+    return tmp_path / "cache"
+
+
+def test_strategy_creation_does_no_io(empty_cache):
+    strategy = SDA17Strategy(min_forces=2, cluster_proximity=5)
+    assert not empty_cache.exists()
+    assert decision_table._tables == {}
+
+    strategy.prepare()
+    assert strategy.table is not None
+    assert [p.name for p in empty_cache.iterdir()] == [DecisionTable.filename(2, 5, 37)]
+    table = strategy.table
+    strategy.prepare()
+    assert strategy.table is table
+
+
+def test_table_loaded_on_first_use(empty_cache):
+    strategy = SDA17Strategy(min_forces=2, cluster_proximity=5)
+    assert strategy._table is None
+    assert strategy.table is get_decision_table(2, 5)
+
+
+def test_lookup_matches_per_spin_cluster(empty_cache):
+    strategy = SDA17Strategy(min_forces=3, cluster_proximity=5)
+    table = get_decision_table(3, 5)
+    rng = random.Random(7)
+    for _ in range(2000):
+        forces = [rng.randint(0, 36) for _ in range(3)]
+        predicted, size, members = table.lookup(forces)
+        expected, info = strategy._predict_cluster(forces)
+        assert (predicted, size, members) == (expected, info["cluster_size"], info["cluster_members"])
+    assert table.lookup([0, 37, 1]) is None
+
+
+def test_saved_table_is_reused(empty_cache):
+    built = get_decision_table(2, 3)
+    decision_table._tables.clear()
+    loaded = DecisionTable.load(empty_cache / DecisionTable.filename(2, 3, 37), 2, 3, 37)
+    assert loaded is not None
+    assert get_decision_table(2, 3).lookup([4, 6]) == built.lookup([4, 6])
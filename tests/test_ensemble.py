@@ -0,0 +1,126 @@
+# Roleta Cloud - Testes do Ensemble (regras de voto, prazo e busy)
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from state.timeline import Timeline
+from strategies.base import StrategyBase, StrategyResult
+from strategies.ensemble import (
+    STATUS_BUSY, STATUS_ERROR, STATUS_LATE, STATUS_OK, EnsembleRunner, StrategyVote,
+    majority_vote, unanimous_vote, weighted_vote
+)
+
+
+def _bet(numbers, center=None, score=6):
+    return StrategyResult(should_bet=True, numbers=list(numbers), center=center if center is not None else numbers[0], score=score)
+
+
+def _votes(*results, extra=()):
+    votes = [StrategyVote(f"s{i}", STATUS_OK, result=r) for i, r in enumerate(results)]
+    return votes + list(extra)
+
+
+NO_BET = StrategyResult()
+OUT = [StrategyVote("lenta", STATUS_LATE), StrategyVote("quebrada", STATUS_ERROR, error="ValueError")]
+
+
+def test_majority():
+    result = majority_vote(_votes(_bet([1, 2, 3], 2), _bet([2, 3, 4], 2), NO_BET, extra=OUT))
+    assert result.should_bet
+    # Mais votados primeiro; tamanho = mediana das apostas (empate: o primeiro visto)
+    assert result.numbers == [2, 3, 1] and result.center == 2
+    assert result.details == {"bettors": 2, "voters": 3, "agreement": 0.667}
+    assert result.score == 4
+
+    tie = majority_vote(_votes(_bet([1, 2, 3]), NO_BET))
+    assert not tie.should_bet and tie.details["agreement"] == 0.5
+    # Atrasadas e com erro não votam
+    assert majority_vote(_votes(extra=OUT)).details == {
+        "reason": "Nenhuma estratégia respondeu no prazo", "voters": 0, "agreement": 0.0
+    }
+
+
+def test_weighted():
+    # Quem não aposta pesa 6: score 5 contra 6 não passa
+    assert not weighted_vote(_votes(_bet([1, 2], score=5), NO_BET)).should_bet
+    result = weighted_vote(_votes(_bet([7, 8, 9], 8, score=3), _bet([8, 9, 10], 9, score=4), NO_BET))
+    assert result.should_bet and result.details["agreement"] == round(7 / 13, 3)
+    assert set(result.numbers) >= {8, 9} and result.center == 9  # centro do voto mais pesado
+    # Score 0 ainda conta como 1
+    assert weighted_vote(_votes(_bet([1], score=0))).details["agreement"] == 1.0
+
+
+def test_unanimous():
+    result = unanimous_vote(_votes(_bet([1, 2, 3, 4], 2), _bet([2, 3, 4, 5], 3), _bet([3, 4, 5, 6], 3), extra=OUT))
+    assert result.should_bet and result.numbers == [3, 4] and result.center == 3 and result.score == 6
+
+    # Centro mais votado fora da interseção: o do meio da interseção
+    assert unanimous_vote(_votes(_bet([1, 2, 3], 1), _bet([2, 3, 4], 1))).center == 3
+    split = unanimous_vote(_votes(_bet([1, 2]), NO_BET, NO_BET))
+    assert not split.should_bet and split.details["agreement"] == 0.333
+    disjoint = unanimous_vote(_votes(_bet([1, 2]), _bet([3, 4])))
+    assert not disjoint.should_bet and disjoint.details["reason"] == "Regiões sem interseção"
+
+
+class FixedStrategy(StrategyBase):
+    def __init__(self, name, result=None, gate=None, error=None):
+        super().__init__(name)
+        self.result = result or _bet([1, 2, 3])
+        self.gate = gate
+        self.error = error
+
+    def analyze(self, timeline, last_number, wheel_sequence):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=4)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_deadline_busy_and_error(executor):
+    gate = threading.Event()
+    strategies = {
+        "a": FixedStrategy("a", _bet([1, 2, 3])),
+        "b": FixedStrategy("b", _bet([2, 3, 4])),
+        "lenta": FixedStrategy("lenta", NO_BET, gate=gate),
+        "quebrada": FixedStrategy("quebrada", error=RuntimeError("falhou")),
+    }
+    runner = EnsembleRunner(strategies, deadline_ms=50, rule="majority", executor=executor)
+    timeline = Timeline("cw", forces=[3, 5, 7])
+
+    async def go():
+        first = await runner.evaluate(timeline, 17, [])
+        # A lenta ainda roda: não é disparada de novo
+        second = await runner.evaluate(timeline, 17, [])
+        gate.set()
+        await asyncio.sleep(0.05)
+        third = await runner.evaluate(timeline, 17, [])
+        return first, second, third
+
+    first, second, third = asyncio.run(go())
+
+    def statuses(result):
+        return {v.name: v.status for v in result.votes}
+
+    assert statuses(first) == {"a": STATUS_OK, "b": STATUS_OK, "lenta": STATUS_LATE, "quebrada": STATUS_ERROR}
+    assert first.result.should_bet and first.result.details["voters"] == 2
+    assert "RuntimeError" in first.votes[3].error
+    assert statuses(second)["lenta"] == STATUS_BUSY
+    assert statuses(third)["lenta"] == STATUS_OK
+    # Com a lenta votando contra: 2 de 3 ainda é maioria
+    assert third.result.details["voters"] == 3 and third.result.should_bet
+
+
+def test_unknown_rule():
+    with pytest.raises(ValueError):
+        EnsembleRunner({}, rule="sorteio")
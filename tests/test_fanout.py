@@ -0,0 +1,126 @@
+# Roleta Cloud - Testes do Fan-out (políticas de consumidor lento)
+
+import asyncio
+
+from server.fanout import (
+    KIND_EVENT, KIND_HEARTBEAT, KIND_STATE, POLICY_COALESCE, POLICY_DISCONNECT, ConnectionSender
+)
+
+
+class FakeWebSocket:
+    subprotocol = None
+
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+
+    async def send(self, message):
+        if self.fail:
+            raise ConnectionError("socket fechado")
+        self.sent.append(message)
+
+
+def _queued(sender):
+    return [(item.kind, item.message) for item in sender._queue]
+
+
+def test_drop_oldest_heartbeat_evicts_state_before_events():
+    # Sem start(): a fila só enche (nada é enviado)
+    sender = ConnectionSender("c1", FakeWebSocket(), max_queue=3)
+    assert sender.enqueue("e0")
+    assert sender.enqueue("s0", KIND_STATE)
+    assert sender.enqueue("e1")
+
+    assert sender.enqueue("e2")  # cheia: sai o state
+    assert _queued(sender) == [(KIND_EVENT, "e0"), (KIND_EVENT, "e1"), (KIND_EVENT, "e2")]
+    assert sender.dropped == 1
+
+    # Só eventos: heartbeat/state não derrubam um evento...
+    assert not sender.enqueue("h0", KIND_HEARTBEAT)
+    assert not sender.enqueue("s1", KIND_STATE)
+    assert sender.dropped == 3
+    # ...mas um evento novo derruba o evento mais antigo
+    assert sender.enqueue("e3")
+    assert [m for _, m in _queued(sender)] == ["e1", "e2", "e3"]
+    assert sender.dropped == 4
+
+
+def test_state_and_heartbeat_coalesce_in_place():
+    sender = ConnectionSender("c1", FakeWebSocket(), max_queue=10)
+    sender.enqueue("e0")
+    sender.enqueue("h0", KIND_HEARTBEAT)
+    sender.enqueue("e1")
+
+    # state substitui o heartbeat na mesma posição; heartbeat não entra com state na fila
+    assert sender.enqueue("s0", KIND_STATE)
+    assert sender.enqueue("h1", KIND_HEARTBEAT)
+    assert sender.enqueue("s1", KIND_STATE)
+    assert _queued(sender) == [(KIND_EVENT, "e0"), (KIND_STATE, "s1"), (KIND_EVENT, "e1")]
+    assert sender.coalesced == 3 and sender.dropped == 0
+
+
+def test_coalesce_policy_replaces_same_key():
+    sender = ConnectionSender("c1", FakeWebSocket(), max_queue=10, policy=POLICY_COALESCE)
+    sender.enqueue("t0", key="trace")
+    sender.enqueue("e0")
+    sender.enqueue("t1", key="trace")
+    sender.enqueue("e1")
+    assert [m for _, m in _queued(sender)] == ["t1", "e0", "e1"]
+    assert sender.coalesced == 1
+
+    # Sem coalesce, a mesma chave enfileira de novo
+    plain = ConnectionSender("c2", FakeWebSocket(), max_queue=10)
+    plain.enqueue("t0", key="trace")
+    plain.enqueue("t1", key="trace")
+    assert plain.depth == 2
+
+
+def test_disconnect_policy_evicts_slow_consumer():
+    async def go():
+        failed = []
+
+        async def on_failure(conn_id):
+            failed.append(conn_id)
+
+        sender = ConnectionSender("c1", FakeWebSocket(), max_queue=2, policy=POLICY_DISCONNECT, on_failure=on_failure)
+        assert sender.enqueue("e0") and sender.enqueue("e1")
+        assert not sender.enqueue("e2")
+        await asyncio.sleep(0)
+        assert failed == ["c1"]
+        assert sender.stats()["failed"] and sender.depth == 0
+        assert not sender.enqueue("e3")
+
+    asyncio.run(go())
+
+
+def test_send_failure_disconnects():
+    async def go():
+        failed = []
+
+        async def on_failure(conn_id):
+            failed.append(conn_id)
+
+        sender = ConnectionSender("c1", FakeWebSocket(fail=True), on_failure=on_failure)
+        sender.start()
+        sender.enqueue("e0")
+        await asyncio.sleep(0.01)
+        assert failed == ["c1"]
+        await sender.stop()
+
+    asyncio.run(go())
+
+
+def test_delivery_in_order_with_on_sent():
+    async def go():
+        websocket = FakeWebSocket()
+        sender = ConnectionSender("c1", websocket)
+        sender.start()
+        done = []
+        for i in range(5):
+            sender.enqueue(f"e{i}", on_sent=lambda i=i: done.append(i))
+        await asyncio.sleep(0.01)
+        assert websocket.sent == [f"e{i}" for i in range(5)]
+        assert done == list(range(5)) and sender.sent == 5
+        await sender.stop()
+
+    asyncio.run(go())
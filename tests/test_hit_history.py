@@ -0,0 +1,94 @@
+# Roleta Cloud - Testes do HitHistory (comparado a uma lista simples)
+
+import random
+
+import pytest
+
+from state.hit_history import HitHistory
+
+WINDOWS = (4, 6, 12)
+
+
+class ListHistory:
+    """Referência: lista (mais recente primeiro) cortada na capacidade."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.results = []
+
+    def record(self, hit: bool) -> None:
+        self.results = [hit, *self.results][:self.capacity]
+
+    def hits_in(self, window: int) -> int:
+        return sum(self.results[:max(window, 0)])
+
+    def rate(self, window: int) -> float:
+        n = min(window, len(self.results))
+        return self.hits_in(window) / n if n > 0 else 0.0
+
+    def streak(self) -> int:
+        run = 0
+        for hit in self.results:
+            if hit != self.results[0]:
+                break
+            run += 1
+        return run
+
+
+def _check(history: HitHistory, reference: ListHistory, queried) -> None:
+    assert history.to_list() == reference.results
+    assert len(history) == len(reference.results)
+    assert history.hits == sum(reference.results)
+    assert history.streak() == reference.streak()
+    for window in queried:
+        assert history.hits_in(window) == reference.hits_in(window), window
+        assert history.rate(window) == pytest.approx(reference.rate(window)), window
+
+
+@pytest.mark.parametrize("capacity", [1, 5, 12, 64, 100])
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_list_reference(capacity, seed):
+    rng = random.Random(seed * 1000 + capacity)
+    bias = rng.random()
+    history = HitHistory(capacity=capacity, windows=WINDOWS)
+    reference = ListHistory(capacity)
+    # Janelas rastreadas, não rastreadas, na capacidade e acima dela
+    queried = sorted({0, 1, 3, *WINDOWS, capacity - 1, capacity, capacity + 1, 2 * capacity})
+
+    for _ in range(3 * capacity + 50):
+        hit = rng.random() < bias
+        history.record(hit)
+        reference.record(hit)
+        _check(history, reference, queried)
+
+
+@pytest.mark.parametrize("capacity", [4, 12, 24])
+def test_initial_results_and_clear(capacity):
+    rng = random.Random(capacity)
+    results = [rng.random() < 0.5 for _ in range(capacity + 7)]
+    history = HitHistory(capacity=capacity, windows=WINDOWS, results=results)
+    reference = ListHistory(capacity)
+    for hit in reversed(results):
+        reference.record(hit)
+    _check(history, reference, [*WINDOWS, capacity, capacity + 3])
+    assert HitHistory.from_list(results, capacity=capacity, windows=WINDOWS) == history
+
+    history.clear()
+    assert len(history) == 0 and history.hits == 0 and history.streak() == 0
+    assert [history.hits_in(w) for w in WINDOWS] == [0, 0, 0]
+    reference = ListHistory(capacity)
+    for hit in results:
+        history.record(hit)
+        reference.record(hit)
+    _check(history, reference, [*WINDOWS, capacity])
+
+
+def test_sequence_protocol():
+    history = HitHistory(capacity=5, results=[True, False, False, True])
+    assert history[0] is True and history[-1] is True and history[1] is False
+    assert history[1:3] == [False, False]
+    assert list(history) == [True, False, False, True]
+    assert history == [True, False, False, True]
+    assert bool(history) and not HitHistory()
+    with pytest.raises(IndexError):
+        history[4]
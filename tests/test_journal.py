@@ -0,0 +1,258 @@
+# Roleta Cloud - Testes do Journal de Spins
+
+import pytest
+
+from state.game import GameState
+from state.journal import RECORD_CLEAR, RECORD_RESET, RECORD_SPIN, SpinJournal
+
+SPINS = [(17, "horario"), (4, "anti-horario"), (32, "horario"), (0, "anti-horario"), (26, "horario")]
+
+
+def _fill(journal: SpinJournal, spins=SPINS) -> None:
+    for i, (numero, direcao) in enumerate(spins):
+        journal.append_spin(numero, direcao, t_client=1000 + i, t_server=2000 + i, trace_id=f"trace-{i}")
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "spins.journal"
+    journal = SpinJournal(path)
+    _fill(journal)
+    assert journal.append_clear(t_server=9) == 6
+    assert journal.append_reset(keep_last_number=True) == 7
+    journal.close()
+
+    reopened = SpinJournal(path)
+    records = list(reopened.records())
+    assert [r.seq for r in records] == list(range(1, 8))
+    assert [r.kind for r in records] == [RECORD_SPIN] * 5 + [RECORD_CLEAR, RECORD_RESET]
+    assert [(r.numero, r.direcao) for r in records[:5]] == SPINS
+    assert records[2].t_client == 1002 and records[2].t_server == 2002 and records[2].trace_id == "trace-2"
+    assert records[6].numero == 1
+    assert [r.seq for r in reopened.records(after_seq=5)] == [6, 7]
+
+
+def test_trace_id_truncated(tmp_path):
+    journal = SpinJournal(tmp_path / "spins.journal")
+    journal.append_spin(1, "horario", trace_id="x" * 50)
+    assert next(journal.records()).trace_id == "x" * SpinJournal.TRACE_ID_SIZE
+
+
+@pytest.mark.parametrize("damage", ["partial", "crc"])
+def test_invalid_tail_truncated(tmp_path, damage):
+    path = tmp_path / "spins.journal"
+    journal = SpinJournal(path)
+    _fill(journal)
+    journal.close()
+
+    raw = bytearray(path.read_bytes())
+    if damage == "partial":
+        raw = raw[:-10]  # escrita interrompida no meio do último registro
+    else:
+        raw[-8] ^= 0xFF  # último registro com CRC que não bate
+    path.write_bytes(bytes(raw))
+
+    reopened = SpinJournal(path)
+    assert reopened.count == 4
+    assert path.stat().st_size == SpinJournal.HEADER.size + 4 * SpinJournal.RECORD.size
+    assert [(r.numero, r.direcao) for r in reopened.records()] == SPINS[:4]
+    # O próximo registro reusa o seq do descartado
+    assert reopened.append_spin(9, "horario") == 5
+
+
+def test_invalid_magic(tmp_path):
+    path = tmp_path / "spins.journal"
+    path.write_bytes(b"XXXX" + bytes(8))
+    with pytest.raises(ValueError):
+        SpinJournal(path)
+
+
+def test_compact(tmp_path):
+    path = tmp_path / "spins.journal"
+    journal = SpinJournal(path, compact_every=3)
+    _fill(journal)
+
+    assert journal.maybe_compact(2) == 0
+    assert journal.compact(3) == 3
+    assert (journal.base_seq, journal.count, journal.last_seq) == (4, 2, 5)
+    assert [r.seq for r in journal.records()] == [4, 5]
+    assert journal.compact(3) == 0
+
+    assert journal.append_spin(7, "horario") == 6
+    assert journal.maybe_compact(6) == 3
+    segments = journal.archived_segments()
+    assert [p.name for p in segments] == ["spins.journal.000000000001", "spins.journal.000000000004"]
+    assert [r.seq for r in journal.iter_all()] == [1, 2, 3, 4, 5, 6]
+    assert [r.numero for r in journal.iter_all()] == [n for n, _ in SPINS] + [7]
+    journal.close()
+
+    reopened = SpinJournal(path)
+    assert (reopened.base_seq, reopened.count) == (7, 0)
+    assert reopened.append_spin(1, "horario") == 7
+
+
+def test_compact_does_not_block_appends(tmp_path, monkeypatch):
+    import threading
+
+    path = tmp_path / "spins.journal"
+    journal = SpinJournal(path)
+    _fill(journal)
+    build = journal._build_segment
+    appended = []
+
+    def build_and_append(*args):
+        temp_path = build(*args)
+        # Spin chegando enquanto os segmentos são gravados
+        worker = threading.Thread(target=lambda: appended.append(journal.append_spin(9, "horario")))
+        worker.start()
+        worker.join(2)
+        assert not worker.is_alive(), "append_spin bloqueado pela compactação"
+        return temp_path
+
+    monkeypatch.setattr(journal, "_build_segment", build_and_append)
+    assert journal.compact(3) == 3
+    assert appended == [6, 7]  # um durante cada segmento gravado
+    assert [r.seq for r in journal.records()] == [4, 5, 6, 7]
+    assert journal.append_spin(1, "horario") == 8
+    journal.close()
+
+    reopened = SpinJournal(path)
+    assert [(r.seq, r.numero) for r in reopened.records()] == [(4, 0), (5, 26), (6, 9), (7, 9), (8, 1)]
+    assert [r.seq for r in reopened.iter_all()] == list(range(1, 9))
+
+
+def test_align(tmp_path):
+    path = tmp_path / "spins.journal"
+    journal = SpinJournal(path)
+    _fill(journal, SPINS[:2])
+
+    journal.align(1)  # Já à frente do checkpoint: nada muda
+    assert (journal.base_seq, journal.count) == (1, 2)
+
+    # state.json registra journal_seq=10 (journal apagado/recriado)
+    journal.align(10)
+    assert (journal.base_seq, journal.count, journal.last_seq) == (11, 0, 10)
+    assert [r.seq for r in journal.iter_all()] == [1, 2]  # registros antigos arquivados
+    assert journal.append_spin(5, "horario") == 11
+
+
+def _replayed_state(tmp_path, keep_last_number: bool) -> GameState:
+    journal = SpinJournal(tmp_path / "spins.journal")
+    _fill(journal)
+    journal.append_reset(keep_last_number=keep_last_number)
+    journal.append_spin(8, "anti-horario")
+    journal.append_spin(11, "horario")
+
+    state = GameState()
+    assert state.replay_journal(journal) == 8
+    assert state.journal_seq == 8
+    return state
+
+
+@pytest.mark.parametrize("keep_last_number", [True, False])
+def test_replay_reset_keep_flag(tmp_path, keep_last_number):
+    state = _replayed_state(tmp_path, keep_last_number)
+    reference = GameState()
+    if keep_last_number:
+        reference.last_number = SPINS[-1][0]
+        reference.last_direction = SPINS[-1][1]
+    reference.process_spin(8, "anti-horario")
+    reference.process_spin(11, "horario")
+
+    assert state.last_number == 11
+    assert state.timeline_cw.forces == reference.timeline_cw.forces
+    assert state.timeline_ccw.forces == reference.timeline_ccw.forces
+
+
+def test_replay_after_checkpoint(tmp_path):
+    journal = SpinJournal(tmp_path / "spins.journal")
+    _fill(journal)
+
+    full = GameState()
+    full.replay_journal(journal)
+
+    partial = GameState()
+    for numero, direcao in SPINS[:3]:
+        partial.process_spin(numero, direcao)
+    partial.journal_seq = 3
+    assert partial.replay_journal(journal) == 2
+    assert partial.timeline_cw.forces == full.timeline_cw.forces
+    assert partial.timeline_ccw.forces == full.timeline_ccw.forces
+
+
+class StubDatabase:
+    """O que handle_new_result usa do DatabaseService."""
+
+    def track_gale_window(self, **kwargs):
+        pass
+
+    def update_result(self, *args):
+        pass
+
+    def save_decision(self, decision):
+        return None
+
+
+class FakeWebSocket:
+    subprotocol = None
+
+    async def send(self, message):
+        pass
+
+
+def test_replay_matches_live_processing(tmp_path):
+    import asyncio
+    import random
+
+    from app_config.settings import settings
+    from models.trace import tracer
+    from server.connection_manager import ConnectionManager
+    from server.message_handler import MessageHandler
+    from server.message_router import Request
+    from strategies import create_strategy
+
+    async def go():
+        journal = SpinJournal(tmp_path / "spins.journal")
+        state = GameState()
+        handler = MessageHandler(
+            state, create_strategy(settings.strategy.primary), asyncio.Lock(), str(tmp_path),
+            journal=journal, connections=ConnectionManager(), db=StubDatabase()
+        )
+        ws = FakeWebSocket()
+        rng = random.Random(3)
+
+        async def result(i):
+            data = {"type": "novo_resultado", "numero": rng.randint(0, 36),
+                    "direcao": rng.choice(("horario", "anti-horario")), "timestamp": 1000 * i}
+            req = Request(ws, data, "c1", "novo_resultado", tracer.start(f"t{i}"))
+            await handler.handle_new_result(req)
+
+        for i in range(150):
+            await result(i)
+        checkpoint = tmp_path / "state.json"
+        state.save(checkpoint)
+        # Cauda: novo_resultado + histórico (só timelines) + novo_resultado
+        for i in range(150, 300):
+            await result(i)
+        history = [{"numero": n, "direcao": "horario"} for n in (5, 9, 14)]
+        await handler.handle_initial_history(Request(ws, {"resultados": history}, "c1", "historico_inicial"))
+        for i in range(300, 320):
+            await result(i)
+        return state, journal, checkpoint
+
+    live, journal, checkpoint = asyncio.run(go())
+    assert len(live.performance_sda17_cw) + len(live.performance_sda17_ccw) > 0
+
+    checkpointed = GameState.read(checkpoint)
+    replayed = GameState.load(checkpoint, journal, create_strategy(settings.strategy.primary))
+    assert replayed.journal_seq == live.journal_seq == 323
+    assert replayed.to_dict() == live.to_dict()
+    # O checkpoint estava atrás: performance e Martingale vieram do replay
+    assert checkpointed.get_performance_stats() != live.get_performance_stats()
+
+
+def test_result_replay_requires_strategy(tmp_path):
+    journal = SpinJournal(tmp_path / "spins.journal")
+    journal.append_spin(4, "horario", result=True)
+    assert next(journal.records()).is_result
+    with pytest.raises(ValueError):
+        GameState().replay_journal(journal)
@@ -0,0 +1,118 @@
+# Roleta Cloud - Testes do ForceKalman (contra o KalmanFilter matricial do arquivo)
+
+import importlib
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from state.game import GameState
+from state.kalman import ForceKalman, KalmanExtension
+
+ARCHIVE = Path(__file__).resolve().parent.parent / "archive" / "backup_antes_sync"
+
+
+@pytest.fixture
+def KalmanFilter(monkeypatch):
+    """KalmanFilter original (NumPy, posição absoluta)."""
+    monkeypatch.syspath_prepend(str(ARCHIVE))
+    return importlib.import_module("force_kalman").KalmanFilter
+
+
+def _forces(seed, count=200):
+    rng = random.Random(seed)
+    return [rng.randint(0, 36) for _ in range(count)]
+
+
+def _covariance(kf: ForceKalman) -> np.ndarray:
+    return np.array([
+        [kf.p00, kf.p01, kf.p02],
+        [kf.p01, kf.p11, kf.p12],
+        [kf.p02, kf.p12, kf.p22],
+    ])
+
+
+@pytest.mark.parametrize("seed,process_noise,measurement_noise", [(1, 0.5, 1.0), (2, 0.1, 4.0), (3, 2.0, 0.5)])
+def test_matches_matrix_filter(KalmanFilter, seed, process_noise, measurement_noise):
+    reference = KalmanFilter(ruido_processo=process_noise, ruido_medicao=measurement_noise)
+    kf = ForceKalman(process_noise=process_noise, measurement_noise=measurement_noise)
+    position = 0.0  # Linha absoluta: soma das forças observadas
+
+    for force in _forces(seed):
+        position += force
+        reference.predict_and_update(position, dt=1.0)
+        kf.observe(force)
+
+        # Mesmo estado, com a posição relativa à última medição
+        np.testing.assert_allclose([kf.pos + position, kf.vel, kf.acc], reference.x, rtol=1e-9, atol=1e-7)
+        np.testing.assert_allclose(_covariance(kf), reference.P, rtol=1e-9, atol=1e-9)
+
+        # Próxima força = próxima posição absoluta - posição atual
+        predicted, confidence = kf.forecast()
+        assert predicted == pytest.approx(reference.prever_futuro(1.0) - position, abs=1e-6)
+        ahead = KalmanFilter(ruido_processo=process_noise, ruido_medicao=measurement_noise)
+        ahead.set_state(reference.get_state())
+        ahead.predict(1.0)
+        assert confidence == pytest.approx(ahead.get_confianca(), rel=1e-9)
+
+
+def test_from_forces_and_persistence():
+    forces = _forces(4, 50)
+    kf = ForceKalman.from_forces(forces)
+    assert kf.updates == 50
+
+    restored = ForceKalman()
+    assert restored.load_list(kf.to_list())
+    assert restored == kf
+    assert not restored.load_list([1.0] * 9)
+    assert not restored.load_list(["x"] * 10)
+    assert restored == kf
+
+    kf.reset()
+    assert kf == ForceKalman()
+
+
+def test_extension_follows_process_spin():
+    state = GameState()
+    extension = state.attach_extension(KalmanExtension())
+    rng = random.Random(5)
+    for _ in range(60):
+        state.process_spin(rng.randint(0, 36), rng.choice(("horario", "anti-horario")))
+
+    for direction, timeline in (("cw", state.timeline_cw), ("ccw", state.timeline_ccw)):
+        expected = ForceKalman.from_forces(reversed(timeline.forces))
+        predicted, confidence, observed = extension.forecast(direction)
+        assert (predicted, confidence) == pytest.approx(expected.forecast())
+        assert observed == expected.updates == timeline.size
+
+    # Snapshot do state.json restaura os filtros
+    data = extension.to_dict()
+    reloaded = KalmanExtension()
+    reloaded.load(data)
+    assert reloaded.forecasts == extension.forecasts
+
+    state.reset_session()
+    assert extension.forecast("cw") == KalmanExtension().forecast("cw")
+
+
+def test_snapshot_freezes_forecast():
+    from app_config.settings import settings
+    from strategies.ensemble import snapshot
+    from strategies.kalman import KalmanForceStrategy
+
+    state = GameState()
+    strategy = KalmanForceStrategy(min_forces=1)
+    strategy.attach(state)
+    wheel = settings.game.wheel_sequence
+    for numero in (3, 17, 25, 8):
+        state.process_spin(numero, "horario")
+
+    frozen = snapshot(state.timeline_cw, state)
+    expected = strategy.analyze(frozen, 8, wheel)
+    # Próximo spin chega antes da estratégia (atrasada) ler o snapshot
+    state.process_spin(30, "horario")
+    assert strategy.extension.forecast("cw") != frozen.extensions["kalman"]
+    assert strategy.analyze(frozen, 8, wheel) == expected
+    # Sem estado ligado: recalcula sobre as forças copiadas
+    assert KalmanForceStrategy(min_forces=1).analyze(frozen, 8, wheel).details["observed"] == frozen.size
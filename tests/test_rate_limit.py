@@ -0,0 +1,129 @@
+# Roleta Cloud - Testes do Rate Limit (TokenBucket e RateLimiter)
+
+import asyncio
+import json
+
+import pytest
+
+from server import message_router
+from server.message_router import LIMIT_QUERY, LIMIT_SPIN, RateLimiter, TokenBucket
+
+
+class FakeWebSocket:
+    subprotocol = None
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(json.loads(message))
+
+
+class Clock:
+    """time.monotonic controlado pelo teste."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(message_router.time, "monotonic", clock)
+    return clock
+
+
+def _limiter(**buckets):
+    limiter = RateLimiter(enabled=True)
+    limiter.buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in buckets.items()}
+    return limiter
+
+
+def _spin(numero=7):
+    return json.dumps({"type": "novo_resultado", "numero": numero, "direcao": "horario"})
+
+
+def test_token_bucket_burst_and_refill():
+    bucket = TokenBucket(rate=10.0, burst=3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(4)] == [True, True, True, False]
+    assert bucket.retry_after_ms() == 101  # 1 token a 10/s
+
+    assert bucket.take(now + 0.1)
+    assert not bucket.take(now + 0.1)
+    # Parado muito tempo: acumula só até o burst
+    assert sum(bucket.take(now + 60) for _ in range(10)) == 3
+
+
+def test_token_bucket_minimum_burst():
+    bucket = TokenBucket(rate=1.0, burst=0)
+    assert bucket.burst == 1 and bucket.take(bucket.updated)
+
+
+def test_one_error_per_burst(clock):
+    async def go():
+        limiter = _limiter(**{LIMIT_SPIN: (1.0, 2)})
+        ws = FakeWebSocket()
+        results = [(await limiter.screen(ws, _spin()))[0] for _ in range(5)]
+        assert results == [True, True, False, False, False]
+        assert len(ws.sent) == 1
+        error = ws.sent[0]
+        assert error["code"] == "RATE_LIMITED" and error["retry_after_ms"] > 0
+
+        # Passada a rajada, uma nova recusa volta a avisar
+        clock.now += 1.0
+        assert (await limiter.screen(ws, _spin()))[0]
+        assert not (await limiter.screen(ws, _spin()))[0]
+        assert len(ws.sent) == 2
+
+    asyncio.run(go())
+
+
+def test_query_flood_does_not_consume_spin_tokens(clock):
+    async def go():
+        limiter = _limiter(**{LIMIT_SPIN: (1.0, 3), LIMIT_QUERY: (1.0, 2)})
+        ws = FakeWebSocket()
+        get_state = json.dumps({"type": "get_state"})
+        passed = [(await limiter.screen(ws, get_state))[0] for _ in range(100)]
+        assert sum(passed) == 2
+        assert limiter.buckets[LIMIT_SPIN].tokens == 3
+
+        for numero in range(3):
+            ok, data = await limiter.screen(ws, _spin(numero))
+            assert ok and data["numero"] == numero
+        assert [m["code"] for m in ws.sent] == ["RATE_LIMITED"]
+
+    asyncio.run(go())
+
+
+def test_disabled_passes_everything(clock):
+    async def go():
+        limiter = RateLimiter(enabled=False)
+        limiter.buckets = {LIMIT_SPIN: TokenBucket(1.0, 1)}
+        ws = FakeWebSocket()
+        for _ in range(10):
+            ok, data = await limiter.screen(ws, _spin())
+            assert ok and data["type"] == "novo_resultado"
+        assert ws.sent == []
+
+    asyncio.run(go())
+
+
+def test_frame_without_peekable_type(clock):
+    async def go():
+        limiter = _limiter(**{LIMIT_SPIN: (1.0, 1), LIMIT_QUERY: (1.0, 5)})
+        ws = FakeWebSocket()
+        # Spin legado (sem "type"): decodificado e contado como spin
+        legacy = json.dumps({"numero": 5, "direcao": "horario"})
+        assert (await limiter.screen(ws, legacy))[0]
+        assert await limiter.screen(ws, legacy) == (False, None)
+        # "type" fora da primeira posição: decodifica antes de decidir
+        query = json.dumps({"mesa_id": "m1", "type": "listar_mesas"})
+        assert (await limiter.screen(ws, query)) == (True, {"mesa_id": "m1", "type": "listar_mesas"})
+        # Frame inválido passa com o valor de `invalid`
+        assert await limiter.screen(ws, "{quebrado", invalid="x") == (True, "x")
+
+    asyncio.run(go())
@@ -0,0 +1,61 @@
+# Roleta Cloud - Testes das Tabelas Compiladas da Roda
+
+import gc
+import weakref
+
+from core.roulette import _COMPILED_CACHE_SIZE, _compiled_cache, RouletteCore, compile_wheel, wheel
+
+
+class TrackedList(list):
+    """Lista com weakref (list comum não aceita)."""
+
+
+def test_european_sequence_reuses_global_wheel():
+    assert compile_wheel() is wheel
+    assert compile_wheel(list(RouletteCore.WHEEL_SEQUENCE)) is wheel
+    assert compile_wheel(tuple(RouletteCore.WHEEL_SEQUENCE)) is wheel
+
+
+def test_mutated_sequence_is_recompiled():
+    sequence = list(range(37))
+    first = compile_wheel(sequence)
+    assert first.neighbors(0, 1) == [36, 0, 1]
+
+    sequence[0], sequence[1] = sequence[1], sequence[0]
+    second = compile_wheel(sequence)
+    assert second is not first
+    assert second.sequence == sequence
+    assert second.neighbors(1, 1) == [36, 1, 0]
+    # Mesmo conteúdo, outro objeto: mesma roda compilada
+    assert compile_wheel(list(sequence)) is second
+
+
+def test_cache_keeps_no_caller_sequences_and_is_bounded():
+    sequence = TrackedList(range(37))
+    sequence.reverse()
+    ref = weakref.ref(sequence)
+    compile_wheel(sequence)
+    del sequence
+    gc.collect()
+    assert ref() is None
+
+    for shift in range(_COMPILED_CACHE_SIZE * 2):
+        compile_wheel([(n + shift) % 37 for n in range(37)])
+    assert len(_compiled_cache) <= _COMPILED_CACHE_SIZE
+
+
+def test_instances_resolve_wheel_once():
+    from app_config.settings import settings
+    from state.game import GameState
+    from strategies.sda17 import SDA17Strategy
+
+    state = GameState()
+    strategy = SDA17Strategy()
+    assert state.wheel is wheel and strategy.wheel is wheel
+    assert strategy._wheel_for(settings.game.wheel_sequence) is wheel
+    assert state._calculate_force(0, 32, "horario") == 1
+    assert strategy._apply_force(0, 1, "cw", settings.game.wheel_sequence) == 32
+    # Outra sequência: compilada à parte, sem mexer na da instância
+    other = list(range(37))
+    assert strategy._apply_force(0, 1, "cw", other) == 1
+    assert strategy.wheel is wheel
@@ -0,0 +1,137 @@
+# Roleta Cloud - Testes do Modo Sharded (frames IPC e troca de worker)
+
+import asyncio
+import json
+
+import pytest
+
+from server.shard import (
+    FRAME, OP_CLOSE, OP_MESSAGE, OP_OPEN, OP_SEND, ShardRouter, ShardWorker, _Client, encode_frame, read_frame
+)
+from server.tables import TableRegistry
+
+
+class FakeWriter:
+    """Lado de escrita de um link IPC (guarda os bytes)."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+class FakeWebSocket:
+    subprotocol = None
+    remote_address = ("127.0.0.1", 5000)
+
+
+def _reader(data=b"", eof=True):
+    reader = asyncio.StreamReader()
+    reader.feed_data(bytes(data))
+    if eof:
+        reader.feed_eof()
+    return reader
+
+
+async def _frames(data):
+    reader = _reader(data)
+    frames = []
+    while not reader.at_eof():
+        frames.append(await read_frame(reader))
+    return frames
+
+
+def test_frame_round_trip():
+    async def go():
+        raw = (
+            encode_frame({"op": OP_MESSAGE, "cid": "c1"}, '{"type": "get_state", "mesa": "ção"}')
+            + encode_frame({"op": OP_SEND, "cid": "c1"}, b"\x81\x00\x01")
+            + encode_frame({"op": OP_CLOSE, "cid": "c1", "code": 1000, "reason": ""})
+        )
+        frames = await _frames(raw)
+        assert frames[0] == ({"op": OP_MESSAGE, "cid": "c1"}, '{"type": "get_state", "mesa": "ção"}')
+        assert frames[1] == ({"op": OP_SEND, "cid": "c1", "bin": True}, b"\x81\x00\x01")
+        # Corpo vazio é binário (b"")
+        assert frames[2] == ({"op": OP_CLOSE, "cid": "c1", "code": 1000, "reason": "", "bin": True}, b"")
+
+    asyncio.run(go())
+
+
+def test_frame_layout():
+    header = {"op": OP_OPEN, "cid": "c1"}
+    raw = encode_frame(dict(header), "abc")
+    header_size, body_size = FRAME.unpack_from(raw)
+    assert json.loads(raw[FRAME.size:FRAME.size + header_size]) == header
+    assert raw[FRAME.size + header_size:] == b"abc" and body_size == 3
+
+
+@pytest.mark.parametrize("cut", [3, FRAME.size + 2, -1])
+def test_truncated_frame(cut):
+    raw = encode_frame({"op": OP_MESSAGE, "cid": "c1"}, "corpo")
+
+    async def go():
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_frame(_reader(raw[:cut]))
+
+    asyncio.run(go())
+
+
+def test_router_switch_closes_old_worker_and_flags_open():
+    async def go():
+        router = ShardRouter(2)
+        router.links = [FakeWriter(), FakeWriter()]
+        client = _Client("c1", FakeWebSocket(), sender=None)
+        client.device_id = "dev"
+
+        await router._join(client, 0, "default")
+        await router._join(client, 1, "mesa_x")
+        return client, await _frames(router.links[0].data), await _frames(router.links[1].data)
+
+    client, first, second = asyncio.run(go())
+    assert client.worker == 1
+    assert [(h["op"], h.get("switch")) for h, _ in first] == [(OP_OPEN, False), (OP_CLOSE, None)]
+    [(opened, _)] = second
+    assert opened["op"] == OP_OPEN and opened["switch"] is True
+    assert (opened["mesa_id"], opened["device_id"], opened["addr"]) == ("mesa_x", "dev", ["127.0.0.1", 5000])
+
+
+@pytest.mark.parametrize("switch", [True, False])
+def test_worker_announces_mesa_ativa_after_switch(tmp_path, switch):
+    async def go():
+        worker = ShardWorker(0, 1)
+        worker.tables = TableRegistry(
+            str(tmp_path), tables_dir=tmp_path / "tables",
+            state_file=tmp_path / "state.json", journal_file=tmp_path / "spins.journal"
+        )
+        link = FakeWriter()
+        reader = _reader(encode_frame({
+            "op": OP_OPEN, "cid": "c1", "mesa_id": "mesa_x", "device_id": "dev",
+            "addr": ["127.0.0.1", 5000], "subprotocol": None, "switch": switch
+        }), eof=False)
+        task = asyncio.create_task(worker._on_link(reader, link))
+
+        # Espera a conexão entrar na sala da mesa (role_assigned sai pelo fan-out)
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            table = worker.tables.tables.get("mesa_x")
+            if table is not None and table.connections.connections:
+                break
+        await asyncio.sleep(0.05)
+        reader.feed_eof()
+        await task
+        await asyncio.sleep(0.01)
+        for table in worker.tables.tables.values():
+            table.journal.close()
+        return [json.loads(body) for header, body in await _frames(link.data) if header["op"] == OP_SEND]
+
+    sent = asyncio.run(go())
+    announced = [m for m in sent if m.get("type") == "mesa_ativa"]
+    if switch:
+        assert announced == [{"type": "mesa_ativa", "mesa_id": "mesa_x", "connection_id": announced[0]["connection_id"]}]
+    else:
+        assert announced == []
+    assert "role_assigned" in [m["type"] for m in sent]
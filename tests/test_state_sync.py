@@ -0,0 +1,192 @@
+# Roleta Cloud - Testes do state_sync (diff, full, delta e resync)
+
+import asyncio
+
+import pytest
+
+from codec import Frame
+from server.connection_manager import ConnectionInfo
+from server.fanout import KIND_HEARTBEAT, KIND_STATE, ConnectionSender
+from server.state_sync import SYNC_MODE_DELTA, StateSyncCache, diff_state
+from state.game import GameState
+
+
+class StubDatabase:
+    """O que StateSyncCache usa do DatabaseService."""
+
+    def __init__(self):
+        self.window_version = 0
+
+    def get_window_history(self):
+        return {"windows": [], "version": self.window_version}
+
+
+class FakeWebSocket:
+    subprotocol = None
+
+    def __init__(self):
+        self.sent = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def send(self, message):
+        await self.release.wait()
+        self.sent.append(message)
+
+
+def _conn(mode="full"):
+    return ConnectionInfo(id="c1", device_id="d1", websocket=None, role="slave", connected_at=0.0, sync_mode=mode)
+
+
+def _cache():
+    state = GameState()
+    return state, StateSyncCache(state, StubDatabase(), resend_timeout=60.0)
+
+
+def _apply(state, changed, removed):
+    """Aplica um delta como o cliente (merge recursivo de dicts)."""
+    for path in removed:
+        *parents, leaf = path.split(".")
+        target = state
+        for k in parents:
+            target = target[k]
+        target.pop(leaf, None)
+    for k, value in changed.items():
+        if isinstance(value, dict) and isinstance(state.get(k), dict):
+            _apply(state[k], value, [])
+        else:
+            state[k] = value
+
+
+def test_diff_state():
+    old = {"a": 1, "b": {"x": 1, "y": [1, 2], "z": 0}, "c": "keep", "gone": 1}
+    new = {"a": 2, "b": {"x": 1, "y": [1, 3]}, "c": "keep", "novo": {"k": 1}}
+    changed, removed = diff_state(old, new)
+    assert changed == {"a": 2, "b": {"y": [1, 3]}, "novo": {"k": 1}}
+    assert sorted(removed) == ["b.z", "gone"]
+    assert diff_state(new, new) == ({}, [])
+
+    rebuilt = {"a": 1, "b": {"x": 1, "y": [1, 2], "z": 0}, "c": "keep", "gone": 1}
+    _apply(rebuilt, changed, removed)
+    assert rebuilt == new
+
+
+def test_full_mode_synced_only_after_send():
+    async def go():
+        state, cache = _cache()
+        conn = _conn()
+        seq = await cache.refresh(asyncio.Lock())
+
+        message, kind, on_sent = cache.render(conn)
+        assert kind == KIND_STATE and message is cache.full_frame
+        # Ainda não enviado: o próximo tick repete o estado completo
+        assert conn.synced_seq is None
+        assert cache.render(conn)[0] is cache.full_frame
+
+        on_sent()
+        assert conn.synced_seq == seq
+        message, kind, on_sent = cache.render(conn)
+        assert kind == KIND_HEARTBEAT and on_sent is None
+
+        state.touch()
+        assert await cache.refresh(asyncio.Lock()) == seq + 1
+        assert cache.render(conn)[1] == KIND_STATE
+
+    asyncio.run(go())
+
+
+def test_full_mode_evicted_frame_is_resent():
+    async def go():
+        _, cache = _cache()
+        conn = _conn()
+        await cache.refresh(asyncio.Lock())
+        websocket = FakeWebSocket()
+        websocket.release.clear()  # Cliente lento: nada sai da fila
+        sender = ConnectionSender("c1", websocket, max_queue=2)
+        sender.start()
+
+        sender.enqueue(Frame({"type": "evento", "n": 0}))  # preso no send
+        await asyncio.sleep(0)
+        message, kind, on_sent = cache.render(conn)
+        assert sender.enqueue(message, kind, on_sent=on_sent)
+        sender.enqueue(Frame({"type": "evento", "n": 1}))
+        sender.enqueue(Frame({"type": "evento", "n": 2}))  # fila cheia: despeja o state_sync
+
+        websocket.release.set()
+        await asyncio.sleep(0.05)
+        assert len(websocket.sent) == 3
+        assert conn.synced_seq is None
+        # Nada de keep-alive: o estado completo volta no próximo tick
+        message, kind, on_sent = cache.render(conn)
+        assert kind == KIND_STATE
+        assert sender.enqueue(message, kind, on_sent=on_sent)
+        await asyncio.sleep(0.05)
+        assert conn.synced_seq == cache.seq
+        await sender.stop()
+
+    asyncio.run(go())
+
+
+def test_delta_ack_and_resync():
+    async def go():
+        state, cache = _cache()
+        lock = asyncio.Lock()
+        conn = _conn()
+        cache.subscribe(conn, SYNC_MODE_DELTA)
+        first = await cache.refresh(lock)
+
+        # Sem ack: estado completo
+        assert cache.message_for(conn) is cache.full_frame
+        assert conn.inflight_seq == first
+        # Stop-and-wait: aguardando o ack
+        assert cache.message_for(conn).message["type"] == "heartbeat"
+        assert cache.ack(conn, first) and conn.inflight_seq is None
+        assert not cache.ack(conn, first)
+        assert not cache.ack(conn, 999)
+        assert cache.message_for(conn).message["type"] == "heartbeat"
+
+        client = dict(cache._history[first])
+        state.process_spin(17, "horario")
+        second = await cache.refresh(lock)
+        delta = cache.message_for(conn).message
+        assert delta["type"] == "state_delta"
+        assert (delta["seq"], delta["base_seq"]) == (second, first)
+        assert "last_number" in delta["changed"]
+        _apply(client, delta["changed"], delta.get("removed", []))
+        assert client == cache._history[second]
+        cache.ack(conn, second)
+
+        cache.resync(conn)
+        assert (conn.acked_seq, conn.inflight_seq, conn.synced_seq) == (None, None, None)
+        assert cache.message_for(conn) is cache.full_frame
+        assert cache.fulls_sent == 2 and cache.deltas_sent == 1
+
+    asyncio.run(go())
+
+
+def test_delta_base_outside_history_falls_back_to_full():
+    async def go():
+        state, cache = _cache()
+        cache.history_size = 2
+        lock = asyncio.Lock()
+        conn = _conn(SYNC_MODE_DELTA)
+        base = await cache.refresh(lock)
+        cache.message_for(conn)
+        cache.ack(conn, base)
+        for numero in (1, 2, 3):
+            state.process_spin(numero, "horario")
+            await cache.refresh(lock)
+        assert base not in cache._history
+        assert cache.message_for(conn) is cache.full_frame
+
+    asyncio.run(go())
+
+
+@pytest.mark.parametrize("mode", ["full", "delta", "outro"])
+def test_subscribe_mode(mode):
+    _, cache = _cache()
+    conn = _conn()
+    conn.synced_seq = 5
+    expected = SYNC_MODE_DELTA if mode == "delta" else "full"
+    assert cache.subscribe(conn, mode) == expected
+    assert conn.sync_mode == expected and conn.synced_seq is None
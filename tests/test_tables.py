@@ -0,0 +1,115 @@
+# Roleta Cloud - Testes do Registro de Mesas
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from server.tables import TableContext, TableRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = TableRegistry(
+        str(tmp_path), max_tables=3, idle_timeout=60.0,
+        tables_dir=tmp_path / "tables",
+        state_file=tmp_path / "state.json",
+        journal_file=tmp_path / "spins.journal"
+    )
+    yield registry
+    for table in registry.tables.values():
+        if table.journal is not None:
+            table.journal.close()
+
+
+def test_concurrent_acquire_loads_once_off_loop(registry, monkeypatch):
+    built, prepared = [], []
+    build = registry._build
+
+    def tracked_build(mesa_id):
+        built.append((mesa_id, threading.current_thread()))
+        return build(mesa_id)
+
+    monkeypatch.setattr(registry, "_build", tracked_build)
+    monkeypatch.setattr(TableContext, "prepare", lambda self: prepared.append(self.mesa_id))
+
+    async def go():
+        tables = await asyncio.gather(*(registry.acquire("mesa_a") for _ in range(5)))
+        return tables, threading.current_thread()
+
+    tables, loop_thread = asyncio.run(go())
+    assert all(t is tables[0] for t in tables)
+    assert [mesa_id for mesa_id, _ in built] == ["mesa_a"]
+    assert built[0][1] is not loop_thread
+    assert prepared == ["mesa_a"]
+    assert registry.loaded == 2 and not registry._loading
+
+
+def _busy(table):
+    """Uma conexão na sala: a mesa deixa de ser ociosa."""
+    table.connections.connections["conn"] = object()
+
+
+async def _drain(registry):
+    await asyncio.gather(*registry._closing.values())
+
+
+def test_lru_evicts_least_recently_used_idle_table(registry):
+    async def go():
+        a = await registry.acquire("mesa_a")
+        await registry.acquire("mesa_b")
+        assert await registry.acquire("mesa_a") is a  # mesa_b passa a ser a menos usada
+        await registry.acquire("mesa_c")
+        assert list(registry.tables) == ["default", "mesa_a", "mesa_c"]
+        assert registry.evicted == 1
+
+        # Mesa com conexão não sai, mesmo sendo a menos usada
+        _busy(a)
+        await registry.acquire("mesa_a")
+        await registry.acquire("mesa_d")
+        await registry.acquire("mesa_e")
+        assert list(registry.tables) == ["default", "mesa_a", "mesa_e"]
+        a.connections.connections.clear()
+        await _drain(registry)
+
+    asyncio.run(go())
+
+
+def test_evicted_table_state_survives_reload(registry):
+    async def go():
+        b = await registry.acquire("mesa_b")
+        b.game_state.process_spin(17, "horario")
+        b.game_state.process_spin(4, "anti-horario")
+        b.handler.persist_state(2)
+        await registry.acquire("mesa_c")
+        await registry.acquire("mesa_d")  # mesa_b descarregada (grava o estado)
+        assert "mesa_b" not in registry.tables
+
+        # Recarregar espera a gravação em andamento
+        reloaded = await registry.acquire("mesa_b")
+        assert reloaded is not b
+        assert reloaded.game_state.last_number == 4
+        assert reloaded.game_state.timeline_ccw.forces == b.game_state.timeline_ccw.forces
+        await _drain(registry)
+
+    asyncio.run(go())
+
+
+def test_sweep_unloads_idle_tables(registry):
+    async def go():
+        a = await registry.acquire("mesa_a")
+        b = await registry.acquire("mesa_b")
+        _busy(b)
+        now = time.monotonic()
+        assert registry.sweep(now + 30) == 0
+        assert registry.sweep(now + 61) == 1  # mesa_a; mesa_b tem conexão, a padrão nunca sai
+        assert list(registry.tables) == ["default", "mesa_b"]
+        assert a.mesa_id in registry._closing
+
+        registry.idle_timeout = 0  # desligado
+        b.connections.connections.clear()
+        assert registry.sweep(now + 3600) == 0
+        await _drain(registry)
+
+    asyncio.run(go())
@@ -0,0 +1,167 @@
+# Roleta Cloud - Testes do Escritor em Lote (fila cheia)
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pytest
+
+from database.writer import POLICY_BLOCK, POLICY_DROP, BatchedDecisionWriter, WriterOverloaded
+
+
+class FakeConnections:
+    @contextmanager
+    def writer(self):
+        yield None
+
+
+class FakeRepository:
+    connections = FakeConnections()
+
+
+@pytest.fixture
+def stalled():
+    """Escritor com a thread presa em uma operação e a fila (1) cheia."""
+    writers = []
+    gate = threading.Event()
+
+    def make(policy, block_timeout):
+        started = threading.Event()
+        writer = BatchedDecisionWriter(
+            FakeRepository(), max_queue=1, batch_size=1, policy=policy, block_timeout=block_timeout
+        )
+        writers.append(writer)
+        writer.call(lambda conn: (started.set(), gate.wait(5)))
+        assert started.wait(5)
+        writer.call(lambda conn: "queued")
+        return writer
+
+    yield make
+    gate.set()
+    for writer in writers:
+        assert writer.flush(5)
+        writer.close()
+
+
+@pytest.mark.parametrize("policy", [POLICY_DROP, POLICY_BLOCK])
+def test_full_queue_never_blocks_event_loop(stalled, policy):
+    writer = stalled(policy, block_timeout=5.0)
+
+    async def submit():
+        start = time.perf_counter()
+        future = writer.call(lambda conn: None)
+        return future, time.perf_counter() - start
+
+    future, elapsed = asyncio.run(submit())
+    assert elapsed < 0.1
+    with pytest.raises(WriterOverloaded):
+        future.result(timeout=0)
+    assert writer.dropped == 1
+
+
+def test_block_policy_waits_outside_event_loop(stalled):
+    writer = stalled(POLICY_BLOCK, block_timeout=0.2)
+    start = time.perf_counter()
+    future = writer.call(lambda conn: None)
+    assert time.perf_counter() - start >= 0.2
+    with pytest.raises(WriterOverloaded):
+        future.result(timeout=0)
+
+
+def test_ops_run_in_order():
+    writer = BatchedDecisionWriter(FakeRepository(), max_queue=100, batch_size=10)
+    seen = []
+    futures = [writer.call(lambda conn, i=i: seen.append(i) or i) for i in range(25)]
+    assert writer.flush(5)
+    assert [f.result() for f in futures] == list(range(25))
+    assert seen == list(range(25))
+    assert writer.stats()["dropped"] == 0
+    writer.close()
+
+
+class WindowRepository(FakeRepository):
+    """O que DatabaseService.track_gale_window usa do repositório."""
+
+    def __init__(self, fail_insert=False):
+        self.fail_insert = fail_insert
+        self.windows = []
+        self.plays = []
+
+    def get_active_window(self, direction, mesa_id="default"):
+        return None
+
+    def insert_gale_window(self, conn, window):
+        if self.fail_insert:
+            raise RuntimeError("disco cheio")
+        self.windows.append(window)
+        return len(self.windows)
+
+    def insert_window_play(self, conn, play):
+        self.plays.append(play.window_id)
+        return len(self.plays)
+
+    def mark_window_closed(self, conn, window_id, result, next_level):
+        pass
+
+    def insert_session(self, conn, session):
+        return session.id
+
+
+@pytest.fixture
+def service(monkeypatch):
+    from database.service import DatabaseService
+
+    def make(repository, writer):
+        monkeypatch.setattr(DatabaseService, "repository", property(lambda self: repository))
+        monkeypatch.setattr(DatabaseService, "writer", property(lambda self: writer))
+        return DatabaseService("m1")
+
+    return make
+
+
+def _play(service, window_count, hit=True):
+    from state.game import GameState
+
+    service.track_gale_window(
+        game_state=GameState(), direction="horario", hit=hit,
+        martingale_info={"window_count": window_count, "level_before": 1},
+        pending={"center": 3}, force=5, numero=3
+    )
+
+
+def test_dropped_window_creation_frees_direction(stalled, service):
+    writer = stalled(POLICY_DROP, block_timeout=0)
+    db = service(WindowRepository(), writer)
+    _play(db, window_count=1)
+    assert db.active_window_ids["cw"] is None
+    assert db.windows_lost == 1
+
+
+def test_failed_window_creation_frees_direction(service):
+    repository = WindowRepository(fail_insert=True)
+    writer = BatchedDecisionWriter(repository, max_queue=100, batch_size=10)
+    db = service(repository, writer)
+    _play(db, window_count=1)
+    assert writer.flush(5)
+    assert isinstance(db.active_window_ids["cw"], Future)
+
+    # Próxima jogada: a janela com erro é esquecida, nada mais é enfileirado para ela
+    _play(db, window_count=2)
+    assert db.active_window_ids["cw"] is None and db.windows_lost == 1
+    repository.fail_insert = False
+    _play(db, window_count=1)
+    _play(db, window_count=2)
+    assert writer.flush(5)
+    assert repository.plays == [1, 1] and db.windows_lost == 1
+    writer.close()
+
+
+def test_create_session_goes_through_writer(service):
+    repository = WindowRepository()
+    writer = BatchedDecisionWriter(repository, max_queue=100, batch_size=10)
+    db = service(repository, writer)
+    future = db.create_session("session_1")
+    assert future.result(timeout=5) == "session_1"
+    writer.close()